@@ -0,0 +1,58 @@
+"""
+SmartWorker 端到端吞吐基准测试
+
+用合成 PDF 语料和本地 mock LLM 服务跑 SmartWorker.process_file，
+报告渲染/编码/LLM 等待/合并各阶段耗时、页/秒、延迟分位数和峰值内存，
+JSON 报告格式与 markpdfdown-bench 相同，可用 --compare 对比两次提交：
+
+    python scripts/benchmark.py --pages 40 --concurrency 8 -o before.json
+    python scripts/benchmark.py --pages 40 --concurrency 8 --compare before.json
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from src.worker.smart_worker import SmartWorker
+from markpdfdown.benchmark.profiler import DEFAULT_TARGETS
+from markpdfdown.benchmark.runner import MOCK_API_KEY, MOCK_MODEL, create_parser, run_cli
+from markpdfdown.config import config
+
+# 在核心阶段之外统计合并每页 markdown 的耗时
+TARGETS = [*DEFAULT_TARGETS, (SmartWorker, "_merge_pages", "merge")]
+
+
+def convert_smart_worker(pdf: bytes, base_url: str, concurrency: int = 4) -> None:
+    """用 SmartWorker 转换一份 PDF (输出写到临时目录)"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        input_path = os.path.join(output_dir, "benchmark.pdf")
+        with open(input_path, "wb") as f:
+            f.write(pdf)
+        worker = SmartWorker(model_name=MOCK_MODEL, concurrency=concurrency, api_key=MOCK_API_KEY, base_url=base_url)
+        asyncio.run(worker.process_file(input_path))
+
+
+def main():
+    parser = create_parser()
+    parser.prog = "benchmark.py"
+    parser.add_argument("--concurrency", type=int, default=4, help="SmartWorker 页面并发数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # 基准测试不能命中补全缓存
+    config.cache_path = ""
+
+    def convert(pdf: bytes, base_url: str) -> None:
+        convert_smart_worker(pdf, base_url, args.concurrency)
+
+    sys.exit(run_cli(args, convert, pipeline="backend", targets=TARGETS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+数据库迁移：添加页面过滤统计字段
+
+添加字段：
+- skipped_pages: 跳过的空白页数
+- deduplicated_pages: 复用已有结果的重复页数
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from src.db.database import AsyncSessionLocal
+
+
+async def migrate():
+    """执行数据库迁移"""
+    print("=" * 60)
+    print("数据库迁移：添加页面过滤统计字段")
+    print("=" * 60)
+
+    async with AsyncSessionLocal() as session:
+        try:
+            # 检查字段是否已存在
+            result = await session.execute(text("PRAGMA table_info(tasks)"))
+            columns = [row[1] for row in result.fetchall()]
+
+            print("\n当前字段:", columns)
+
+            for column in ("skipped_pages", "deduplicated_pages"):
+                if column not in columns:
+                    print(f"\n添加字段: {column}")
+                    await session.execute(text(
+                        f"ALTER TABLE tasks ADD COLUMN {column} INTEGER DEFAULT 0"
+                    ))
+                    print(f"✅ {column} 字段添加成功")
+                else:
+                    print(f"\n⚠️  {column} 字段已存在，跳过")
+
+            await session.commit()
+
+            print("\n✅ 数据库迁移成功完成！")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"\n❌ 迁移失败: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,73 @@
+"""
+数据库迁移：添加逐页转换记录字段
+
+为 task_details 表添加字段：
+- route: 实际走的转换路线
+- model: 采用结果的模型
+- latency: 耗时（秒）
+- input_tokens / output_tokens: 该页消耗的 token
+- retries: LLM 请求失败重试的次数
+- updated_at: 最近一次更新时间
+
+并为 task_details.task_id 建立索引（按任务查询逐页状态）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from src.db.database import AsyncSessionLocal
+
+COLUMNS = (
+    ("route", "VARCHAR"),
+    ("model", "VARCHAR"),
+    ("latency", "FLOAT"),
+    ("input_tokens", "INTEGER DEFAULT 0"),
+    ("output_tokens", "INTEGER DEFAULT 0"),
+    ("retries", "INTEGER DEFAULT 0"),
+    ("updated_at", "DATETIME"),
+)
+
+
+async def migrate():
+    """执行数据库迁移"""
+    print("=" * 60)
+    print("数据库迁移：添加逐页转换记录字段")
+    print("=" * 60)
+
+    async with AsyncSessionLocal() as session:
+        try:
+            # 检查字段是否已存在
+            result = await session.execute(text("PRAGMA table_info(task_details)"))
+            columns = [row[1] for row in result.fetchall()]
+
+            print("\n当前字段:", columns)
+
+            for column, ddl in COLUMNS:
+                if column not in columns:
+                    print(f"\n添加字段: {column}")
+                    await session.execute(text(f"ALTER TABLE task_details ADD COLUMN {column} {ddl}"))
+                    print(f"✅ {column} 字段添加成功")
+                else:
+                    print(f"\n⚠️  {column} 字段已存在，跳过")
+
+            # 与模型中 index=True 生成的索引同名，新建的数据库已包含该索引
+            await session.execute(text("CREATE INDEX IF NOT EXISTS ix_task_details_task_id ON task_details (task_id)"))
+            print("\n✅ ix_task_details_task_id 索引已就绪")
+
+            await session.commit()
+
+            print("\n✅ 数据库迁移成功完成！")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"\n❌ 迁移失败: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
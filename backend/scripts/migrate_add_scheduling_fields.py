@@ -0,0 +1,55 @@
+"""
+数据库迁移：添加任务准入调度字段
+
+添加字段：
+- priority: 优先级，越高越先开始
+- deadline: 截止时间 (UTC)，临近截止的任务提前
+- tenant: 租户，同一租户的任务共享一份页面调度份额
+- weight: 页面调度权重
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from src.db.database import AsyncSessionLocal
+
+
+async def migrate():
+    """执行数据库迁移"""
+    print("=" * 60)
+    print("数据库迁移：添加任务准入调度字段")
+    print("=" * 60)
+
+    async with AsyncSessionLocal() as session:
+        try:
+            # 检查字段是否已存在
+            result = await session.execute(text("PRAGMA table_info(tasks)"))
+            columns = [row[1] for row in result.fetchall()]
+
+            print("\n当前字段:", columns)
+
+            for column, ddl in (("priority", "INTEGER DEFAULT 0"), ("deadline", "DATETIME"), ("tenant", "VARCHAR"), ("weight", "FLOAT DEFAULT 1.0")):
+                if column not in columns:
+                    print(f"\n添加字段: {column}")
+                    await session.execute(text(f"ALTER TABLE tasks ADD COLUMN {column} {ddl}"))
+                    print(f"✅ {column} 字段添加成功")
+                else:
+                    print(f"\n⚠️  {column} 字段已存在，跳过")
+
+            await session.commit()
+
+            print("\n✅ 数据库迁移成功完成！")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"\n❌ 迁移失败: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -1,9 +1,11 @@
 import logging
+import os
 import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import router
+from .routes import UPLOAD_DIR, router
 from src.db.database import init_db
+from src.worker.tasks import RESUME_INTERRUPTED_TASKS, resume_interrupted_tasks
 
 # Configure global logging
 logging.basicConfig(
@@ -27,6 +29,11 @@ app.add_middleware(
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    # BackgroundTasks 模式下未完成的任务随进程一起丢失：从逐页清单续跑
+    if os.getenv("USE_CELERY", "true").lower() != "true" and RESUME_INTERRUPTED_TASKS:
+        resumed = await resume_interrupted_tasks(UPLOAD_DIR)
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} interrupted tasks")
 
 app.include_router(router, prefix="/api/v1")
 
@@ -4,11 +4,14 @@ import uuid
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.database import get_db, AsyncSessionLocal
-from src.db.models import Task, TaskStatus, TaskResponse
-from src.worker.tasks import convert_pdf_task, run_async_process
+from src.db.models import Task, TaskDetail, TaskStatus, TaskResponse, TaskDetailResponse
+from src.worker.tasks import convert_pdf_task, run_async_process, task_admission
+from src.worker.page_states import page_state_writer
 from sqlalchemy import func, select
 
 router = APIRouter()
@@ -73,13 +76,20 @@ async def _process_upload_file(file: UploadFile, task_id: str):
         
     return original_filename, os.path.abspath(file_path)
 
-def _create_task_obj(task_id: str, original_filename: str) -> Task:
+def _create_task_obj(task_id: str, original_filename: str, priority: int = 0, deadline: Optional[datetime] = None, tenant: Optional[str] = None, weight: float = 1.0) -> Task:
     """Internal helper to create Task object (not committed)"""
+    # 截止时间统一按 UTC 存储（与其他时间字段一致，不带时区）
+    if deadline is not None and deadline.tzinfo is not None:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
     return Task(
         id=task_id,
         file_name=original_filename,
         status=TaskStatus.PENDING,
-        total_pages=0
+        total_pages=0,
+        priority=priority,
+        deadline=deadline,
+        tenant=tenant,
+        weight=weight
     )
 
 def _get_processing_params():
@@ -99,7 +109,9 @@ def _trigger_background_task(
     background_tasks: BackgroundTasks, 
     task_id: str, 
     file_path: str, 
-    params: dict
+    params: dict,
+    tenant: Optional[str] = None,
+    weight: float = 1.0
 ):
     """Helper to trigger background processing"""
     if params["use_celery"]:
@@ -109,7 +121,9 @@ def _trigger_background_task(
             params["model_name"], 
             params["concurrency"], 
             params["api_key"], 
-            params["base_url"]
+            params["base_url"],
+            tenant,
+            weight
         )
     else:
         background_tasks.add_task(
@@ -119,17 +133,29 @@ def _trigger_background_task(
             params["model_name"], 
             params["concurrency"], 
             params["api_key"], 
-            params["base_url"]
+            params["base_url"],
+            tenant,
+            weight
         )
 
+def _check_weight(weight: float):
+    """Helper to reject non-positive scheduling weights"""
+    if not weight > 0:
+        raise HTTPException(status_code=400, detail=f"Weight must be positive, got {weight}")
+
 @router.post("/upload", response_model=TaskResponse)
 async def upload_pdf(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    priority: int = Form(0),
+    deadline: Optional[datetime] = Form(None),
+    tenant: Optional[str] = Form(None),
+    weight: float = Form(1.0),
     db: AsyncSession = Depends(get_db)
 ):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    _check_weight(weight)
 
     # Generate Task ID
     task_id = str(uuid.uuid4())
@@ -138,14 +164,14 @@ async def upload_pdf(
     original_filename, file_path_abs = await _process_upload_file(file, task_id)
         
     # Create DB Task
-    new_task = _create_task_obj(task_id, original_filename)
+    new_task = _create_task_obj(task_id, original_filename, priority, deadline, tenant, weight)
     db.add(new_task)
     await db.commit()
     await db.refresh(new_task)
     
     # Trigger processing
     params = _get_processing_params()
-    _trigger_background_task(background_tasks, task_id, file_path_abs, params)
+    _trigger_background_task(background_tasks, task_id, file_path_abs, params, tenant, weight)
     
     # Cleanup task
     background_tasks.add_task(perform_cleanup, params["max_tasks"])
@@ -156,6 +182,10 @@ async def upload_pdf(
 async def upload_pdf_batch(
     background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
+    priority: int = Form(0),
+    deadline: Optional[datetime] = Form(None),
+    tenant: Optional[str] = Form(None),
+    weight: float = Form(1.0),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -163,6 +193,7 @@ async def upload_pdf_batch(
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
+    _check_weight(weight)
 
     # 检查文件数量限制
     if len(files) > MAX_BATCH_SIZE:
@@ -193,7 +224,7 @@ async def upload_pdf_batch(
         task_id = str(uuid.uuid4())
         original_filename, file_path_abs = await _process_upload_file(file, task_id)
 
-        new_task = _create_task_obj(task_id, original_filename)
+        new_task = _create_task_obj(task_id, original_filename, priority, deadline, tenant, weight)
         tasks_to_create.append(new_task)
         file_paths[task_id] = file_path_abs
 
@@ -210,7 +241,7 @@ async def upload_pdf_batch(
     # Trigger all tasks
     params = _get_processing_params()
     for task in tasks_to_create:
-        _trigger_background_task(background_tasks, task.id, file_paths[task.id], params)
+        _trigger_background_task(background_tasks, task.id, file_paths[task.id], params, tenant, weight)
 
     # Cleanup task (just once)
     background_tasks.add_task(perform_cleanup, params["max_tasks"])
@@ -237,7 +268,13 @@ async def get_task(task_id: str, db: AsyncSession = Depends(get_db)):
     task = await db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    response = TaskResponse.model_validate(task)
+    # 在本进程准入队列中排队的任务：返回排队位置与预计开始时间（Celery 模式下不可知）
+    queued = task_admission.position(task_id)
+    if queued is not None:
+        response.queue_position, wait_seconds = queued
+        response.estimated_start_at = datetime.utcnow() + timedelta(seconds=wait_seconds)
+    return response
 
 @router.get("/tasks/{task_id}/download")
 async def download_task(task_id: str, db: AsyncSession = Depends(get_db)):
@@ -355,6 +392,22 @@ async def events_stats():
 
 
 # Page Preview Endpoints
+@router.get("/tasks/{task_id}/pages", response_model=List[TaskDetailResponse])
+async def list_task_pages(task_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    获取任务的逐页状态：路线、模型、耗时、token、重试次数与错误信息
+
+    只查询数据库，不读取任务目录；尚未转换完成的页面不在列表中
+    """
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # 先写入缓冲中的逐页状态，返回的总是最新结果
+    await page_state_writer.flush()
+    result = await db.execute(select(TaskDetail).where(TaskDetail.task_id == task_id).order_by(TaskDetail.page_num))
+    return result.scalars().all()
+
+
 @router.get("/tasks/{task_id}/pages/{page_num}")
 async def get_page_image(task_id: str, page_num: int, db: AsyncSession = Depends(get_db)):
     """
@@ -408,6 +461,7 @@ async def get_page_content(task_id: str, page_num: int, db: AsyncSession = Depen
     - 直接读取每页的 markdown 文件 (page_0001.md)
     - 无需分割最终的合并文件
     - 支持实时预览 - 页面转换完成即可查看
+    - 流式输出 (STREAM_OUTPUT) 时返回生成中的 page_0001.md.partial，并标记 partial=true
 
     参数:
         task_id: 任务ID
@@ -431,6 +485,24 @@ async def get_page_content(task_id: str, page_num: int, db: AsyncSession = Depen
     task_dir = os.path.join(UPLOAD_DIR, task_id)
     page_md_path = os.path.join(task_dir, f"page_{page_num:04d}.md")
 
+    # 页面尚未完成但正在流式生成：返回已生成的部分内容
+    if not os.path.exists(page_md_path):
+        try:
+            with open(page_md_path + ".partial", "r", encoding="utf-8") as f:
+                partial_content = f.read()
+        except FileNotFoundError:
+            partial_content = None
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to read page content: {str(e)}")
+        if partial_content is not None and task.status == TaskStatus.PROCESSING:
+            return {
+                "page": page_num,
+                "status": task.status.value,
+                "content": partial_content,
+                "partial": True,
+                "total_pages": task.total_pages
+            }
+
     # 检查页面文件是否存在
     if not os.path.exists(page_md_path):
         # 页面文件不存在,可能还未完成转换
@@ -474,6 +546,7 @@ async def get_page_content(task_id: str, page_num: int, db: AsyncSession = Depen
         "page": page_num,
         "status": task.status.value,
         "content": page_content,
+        "partial": False,
         "total_pages": task.total_pages
     }
 
@@ -30,6 +30,21 @@ class ProgressEvent:
         return f"data: {data}\n\n"
 
 
+@dataclass
+class PageContentEvent:
+    """页面流式内容事件 (生成中的 Markdown)"""
+    task_id: str
+    page: int
+    content: str  # 截至目前已生成的完整内容
+    done: bool  # True 表示页面已完成，content 为最终内容
+    timestamp: float
+
+    def to_sse_format(self) -> str:
+        """转换为SSE格式，使用具名事件 page_content，不影响进度事件的 onmessage 处理"""
+        data = json.dumps(asdict(self), ensure_ascii=False)
+        return f"event: page_content\ndata: {data}\n\n"
+
+
 class SSEManager:
     """
     SSE连接管理器
@@ -129,21 +144,48 @@ class SSEManager:
             progress: 进度百分比 (0-100)
             status: 状态
         """
+        event = ProgressEvent(
+            task_id=task_id,
+            current_page=current_page,
+            total_pages=total_pages,
+            progress=progress,
+            status=status,
+            timestamp=asyncio.get_event_loop().time()
+        )
+        await self._broadcast(task_id, event.to_sse_format())
+
+    async def broadcast_page_content(self, task_id: str, page_num: int, content: str, done: bool = False):
+        """
+        广播页面流式内容到所有订阅者
+
+        Args:
+            task_id: 任务ID
+            page_num: 页码 (从 1 开始)
+            content: 截至目前已生成的页面 Markdown
+            done: 页面是否已完成
+        """
+        event = PageContentEvent(
+            task_id=task_id,
+            page=page_num,
+            content=content,
+            done=done,
+            timestamp=asyncio.get_event_loop().time()
+        )
+        await self._broadcast(task_id, event.to_sse_format())
+
+    async def _broadcast(self, task_id: str, message: str):
+        """
+        发送一条SSE消息到任务的所有订阅者
+
+        Args:
+            task_id: 任务ID
+            message: SSE格式的消息
+        """
         async with self._lock:
             if task_id not in self._task_subscribers:
                 # 没有订阅者
                 return
 
-            # 创建事件
-            event = ProgressEvent(
-                task_id=task_id,
-                current_page=current_page,
-                total_pages=total_pages,
-                progress=progress,
-                status=status,
-                timestamp=asyncio.get_event_loop().time()
-            )
-
             # 获取订阅者
             subscribers = self._task_subscribers[task_id].copy()
 
@@ -160,7 +202,7 @@ class SSEManager:
                             except asyncio.QueueEmpty:
                                 pass
 
-                        queue.put_nowait(event.to_sse_format())
+                        queue.put_nowait(message)
                     except asyncio.QueueFull:
                         logger.warning(f"[SSE] Queue full for client {client_id}, event dropped")
 
@@ -3,7 +3,7 @@ from enum import Enum
 from typing import Optional
 import uuid
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Enum as SAEnum, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Enum as SAEnum, BigInteger, Float
 from sqlalchemy.orm import declarative_base, relationship
 from pydantic import BaseModel, ConfigDict
 
@@ -38,19 +38,39 @@ class Task(Base):
     output_tokens = Column(BigInteger, default=0)  # 输出 token 总数
     total_tokens = Column(BigInteger, default=0)  # 总 token 数 (计算字段)
 
+    # 页面过滤统计
+    skipped_pages = Column(Integer, default=0)  # 跳过的空白页数
+    deduplicated_pages = Column(Integer, default=0)  # 复用已有结果的重复页数
+
+    # 准入调度：优先级越高越先开始，临近截止时间 (UTC) 的任务提前
+    priority = Column(Integer, default=0)
+    deadline = Column(DateTime, nullable=True)
+    # 页面调度的份额：同一租户的任务共享一份，权重越大分到的页面名额越多；续跑时沿用
+    tenant = Column(String, nullable=True)
+    weight = Column(Float, default=1.0)
+
     details = relationship("TaskDetail", back_populates="task", cascade="all, delete-orphan")
 
 class TaskDetail(Base):
     __tablename__ = "task_details"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    task_id = Column(String, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(String, ForeignKey("tasks.id"), nullable=False, index=True)
     page_num = Column(Integer, nullable=False)
     status = Column(SAEnum(TaskStatus), default=TaskStatus.PENDING)
     content = Column(Text, nullable=True)
     image_path = Column(String, nullable=True)
     error_message = Column(Text, nullable=True)
 
+    # 逐页转换记录：实际走的路线（llm / tiled / packed / text / blank / duplicate）与模型
+    route = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    latency = Column(Float, nullable=True)  # 秒，从获得并发名额到结果返回
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    retries = Column(Integer, default=0)  # LLM 请求失败重试的次数
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     task = relationship("Task", back_populates="details")
 
 # Pydantic Schemas
@@ -72,6 +92,15 @@ class TaskResponse(TaskBase):
     input_tokens: int = 0
     output_tokens: int = 0
     total_tokens: int = 0
+    skipped_pages: int = 0
+    deduplicated_pages: int = 0
+    priority: int = 0
+    deadline: Optional[datetime] = None
+    tenant: Optional[str] = None
+    weight: float = 1.0
+    # 排队中的任务：排队位置（从 1 开始）与预计开始时间 (UTC)
+    queue_position: Optional[int] = None
+    estimated_start_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -79,5 +108,13 @@ class TaskDetailResponse(BaseModel):
     page_num: int
     status: TaskStatus
     content: Optional[str] = None
-    
+    route: Optional[str] = None
+    model: Optional[str] = None
+    latency: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    retries: int = 0
+    error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
     model_config = ConfigDict(from_attributes=True)
@@ -10,6 +10,8 @@ import mcp.types as types
 app = Server("markpdfdown-server")
 
 API_BASE = os.getenv("API_BASE", "http://localhost:8000/api/v1")
+# MCP 提交的多为批量/自动化转换，默认优先级低于界面上传 (0)，不抢占交互用户的准入名额
+MCP_DEFAULT_PRIORITY = int(os.getenv("MCP_DEFAULT_PRIORITY", "-1"))
 
 @app.list_tools()
 async def list_tools() -> list[types.Tool]:
@@ -23,6 +25,24 @@ async def list_tools() -> list[types.Tool]:
                     "file_path": {
                         "type": "string",
                         "description": "Absolute path to the local PDF file to convert."
+                    },
+                    "priority": {
+                        "type": "integer",
+                        "description": f"Scheduling priority; higher starts sooner, negative yields to interactive uploads, which use 0 (default {MCP_DEFAULT_PRIORITY})",
+                        "default": MCP_DEFAULT_PRIORITY
+                    },
+                    "deadline": {
+                        "type": "string",
+                        "description": "Optional ISO 8601 time by which the conversion should be done; tasks close to their deadline start sooner."
+                    },
+                    "tenant": {
+                        "type": "string",
+                        "description": "Optional tenant name; all tasks of one tenant share a single fair share of page slots."
+                    },
+                    "weight": {
+                        "type": "number",
+                        "description": "Scheduling weight; a task (or tenant) with weight 2 gets twice the page slots of weight 1 (default 1)",
+                        "default": 1
                     }
                 },
                 "required": ["file_path"]
@@ -80,7 +100,14 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent | type
                     # Explicitly set filename for httpx
                     filename = os.path.basename(file_path)
                     files = {"file": (filename, f)}
-                    resp = await client.post(f"{API_BASE}/upload", files=files)
+                    data = {"priority": str(arguments.get("priority", MCP_DEFAULT_PRIORITY))}
+                    if arguments.get("deadline"):
+                        data["deadline"] = arguments["deadline"]
+                    if arguments.get("tenant"):
+                        data["tenant"] = arguments["tenant"]
+                    if "weight" in arguments:
+                        data["weight"] = str(arguments["weight"])
+                    resp = await client.post(f"{API_BASE}/upload", files=files, data=data)
                     if resp.status_code != 200:
                          return [types.TextContent(type="text", text=f"Upload failed: {resp.text}")]
                     
@@ -100,8 +127,9 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent | type
                         break
                     if status == "failed":
                          return [types.TextContent(type="text", text=f"Conversion failed: {task_data.get('error_message')}")]
-                    
-                    await asyncio.sleep(1)
+
+                    # 排队中的任务放慢轮询
+                    await asyncio.sleep(5 if task_data.get("queue_position") else 1)
 
                 # 3. Download
                 resp = await client.get(f"{API_BASE}/tasks/{task_id}/download")
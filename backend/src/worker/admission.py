@@ -0,0 +1,187 @@
+"""
+任务准入队列：短作业优先 (SJF) + 截止时间感知，带老化防止饥饿
+
+排队任务按“有效时长”（秒）排序，值越小越先开始：
+    预估时长 - 老化系数 × 已等待时间 - 优先级 × PRIORITY_SECONDS
+设置了截止时间的任务再与“剩余松弛时间”（距截止时间 - 预估时长）取较小值，临近截止的任务会提前。
+预估时长 = 预估成本（按页数与页面复杂度折算的页数）× 每单位成本的耗时，后者随已完成任务的实际耗时滑动更新。
+已等待的时间不断降低有效时长，因此大任务不会被源源不断的小任务无限推迟。
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 每等待 1 秒，有效时长减少的秒数
+ADMISSION_AGING = float(os.getenv("ADMISSION_AGING", "1.0"))
+# 每一级优先级相当于提前的秒数
+PRIORITY_SECONDS = float(os.getenv("PRIORITY_SECONDS", "60"))
+# 没有历史数据时每单位成本（一页普通页面）的预估耗时（秒）
+SECONDS_PER_PAGE = 5.0
+# 估算复杂度时最多抽样的页数，超长文档按抽样结果外推
+COST_SAMPLE_PAGES = 16
+
+
+def estimate_cost(input_path: str) -> tuple[int, float]:
+    """
+    根据页数与页面复杂度估算转换成本
+
+    含图片的页面与矢量图形密集（表格、图表）的页面各按额外 0.5 页计算
+
+    Returns:
+        (页数, 成本)：成本以普通页面为单位
+    """
+    import fitz
+
+    if not input_path.lower().endswith(".pdf"):
+        return 1, 1.0
+    try:
+        with fitz.open(input_path) as document:
+            pages = document.page_count
+            if pages == 0:
+                return 0, 0.0
+            step = max(1, pages // COST_SAMPLE_PAGES)
+            sample = range(0, pages, step)
+            complexity = 0.0
+            for index in sample:
+                page = document[index]
+                complexity += 1.0
+                if page.get_images():
+                    complexity += 0.5
+                if len(page.get_drawings()) > 10:
+                    complexity += 0.5
+            return pages, pages * complexity / len(sample)
+    except Exception as e:
+        logger.warning(f"Failed to estimate cost of {input_path}: {e}")
+        return 1, 1.0
+
+
+@dataclass
+class _Waiter:
+    task_id: str
+    cost: float
+    priority: int
+    deadline: Optional[datetime]  # UTC
+    enqueued: float  # clock() 时间
+    sequence: int
+    future: asyncio.Future
+
+
+class AdmissionQueue:
+    def __init__(self, slots: int, aging: float = ADMISSION_AGING, priority_seconds: float = PRIORITY_SECONDS, seconds_per_page: float = SECONDS_PER_PAGE):
+        if slots < 1:
+            raise ValueError(f"Admission slots must be at least 1, got {slots}")
+        self.slots = slots
+        self.aging = aging
+        self.priority_seconds = priority_seconds
+        self.seconds_per_page = seconds_per_page  # 每单位成本的耗时，随完成的任务更新
+        self.clock = time.monotonic
+        self._waiting = {}  # {task_id: _Waiter}
+        self._running = {}  # {task_id: (开始时间, 预估时长)}
+        self._sequence = 0
+
+    @property
+    def active(self) -> int:
+        """正在运行的任务数"""
+        return len(self._running)
+
+    def _duration(self, cost: float) -> float:
+        return cost * self.seconds_per_page
+
+    def _effective(self, waiter: _Waiter, now: float, utcnow: datetime) -> float:
+        """有效时长：越小越先开始"""
+        duration = self._duration(waiter.cost)
+        effective = duration - self.aging * (now - waiter.enqueued) - self.priority_seconds * waiter.priority
+        if waiter.deadline is not None:
+            slack = (waiter.deadline - utcnow).total_seconds() - duration
+            effective = min(effective, slack)
+        return effective
+
+    def _order(self) -> list:
+        """当前的排队顺序"""
+        now, utcnow = self.clock(), datetime.utcnow()
+        return sorted(self._waiting.values(), key=lambda w: (self._effective(w, now, utcnow), w.sequence))
+
+    def _start(self, waiter_id: str, cost: float) -> None:
+        self._running[waiter_id] = (self.clock(), self._duration(cost))
+
+    async def acquire(self, task_id: str, cost: float = 1.0, priority: int = 0, deadline: Optional[datetime] = None) -> None:
+        """等待任务获准开始"""
+        if len(self._running) < self.slots and not self._waiting:
+            self._start(task_id, cost)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        self._waiting[task_id] = _Waiter(task_id, cost, priority, deadline, self.clock(), self._sequence, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已获准但调用方被取消：让出名额
+                self.release(task_id)
+            else:
+                self._waiting.pop(task_id, None)
+            raise
+
+    def release(self, task_id: str, cost: float = None) -> None:
+        """
+        任务结束，按排队顺序放行下一个任务
+
+        Args:
+            cost: 成功完成时传入任务成本，用实际耗时更新每单位成本的耗时
+        """
+        started, _ = self._running.pop(task_id)
+        if cost:
+            observed = (self.clock() - started) / cost
+            self.seconds_per_page = 0.8 * self.seconds_per_page + 0.2 * observed
+        while self._waiting and len(self._running) < self.slots:
+            waiter = self._order()[0]
+            del self._waiting[waiter.task_id]
+            if waiter.future.done():
+                continue  # 等待者已被取消，尚未来得及自行出队
+            self._start(waiter.task_id, waiter.cost)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, task_id: str, cost: float = 1.0, priority: int = 0, deadline: Optional[datetime] = None):
+        """在获准后执行其中的代码块；成功完成的任务用于校准耗时预估"""
+        await self.acquire(task_id, cost, priority, deadline)
+        try:
+            yield
+        except BaseException:
+            self.release(task_id)
+            raise
+        self.release(task_id, cost)
+
+    def position(self, task_id: str) -> Optional[tuple[int, float]]:
+        """
+        排队任务的位置与预计开始时间
+
+        按当前顺序把排队任务依次分配给最早空出的名额（运行中任务按预估剩余时长）
+
+        Returns:
+            (排队位置（从 1 开始）, 预计多少秒后开始)，任务不在排队时返回 None
+        """
+        if task_id not in self._waiting:
+            return None
+        now = self.clock()
+        free_at = [max(0.0, duration - (now - started)) for started, duration in self._running.values()]
+        free_at += [0.0] * (self.slots - len(free_at))
+        heapq.heapify(free_at)
+        for index, waiter in enumerate(self._order()):
+            start = heapq.heappop(free_at)
+            if waiter.task_id == task_id:
+                return index + 1, start
+            heapq.heappush(free_at, start + self._duration(waiter.cost))
+        return None
+
+    def stats(self) -> dict:
+        """运行中与排队中的任务数"""
+        return {"slots": self.slots, "active": len(self._running), "waiting": len(self._waiting), "seconds_per_page": round(self.seconds_per_page, 3)}
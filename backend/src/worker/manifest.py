@@ -0,0 +1,114 @@
+"""
+逐页转换清单：记录每页渲染图片与 Markdown 的状态和哈希，供中断后的任务续跑
+
+清单是任务目录下的 manifest.jsonl，只追加写入：首行记录源文件哈希，之后每行是一页的一次状态变化
+（rendered = 图片已落盘，done = Markdown 已保存）。进程崩溃最多留下不完整的最后一行，读取时忽略。
+续跑时只承认哈希与磁盘文件一致的记录，源文件变化则整份清单作废。
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.jsonl"
+PAGE_RENDERED = "rendered"
+PAGE_DONE = "done"
+
+
+def file_sha256(path: str) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PageManifest:
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()  # 图片落盘线程与事件循环都会追加记录
+
+    def _append(self, record: dict, mode: str = "a") -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                with open(self.path, mode, encoding="utf-8") as f:
+                    f.write(line)
+            except Exception as e:
+                # 清单只用于续跑，写入失败不影响转换
+                logger.error(f"Failed to write page manifest {self.path}: {e}")
+
+    def start(self, source_sha256: str) -> None:
+        """开始一次全新的转换：清空清单并记录源文件哈希"""
+        self._append({"source": source_sha256}, mode="w")
+
+    def record_rendered(self, page_num: int, image_name: str, data: bytes) -> None:
+        """页面图片已落盘"""
+        self._append({"page": page_num, "status": PAGE_RENDERED, "image": image_name, "sha256": _sha256(data)})
+
+    def record_done(self, page_num: int, content: str, input_tokens: int = 0, output_tokens: int = 0) -> None:
+        """页面 Markdown 已保存，连同该页消耗的 token"""
+        self._append({"page": page_num, "status": PAGE_DONE, "sha256": _sha256(content.encode("utf-8")), "input_tokens": input_tokens, "output_tokens": output_tokens})
+
+    def _load(self, source_sha256: str) -> dict:
+        """读取清单中每页每种状态的最后一条记录 {(页码, 状态): 记录}；源文件不一致时返回空"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return {}
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("source") != source_sha256:
+            logger.info(f"Page manifest {self.path} does not match the source file, ignored")
+            return {}
+        records = {}
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 崩溃时写了一半的行
+            records[(record["page"], record["status"])] = record
+        return records
+
+    def resume(self, source_sha256: str) -> tuple[dict, dict]:
+        """
+        读取可以复用的页面；清单不可用时重新开始
+
+        Returns:
+            ({页码: (Markdown 内容, 输入 token, 输出 token)}, {页码: 图片路径})：
+            已完成的页面，以及图片已渲染但尚未完成的页面，均已核对磁盘文件的哈希
+        """
+        records = self._load(source_sha256)
+        if not records:
+            self.start(source_sha256)
+            return {}, {}
+        done, images = {}, {}
+        for (page_num, status), record in records.items():
+            try:
+                if status == PAGE_DONE:
+                    with open(os.path.join(self.output_dir, f"page_{page_num:04d}.md"), "rb") as f:
+                        data = f.read()
+                    if _sha256(data) == record["sha256"]:
+                        done[page_num] = (data.decode("utf-8"), record.get("input_tokens", 0), record.get("output_tokens", 0))
+                elif status == PAGE_RENDERED:
+                    image_path = os.path.join(self.output_dir, record["image"])
+                    with open(image_path, "rb") as f:
+                        if _sha256(f.read()) == record["sha256"]:
+                            images[page_num] = image_path
+            except (OSError, UnicodeDecodeError):
+                continue  # 文件缺失或损坏：重新转换该页
+        for page_num in done:
+            images.pop(page_num, None)
+        return done, images
@@ -0,0 +1,103 @@
+"""
+进程级页面调度器：全局 LLM 页面并发预算，按加权公平排队 (WFQ) 在所有活动任务间交错分配
+
+每个任务（或租户）是一条流。页面请求名额时获得完成标签
+max(虚拟时间, 该流上一个标签) + 1 / 权重，名额释放后交给标签最小的等待者。
+正在转换 800 页文档的任务只能占用与其权重成比例的份额，
+新来的 2 页文档的页面标签很小，会立刻插到队首，几秒内即可完成。
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PageScheduler:
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Page scheduler capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.active = 0  # 已分配的名额数
+        self.virtual_time = 0.0  # 最近一次分配出去的完成标签
+        self._finish = {}  # {流: 该流最后一个完成标签}
+        self._waiting = []  # 堆 [(完成标签, 序号, future, 流)]
+        self._sequence = itertools.count()  # 同标签时先到先得
+        self.granted = {}  # {流: 累计分配的名额数}
+
+    def _tag(self, flow: str, weight: float) -> float:
+        tag = max(self.virtual_time, self._finish.get(flow, 0.0)) + 1.0 / weight
+        self._finish[flow] = tag
+        return tag
+
+    def _grant(self, flow: str) -> None:
+        self.active += 1
+        self.granted[flow] = self.granted.get(flow, 0) + 1
+
+    async def acquire(self, flow: str, weight: float = 1.0) -> None:
+        """为流 flow 等待一个页面名额，权重越大分到的份额越多"""
+        if weight <= 0:
+            raise ValueError(f"Page scheduler weight must be positive, got {weight}")
+        tag = self._tag(flow, weight)
+        if self.active < self.capacity and not self._waiting:
+            self.virtual_time = tag
+            self._grant(flow)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (tag, next(self._sequence), future, flow))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已分配但调用方被取消：交还给下一个等待者
+                self.release()
+            else:
+                self._waiting = [entry for entry in self._waiting if entry[2] is not future]
+                heapq.heapify(self._waiting)
+            raise
+
+    def release(self) -> None:
+        """归还名额，交给完成标签最小的等待者"""
+        self.active -= 1
+        while self._waiting and self.active < self.capacity:
+            tag, _, future, flow = heapq.heappop(self._waiting)
+            if future.done():
+                continue  # 等待者已被取消，尚未来得及自行出队
+            self.virtual_time = tag
+            self._grant(flow)
+            future.set_result(None)
+        # 标签已落后于虚拟时间的流不再影响排队，丢弃以免随任务数增长
+        if len(self._finish) > len(self._waiting):
+            self._finish = {flow: tag for flow, tag in self._finish.items() if tag > self.virtual_time}
+
+    @asynccontextmanager
+    async def slot(self, flow: str, weight: float = 1.0):
+        """占用一个页面名额执行其中的代码块"""
+        await self.acquire(flow, weight)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """当前占用、排队的页面数与容量"""
+        return {"capacity": self.capacity, "active": self.active, "waiting": len(self._waiting)}
+
+
+# 全局页面并发预算：所有任务同时进行的 LLM 页面请求总数（默认与原先 2 个任务 × 每任务 2 并发相同）
+# 可以通过环境变量 PAGE_CONCURRENCY 进行调整
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", "4"))
+
+_page_scheduler = None
+
+
+def get_page_scheduler() -> PageScheduler:
+    """进程内所有任务共享的页面调度器"""
+    global _page_scheduler
+    if _page_scheduler is None:
+        _page_scheduler = PageScheduler(PAGE_CONCURRENCY)
+        logger.info(f"Page scheduler created with capacity {PAGE_CONCURRENCY}")
+    return _page_scheduler
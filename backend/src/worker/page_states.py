@@ -0,0 +1,112 @@
+"""
+逐页状态的写回缓冲：SmartWorker 每完成一页产生一条 PageState，攒批后在一个事务中写入 TaskDetail
+
+逐页直接写库会让 SQLite 每页一次事务（每次都要 fsync 并持有写锁），与其他任务的状态更新争抢。
+缓冲区按 (任务, 页码) 合并同一页的多次更新，满 PAGE_STATE_BATCH_SIZE 条或距第一条未写入记录
+PAGE_STATE_FLUSH_INTERVAL 秒时写入；任务结束与查询逐页状态前立即写入，读取方看到的总是最新状态。
+"""
+import asyncio
+import logging
+import os
+import weakref
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src.db.database import AsyncSessionLocal
+from src.db.models import Task, TaskDetail, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# 攒够多少条逐页状态立即写入
+PAGE_STATE_BATCH_SIZE = int(os.getenv("PAGE_STATE_BATCH_SIZE", "50"))
+# 未攒够一批时最多延迟多少秒写入
+PAGE_STATE_FLUSH_INTERVAL = float(os.getenv("PAGE_STATE_FLUSH_INTERVAL", "1.0"))
+
+
+class PageStateWriter:
+    def __init__(self, batch_size: int = PAGE_STATE_BATCH_SIZE, interval: float = PAGE_STATE_FLUSH_INTERVAL, session_factory=AsyncSessionLocal):
+        if batch_size < 1:
+            raise ValueError(f"Page state batch size must be at least 1, got {batch_size}")
+        self.batch_size = batch_size
+        self.interval = interval
+        self.session_factory = session_factory
+        self.flushes = 0  # 已提交的写入事务数
+        self._pending = {}  # {(task_id, page_num): PageState}，同一页只保留最新状态
+        self._timer = None
+        # 写入按事件循环串行，保证同一页的新状态不会被并发写入的旧状态覆盖（Celery 每个任务一个事件循环）
+        self._locks = weakref.WeakKeyDictionary()
+
+    @property
+    def pending(self) -> int:
+        """尚未写入的状态数"""
+        return len(self._pending)
+
+    async def add(self, task_id: str, state) -> None:
+        """缓冲一页的状态，攒够一批时写入"""
+        self._pending[(task_id, state.page_num)] = state
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.interval)
+        await self.flush()
+
+    def _cancel_timer(self) -> None:
+        timer, self._timer = self._timer, None
+        if timer is None or timer.done() or timer is asyncio.current_task():
+            return
+        if timer.get_loop() is asyncio.get_running_loop():
+            timer.cancel()
+
+    async def flush(self) -> None:
+        """在一个事务中写入所有缓冲的状态；写入失败时放回缓冲区，下次重试"""
+        self._cancel_timer()
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await self._write(batch)
+                self.flushes += 1
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} page states: {e}")
+                # 写入期间到达的新状态不被失败批次中的旧状态覆盖
+                for key, state in batch.items():
+                    self._pending.setdefault(key, state)
+
+    async def _write(self, batch: dict) -> None:
+        task_ids = {task_id for task_id, _ in batch}
+        async with self.session_factory() as session:
+            # 任务可能已在转换过程中被删除，不为其写入孤立的明细
+            result = await session.execute(select(Task.id).where(Task.id.in_(task_ids)))
+            live = set(result.scalars().all())
+            pages = {page_num for _, page_num in batch}
+            result = await session.execute(select(TaskDetail).where(TaskDetail.task_id.in_(live), TaskDetail.page_num.in_(pages)))
+            existing = {(detail.task_id, detail.page_num): detail for detail in result.scalars().all()}
+            now = datetime.utcnow()
+            for (task_id, page_num), state in batch.items():
+                if task_id not in live:
+                    continue
+                detail = existing.get((task_id, page_num))
+                if detail is None:
+                    detail = TaskDetail(task_id=task_id, page_num=page_num)
+                    session.add(detail)
+                detail.status = TaskStatus(state.status)
+                detail.route = state.route
+                detail.model = state.model
+                detail.latency = state.latency
+                detail.input_tokens = state.input_tokens
+                detail.output_tokens = state.output_tokens
+                detail.retries = state.retries
+                detail.error_message = state.error
+                detail.updated_at = now
+            await session.commit()
+
+
+# 进程级写回缓冲，所有任务共享
+page_state_writer = PageStateWriter()
@@ -2,7 +2,11 @@ import asyncio
 import logging
 import os
 import sys
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
 from typing import List
 from pathlib import Path
 
@@ -13,51 +17,314 @@ if str(core_src_dir) not in sys.path:
     sys.path.insert(0, str(core_src_dir))
 
 # Import from core using expected path (assuming PYTHONPATH is set)
-from markpdfdown.core.file_worker import create_worker
-from markpdfdown.core.llm_client import LLMClient
+from markpdfdown.core.file_worker import PageImage, PDFWorker, create_worker
+from markpdfdown.core.cache import get_completion_cache
+from markpdfdown.core.cassette import get_cassette
+from markpdfdown.core.cascade import CascadeRecord, TierAttempt, check_page
+from markpdfdown.core.concurrency import AdaptiveLimiter
+from markpdfdown.core.endpoint_pool import Endpoint, endpoints_from_json, get_endpoint_pool
+from markpdfdown.core.image_encoding import ImageEncoder
+from markpdfdown.core.packing import PagePacker, estimate_page_tokens, packed_prompt, split_packed_response
+from markpdfdown.core.rate_limit import get_rate_limiter
+from markpdfdown.core.request_policy import get_request_policy
+from markpdfdown.core.tiling import PageTiler, stitch_bands
+from markpdfdown.core.llm_client import CompletionResult, LLMClient
+from markpdfdown.core.page_filter import PAGE_BLANK, PAGE_DUPLICATE, PageFilter
 from markpdfdown.config import config
+from .manifest import PageManifest, file_sha256
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = """
+You are a helpful assistant that can convert images to Markdown format. You are given an image, and you need to convert it to Markdown format. Please output the Markdown content only, without any other text.
+"""
+
+USER_PROMPT = """
+Below is the image of one page of a document, please read the content in the image and transcribe it into plain Markdown format. Please note:
+1. Identify heading levels, text styles, formulas, and the format of table rows and columns
+2. Mathematical formulas should be transcribed using LaTeX syntax, ensuring consistency with the original
+3. Do NOT include any page headers or footers (e.g., page numbers, document titles, logos at the top/bottom of the page). Only transcribe the main body content.
+4. Please output the Markdown content only, without any other text.
+"""
+
+TILE_PROMPT = """
+5. This image is horizontal strip {band} of {bands} of one tall page, cut with a small overlap with the neighbouring strips. Transcribe only what is visible in this strip, top to bottom; a line cut off at the top or bottom edge may be skipped. Do not invent headings, and if the strip continues a table, output its rows as table rows.
+"""
+
 # ...
 
+def _litellm_model_name(model_name: str) -> str:
+    """处理模型名称格式，确保符合 litellm 规范"""
+    # litellm 需要 provider/model 格式，如 gemini/gemini-2.0-flash
+    if model_name.startswith("gemini") and not model_name.startswith("gemini/"):
+        # 为 Gemini 模型添加 gemini/ 前缀
+        return f"gemini/{model_name}"
+    # Claude 模型可以直接使用，litellm 会自动处理
+    return model_name
+
+
+def _add_usage(result: CompletionResult, spent: list) -> CompletionResult:
+    """将被放弃的请求（输出截断、级联升级）消耗的 token 计入最终结果"""
+    fresh = [earlier for earlier in spent if not earlier.cached]
+    if not fresh:
+        return result
+    return replace(
+        result,
+        input_tokens=result.input_tokens + sum(earlier.input_tokens for earlier in fresh),
+        output_tokens=result.output_tokens + sum(earlier.output_tokens for earlier in fresh),
+        total_tokens=result.total_tokens + sum(earlier.total_tokens for earlier in fresh),
+        retries=result.retries + sum(earlier.retries for earlier in fresh),
+        cached=False,
+    )
+
+
+def _save_page_image(output_dir: str, image: PageImage, manifest: PageManifest = None) -> None:
+    """
+    将内存中的页面图片写入磁盘，供预览接口 /tasks/{id}/pages/{n} 使用，并记入逐页清单供续跑复用
+
+    在线程池中执行，不阻塞 LLM 请求
+    """
+    image_path = os.path.join(output_dir, image.file_name)
+    try:
+        # 使用原子操作：先写临时文件，再重命名
+        image_tmp = image_path + ".tmp"
+        with open(image_tmp, "wb") as f:
+            f.write(image.data)
+        os.replace(image_tmp, image_path)
+    except Exception as e:
+        logger.error(f"Failed to save page {image.page_num} image: {e}")
+        return
+    if manifest is not None:
+        manifest.record_rendered(image.page_num, image.file_name, image.data)
+
+
+def _record_page_image(manifest: PageManifest, page_num: int, image_path: str) -> None:
+    """将渲染器写入磁盘的页面图片记入逐页清单（在线程池中执行）"""
+    try:
+        with open(image_path, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        logger.error(f"Failed to read page {page_num} image for the manifest: {e}")
+        return
+    manifest.record_rendered(page_num, os.path.basename(image_path), data)
+
+
+def _load_page_image(page_num: int, image_path: str) -> PageImage:
+    """读取续跑时复用的页面图片（内存模式）"""
+    with open(image_path, "rb") as f:
+        data = f.read()
+    mime_type = "image/png" if image_path.endswith(".png") else "image/jpeg"
+    return PageImage(page_num=page_num, data=data, mime_type=mime_type)
+
+
+@dataclass
+class _ResumedPage:
+    """续跑时中断前已完成的页面"""
+    content: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+@dataclass
+class PageState:
+    """一页的转换结果，经 page_state_callback 交给调用方持久化"""
+    page_num: int
+    status: str  # "completed" / "failed"
+    route: str  # llm / tiled / packed / text / blank / duplicate
+    model: str = None  # 非 LLM 路线为 None
+    latency: float = 0.0  # 秒，从获得并发名额到结果返回
+    input_tokens: int = 0
+    output_tokens: int = 0
+    retries: int = 0
+    error: str = None
+
+# 渲染线程放入队列的结束标记
+_RENDER_DONE = object()
+
+
+def _render_pages(image_gen, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+    """
+    渲染线程：逐页迭代渲染生成器并放入有界队列，队列满时阻塞等待（背压）
+
+    正常结束放入 _RENDER_DONE，渲染异常作为队列元素交给事件循环一侧抛出；
+    stop 被设置（消费方提前退出）后不再渲染
+    """
+    item = _RENDER_DONE
+    try:
+        for image in image_gen:
+            asyncio.run_coroutine_threadsafe(queue.put(image), loop).result()
+            if stop.is_set():
+                break
+    except Exception as e:
+        item = e
+    finally:
+        close = getattr(image_gen, "close", None)
+        if close is not None:
+            close()
+    if not stop.is_set():
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+
+class _PageStream:
+    """
+    单页的流式输出：把增量追加到 page_NNNN.md.partial，并按间隔推送已生成的内容
+
+    写文件与推送都按 interval 节流；页面完成后由 finish() 删除 partial 文件
+    """
+
+    def __init__(self, output_dir: str, page_num: int, interval: float, callback=None, task_id: str = None):
+        self.path = os.path.join(output_dir, f"page_{page_num:04d}.md.partial")
+        self.page_num = page_num
+        self.interval = interval
+        self.callback = callback
+        self.task_id = task_id
+        self.content = ""
+        self._pending = ""  # 尚未写入 partial 文件的增量
+        self._truncate = True  # 首个增量（含重试后的首个增量）覆盖旧内容
+        self._last_flush = 0.0
+
+    async def on_chunk(self, delta: str, content: str):
+        """LLMClient.acompletion 的 on_chunk 回调"""
+        if delta == content:
+            # 新一轮尝试从头开始生成，丢弃上一轮的部分内容
+            self._pending = ""
+            self._truncate = True
+        self._pending += delta
+        self.content = content
+        if time.monotonic() - self._last_flush >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        """追加未写入的增量并推送当前内容"""
+        self._last_flush = time.monotonic()
+        try:
+            with open(self.path, "w" if self._truncate else "a", encoding="utf-8") as f:
+                f.write(self._pending)
+            self._pending = ""
+            self._truncate = False
+        except Exception as e:
+            logger.error(f"Failed to write partial markdown of page {self.page_num}: {e}")
+        if self.callback and self.task_id:
+            await self.callback(task_id=self.task_id, page_num=self.page_num, content=self.content, done=False)
+
+    async def finish(self, content: str):
+        """页面 markdown 已保存：删除 partial 文件并推送最终内容"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove partial markdown of page {self.page_num}: {e}")
+        if self.callback and self.task_id and self._last_flush:
+            await self.callback(task_id=self.task_id, page_num=self.page_num, content=content, done=True)
+
+
 class SmartWorker:
-    def __init__(self, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None, progress_callback=None):
+    def __init__(self, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None, progress_callback=None, render_workers: int = None, in_memory_images: bool = None, adaptive_dpi: bool = None, text_fast_path: bool = None, page_filter: bool = None, image_encoding: bool = None, page_packing: bool = None, adaptive_concurrency: bool = None, stream_output: bool = None, page_content_callback=None, tile_pages: bool = None, cascade_models: list = None, render_prefetch: int = None, max_inflight_pages: int = None, scheduler=None, flow: str = None, weight: float = 1.0, page_state_callback=None):
         self.concurrency = concurrency
         self.progress_callback = progress_callback  # 进度回调函数
-
-        # 处理模型名称格式，确保符合 litellm 规范
-        # litellm 需要 provider/model 格式，如 gemini/gemini-2.0-flash
-        if model_name.startswith("gemini") and not model_name.startswith("gemini/"):
-            # 为 Gemini 模型添加 gemini/ 前缀
-            self.model_name = f"gemini/{model_name}"
-        elif model_name.startswith("claude") and not model_name.startswith("anthropic/"):
-            # Claude 模型可以直接使用，litellm 会自动处理
-            self.model_name = model_name
-        else:
-            self.model_name = model_name
-
-        # Determine provider to set correct env var
-        # Basic mapping for common providers
-        if api_key:
-            if model_name.startswith("gpt"):
-                os.environ["OPENAI_API_KEY"] = api_key
-            elif model_name.startswith("claude"):
-                os.environ["ANTHROPIC_API_KEY"] = api_key
-            elif model_name.startswith("gemini"):
-                os.environ["GEMINI_API_KEY"] = api_key
-            elif "ollama" in model_name:
-                pass # Ollama usually doesn't need key, or used in base_url
-            else:
-                # Default fallback or custom provider
-                os.environ["OPENAI_API_KEY"] = api_key
-
-        if base_url:
-            os.environ["OPENAI_API_BASE"] = base_url
-
-        self.llm_client = LLMClient(self.model_name)
-
-    async def process_file(self, input_path: str, task_id: str = None) -> tuple[str, int]:
+        # 流式输出：生成中的页面内容写入 page_NNNN.md.partial，并通过 page_content_callback 推送
+        self.stream_output = config.stream_output if stream_output is None else stream_output
+        self.page_content_callback = page_content_callback
+        # 每页转换结束（成功或失败）后以 PageState 回调，供调用方记录逐页状态
+        self.page_state_callback = page_state_callback
+        # 最近一次 process_file 的逐页转换结果 {page_num: PageState}，不含续跑沿用的页面
+        self.page_states = {}
+        # PDF 渲染进程数 (1 = 串行渲染)，默认取 core 配置 RENDER_WORKERS
+        self.render_workers = render_workers or config.render_workers
+        # 内存模式：渲染结果直接发送给 LLM，图片落盘移出关键路径
+        self.in_memory_images = config.in_memory_images if in_memory_images is None else in_memory_images
+        # 按页面内容自适应选择渲染 DPI
+        self.adaptive_dpi = config.adaptive_dpi if adaptive_dpi is None else adaptive_dpi
+        # 纯文字页直接从 PDF 文本层生成 Markdown，跳过 LLM
+        self.text_fast_path = config.text_fast_path if text_fast_path is None else text_fast_path
+        # 跳过空白页，近似重复页复用首次出现页面的 Markdown
+        self.page_filter = config.page_filter if page_filter is None else page_filter
+        # 最近一次 process_file 的逐页渲染决策 {page_num: PageRenderPlan}
+        self.render_plans = {}
+        # 最近一次 process_file 的逐页路由决策 {page_num: PageRoute}
+        self.page_routes = {}
+        # 最近一次 process_file 跳过的空白页数与去重复用的页数
+        self.skipped_pages = 0
+        self.deduplicated_pages = 0
+        # 最近一次 process_file 续跑时沿用的已完成页数与复用的渲染图片数
+        self.resumed_pages = 0
+        self.reused_images = 0
+        # 发送前按目标模型缩放并选择最小的图片格式
+        self.image_encoding = config.image_encoding if image_encoding is None else image_encoding
+        # 最近一次 process_file 的逐页图片字节数 {page_num: (编码前, 实际发送)}
+        self.image_bytes = {}
+        # 连续的轻量页面合并为一次请求，按页分隔符拆分结果
+        self.page_packing = config.page_packing if page_packing is None else page_packing
+        # 最近一次 process_file 由合并请求完成的页数，及拆分失败回退逐页请求的组数
+        self.packed_pages = 0
+        self.pack_fallbacks = 0
+        # 超长/超密页面切成有重叠的水平条带并行转换，再按重叠去重拼接
+        self.tiler = None
+        if config.tile_pages if tile_pages is None else tile_pages:
+            self.tiler = PageTiler(max_aspect=config.tile_max_aspect, max_bands=config.tile_max_bands, overlap=config.tile_overlap)
+        # 最近一次 process_file 按条带转换的页面 {page_num: 条带数}
+        self.tiled_pages = {}
+        # 自适应并发 (AIMD)：根据延迟与限流反馈调整并发窗口，替代固定信号量
+        self.limiter = None
+        if config.adaptive_concurrency if adaptive_concurrency is None else adaptive_concurrency:
+            self.limiter = AdaptiveLimiter(initial_limit=concurrency, max_limit=max(config.max_concurrency, concurrency))
+        # 流水线窗口：最多提前渲染 render_prefetch 页，同时在途 max_inflight_pages 页（默认并发上限的 2 倍）
+        self.render_prefetch = render_prefetch or config.render_prefetch
+        self.max_inflight_pages = max_inflight_pages or config.max_inflight_pages or 2 * (self.limiter.max_limit if self.limiter else concurrency)
+        # 进程级页面调度器 (PageScheduler)：每个 LLM 页面请求另需占用一个全局名额，按流 (默认为任务 ID) 加权公平分配
+        self.scheduler = scheduler
+        self.flow = flow
+        self.weight = weight
+
+        self.model_name = _litellm_model_name(model_name)
+
+        # 凭据随每个请求传递，不再写入进程环境变量：不同 Key 的任务互不干扰
+        # base_url 只作用于 OpenAI 兼容接口（与原先设置 OPENAI_API_BASE 的效果一致）
+        def _task_endpoint(name: str) -> Endpoint:
+            openai_compatible = not (name.startswith(("gemini", "claude")) or "ollama" in name)
+            return Endpoint(_litellm_model_name(name), api_key=api_key or None, api_base=(base_url or None) if openai_compatible else None)
+
+        task_endpoint = _task_endpoint(model_name)
+        # 多 Key / 多网关：LLM_ENDPOINTS 中的端点与任务自身的端点组成池，按错误率与延迟加权路由
+        # 端点池为进程级共享：错误率、延迟与摘除状态跨任务保留，失效的 Key 不会被每个新任务重新尝试
+        endpoints = endpoints_from_json(config.llm_endpoints, default=task_endpoint) if config.llm_endpoints else [task_endpoint]
+        self.pool = get_endpoint_pool(endpoints, eject_after=config.endpoint_eject_after, eject_seconds=config.endpoint_eject_seconds)
+
+        # 持久化转换缓存：相同图片、模型与参数的页面直接复用已有结果
+        # 进程级共享：所有任务共用同一个 SQLite 连接，不再每个任务各开一个且从不关闭
+        cache = get_completion_cache(config.cache_path, config.cache_max_mb * 1024 * 1024)
+        # 录制/回放：记录真实运行的模型响应，或离线用录制的响应复现整个任务
+        cassette = get_cassette(config.cassette_path, config.cassette_mode, config.cassette_on_miss, config.cassette_latency_scale)
+        encoder = None
+        if self.image_encoding:
+            encoder = ImageEncoder.for_model(self.model_name, config.image_quality, config.image_max_edge)
+        # 进程级 RPM/TPM 限流：所有任务共享同一组令牌桶，按端点（模型与 API Key）分桶
+        rate_limiter = get_rate_limiter(config.rpm_limit, config.tpm_limit, config.rate_limit_redis_url)
+        # 请求策略：带抖动的指数退避（遵循 Retry-After）、单次调用超时，以及长尾页面的对冲请求
+        # 进程级共享：对冲阈值按端点的历史延迟计算，样本跨任务积累，不必每个任务重新攒够 HEDGE_MIN_SAMPLES
+        self.policy = get_request_policy(
+            base_delay=config.retry_base_delay,
+            max_delay=config.retry_max_delay,
+            timeout=config.request_timeout or None,
+            hedge_percentile=config.hedge_percentile or None,
+            hedge_min_samples=config.hedge_min_samples,
+        )
+        self.llm_client = LLMClient(self.model_name, cache=cache, encoder=encoder, limiter=self.limiter, rate_limiter=rate_limiter, policy=self.policy, pool=self.pool, cassette=cassette)
+
+        # 模型级联：页面先交给更便宜的模型，校验不通过再逐级升级，最后一级为任务选择的模型
+        # 各级共用任务凭据、缓存、录制/回放、限流与请求策略
+        if cascade_models is None:
+            cascade_models = [name.strip() for name in config.cascade_models.split(",") if name.strip()]
+        self.cascade = []  # [(模型名, LLMClient)]，不含最后一级
+        for name in cascade_models:
+            endpoint = _task_endpoint(name)
+            tier_encoder = ImageEncoder.for_model(endpoint.model, config.image_quality, config.image_max_edge) if self.image_encoding else None
+            tier_pool = get_endpoint_pool([endpoint], eject_after=config.endpoint_eject_after, eject_seconds=config.endpoint_eject_seconds)
+            self.cascade.append((endpoint.model, LLMClient(endpoint.model, cache=cache, encoder=tier_encoder, limiter=self.limiter, rate_limiter=rate_limiter, policy=self.policy, pool=tier_pool, cassette=cassette)))
+        # 最近一次 process_file 的逐页级联记录 {page_num: CascadeRecord}（采用的模型层级与各级 token）
+        self.page_tiers = {}
+
+    async def process_file(self, input_path: str, task_id: str = None, resume: bool = False) -> tuple[str, int]:
         """
         Process a file using a streaming pipeline with per-page markdown saving.
 
@@ -66,9 +333,13 @@ class SmartWorker:
         2. 实现实时预览 - 每页完成后即可查看
         3. 最后合并所有页面为完整的 markdown 文件
 
+        转换 PDF 时逐页清单 (manifest.jsonl) 记录已渲染的图片与已保存的页面，
+        续跑时只转换清单中没有、或哈希与磁盘文件不一致的页面
+
         Args:
             input_path: 输入文件路径
             task_id: 任务ID (用于进度回调)
+            resume: 续跑中断的转换，复用已完成的页面与已渲染的图片
 
         Returns:
             (markdown_content, total_pages): Markdown 内容和总页数
@@ -80,33 +351,166 @@ class SmartWorker:
 
         try:
              worker = create_worker(input_path)
+             is_pdf = isinstance(worker, PDFWorker)
+             page_filter = None
+             if self.page_filter and is_pdf:
+                 page_filter = PageFilter(
+                     blank_ink_ratio=config.blank_ink_ratio,
+                     max_hash_distance=config.duplicate_hash_distance,
+                     max_mean_diff=config.duplicate_mean_diff,
+                 )
+             manifest = None
+             resumed_pages, resumed_images = {}, {}
+             if is_pdf:
+                 manifest = PageManifest(output_dir)
+                 source_sha256 = await asyncio.to_thread(file_sha256, input_path)
+                 if resume:
+                     resumed_pages, resumed_images = await asyncio.to_thread(manifest.resume, source_sha256)
+                     # 文本层路由与空白/重复页判断在渲染时进行，开启时重新渲染未完成的页面
+                     if self.text_fast_path or page_filter is not None:
+                         resumed_images = {}
+                     logger.info(f"Resuming: {len(resumed_pages)} pages already converted, {len(resumed_images)} rendered images reused")
+                 else:
+                     manifest.start(source_sha256)
              # image_gen is a generator (one page at a time)
-             image_gen = worker.convert_to_images()
+             image_gen = worker.convert_to_images(
+                 workers=self.render_workers,
+                 in_memory=self.in_memory_images,
+                 adaptive_dpi=self.adaptive_dpi,
+                 route_text=self.text_fast_path,
+                 page_filter=page_filter,
+                 skip_pages=set(resumed_pages) | set(resumed_images),
+             )
+             # 计划转换的页数（渲染受窗口节流时用于计算进度）
+             planned_pages = len(worker.page_indices) if is_pdf else 1
+             page_routes = worker.page_routes if is_pdf else {}
+             page_verdicts = worker.page_verdicts if is_pdf else {}
         except Exception as e:
             logger.error(f"Failed to initialize worker: {e}")
             raise
 
         # Parallel conversion with Semaphore to control concurrency
         tasks = []
-        semaphore = asyncio.Semaphore(self.concurrency)
+        persist_tasks = []  # 内存模式下的后台图片落盘任务
+        # 自适应模式下由 LLMClient 内的窗口限流，页面级信号量只设上限
+        semaphore = asyncio.Semaphore(self.limiter.max_limit if self.limiter else self.concurrency)
+        # 全局页面调度器中的流：未指定租户时每个任务一条流
+        flow = task_id or input_path
         completed_count = 0
         total_pages = 0
         total_input_tokens = 0
         total_output_tokens = 0
+        failed_pages = set()  # 转换失败的页码，其重复页不复用错误内容
+        self.image_bytes = {}
+        self.packed_pages = 0
+        self.pack_fallbacks = 0
+        self.tiled_pages = {}
+        self.page_tiers = {}
+        self.page_states = {}
+        packer = None
+        if self.page_packing:
+            # 预估不可靠，预算最多占 max_tokens 的一半，为输出留余量
+            packer = PagePacker(
+                token_budget=min(config.pack_token_budget, config.max_tokens // 2),
+                max_pages=config.pack_max_pages,
+            )
 
-        async def _wrapped_convert(index: int, img_path: str):
+        async def _run_packed(group):
+            """合并请求：成功时返回逐页结果，拆分失败返回 None 由各页单独转换"""
+            nonlocal total_input_tokens, total_output_tokens
+            async with semaphore, self._page_slot(flow):
+                result, parts = await self._convert_packed(group)
+            if parts is None:
+                # 失败的合并请求同样消耗了 token
+                if result is not None and not result.cached:
+                    total_input_tokens += result.input_tokens
+                    total_output_tokens += result.output_tokens
+                return None
+            results = [CompletionResult(content=part, cached=result.cached) for part in parts]
+            # 整组的 token 计入首页，保证总数正确
+            results[0].input_tokens = result.input_tokens
+            results[0].output_tokens = result.output_tokens
+            results[0].total_tokens = result.total_tokens
+            results[0].retries = result.retries
+            return results
+
+        # 在途窗口：页面派发前占用名额、完成后释放，协程、内存图片与提前渲染的页面数随窗口而非文档长度增长
+        window = asyncio.Semaphore(self.max_inflight_pages)
+
+        async def _start(coro):
+            """等待在途窗口的名额后创建页面任务"""
+            await window.acquire()
+            task = asyncio.create_task(coro)
+            task.add_done_callback(lambda _: window.release())
+            tasks.append(task)
+
+        async def _dispatch_group(group):
+            """为一组轻量页面创建任务，多页时共享一次合并请求"""
+            group_task = asyncio.create_task(_run_packed(group)) if len(group) > 1 else None
+            for position, (index, image) in enumerate(group):
+                packed = (group_task, position) if group_task is not None else None
+                await _start(_wrapped_convert(index, image, packed=packed))
+
+        async def _wrapped_convert(index: int, image, route=None, verdict=None, original=None, packed=None, bands: int = 1):
             nonlocal completed_count, total_input_tokens, total_output_tokens
+            started = time.monotonic()  # 合并页从等待整组请求开始计时
+            page_route = "llm"
+            reused_content = None
+            if original is not None:
+                # 重复页：在占用并发名额前等待原页完成，避免与原页互相等待
+                original_index, original_content = await original
+                if original_index + 1 not in failed_pages:
+                    reused_content = original_content
+            packed_result = None
+            if packed is not None:
+                # 合并页：等待整组请求完成，拆分失败时退回单页转换
+                group_task, position = packed
+                group_results = await group_task
+                if group_results is not None:
+                    packed_result = group_results[position]
+            stream = None
             async with semaphore:
+                if packed_result is None:
+                    started = time.monotonic()
                 try:
-                    # Wrap blocking _convert_one into thread for true async in loop
-                    loop = asyncio.get_running_loop()
-                    result = await loop.run_in_executor(None, self._convert_one, img_path)
+                    if verdict is not None and verdict.action == PAGE_BLANK:
+                        # 空白页：不调用 LLM，输出空内容
+                        page_route = "blank"
+                        result = CompletionResult(content="")
+                    elif reused_content is not None:
+                        page_route = "duplicate"
+                        result = CompletionResult(content=reused_content)
+                    elif route is not None and route.is_local:
+                        # 文本层快速通道：直接使用本地生成的 Markdown
+                        page_route = "text"
+                        result = CompletionResult(content=route.markdown)
+                    elif packed_result is not None:
+                        page_route = "packed"
+                        result = packed_result
+                    else:
+                        if bands > 1:
+                            page_route = "tiled"
+                        if self.stream_output and bands == 1:
+                            stream = _PageStream(output_dir, index + 1, config.stream_interval, self.page_content_callback, task_id)
+                        # 原生异步请求：等待 LLM 期间只占用协程，不占用线程
+                        char_count = route.char_count if route is not None else 0
+                        async with self._page_slot(flow):
+                            result = await self._convert_page(image, bands, on_chunk=stream.on_chunk if stream else None, page_num=index + 1, char_count=char_count)
+                        if getattr(result, "image_bytes_before", 0):
+                            self.image_bytes[index + 1] = (result.image_bytes_before, result.image_bytes_after)
+                        if index + 1 in self.tiled_pages:
+                            page_route = "tiled"  # 输出被截断后改用条带重试
+                    latency = time.monotonic() - started
 
                     # Extract content and tokens from result
+                    page_tokens = (0, 0)
                     if hasattr(result, 'content'):
                         content = result.content
-                        total_input_tokens += result.input_tokens
-                        total_output_tokens += result.output_tokens
+                        # 命中缓存的页面未产生新的 token 消耗
+                        if not result.cached:
+                            total_input_tokens += result.input_tokens
+                            total_output_tokens += result.output_tokens
+                            page_tokens = (result.input_tokens, result.output_tokens)
                     else:
                         # 兼容旧版本，如果返回的是字符串
                         content = result
@@ -117,6 +521,9 @@ class SmartWorker:
 
                     content = content.strip()
 
+                    # LLM 请求失败的页面以空内容继续，逐页状态记为失败
+                    error = getattr(result, "error", None)
+
                     # ✨ 架构改进: 立即保存每页的 markdown 文件
                     # 这样前端可以实时获取和预览每个页面的内容
                     page_num = index + 1
@@ -130,17 +537,28 @@ class SmartWorker:
                         # 原子性重命名（OS 级别的原子操作）
                         os.replace(page_md_tmp, page_md_path)
                         logger.debug(f"Page {page_num} saved locally")
+                        # 失败的页面不记为完成，续跑时重新转换
+                        if manifest is not None and not error:
+                            manifest.record_done(page_num, content, *page_tokens)
                     except Exception as e:
                         logger.error(f"Failed to save page {page_num} markdown: {e}")
+                    if stream is not None:
+                        # 完整文件已落盘后再删除 partial，预览接口始终能读到其中之一
+                        await stream.finish(content)
+                    if error:
+                        failed_pages.add(page_num)  # 重复页不复用失败页的空内容
+                    await self._record_page_state(task_id, PageState(page_num, "failed" if error else "completed", page_route, self._page_model(page_num, page_route), latency, *page_tokens, retries=getattr(result, "retries", 0), error=error))
 
                     # 更新进度
                     completed_count += 1
                     if self.progress_callback and task_id:
-                        progress = (completed_count / total_pages * 100) if total_pages > 0 else 0
+                        # 渲染受窗口节流，已渲染页数落后于实际页数，按计划页数计算进度
+                        known_pages = max(total_pages, planned_pages)
+                        progress = (completed_count / known_pages * 100) if known_pages > 0 else 0
                         await self.progress_callback(
                             task_id=task_id,
                             current_page=completed_count,
-                            total_pages=total_pages,
+                            total_pages=known_pages,
                             progress=progress,
                             status="processing"
                         )
@@ -148,27 +566,158 @@ class SmartWorker:
                     return index, content
                 except Exception as e:
                     logger.error(f"Task failed for page {index+1}: {e}")
+                    failed_pages.add(index + 1)
+                    await self._record_page_state(task_id, PageState(index + 1, "failed", page_route, self._page_model(index + 1, page_route), time.monotonic() - started, error=str(e)))
                     return index, f"<!-- Error processing page {index+1} -->"
 
-        # Read specific pages from generator (Streaming start)
+        # 渲染在独立线程中进行，经有界队列交给事件循环：get_pixmap 不阻塞 SSE 心跳与其他任务的请求，
+        # 队列满时渲染线程等待，最多提前渲染 render_prefetch 页
+        loop = asyncio.get_running_loop()
+        render_queue = asyncio.Queue(maxsize=self.render_prefetch)
+        stop_rendering = threading.Event()
+        render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+        producer = loop.run_in_executor(render_executor, _render_pages, image_gen, render_queue, loop, stop_rendering)
+
+        async def _rendered_pages():
+            while True:
+                item = await render_queue.get()
+                if item is _RENDER_DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        async def _pages():
+            """按页序产出页面：续跑时插入已完成的页面与复用的图片，其余页面来自渲染队列"""
+            rendered = _rendered_pages()
+            if not resumed_pages and not resumed_images:
+                async for image in rendered:
+                    yield image
+                return
+            for page_num in range(1, planned_pages + 1):
+                if page_num in resumed_pages:
+                    yield _ResumedPage(*resumed_pages[page_num])
+                elif page_num in resumed_images:
+                    image_path = resumed_images[page_num]
+                    if self.in_memory_images:
+                        yield await asyncio.to_thread(_load_page_image, page_num, image_path)
+                    else:
+                        yield image_path
+                else:
+                    try:
+                        yield await rendered.__anext__()
+                    except StopAsyncIteration:
+                        return
+
+        async def _resumed_page(index: int, page: _ResumedPage):
+            """中断前已完成的页面：沿用保存的 Markdown，不再调用 LLM，token 计入中断前的消耗"""
+            nonlocal completed_count, total_input_tokens, total_output_tokens
+            completed_count += 1
+            total_input_tokens += page.input_tokens
+            total_output_tokens += page.output_tokens
+            return index, page.content
+
+        # Read specific pages from the render queue (Streaming start)
         try:
-            for i, img_path in enumerate(image_gen):
+            async for image in _pages():
+                i = total_pages
                 total_pages = i + 1  # 更新总页数
-                logger.debug(f"Page {i+1} rendered, queuing...")
-                task = asyncio.create_task(_wrapped_convert(i, img_path))
-                tasks.append(task)
-
                 # 发送初始进度
                 if self.progress_callback and task_id and i == 0:
                     await self.progress_callback(
                         task_id=task_id,
                         current_page=0,
-                        total_pages=total_pages,
+                        total_pages=max(total_pages, planned_pages),
                         progress=0,
                         status="processing"
                     )
+                if isinstance(image, _ResumedPage):
+                    # 打断连续的合并段，保持任务按页序排列
+                    if packer is not None:
+                        pending = packer.flush()
+                        if pending:
+                            await _dispatch_group(pending)
+                    await _start(_resumed_page(i, image))
+                    continue
+                logger.debug(f"Page {i+1} rendered, queuing...")
+                if i + 1 in resumed_images:
+                    pass  # 复用的图片已在磁盘上并记入清单
+                elif isinstance(image, PageImage):
+                    persist_tasks.append(
+                        loop.run_in_executor(None, _save_page_image, output_dir, image, manifest)
+                    )
+                elif manifest is not None:
+                    persist_tasks.append(
+                        loop.run_in_executor(None, _record_page_image, manifest, i + 1, image)
+                    )
+                # 路由与过滤决策在页面产出前已记录
+                route = page_routes.get(i + 1)
+                verdict = page_verdicts.get(i + 1)
+                needs_llm = (verdict is None or verdict.needs_llm) and not (route is not None and route.is_local)
+                estimate = None
+                if (packer is not None or self.tiler is not None) and needs_llm:
+                    try:
+                        char_count = route.char_count if route is not None else 0
+                        estimate = await asyncio.to_thread(estimate_page_tokens, image, char_count)
+                    except Exception as e:
+                        logger.warning(f"Failed to estimate page {i+1} tokens: {e}")
+                if packer is not None and estimate is not None and packer.is_light(estimate):
+                    closed = packer.add((i, image), estimate)
+                    if closed:
+                        await _dispatch_group(closed)
+                else:
+                    # 非轻量页打断连续段：先发出已累积的合并组，保持任务按页序排列
+                    if packer is not None:
+                        pending = packer.flush()
+                        if pending:
+                            await _dispatch_group(pending)
+                    original = None
+                    if verdict is not None and verdict.action == PAGE_DUPLICATE:
+                        original = tasks[verdict.duplicate_of - 1]
+                    bands = 1
+                    if self.tiler is not None and needs_llm:
+                        # 按页面几何尺寸与预估输出量决定条带数
+                        try:
+                            bands = await asyncio.to_thread(self.tiler.plan, image, estimate or 0, config.max_tokens)
+                        except Exception as e:
+                            logger.warning(f"Failed to plan tiles for page {i+1}: {e}")
+                    await _start(_wrapped_convert(i, image, route, verdict, original, bands=bands))
         except Exception as e:
             logger.error(f"Error during image generation: {e}")
+        finally:
+            # 提前退出时让渲染线程停止：清空队列以解除其阻塞
+            stop_rendering.set()
+            while not render_queue.empty():
+                render_queue.get_nowait()
+            await producer
+            render_executor.shutdown(wait=False)
+
+        if packer is not None:
+            pending = packer.flush()
+            if pending:
+                await _dispatch_group(pending)
+
+        self.render_plans = getattr(worker, "render_plans", {})
+        if self.render_plans:
+            dpi_counts = {}
+            for render_plan in self.render_plans.values():
+                dpi_counts[render_plan.dpi] = dpi_counts.get(render_plan.dpi, 0) + 1
+            logger.info(f"Adaptive DPI plan (dpi: pages): {dict(sorted(dpi_counts.items()))}")
+
+        self.page_routes = page_routes
+        if self.page_routes:
+            local_pages = sum(1 for route in self.page_routes.values() if route.is_local)
+            logger.info(f"Text fast path: {local_pages}/{len(self.page_routes)} pages converted locally, {local_pages} LLM calls saved")
+
+        if page_filter is not None:
+            self.skipped_pages = len(page_filter.blank_pages)
+            self.deduplicated_pages = len(page_filter.duplicate_pages)
+            logger.info(f"Page filter: {self.skipped_pages} blank pages skipped, {self.deduplicated_pages} duplicate pages reused")
+        else:
+            self.skipped_pages = self.deduplicated_pages = 0
+
+        self.resumed_pages = len(resumed_pages)
+        self.reused_images = len(resumed_images)
 
         if not tasks:
             logger.warning("No pages were generated for processing.")
@@ -177,18 +726,73 @@ class SmartWorker:
         # Wait for all tasks to complete
         logger.info(f"All {len(tasks)} pages dispatched. Waiting for results...")
         results = await asyncio.gather(*tasks)
+        # 确保预览图片全部落盘后再返回
+        await asyncio.gather(*persist_tasks)
 
         # Sort results by index to ensure strictly correct order
         # This prevents the "out of order" or "interleaved" data corruption
         sorted_results = sorted(results, key=lambda x: x[0])
 
-        # ✨ 改进的合并逻辑:
-        # 1. 从保存的每页 markdown 文件中读取内容
-        # 2. 在每页之间添加页码分隔符
-        # 3. 合并为最终的 markdown 文件
+        final_markdown = self._merge_pages(output_dir, [index + 1 for index, _ in sorted_results])
+        logger.info(f"File processing complete. Total pages: {len(sorted_results)}")
+
+        # 发送完成进度
+        if self.progress_callback and task_id:
+            await self.progress_callback(
+                task_id=task_id,
+                current_page=total_pages,
+                total_pages=total_pages,
+                progress=100,
+                status="completed"
+            )
+
+        logger.info(f"Processing completed. Total pages: {total_pages}")
+        logger.info(f"Token usage: Input={total_input_tokens}, Output={total_output_tokens}, Total={total_input_tokens + total_output_tokens}")
+        if self.limiter is not None:
+            stats = self.limiter.stats()
+            logger.info(f"Adaptive concurrency: window {stats['window']} ({stats['increases']} increases, {stats['decreases']} decreases)")
+        if len(self.pool.endpoints) > 1:
+            logger.info(f"Endpoint pool: {self.pool.stats()}")
+        if self.policy.hedge_percentile is not None:
+            logger.info(f"Hedged requests (all tasks): {self.policy.hedges_fired} fired, {self.policy.hedges_won} won")
+        if packer is not None:
+            logger.info(f"Page packing: {self.packed_pages} pages converted in packed requests, {self.pack_fallbacks} groups fell back to per-page calls")
+        if self.cascade:
+            tier_pages = {}
+            for record in self.page_tiers.values():
+                tier_pages[record.model] = tier_pages.get(record.model, 0) + 1
+            escalated = sum(1 for record in self.page_tiers.values() if record.tier > 0)
+            logger.info(f"Model cascade: pages per model {tier_pages}, {escalated} pages escalated")
+        if self.tiler is not None:
+            logger.info(f"Tiling: {len(self.tiled_pages)} pages converted in bands {self.tiled_pages}")
+        if self.image_bytes:
+            bytes_before = sum(before for before, _ in self.image_bytes.values())
+            bytes_after = sum(after for _, after in self.image_bytes.values())
+            logger.info(f"Image bytes sent: {bytes_after}/{bytes_before} ({len(self.image_bytes)} pages, {1 - bytes_after / bytes_before:.1%} saved)")
+        if self.llm_client.cassette is not None:
+            logger.info(f"Cassette {self.llm_client.cassette.mode}: {self.llm_client.cassette.stats()}")
+        if self.llm_client.cache is not None:
+            stats = self.llm_client.cache.stats()
+            logger.info(f"Completion cache (all tasks): {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries ({stats['size_bytes']} bytes)")
+        return final_markdown, total_pages, total_input_tokens, total_output_tokens
+
+    def _page_slot(self, flow: str):
+        """占用全局页面调度器的一个名额（未配置调度器时不限制）"""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(self.flow or flow, self.weight)
+
+    def _merge_pages(self, output_dir: str, page_nums: list) -> str:
+        """
+        合并每页保存的 markdown 文件为完整文档
+
+        ✨ 改进的合并逻辑:
+        1. 从保存的每页 markdown 文件中读取内容
+        2. 在每页之间添加页码分隔符
+        3. 合并为最终的 markdown 文件
+        """
         markdown_parts = []
-        for index, _ in sorted_results:
-            page_num = index + 1
+        for page_num in page_nums:
             page_md_path = os.path.join(output_dir, f"page_{page_num:04d}.md")
 
             try:
@@ -205,51 +809,165 @@ class SmartWorker:
                 logger.error(f"Failed to read page {page_num} markdown: {e}")
 
         # 合并所有页面
-        final_markdown = "".join(markdown_parts)
-        logger.info(f"File processing complete. Total pages: {len(sorted_results)}")
+        return "".join(markdown_parts)
+
+    def _page_model(self, page_num: int, route: str) -> str:
+        """页面结果采用的模型；未调用 LLM 的路线为 None"""
+        if route not in ("llm", "tiled", "packed"):
+            return None
+        record = self.page_tiers.get(page_num)
+        return record.model if record is not None else self.model_name
+
+    async def _record_page_state(self, task_id: str, state: PageState) -> None:
+        """保存页面转换结果并通知 page_state_callback；回调失败不影响转换"""
+        self.page_states[state.page_num] = state
+        if self.page_state_callback is None or not task_id:
+            return
+        try:
+            await self.page_state_callback(task_id=task_id, state=state)
+        except Exception as e:
+            logger.error(f"Page state callback failed for page {state.page_num}: {e}")
 
-        # 发送完成进度
-        if self.progress_callback and task_id:
-            await self.progress_callback(
-                task_id=task_id,
-                current_page=total_pages,
-                total_pages=total_pages,
-                progress=100,
-                status="completed"
-            )
+    async def _convert_page(self, image, bands: int = 1, refresh_cache: bool = False, on_chunk=None, page_num: int = None, char_count: int = 0) -> CompletionResult:
+        """
+        Convert one page through the model cascade, in bands when tiling asks for it
 
-        logger.info(f"Processing completed. Total pages: {total_pages}")
-        logger.info(f"Token usage: Input={total_input_tokens}, Output={total_output_tokens}, Total={total_input_tokens + total_output_tokens}")
-        return final_markdown, total_pages, total_input_tokens, total_output_tokens
+        Args:
+            image: 页面图片路径，或内存模式下的 PageImage
+            bands: 预先规划的条带数 (1 = 单次请求)
+            refresh_cache: 跳过缓存读取并用新结果覆盖（用于重新生成页面）
+            on_chunk: 流式输出回调，仅用于单次请求
+            page_num: 页码，用于日志、tiled_pages 与 page_tiers 统计
+            char_count: 页面文本层字符数 (0 = 未知)，用于输出长度校验
 
-    def _convert_one(self, image_path: str) -> 'CompletionResult':
+        Returns:
+            CompletionResult；包含被升级或截断的请求所消耗的 token
         """
-        Single image conversion (runs in thread)
+        # 级联：先用便宜的模型，校验不通过（表格畸形、LaTeX 不配对、输出过短、被截断）再升级
+        attempts = []
+        rejected = []
+        for model, client in self.cascade:
+            result = await self._convert_tier(client, image, bands, refresh_cache, on_chunk, page_num)
+            issues = check_page(result.content, result.finish_reason, char_count, config.cascade_min_text_ratio)
+            attempts.append(TierAttempt(model, result.input_tokens, result.output_tokens, result.cached, issues))
+            if not issues:
+                self.page_tiers[page_num] = CascadeRecord(page_num, attempts)
+                return _add_usage(result, rejected)
+            logger.info(f"Page {page_num} escalated from {model}: {'; '.join(issues)}")
+            rejected.append(result)
+
+        # 最后一级（任务选择的模型）的结果总被采用，输出被截断时改用条带重试
+        result = await self._convert_tier(self.llm_client, image, bands, refresh_cache, on_chunk, page_num, retile=self.tiler is not None)
+        if self.cascade:
+            attempts.append(TierAttempt(self.model_name, result.input_tokens, result.output_tokens, result.cached))
+            self.page_tiers[page_num] = CascadeRecord(page_num, attempts)
+        return _add_usage(result, rejected)
+
+    async def _convert_tier(self, client: LLMClient, image, bands: int, refresh_cache: bool = False, on_chunk=None, page_num: int = None, retile: bool = False) -> CompletionResult:
+        """
+        Convert one page with one model, in bands when tiling asks for it
+
+        Args:
+            client: 该级模型的 LLMClient
+            image: 页面图片路径，或内存模式下的 PageImage
+            bands: 预先规划的条带数 (1 = 单次请求)
+            refresh_cache: 跳过缓存读取并用新结果覆盖
+            on_chunk: 流式输出回调，仅用于单次请求
+            page_num: 页码，用于日志与 tiled_pages 统计
+            retile: 单次请求输出被截断时改用条带转换
+
+        Returns:
+            CompletionResult
+        """
+        if self.tiler is not None and bands > 1:
+            result = await self._convert_tiled(image, bands, refresh_cache, client)
+            self.tiled_pages[page_num] = bands
+            return result
+
+        result = await self._convert_one(image, refresh_cache=refresh_cache, on_chunk=on_chunk, client=client)
+        if result.finish_reason != "length" or client is not self.llm_client:
+            return result
+        if not retile:
+            logger.warning(f"Page {page_num} output was truncated at max_tokens ({config.max_tokens}); set TILE_PAGES=true to convert such pages in bands")
+            return result
+
+        # 输出被截断：不再静默返回不完整内容，改为条带并行转换
+        bands = self.tiler.max_bands
+        logger.warning(f"Page {page_num} output was truncated at max_tokens ({config.max_tokens}), retrying in {bands} bands")
+        tiled = await self._convert_tiled(image, bands, refresh_cache, client)
+        if not tiled.content:
+            return result
+        self.tiled_pages[page_num] = bands
+        # 被截断的请求同样消耗了 token
+        return _add_usage(tiled, [result])
+
+    async def _convert_tiled(self, image, bands: int, refresh_cache: bool = False, client: LLMClient = None) -> CompletionResult:
+        """
+        Convert a page as overlapping horizontal bands in parallel and stitch the results
+
+        Args:
+            image: 页面图片路径，或内存模式下的 PageImage
+            bands: 条带数
+            refresh_cache: 跳过缓存读取并用新结果覆盖
+            client: 使用的 LLMClient（默认为任务模型）
+
+        Returns:
+            CompletionResult：拼接后的内容，token 为各条带未命中缓存部分之和
+        """
+        band_images = await asyncio.to_thread(self.tiler.split, image, bands)
+        results = await asyncio.gather(*(
+            self._convert_one(band_image, refresh_cache=refresh_cache, user_prompt=USER_PROMPT + TILE_PROMPT.format(band=band, bands=bands), client=client)
+            for band, band_image in enumerate(band_images, start=1)
+        ))
+        fresh = [result for result in results if not result.cached]
+        return CompletionResult(
+            content=stitch_bands([result.content for result in results]),
+            input_tokens=sum(result.input_tokens for result in fresh),
+            output_tokens=sum(result.output_tokens for result in fresh),
+            total_tokens=sum(result.total_tokens for result in fresh),
+            retries=sum(result.retries for result in results),
+            error=next((result.error for result in results if result.error), None),
+            cached=not fresh,
+            image_bytes_before=sum(result.image_bytes_before for result in results),
+            image_bytes_after=sum(result.image_bytes_after for result in results),
+            # 仍有条带被截断时保留 "length"，便于上层识别
+            finish_reason="length" if any(result.finish_reason == "length" for result in results) else "stop",
+        )
+
+    async def _convert_one(self, image_path, refresh_cache: bool = False, on_chunk=None, user_prompt: str = USER_PROMPT, client: LLMClient = None) -> 'CompletionResult':
+        """
+        Single image conversion (native asyncio via LLMClient.acompletion)
+
+        Args:
+            image_path: 页面图片路径，或内存模式下的 PageImage
+            refresh_cache: 跳过缓存读取并用新结果覆盖（用于重新生成页面）
+            on_chunk: 流式输出回调 (delta, 已生成内容)，为 None 时不使用流式请求
+            user_prompt: 用户提示词（条带转换时附加条带说明）
+            client: 使用的 LLMClient（默认为任务模型，级联时为各级模型）
 
         Returns:
             CompletionResult with content and token usage
         """
-        logger.debug(f"Starting conversion for: {image_path} with {self.model_name}")
+        client = client or self.llm_client
+        logger.debug(f"Starting conversion for: {image_path} with {client.model_name}")
+        if isinstance(image_path, PageImage):
+            request_kwargs = {"images": [image_path]}
+        else:
+            request_kwargs = {"image_paths": [image_path]}
+        if refresh_cache:
+            request_kwargs["refresh_cache"] = True
+        if on_chunk is not None:
+            request_kwargs["on_chunk"] = on_chunk
 
-        system_prompt = """
-You are a helpful assistant that can convert images to Markdown format. You are given an image, and you need to convert it to Markdown format. Please output the Markdown content only, without any other text.
-"""
-        user_prompt = """
-Below is the image of one page of a document, please read the content in the image and transcribe it into plain Markdown format. Please note:
-1. Identify heading levels, text styles, formulas, and the format of table rows and columns
-2. Mathematical formulas should be transcribed using LaTeX syntax, ensuring consistency with the original
-3. Do NOT include any page headers or footers (e.g., page numbers, document titles, logos at the top/bottom of the page). Only transcribe the main body content.
-4. Please output the Markdown content only, without any other text.
-"""
         try:
             logger.debug(f"Calling LLM API for: {image_path}")
-            result = self.llm_client.completion(
+            result = await client.acompletion(
                 user_message=user_prompt,
-                system_prompt=system_prompt,
-                image_paths=[image_path],
+                system_prompt=SYSTEM_PROMPT,
                 temperature=config.temperature,
                 max_tokens=config.max_tokens,
-                retry_times=config.retry_times # Reusing config for now
+                retry_times=config.retry_times, # Reusing config for now
+                **request_kwargs
             )
             logger.info(f"Page converted successfully. Tokens: {result.total_tokens}")
             return result
@@ -257,4 +975,48 @@ Below is the image of one page of a document, please read the content in the ima
             logger.error(f"Error converting {image_path}: {e}")
             # 返回空的 CompletionResult 而不是空字符串
             from markpdfdown.core.llm_client import CompletionResult
-            return CompletionResult(content="")
+            return CompletionResult(content="", error=str(e))
+
+    async def _convert_packed(self, pages: list) -> tuple:
+        """
+        Convert several light pages in one request and split the response per page
+
+        Args:
+            pages: [(index, 页面图片路径或 PageImage)]，按页序排列
+
+        Returns:
+            (CompletionResult 或 None, 逐页 Markdown 列表；请求失败或拆分校验失败时为 None)
+        """
+        page_nums = [index + 1 for index, _ in pages]
+        images = [image for _, image in pages]
+        if isinstance(images[0], PageImage):
+            request_kwargs = {"images": images}
+        else:
+            request_kwargs = {"image_paths": images}
+
+        try:
+            result = await self.llm_client.acompletion(
+                user_message=USER_PROMPT + "\n" + packed_prompt(page_nums),
+                system_prompt=SYSTEM_PROMPT,
+                temperature=config.temperature,
+                max_tokens=config.max_tokens,
+                retry_times=config.retry_times,
+                **request_kwargs
+            )
+        except Exception as e:
+            logger.warning(f"Packed request for pages {page_nums} failed, falling back to per-page calls: {e}")
+            self.pack_fallbacks += 1
+            return None, None
+
+        # 输出被截断时最后一页不完整，即使分隔符齐全也不采用
+        parts = None
+        if result.finish_reason != "length":
+            parts = split_packed_response(result.content, page_nums)
+        if parts is None:
+            logger.warning(f"Packed response for pages {page_nums} failed validation, falling back to per-page calls")
+            self.pack_fallbacks += 1
+            return result, None
+
+        logger.info(f"Pages {page_nums} converted in one request. Tokens: {result.total_tokens}")
+        self.packed_pages += len(parts)
+        return result, parts
@@ -1,7 +1,12 @@
 import asyncio
 import logging
+import time
 from .celery_app import celery_app
-from .smart_worker import SmartWorker
+from .admission import AdmissionQueue, estimate_cost
+from .manifest import PageManifest
+from .page_scheduler import get_page_scheduler
+from .page_states import page_state_writer
+from .smart_worker import PageState, SmartWorker
 from src.db.database import AsyncSessionLocal
 from src.db.models import Task, TaskStatus
 from src.api.sse_manager import sse_manager
@@ -23,21 +28,53 @@ async def progress_callback(task_id: str, current_page: int, total_pages: int, p
         logger.error(f"Failed to send progress update: {e}")
 
 
+async def page_content_callback(task_id: str, page_num: int, content: str, done: bool):
+    """流式输出回调函数 - 通过SSE推送生成中的页面内容"""
+    try:
+        await sse_manager.broadcast_page_content(task_id=task_id, page_num=page_num, content=content, done=done)
+    except Exception as e:
+        logger.error(f"Failed to send page content update: {e}")
+
+
+async def page_state_callback(task_id: str, state: PageState):
+    """逐页状态回调函数 - 写入 TaskDetail 的写回缓冲，按批提交"""
+    await page_state_writer.add(task_id, state)
 
-# 全局并发控制信号量 - 限制同时进行的任务数
-# 针对 2核4G 环境，默认限制为 2
+
+# 任务准入队列 - 限制同时打开的任务数，排队任务按预估时长（短作业优先）、优先级与截止时间放行
+# LLM 页面请求总数由全局页面调度器 (PAGE_CONCURRENCY) 限制，并在活动任务间加权公平分配，
+# 准入只需限制打开的文档、渲染线程与在途页面图片占用的内存（每个任务受 RENDER_PREFETCH 与
+# MAX_INFLIGHT_PAGES 限制），针对 2核4G 环境，默认限制为 8（早期版本为 2）：
+# 大文档转换期间新上传的小文档直接进入页面调度，而不是排在准入队列中等待
 # 可以通过环境变量 MAX_CONCURRENT_TASKS 进行调整
 import os
-MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "2"))
-task_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "8"))
+task_admission = AdmissionQueue(MAX_CONCURRENT_TASKS)
 
-async def run_async_process(task_id: str, input_path: str, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None):
-    # 使用信号量限制并发任务数
-    async with task_semaphore:
-        logger.info(f"Acquired semaphore for task {task_id}. Active tasks: {MAX_CONCURRENT_TASKS - task_semaphore._value}")
-        await _run_async_process_internal(task_id, input_path, model_name, concurrency, api_key, base_url)
+async def run_async_process(task_id: str, input_path: str, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None, tenant: str = None, weight: float = 1.0, resume: bool = False):
+    """
+    转换一个任务；页面通过进程级页面调度器与其它任务的页面交错执行
 
-async def _run_async_process_internal(task_id: str, input_path: str, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None):
+    任务先进入准入队列，按预估成本、Task.priority 与 Task.deadline 排序，等待越久越靠前
+
+    Args:
+        tenant: 租户标识，同一租户的所有任务共享一份调度份额（默认每个任务单独一份）
+        weight: 调度权重，权重为 2 的任务（或租户）获得的页面名额是权重为 1 的两倍
+        resume: 续跑中断的任务，只转换逐页清单中尚未完成的页面
+    """
+    priority, deadline = 0, None
+    async with AsyncSessionLocal() as session:
+        task = await session.get(Task, task_id)
+        if task:
+            priority, deadline = task.priority or 0, task.deadline
+    # 打开 PDF 抽样估算成本，放到线程中避免阻塞事件循环
+    pages, cost = await asyncio.to_thread(estimate_cost, input_path)
+    logger.info(f"Task {task_id} queued for admission: {pages} pages, cost {cost:.1f}, priority {priority}, deadline {deadline}")
+    async with task_admission.admit(task_id, cost, priority, deadline):
+        logger.info(f"Task {task_id} admitted. Active tasks: {task_admission.active}")
+        await _run_async_process_internal(task_id, input_path, model_name, concurrency, api_key, base_url, tenant, weight, resume)
+
+async def _run_async_process_internal(task_id: str, input_path: str, model_name: str, concurrency: int = 2, api_key: str = None, base_url: str = None, tenant: str = None, weight: float = 1.0, resume: bool = False):
 
     logger.info(f"Starting async process for task {task_id}")
     logger.info(f"Task parameters: Input path: {input_path}, Model: {model_name}, Concurrency: {concurrency}")
@@ -52,7 +89,9 @@ async def _run_async_process_internal(task_id: str, input_path: str, model_name:
             return
 
         task.status = TaskStatus.PROCESSING
-        task.started_at = datetime.utcnow()
+        # 续跑的任务保留最初的开始时间
+        if not (resume and task.started_at):
+            task.started_at = datetime.utcnow()
         await session.commit()
         logger.info(f"Task {task_id} status updated to PROCESSING")
 
@@ -64,10 +103,17 @@ async def _run_async_process_internal(task_id: str, input_path: str, model_name:
             concurrency=concurrency,
             api_key=api_key,
             base_url=base_url,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            page_content_callback=page_content_callback,
+            page_state_callback=page_state_callback,
+            scheduler=get_page_scheduler(),
+            flow=tenant,
+            weight=weight
         )
         logger.info(f"Starting file processing...")
-        markdown_content, total_pages, input_tokens, output_tokens = await worker.process_file(input_path, task_id=task_id)
+        markdown_content, total_pages, input_tokens, output_tokens = await worker.process_file(input_path, task_id=task_id, resume=resume)
+        # 任务状态变为 COMPLETED 前写入全部逐页状态
+        await page_state_writer.flush()
 
         logger.info(f"Processing completed. Total pages: {total_pages}. Tokens: Input={input_tokens}, Output={output_tokens}, Total={input_tokens + output_tokens}")
 
@@ -95,12 +141,15 @@ async def _run_async_process_internal(task_id: str, input_path: str, model_name:
                 task.input_tokens = input_tokens  # 更新 token 统计
                 task.output_tokens = output_tokens
                 task.total_tokens = input_tokens + output_tokens
+                task.skipped_pages = worker.skipped_pages  # 页面过滤统计
+                task.deduplicated_pages = worker.deduplicated_pages
                 await session.commit()
 
         logger.info(f"Task {task_id} completed successfully. Duration: {task.completed_at - task.started_at}")
 
     except Exception as e:
         logger.error(f"Task {task_id} failed: {e}")
+        await page_state_writer.flush()
         async with AsyncSessionLocal() as session:
             task = await session.get(Task, task_id)
             if task:
@@ -110,6 +159,56 @@ async def _run_async_process_internal(task_id: str, input_path: str, model_name:
         raise e
 
 
+# 启动时续跑重启前未完成的任务 (PENDING / PROCESSING)，可以通过环境变量 RESUME_INTERRUPTED_TASKS 关闭
+RESUME_INTERRUPTED_TASKS = os.getenv("RESUME_INTERRUPTED_TASKS", "true").lower() == "true"
+_resumed_runs = set()  # 持有续跑任务的引用，避免被垃圾回收
+
+
+def _forget_resumed_run(run: asyncio.Task) -> None:
+    _resumed_runs.discard(run)
+    if not run.cancelled():
+        run.exception()  # 失败已记录在任务状态中，取出异常避免未处理异常警告
+
+
+async def resume_interrupted_tasks(upload_dir: str) -> list:
+    """
+    查找进程重启前未完成的任务并重新排队，只转换逐页清单中尚未完成的页面
+
+    BackgroundTasks 模式下这些任务随进程一起丢失；Celery 模式下由 Celery 负责重投，不应调用
+
+    Args:
+        upload_dir: 任务目录的上级目录 (files/tasks)
+
+    Returns:
+        重新排队的任务 ID 列表
+    """
+    from sqlalchemy import select
+    from src.api.settings import load_settings_from_env
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Task).where(Task.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING])).order_by(Task.created_at.asc()))
+        interrupted = result.scalars().all()
+        runnable = []
+        for task in interrupted:
+            input_path = os.path.abspath(os.path.join(upload_dir, task.id, task.file_name or ""))
+            if task.file_name and os.path.isfile(input_path):
+                # 沿用上传时的租户与权重，重启后仍按原份额参与页面调度
+                runnable.append((task.id, input_path, task.tenant, task.weight or 1.0))
+            else:
+                task.status = TaskStatus.FAILED
+                task.error_message = "Input file missing after restart"
+                logger.error(f"Cannot resume task {task.id}: input file {input_path} not found")
+        await session.commit()
+
+    settings = load_settings_from_env()
+    for task_id, input_path, tenant, weight in runnable:
+        logger.info(f"Resuming interrupted task {task_id}")
+        run = asyncio.create_task(run_async_process(task_id, input_path, settings.model, settings.concurrency, settings.apiKey, settings.baseUrl, tenant, weight, resume=True))
+        _resumed_runs.add(run)
+        run.add_done_callback(_forget_resumed_run)
+    return [task_id for task_id, *_ in runnable]
+
+
 async def regenerate_single_page(
     task_id: str,
     page_num: int,
@@ -145,14 +244,20 @@ async def regenerate_single_page(
             concurrency=1,  # 单页并发为1
             api_key=api_key,
             base_url=base_url,
-            progress_callback=None  # 单页重新生成不需要进度回调
+            progress_callback=None,  # 单页重新生成不需要进度回调
+            scheduler=get_page_scheduler()
         )
 
-        # 1. 转换单页 - 使用 _convert_one 方法而不是 process_file
-        # _convert_one 是同步方法，需要在线程池中运行
-        import asyncio
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, worker._convert_one, image_path)
+        # 1. 转换单页 - 使用 _convert_page 方法而不是 process_file（输出被截断时按条带重试）
+        # 重新生成必须跳过转换缓存，否则会拿回同样的结果
+        # 与正在运行的任务共享全局页面名额，单页请求的标签最小，通常立即得到名额
+        started = time.monotonic()
+        async with worker._page_slot(task_id):
+            result = await worker._convert_page(image_path, refresh_cache=True, page_num=page_num)
+        page_route = "tiled" if page_num in worker.tiled_pages else "llm"
+        # LLM 请求失败时以空内容继续，逐页状态记为失败
+        error = result.error
+        await page_state_writer.add(task_id, PageState(page_num, "failed" if error else "completed", page_route, worker._page_model(page_num, page_route), time.monotonic() - started, result.input_tokens, result.output_tokens, result.retries, error=error))
 
         # 提取 markdown 内容和 token 使用
         if hasattr(result, 'content'):
@@ -175,6 +280,9 @@ async def regenerate_single_page(
         # 原子性重命名（OS 级别的原子操作）
         os.replace(page_md_tmp, page_md_path)
         logger.info(f"Page {page_num} markdown saved to {page_md_path}")
+        # 同步逐页清单，续跑时沿用重新生成的内容；失败的页面不记为完成，续跑时重新转换
+        if not error:
+            PageManifest(str(task_dir)).record_done(page_num, page_markdown)
 
         # 3. 查找所有页面文件并按顺序合并（使用严格的模式匹配）
         # 使用严格的4位数字模式匹配，避免匹配到用户上传的其他文件
@@ -257,7 +365,7 @@ async def regenerate_single_page(
         raise e
 
 @celery_app.task(bind=True)
-def convert_pdf_task(self, task_id: str, input_path: str, model_name: str = "gpt-4o", concurrency: int = 2, api_key: str = None, base_url: str = None):
+def convert_pdf_task(self, task_id: str, input_path: str, model_name: str = "gpt-4o", concurrency: int = 2, api_key: str = None, base_url: str = None, tenant: str = None, weight: float = 1.0):
     """
     Celery task to convert PDF to Markdown
     """
@@ -268,4 +376,4 @@ def convert_pdf_task(self, task_id: str, input_path: str, model_name: str = "gpt
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
-    loop.run_until_complete(run_async_process(task_id, input_path, model_name, concurrency, api_key, base_url))
+    loop.run_until_complete(run_async_process(task_id, input_path, model_name, concurrency, api_key, base_url, tenant, weight))
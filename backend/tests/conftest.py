@@ -14,3 +14,11 @@ import pytest
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture
+def mock_llm_server():
+    """本地 OpenAI 兼容的模拟 LLM 服务，用于离线的吞吐与容错测试"""
+    from markpdfdown.testing import MockLLMServer
+    with MockLLMServer() as server:
+        yield server
@@ -4,6 +4,7 @@ from src.api.main import app
 from src.db.database import get_db, init_db
 from src.worker.tasks import convert_pdf_task
 from unittest.mock import patch, MagicMock
+import asyncio
 import os
 
 # ...
@@ -23,11 +24,27 @@ def mock_celery_task():
             os.environ.pop("USE_CELERY", None)
 
 @pytest.fixture(autouse=True)
-async def setup_db():
-    # Initialize DB before tests
+async def setup_db(tmp_path, monkeypatch):
+    # 每个测试使用 tmp_path 下独立的数据库和上传目录，不写入仓库里的 tasks.db 与 files/tasks
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from src.db import database
+    from src.worker import page_states, tasks
+    from src.api import main, routes
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tasks.db'}", echo=False)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "engine", engine)
+    for module in (database, tasks, routes, page_states):
+        monkeypatch.setattr(module, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(page_states.page_state_writer, "session_factory", session_factory)
+    upload_dir = str(tmp_path / "tasks")
+    os.makedirs(upload_dir)
+    monkeypatch.setattr(routes, "UPLOAD_DIR", upload_dir)
+    monkeypatch.setattr(main, "UPLOAD_DIR", upload_dir)
+
     await init_db()
     yield
-    # We could drop tables here if we want clean state
+    await engine.dispose()
 
 
 @pytest.mark.asyncio
@@ -98,9 +115,162 @@ startxref
     args = mock_celery_task.call_args[0]
     assert args[0] == data["id"] # First arg is task_id
 
+@pytest.mark.asyncio
+async def test_upload_passes_tenant_and_weight(mock_celery_task):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        files = {"file": ("tenant.pdf", b"%PDF-1.4\n%%EOF", "application/pdf")}
+        response = await ac.post("/api/v1/upload", files=files, data={"tenant": "acme", "weight": "2"})
+        assert response.status_code == 200
+
+        args = mock_celery_task.call_args[0]
+        assert args[0] == response.json()["id"]
+        assert args[-2:] == ("acme", 2.0)
+        assert (response.json()["tenant"], response.json()["weight"]) == ("acme", 2.0)
+
+        # 权重必须为正数
+        response = await ac.post("/api/v1/upload", files=files, data={"weight": "0"})
+        assert response.status_code == 400
+        mock_celery_task.assert_called_once()
+
 @pytest.mark.asyncio
 async def test_get_task_not_found():
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         response = await ac.get("/api/v1/tasks/non-existent-id")
         assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_task_queue_position(mock_celery_task):
+    import asyncio
+    from src.worker.tasks import task_admission
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        files = {"file": ("queued.pdf", b"%PDF-1.4\n%%EOF", "application/pdf")}
+        data = {"priority": "2", "deadline": "2030-01-01T08:00:00+08:00"}
+        response = await ac.post("/api/v1/upload", files=files, data=data)
+        task_id = response.json()["id"]
+
+        # 占满准入名额，让任务在队列中等待
+        blockers = [f"blocker-{i}" for i in range(task_admission.slots - task_admission.active)]
+        for blocker in blockers:
+            await task_admission.acquire(blocker)
+        waiter = asyncio.create_task(task_admission.acquire(task_id, 3.0))
+        await asyncio.sleep(0)
+        try:
+            response = await ac.get(f"/api/v1/tasks/{task_id}")
+        finally:
+            for blocker in blockers:
+                task_admission.release(blocker)
+            await waiter
+            task_admission.release(task_id)
+
+    assert response.status_code == 200
+    task = response.json()
+    assert task["priority"] == 2
+    assert task["deadline"] == "2030-01-01T00:00:00"
+    assert task["queue_position"] == 1
+    assert task["estimated_start_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_resume_interrupted_tasks(tmp_path):
+    import uuid
+    from src.db.database import AsyncSessionLocal
+    from src.db.models import Task, TaskStatus
+    from src.worker.tasks import resume_interrupted_tasks
+
+    interrupted, missing = str(uuid.uuid4()), str(uuid.uuid4())
+    os.makedirs(tmp_path / interrupted)
+    (tmp_path / interrupted / "doc.pdf").write_bytes(b"%PDF-1.4\n%%EOF")
+    async with AsyncSessionLocal() as session:
+        session.add(Task(id=interrupted, file_name="doc.pdf", status=TaskStatus.PROCESSING, tenant="acme", weight=2.0))
+        session.add(Task(id=missing, file_name="gone.pdf", status=TaskStatus.PENDING))
+        await session.commit()
+
+    with patch("src.worker.tasks.run_async_process") as mock_run:
+        async def _run(*args, **kwargs):
+            return None
+        mock_run.side_effect = _run
+        resumed = await resume_interrupted_tasks(str(tmp_path))
+        await asyncio.sleep(0)
+
+    assert interrupted in resumed and missing not in resumed
+    calls = {c.args[0]: c for c in mock_run.call_args_list}
+    assert calls[interrupted].args[1] == str(tmp_path / interrupted / "doc.pdf")
+    assert calls[interrupted].kwargs["resume"] is True
+    # 上传时的租户与权重随任务保存，续跑时沿用
+    assert calls[interrupted].args[6:8] == ("acme", 2.0)
+    async with AsyncSessionLocal() as session:
+        assert (await session.get(Task, missing)).status == TaskStatus.FAILED
+        for task_id in (interrupted, missing):
+            await session.delete(await session.get(Task, task_id))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_list_task_pages():
+    import uuid
+    from sqlalchemy import func, select
+    from src.db.database import AsyncSessionLocal
+    from src.db.models import Task, TaskDetail, TaskStatus
+    from src.worker.page_states import page_state_writer
+    from src.worker.smart_worker import PageState
+
+    task_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as session:
+        session.add(Task(id=task_id, file_name="doc.pdf", status=TaskStatus.COMPLETED))
+        await session.commit()
+    # 状态仍在写回缓冲中，查询接口先写入再读取
+    await page_state_writer.add(task_id, PageState(2, "failed", "llm", "gpt-4o", 0.5, retries=2, error="timeout"))
+    await page_state_writer.add(task_id, PageState(1, "completed", "text", latency=0.01))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/tasks/{task_id}/pages")
+        assert response.status_code == 200
+        pages = response.json()
+        assert [(p["page_num"], p["status"], p["route"]) for p in pages] == [(1, "completed", "text"), (2, "failed", "llm")]
+        assert (pages[1]["model"], pages[1]["retries"], pages[1]["error_message"]) == ("gpt-4o", 2, "timeout")
+
+        assert (await ac.get("/api/v1/tasks/non-existent-id/pages")).status_code == 404
+        assert (await ac.delete(f"/api/v1/tasks/{task_id}")).status_code == 204
+
+    async with AsyncSessionLocal() as session:
+        remaining = await session.execute(select(func.count()).select_from(TaskDetail).where(TaskDetail.task_id == task_id))
+        assert remaining.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_regenerate_failed_page_is_recorded_as_failed(tmp_path):
+    import uuid
+    from unittest.mock import AsyncMock
+    from sqlalchemy import select
+    from markpdfdown.core.llm_client import CompletionResult
+    from src.db.database import AsyncSessionLocal
+    from src.db.models import Task, TaskDetail, TaskStatus
+    from src.worker.manifest import PAGE_DONE, PageManifest
+    from src.worker.page_states import page_state_writer
+    from src.worker.tasks import regenerate_single_page
+
+    task_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as session:
+        session.add(Task(id=task_id, file_name="doc.pdf", status=TaskStatus.COMPLETED))
+        await session.commit()
+    (tmp_path / "page_0001.jpg").write_bytes(b"image")
+    PageManifest(str(tmp_path)).start("source")
+
+    failed = CompletionResult(content="", error="upstream timeout")
+    with patch("src.worker.tasks.SmartWorker._convert_page", AsyncMock(return_value=failed)):
+        await regenerate_single_page(task_id, 1, str(tmp_path / "page_0001.jpg"), "gpt-4o")
+    await page_state_writer.flush()
+
+    async with AsyncSessionLocal() as session:
+        detail = (await session.execute(select(TaskDetail).where(TaskDetail.task_id == task_id))).scalar_one()
+        assert (detail.status, detail.error_message) == (TaskStatus.FAILED, "upstream timeout")
+        await session.delete(await session.get(Task, task_id))
+        await session.commit()
+    # 失败的页面不记为完成，续跑时重新转换
+    assert (1, PAGE_DONE) not in PageManifest(str(tmp_path))._load("source")
@@ -0,0 +1,192 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import fitz
+import pytest
+
+from src.worker.admission import AdmissionQueue, estimate_cost
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _queue(slots: int = 1, **kwargs) -> AdmissionQueue:
+    queue = AdmissionQueue(slots, seconds_per_page=1.0, **kwargs)
+    queue.clock = FakeClock()
+    return queue
+
+
+async def _admitted_order(queue: AdmissionQueue, waiters: list) -> list:
+    """依次排队 waiters [(task_id, cost, priority, deadline)]，释放占位任务后返回放行顺序"""
+    order = []
+
+    async def run(task_id, cost, priority, deadline):
+        await queue.acquire(task_id, cost, priority, deadline)
+        order.append(task_id)
+        queue.release(task_id)
+
+    await queue.acquire("running", 1.0)
+    tasks = []
+    for waiter in waiters:
+        tasks.append(asyncio.create_task(run(*waiter)))
+        await asyncio.sleep(0)
+    queue.release("running")
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_admission_shortest_job_first():
+    """
+    Test that queued tasks start cheapest first rather than in arrival order
+    """
+    queue = _queue()
+
+    order = await _admitted_order(queue, [("batch", 800, 0, None), ("medium", 40, 0, None), ("small", 2, 0, None)])
+
+    assert order == ["small", "medium", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_admission_priority_and_deadline():
+    """
+    Test that priority and a close deadline move a task ahead of cheaper ones
+    """
+    queue = _queue(priority_seconds=100)
+    soon = datetime.utcnow() + timedelta(seconds=21)
+
+    order = await _admitted_order(queue, [
+        ("small", 2, 0, None),
+        ("urgent", 20, 0, soon),
+        ("important", 150, 2, None),
+        ("low", 1, -1, None),
+    ])
+
+    # important: 150 - 200 = -50，urgent: 松弛 21 - 20 ≈ 1，small: 2，low: 1 + 100 = 101
+    assert order == ["important", "urgent", "small", "low"]
+
+
+@pytest.mark.asyncio
+async def test_admission_aging_prevents_starvation():
+    """
+    Test that a long-waiting large task overtakes newly arrived small ones
+    """
+    queue = _queue(aging=1.0)
+    await queue.acquire("running", 1.0)
+    large = asyncio.create_task(queue.acquire("large", 100))
+    await asyncio.sleep(0)
+    queue.clock.now += 99
+    small = asyncio.create_task(queue.acquire("small", 2))
+    await asyncio.sleep(0)
+
+    # large: 100 - 99 = 1 < small: 2
+    assert queue.position("large")[0] == 1
+    queue.release("running")
+    await large
+    assert not small.done()
+    queue.release("large")
+    await small
+
+
+@pytest.mark.asyncio
+async def test_admission_position_and_eta():
+    """
+    Test queue positions and estimated start times from running and queued work
+    """
+    queue = _queue(slots=2)
+    await queue.acquire("a", 10)
+    await queue.acquire("b", 30)
+    queue.clock.now += 4
+    waiters = [asyncio.create_task(queue.acquire(task_id, cost)) for task_id, cost in (("c", 5), ("d", 8))]
+    await asyncio.sleep(0)
+
+    # a 还需 6 秒，b 还需 26 秒；c 接在 a 之后，d 接在 c 之后（6 + 5 = 11 < 26）
+    assert queue.position("c") == (1, 6.0)
+    assert queue.position("d") == (2, 11.0)
+    assert queue.position("a") is None
+    assert queue.stats()["waiting"] == 2
+
+    queue.release("a")
+    queue.release("b")
+    await asyncio.gather(*waiters)
+
+
+@pytest.mark.asyncio
+async def test_admission_learns_seconds_per_page():
+    """
+    Test that completed tasks calibrate the duration estimate and failed ones do not
+    """
+    queue = _queue(slots=1)
+
+    async with queue.admit("done", 2):
+        queue.clock.now += 12
+    with pytest.raises(RuntimeError):
+        async with queue.admit("failed", 2):
+            raise RuntimeError("boom")
+
+    # 0.8 × 1.0 + 0.2 × (12 / 2)
+    assert queue.seconds_per_page == pytest.approx(2.0)
+    assert queue.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_cancelled_waiter():
+    """
+    Test that a cancelled queued task leaves the queue without blocking the next one
+    """
+    queue = _queue()
+    await queue.acquire("running")
+    cancelled = asyncio.create_task(queue.acquire("cancelled"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    queue.release("running")
+
+    assert queue.stats()["waiting"] == 0
+    await asyncio.wait_for(queue.acquire("next"), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_admission_waiter_cancelled_before_release():
+    """
+    Test that a release skips a waiter cancelled before it could leave the queue
+    """
+    queue = _queue()
+    await queue.acquire("running")
+    cancelled = asyncio.create_task(queue.acquire("cancelled", 1))
+    following = asyncio.create_task(queue.acquire("next", 5))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    # 被取消的任务成本更低、排在前面，释放时跳过它，名额交给下一个任务
+    queue.release("running")
+
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await asyncio.wait_for(following, timeout=1)
+    assert queue.stats()["active"] == 1 and queue.stats()["waiting"] == 0
+    queue.release("next")
+    assert queue.active == 0
+
+
+def test_estimate_cost(tmp_path):
+    """
+    Test that pages with figures and dense drawings cost more than plain text pages
+    """
+    path = str(tmp_path / "doc.pdf")
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), "Plain text")
+    figure = document.new_page()
+    figure.insert_image(fitz.Rect(72, 72, 172, 172), pixmap=fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False))
+    document.save(path)
+    document.close()
+
+    assert estimate_cost(path) == (2, 2.5)
+    assert estimate_cost(str(tmp_path / "scan.png")) == (1, 1.0)
@@ -0,0 +1,44 @@
+from src.worker.manifest import PageManifest
+
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_manifest_resume_verifies_files(tmp_path):
+    """
+    Test that only pages whose files still match their recorded hashes are reused
+    """
+    manifest = PageManifest(str(tmp_path))
+    manifest.start("source")
+    for page_num in (1, 2, 3):
+        _write(tmp_path / f"page_{page_num:04d}.jpg", b"image %d" % page_num)
+        manifest.record_rendered(page_num, f"page_{page_num:04d}.jpg", b"image %d" % page_num)
+    for page_num in (1, 2):
+        _write(tmp_path / f"page_{page_num:04d}.md", b"# Page %d" % page_num)
+        manifest.record_done(page_num, "# Page %d" % page_num, 100, 20)
+    # 第 2 页 Markdown 被改写，第 3 页图片损坏，第 4 页只写了半行就崩溃
+    _write(tmp_path / "page_0002.md", b"# Edited")
+    _write(tmp_path / "page_0003.jpg", b"truncated")
+    with open(manifest.path, "a", encoding="utf-8") as f:
+        f.write('{"page": 4, "status": "do')
+
+    done, images = PageManifest(str(tmp_path)).resume("source")
+
+    assert done == {1: ("# Page 1", 100, 20)}
+    assert images == {2: str(tmp_path / "page_0002.jpg")}
+
+
+def test_manifest_other_source_starts_over(tmp_path):
+    """
+    Test that a manifest written for a different source file is discarded
+    """
+    manifest = PageManifest(str(tmp_path))
+    manifest.start("old source")
+    _write(tmp_path / "page_0001.md", b"# Page 1")
+    manifest.record_done(1, "# Page 1")
+
+    assert manifest.resume("new source") == ({}, {})
+    # 清单已按新源文件重新开始，旧的完成记录不再出现
+    assert manifest.resume("old source") == ({}, {})
@@ -64,3 +64,13 @@ async def test_task_details(session):
     assert len(details) == 2
     assert details[0].content == "Page 1 Content"
     assert details[1].status == TaskStatus.PENDING
+
+@pytest.mark.asyncio
+async def test_task_page_filter_stats_default_to_zero(session):
+    task_id = str(uuid.uuid4())
+    session.add(Task(id=task_id, status=TaskStatus.PENDING))
+    await session.commit()
+
+    result = await session.get(Task, task_id)
+    assert result.skipped_pages == 0
+    assert result.deduplicated_pages == 0
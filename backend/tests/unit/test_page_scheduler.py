@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from src.worker.page_scheduler import PageScheduler, get_page_scheduler
+
+
+async def _run(scheduler: PageScheduler, flow: str, weight: float, order: list, hold: float = 0.01):
+    """占用一个名额，记录获得名额的顺序"""
+    async with scheduler.slot(flow, weight):
+        order.append(flow)
+        await asyncio.sleep(hold)
+
+
+@pytest.mark.asyncio
+async def test_page_scheduler_capacity():
+    """
+    Test that no more pages than the capacity hold a slot at once
+    """
+    scheduler = PageScheduler(3)
+    peak = 0
+
+    async def page():
+        nonlocal peak
+        async with scheduler.slot("task"):
+            peak = max(peak, scheduler.active)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(page() for _ in range(10)))
+
+    assert peak == 3
+    assert scheduler.stats() == {"capacity": 3, "active": 0, "waiting": 0}
+
+
+@pytest.mark.asyncio
+async def test_page_scheduler_small_task_not_starved():
+    """
+    Test that a small task queued behind a large backlog is served within its fair share
+    """
+    scheduler = PageScheduler(1)
+    order = []
+    large = [asyncio.create_task(_run(scheduler, "large", 1.0, order)) for _ in range(20)]
+    await asyncio.sleep(0)
+    small = [asyncio.create_task(_run(scheduler, "small", 1.0, order)) for _ in range(2)]
+
+    await asyncio.gather(*large, *small)
+
+    # 两条流交替获得名额，小任务的两页在前 5 个名额内完成，而不是排在 20 页之后
+    assert [i for i, flow in enumerate(order) if flow == "small"] == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_page_scheduler_weights():
+    """
+    Test that a flow with twice the weight gets twice the slots under contention
+    """
+    scheduler = PageScheduler(1)
+    order = []
+    tasks = [asyncio.create_task(_run(scheduler, "heavy", 2.0, order, hold=0)) for _ in range(12)]
+    tasks += [asyncio.create_task(_run(scheduler, "light", 1.0, order, hold=0)) for _ in range(12)]
+
+    await asyncio.gather(*tasks)
+
+    # 首页立即获得名额，之后的名额按 2:1 分配
+    assert order[1:13].count("heavy") == 8
+    assert scheduler.granted == {"heavy": 12, "light": 12}
+
+
+@pytest.mark.asyncio
+async def test_page_scheduler_cancelled_waiter():
+    """
+    Test that a cancelled waiter neither holds nor blocks a slot
+    """
+    scheduler = PageScheduler(1)
+    await scheduler.acquire("a")
+    waiter = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    scheduler.release()
+
+    assert scheduler.stats() == {"capacity": 1, "active": 0, "waiting": 0}
+    await asyncio.wait_for(scheduler.acquire("c"), timeout=1)
+    assert scheduler.active == 1
+
+
+@pytest.mark.asyncio
+async def test_page_scheduler_waiter_cancelled_before_release():
+    """
+    Test that a release skips a waiter cancelled before it could leave the queue
+    """
+    scheduler = PageScheduler(1)
+    await scheduler.acquire("a")
+    cancelled = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    following = asyncio.create_task(scheduler.acquire("c"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    # 被取消的等待者还在堆中，释放时跳过它，名额交给下一个等待者
+    scheduler.release()
+
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await asyncio.wait_for(following, timeout=1)
+    assert scheduler.stats() == {"capacity": 1, "active": 1, "waiting": 0}
+    assert "b" not in scheduler.granted
+    scheduler.release()
+    assert scheduler.active == 0
+
+
+def test_page_scheduler_invalid_settings():
+    """
+    Test that a zero capacity or weight is rejected
+    """
+    with pytest.raises(ValueError):
+        PageScheduler(0)
+    with pytest.raises(ValueError):
+        asyncio.run(PageScheduler(1).acquire("task", weight=0))
+
+
+def test_get_page_scheduler_is_shared():
+    """
+    Test that every task draws from one process-wide scheduler
+    """
+    assert get_page_scheduler() is get_page_scheduler()
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.db.models import Base, Task, TaskDetail, TaskStatus
+from src.worker.page_states import PageStateWriter
+from src.worker.smart_worker import PageState
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Task(id="task", status=TaskStatus.PROCESSING))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def _details(session_factory) -> list:
+    async with session_factory() as session:
+        result = await session.execute(select(TaskDetail).order_by(TaskDetail.page_num))
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_page_state_writer_batches(session_factory):
+    """
+    Test that page states are written in one transaction per batch, not one per page
+    """
+    writer = PageStateWriter(batch_size=3, interval=60, session_factory=session_factory)
+    for page_num in (1, 2):
+        await writer.add("task", PageState(page_num, "completed", "llm", "gpt-4o", 1.5, 100, 50))
+
+    assert writer.flushes == 0
+    assert await _details(session_factory) == []
+
+    await writer.add("task", PageState(3, "failed", "llm", "gpt-4o", 0.2, error="timeout"))
+
+    assert writer.flushes == 1
+    assert writer.pending == 0
+    details = await _details(session_factory)
+    assert [(d.page_num, d.status, d.input_tokens) for d in details] == [
+        (1, TaskStatus.COMPLETED, 100),
+        (2, TaskStatus.COMPLETED, 100),
+        (3, TaskStatus.FAILED, 0),
+    ]
+    assert details[2].error_message == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_page_state_writer_upserts(session_factory):
+    """
+    Test that a later state for the same page updates its row instead of adding one
+    """
+    writer = PageStateWriter(batch_size=10, interval=60, session_factory=session_factory)
+    await writer.add("task", PageState(1, "failed", "llm", "gpt-4o", 0.1, error="timeout"))
+    await writer.flush()
+    await writer.add("task", PageState(1, "completed", "tiled", "gpt-4o", 3.0, 300, 90, retries=2))
+    # 已删除任务的状态不写入
+    await writer.add("deleted", PageState(1, "completed", "text"))
+    await writer.flush()
+
+    details = await _details(session_factory)
+    assert len(details) == 1
+    assert (details[0].status, details[0].route, details[0].retries, details[0].error_message) == (TaskStatus.COMPLETED, "tiled", 2, None)
+    assert writer.flushes == 2
+
+
+@pytest.mark.asyncio
+async def test_page_state_writer_flushes_after_interval(session_factory):
+    """
+    Test that a partial batch is written once the flush interval passes
+    """
+    writer = PageStateWriter(batch_size=50, interval=0.01, session_factory=session_factory)
+    await writer.add("task", PageState(1, "completed", "blank"))
+
+    await asyncio.sleep(0.1)
+
+    assert writer.flushes == 1
+    assert [d.route for d in await _details(session_factory)] == ["blank"]
+
+
+@pytest.mark.asyncio
+async def test_page_state_writer_keeps_states_on_error(session_factory):
+    """
+    Test that states from a failed write stay buffered for the next flush
+    """
+    def _broken():
+        raise RuntimeError("database is locked")
+
+    writer = PageStateWriter(batch_size=50, interval=60, session_factory=_broken)
+    await writer.add("task", PageState(1, "completed", "llm"))
+    await writer.flush()
+
+    assert writer.pending == 1
+    writer.session_factory = session_factory
+    await writer.flush()
+    assert writer.pending == 0
+    assert len(await _details(session_factory)) == 1
@@ -1,6 +1,8 @@
 import pytest
-from unittest.mock import MagicMock, patch, call, ANY
+from unittest.mock import AsyncMock, MagicMock, patch, call, ANY
 import asyncio
+import os
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
 from src.worker.smart_worker import SmartWorker
@@ -11,12 +13,12 @@ def mock_llm_client():
     with patch("src.worker.smart_worker.LLMClient") as mock:
         client_instance = mock.return_value
         # Return CompletionResult object instead of string
-        client_instance.completion.return_value = CompletionResult(
+        client_instance.acompletion = AsyncMock(return_value=CompletionResult(
             content="Mocked Markdown Content",
             input_tokens=100,
             output_tokens=50,
             total_tokens=150
-        )
+        ))
         yield client_instance
 
 @pytest.fixture
@@ -35,11 +37,8 @@ def mock_create_worker():
 @pytest.mark.asyncio
 async def test_smart_worker_flow(mock_create_worker, mock_llm_client):
     """
-    Test that SmartWorker splits PDF and calls LLM in parallel (via threads)
+    Test that SmartWorker splits PDF and calls LLM in parallel (via coroutines)
     """
-    # Mock loop.run_in_executor to just call the function immediately or use real thread pool
-    # Real thread pool is fine if mocks are thread safe or simple.
-    
     worker = SmartWorker(model_name="gpt-4o", concurrency=3)
 
     # We call process_file
@@ -49,12 +48,12 @@ async def test_smart_worker_flow(mock_create_worker, mock_llm_client):
     mock_create_worker.assert_called_once_with("/tmp/test.pdf")
 
     # Verify LLM called 3 times
-    assert mock_llm_client.completion.call_count == 3
+    assert mock_llm_client.acompletion.call_count == 3
 
     # Verify arguments to LLM (check one of them)
     # We expect verify call args to contain image paths
     # The 'image_paths' arg should be a list containing one image
-    mock_llm_client.completion.assert_any_call(
+    mock_llm_client.acompletion.assert_any_await(
         user_message=ANY,
         system_prompt=ANY,
         image_paths=["/tmp/page_1.jpg"],
@@ -71,3 +70,740 @@ async def test_smart_worker_flow(mock_create_worker, mock_llm_client):
     assert total_pages == 3
     assert input_tokens == 300  # 100 per page * 3 pages
     assert output_tokens == 150  # 50 per page * 3 pages
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_render_workers(mock_create_worker, mock_llm_client):
+    """
+    Test that the configured render process count reaches convert_to_images
+    """
+    worker = SmartWorker(model_name="gpt-4o", concurrency=3, render_workers=4)
+
+    await worker.process_file("/tmp/test.pdf")
+
+    call_kwargs = mock_create_worker.return_value.convert_to_images.call_args.kwargs
+    assert call_kwargs["workers"] == 4
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_in_memory_images(mock_create_worker, mock_llm_client, tmp_path):
+    """
+    Test that in-memory pages go straight to the LLM and are persisted for preview
+    """
+    from markpdfdown.core.file_worker import PageImage
+
+    pages = [PageImage(page_num=i, data=b"\xff\xd8\xff" + bytes([i])) for i in (1, 2)]
+    mock_create_worker.return_value.convert_to_images.return_value = pages
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, in_memory_images=True)
+    markdown, total_pages, _, _ = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    call_kwargs = mock_create_worker.return_value.convert_to_images.call_args.kwargs
+    assert call_kwargs["in_memory"] is True
+    assert total_pages == 2
+    mock_llm_client.acompletion.assert_any_await(
+        user_message=ANY,
+        system_prompt=ANY,
+        images=[pages[0]],
+        temperature=ANY,
+        max_tokens=ANY,
+        retry_times=ANY
+    )
+    assert (tmp_path / "page_0001.jpg").read_bytes() == pages[0].data
+    assert (tmp_path / "page_0002.jpg").read_bytes() == pages[1].data
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_text_fast_path(mock_llm_client, tmp_path):
+    """
+    Test that prose pages are converted from the text layer without calling the LLM
+    """
+    import fitz
+
+    pdf_path = tmp_path / "test.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(72, 72, 520, 400), "Plain prose sentence. " * 30, fontsize=11)
+    doc.new_page().insert_text((72, 300), "Figure 1", fontsize=11)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, text_fast_path=True)
+    markdown, total_pages, input_tokens, _ = await worker.process_file(str(pdf_path))
+
+    assert total_pages == 2
+    assert mock_llm_client.acompletion.call_count == 1
+    assert "<!-- PAGE 1 -->\n\nPlain prose sentence." in markdown
+    assert input_tokens == 100
+    assert worker.page_routes[1].is_local
+    assert not worker.page_routes[2].is_local
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_page_filter(mock_llm_client, tmp_path):
+    """
+    Test that blank pages are skipped and duplicate pages reuse the first page's Markdown
+    """
+    import fitz
+
+    pdf_path = tmp_path / "scanned.pdf"
+    doc = fitz.open()
+    for text in ["Terms and conditions. " * 20, None, "Terms and conditions. " * 20, "Signature page. " * 20]:
+        page = doc.new_page()
+        if text:
+            page.insert_textbox(fitz.Rect(72, 72, 520, 400), text, fontsize=11)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    # 并发为 1 时重复页也不能因等待原页而死锁
+    worker = SmartWorker(model_name="gpt-4o", concurrency=1, page_filter=True)
+    markdown, total_pages, input_tokens, _ = await worker.process_file(str(pdf_path))
+
+    assert total_pages == 4
+    assert mock_llm_client.acompletion.call_count == 2
+    assert input_tokens == 200
+    assert worker.skipped_pages == 1
+    assert worker.deduplicated_pages == 1
+    assert (tmp_path / "page_0002.md").read_text() == ""
+    assert (tmp_path / "page_0003.md").read_text() == "Mocked Markdown Content"
+    assert markdown.count("Mocked Markdown Content") == 3
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_cached_pages_use_no_tokens(mock_create_worker, mock_llm_client):
+    """
+    Test that pages answered from the completion cache do not count towards token usage
+    """
+    mock_llm_client.acompletion.side_effect = [
+        CompletionResult(content="Fresh", input_tokens=100, output_tokens=50, total_tokens=150),
+        CompletionResult(content="Cached", input_tokens=100, output_tokens=50, total_tokens=150, cached=True),
+        CompletionResult(content="Cached", input_tokens=100, output_tokens=50, total_tokens=150, cached=True),
+    ]
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=1)
+    _, total_pages, input_tokens, output_tokens = await worker.process_file("/tmp/test.pdf")
+
+    assert total_pages == 3
+    assert (input_tokens, output_tokens) == (100, 50)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_image_encoding(mock_create_worker, mock_llm_client):
+    """
+    Test that the client gets a per-model encoder and per-page image bytes are recorded
+    """
+    mock_llm_client.acompletion.side_effect = [
+        CompletionResult(content=f"Page {i}", image_bytes_before=1000, image_bytes_after=250 * i)
+        for i in range(1, 4)
+    ]
+
+    with patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        mock_client_cls.return_value = mock_llm_client
+        worker = SmartWorker(model_name="claude-sonnet-4", concurrency=1, image_encoding=True)
+    encoder = mock_client_cls.call_args.kwargs["encoder"]
+    await worker.process_file("/tmp/test.pdf")
+
+    assert encoder.limit.max_long_edge == 1568
+    assert worker.image_bytes == {1: (1000, 250), 2: (1000, 500), 3: (1000, 750)}
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_page_packing(mock_llm_client, tmp_path):
+    """
+    Test that consecutive light pages share one request and are split back per page
+    """
+    pages = [str(tmp_path / f"page_{i}.jpg") for i in range(1, 5)]
+    worker_instance = MagicMock()
+    worker_instance.convert_to_images.return_value = pages
+    estimates = {pages[0]: 300, pages[1]: 300, pages[2]: 5000, pages[3]: 300}
+    mock_llm_client.acompletion.side_effect = [
+        CompletionResult(content="<!-- PAGE 1 -->\nFirst\n<!-- PAGE 2 -->\nSecond", input_tokens=200, output_tokens=80, total_tokens=280),
+        CompletionResult(content="Third", input_tokens=100, output_tokens=50, total_tokens=150),
+        CompletionResult(content="Fourth", input_tokens=100, output_tokens=50, total_tokens=150),
+    ]
+
+    with patch("src.worker.smart_worker.create_worker", return_value=worker_instance), \
+         patch("src.worker.smart_worker.estimate_page_tokens", side_effect=lambda image, chars: estimates[image]):
+        worker = SmartWorker(model_name="gpt-4o", concurrency=1, page_packing=True)
+        markdown, total_pages, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    assert total_pages == 4
+    assert mock_llm_client.acompletion.await_count == 3
+    packed_call = mock_llm_client.acompletion.await_args_list[0]
+    assert packed_call.kwargs["image_paths"] == pages[:2]
+    assert "<!-- PAGE 1 -->" in packed_call.kwargs["user_message"]
+    assert [(tmp_path / f"page_{i:04d}.md").read_text() for i in range(1, 5)] == ["First", "Second", "Third", "Fourth"]
+    assert markdown.index("First") < markdown.index("Second") < markdown.index("Third")
+    assert (input_tokens, output_tokens) == (400, 180)
+    assert (worker.packed_pages, worker.pack_fallbacks) == (2, 0)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_page_packing_fallback(mock_create_worker, mock_llm_client, tmp_path):
+    """
+    Test that a packed response failing validation falls back to per-page calls
+    """
+    mock_llm_client.acompletion.side_effect = [
+        CompletionResult(content="<!-- PAGE 1 -->\nFirst\n<!-- PAGE 2 -->\nSecond", input_tokens=300, output_tokens=90, total_tokens=390),
+        CompletionResult(content="Page 1", input_tokens=100, output_tokens=50, total_tokens=150),
+        CompletionResult(content="Page 2", input_tokens=100, output_tokens=50, total_tokens=150),
+        CompletionResult(content="Page 3", input_tokens=100, output_tokens=50, total_tokens=150),
+    ]
+
+    with patch("src.worker.smart_worker.estimate_page_tokens", return_value=100):
+        worker = SmartWorker(model_name="gpt-4o", concurrency=1, page_packing=True)
+        markdown, _, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    # 三页合并为一组，但响应缺少第 3 页的分隔符
+    assert mock_llm_client.acompletion.await_args_list[0].kwargs["image_paths"] == ["/tmp/page_1.jpg", "/tmp/page_2.jpg", "/tmp/page_3.jpg"]
+    assert mock_llm_client.acompletion.await_count == 4
+    assert [(tmp_path / f"page_{i:04d}.md").read_text() for i in range(1, 4)] == ["Page 1", "Page 2", "Page 3"]
+    # 失败的合并请求消耗的 token 同样计入
+    assert (input_tokens, output_tokens) == (600, 240)
+    assert (worker.packed_pages, worker.pack_fallbacks) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_adaptive_concurrency(mock_create_worker):
+    """
+    Test that adaptive mode hands an AIMD limiter to the client instead of capping pages at concurrency
+    """
+    with patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        mock_client_cls.return_value.acompletion = AsyncMock(return_value=CompletionResult(content="ok"))
+        worker = SmartWorker(model_name="gpt-4o", concurrency=3, adaptive_concurrency=True)
+        await worker.process_file("/tmp/test.pdf")
+
+    limiter = mock_client_cls.call_args.kwargs["limiter"]
+    assert limiter is worker.limiter
+    assert limiter.window == 3
+    assert limiter.max_limit == 32
+
+    assert SmartWorker(model_name="gpt-4o", adaptive_concurrency=False).limiter is None
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_stream_output(tmp_path, mock_create_worker, mock_llm_client):
+    """
+    Test that streamed chunks land in page_NNNN.md.partial and reach the page content callback
+    """
+    mock_create_worker.return_value.convert_to_images.return_value = ["/tmp/page_1.jpg"]
+    partial_path = tmp_path / "page_0001.md.partial"
+    seen_partial = []
+
+    async def _streaming_completion(on_chunk=None, **kwargs):
+        await on_chunk("# Ti", "# Ti")
+        await on_chunk("tle", "# Title")
+        seen_partial.append(partial_path.read_text())
+        # 重试从头开始：partial 文件被覆盖而不是追加
+        await on_chunk("# Title", "# Title")
+        await on_chunk("\nBody", "# Title\nBody")
+        seen_partial.append(partial_path.read_text())
+        return CompletionResult(content="# Title\nBody", input_tokens=100, output_tokens=20, total_tokens=120)
+
+    mock_llm_client.acompletion.side_effect = _streaming_completion
+    page_content_callback = AsyncMock()
+
+    with patch.multiple("src.worker.smart_worker.config", stream_interval=0):
+        worker = SmartWorker(model_name="gpt-4o", stream_output=True, page_content_callback=page_content_callback)
+        _, _, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"), task_id="task-1")
+
+    assert seen_partial == ["# Title", "# Title\nBody"]
+    assert (tmp_path / "page_0001.md").read_text() == "# Title\nBody"
+    assert not partial_path.exists()
+    assert (input_tokens, output_tokens) == (100, 20)
+    assert page_content_callback.await_args_list[1] == call(task_id="task-1", page_num=1, content="# Title", done=False)
+    assert page_content_callback.await_args_list[-1] == call(task_id="task-1", page_num=1, content="# Title\nBody", done=True)
+
+
+def _blank_page(path, width, height):
+    import fitz
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    pix.save(str(path))
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_tile_pages(tmp_path, mock_llm_client):
+    """
+    Test that a tall page is converted as parallel bands and stitched without the overlap
+    """
+    page = _blank_page(tmp_path / "page_1.png", 100, 450)
+    worker_instance = MagicMock()
+    worker_instance.convert_to_images.return_value = [page]
+    band_contents = {
+        1: "| Item | Qty |\n|---|---|\n| Apples | 3 |",
+        2: "| Apples | 3 |\n| Pears | 5 |",
+        3: "| Item | Qty |\n|---|---|\n| Plums | 7 |",
+    }
+
+    async def _band_completion(user_message, images, **kwargs):
+        band = next(band for band in band_contents if f"strip {band} of 3" in user_message)
+        return CompletionResult(content=band_contents[band], input_tokens=100, output_tokens=10, total_tokens=110)
+
+    mock_llm_client.acompletion.side_effect = _band_completion
+
+    with patch("src.worker.smart_worker.create_worker", return_value=worker_instance):
+        worker = SmartWorker(model_name="gpt-4o", tile_pages=True)
+        _, _, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    assert mock_llm_client.acompletion.await_count == 3
+    assert (tmp_path / "page_0001.md").read_text() == "| Item | Qty |\n|---|---|\n| Apples | 3 |\n| Pears | 5 |\n| Plums | 7 |"
+    assert (input_tokens, output_tokens) == (300, 30)
+    assert worker.tiled_pages == {1: 3}
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_tile_truncated_page(tmp_path, mock_llm_client):
+    """
+    Test that a page cut off at max_tokens is converted again in bands instead of returned partially
+    """
+    page = _blank_page(tmp_path / "page_1.png", 100, 140)
+    worker_instance = MagicMock()
+    worker_instance.convert_to_images.return_value = [page]
+    mock_llm_client.acompletion.side_effect = [
+        CompletionResult(content="Top half and the bottom ha", input_tokens=100, output_tokens=800, total_tokens=900, finish_reason="length"),
+        CompletionResult(content="Top half", input_tokens=60, output_tokens=10, total_tokens=70, finish_reason="stop"),
+        CompletionResult(content="Bottom half", input_tokens=60, output_tokens=10, total_tokens=70, finish_reason="stop"),
+    ]
+
+    with patch("src.worker.smart_worker.create_worker", return_value=worker_instance), \
+         patch.multiple("src.worker.smart_worker.config", tile_max_bands=2):
+        worker = SmartWorker(model_name="gpt-4o", concurrency=1, tile_pages=True)
+        _, _, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    assert mock_llm_client.acompletion.await_count == 3
+    assert (tmp_path / "page_0001.md").read_text() == "Top half\n\nBottom half"
+    # 被截断的请求同样消耗了 token
+    assert (input_tokens, output_tokens) == (220, 820)
+    assert worker.tiled_pages == {1: 2}
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_model_cascade(mock_create_worker):
+    """
+    Test that pages start on the cheap model and escalate when its output fails validation
+    """
+    cheap, strong = MagicMock(model_name="gpt-4o-mini"), MagicMock(model_name="gpt-4o")
+    cheap.acompletion = AsyncMock(side_effect=[
+        CompletionResult(content="# Easy page", input_tokens=100, output_tokens=10, total_tokens=110),
+        CompletionResult(content="| A | B |\n| 1 | 2 | 3 |", input_tokens=100, output_tokens=20, total_tokens=120),
+        CompletionResult(content="Cut o", input_tokens=100, output_tokens=800, total_tokens=900, finish_reason="length"),
+    ])
+    strong.acompletion = AsyncMock(return_value=CompletionResult(content="Fixed", input_tokens=300, output_tokens=30, total_tokens=330))
+
+    with patch("src.worker.smart_worker.LLMClient", side_effect=lambda model, **kwargs: strong if model == "gpt-4o" else cheap) as mock_client_cls:
+        worker = SmartWorker(model_name="gpt-4o", concurrency=1, api_key="sk-task", cascade_models=["gpt-4o-mini"])
+        _, _, input_tokens, output_tokens = await worker.process_file("/tmp/test.pdf")
+
+    # 便宜模型同样使用任务自身的凭据
+    cheap_pool = mock_client_cls.call_args_list[1].kwargs["pool"]
+    assert [(e.model, e.api_key) for e in cheap_pool.endpoints] == [("gpt-4o-mini", "sk-task")]
+    assert strong.acompletion.await_count == 2
+    assert [(record.tier, record.model) for record in worker.page_tiers.values()] == [(0, "gpt-4o-mini"), (1, "gpt-4o"), (1, "gpt-4o")]
+    assert worker.page_tiers[2].attempts[0].issues == ["table without a header separator row"]
+    assert worker.page_tiers[3].attempts[0].issues == ["output truncated at max_tokens"]
+    assert (worker.page_tiers[2].input_tokens, worker.page_tiers[2].output_tokens) == (400, 50)
+    # 被升级的请求消耗的 token 同样计入
+    assert (input_tokens, output_tokens) == (900, 890)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_against_mock_llm_server(tmp_path, mock_llm_server):
+    """
+    Test a whole PDF end to end over HTTP against the local mock LLM server, injected 500s included
+    """
+    import fitz
+    document = fitz.open()
+    for i in range(3):
+        document.new_page().insert_text((72, 72), f"Page {i + 1}")
+    document.save(str(tmp_path / "test.pdf"))
+    document.close()
+    mock_llm_server.error_500 = 0.3
+
+    with patch.multiple("src.worker.smart_worker.config", retry_base_delay=0.01, retry_times=5):
+        worker = SmartWorker(model_name="openai/mock", concurrency=3, api_key="sk-mock", base_url=mock_llm_server.base_url)
+        markdown, total_pages, input_tokens, output_tokens = await worker.process_file(str(tmp_path / "test.pdf"))
+
+    assert total_pages == 3
+    assert markdown.count("<!-- PAGE") == 3
+    assert all((tmp_path / f"page_{i:04d}.md").read_text().startswith("# ") for i in range(1, 4))
+    assert input_tokens > 3 * 765 and output_tokens > 0
+    assert mock_llm_server.stats()["requests"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_cassette_replay(tmp_path, mock_llm_server):
+    """
+    Test a recorded run replays offline to the same Markdown while the provider only fails
+    """
+    import fitz
+    document = fitz.open()
+    for i in range(3):
+        document.new_page().insert_text((72, 72), f"Page {i + 1}")
+    document.save(str(tmp_path / "test.pdf"))
+    document.close()
+    cassette_path = str(tmp_path / "run.jsonl.gz")
+
+    async def run(mode):
+        with patch.multiple("src.worker.smart_worker.config", cassette_path=cassette_path, cassette_mode=mode, cassette_on_miss="fail", retry_times=1):
+            worker = SmartWorker(model_name="openai/mock", concurrency=3, api_key="sk-mock", base_url=mock_llm_server.base_url)
+            return await worker.process_file(str(tmp_path / "test.pdf"))
+
+    recorded = await run("record")
+    requests = mock_llm_server.stats()["requests"]
+    mock_llm_server.error_500 = 1.0
+    replayed = await run("replay")
+
+    assert replayed == recorded
+    assert recorded[1] == 3 and recorded[2] > 0
+    assert mock_llm_server.stats()["requests"] == requests
+
+
+def test_smart_worker_request_policy():
+    """
+    Test that backoff, timeout and hedging settings reach the client's request policy
+    """
+    with patch.multiple("src.worker.smart_worker.config", request_timeout=45.0, hedge_percentile=95.0, hedge_min_samples=10), \
+         patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        worker = SmartWorker(model_name="gpt-4o")
+
+    policy = mock_client_cls.call_args.kwargs["policy"]
+    assert policy is worker.policy
+    assert (policy.timeout, policy.hedge_percentile, policy.hedge_min_samples) == (45.0, 95.0, 10)
+
+    with patch("src.worker.smart_worker.LLMClient"):
+        policy = SmartWorker(model_name="gpt-4o").policy
+        # 策略跨任务共享，端点延迟样本不随任务结束而丢失
+        assert SmartWorker(model_name="gpt-4o").policy is policy
+    assert (policy.timeout, policy.hedge_percentile) == (None, None)
+
+
+def test_smart_worker_shared_rate_limiter():
+    """
+    Test that every worker draws from the process-wide rate limiter, bucketed per API key
+    """
+    with patch.multiple("src.worker.smart_worker.config", rpm_limit=60, tpm_limit=100000), \
+         patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        SmartWorker(model_name="gpt-4o", api_key="sk-one")
+        SmartWorker(model_name="gpt-4o", api_key="sk-two")
+
+    first, second = (c.kwargs for c in mock_client_cls.call_args_list)
+    assert first["rate_limiter"] is second["rate_limiter"]
+    assert first["rate_limiter"].rpm == 60
+    # 限流桶按端点区分：同一模型不同 Key 各自计量
+    first_key, second_key = (kwargs["pool"].endpoints[0].key for kwargs in (first, second))
+    assert first_key.startswith("gpt-4o:")
+    assert first_key != second_key
+
+
+def test_smart_worker_credentials_per_request(monkeypatch):
+    """
+    Test that task credentials travel with the requests instead of the process environment
+    """
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_BASE", raising=False)
+    endpoints = '[{"model": "openai/gpt-4o", "api_base": "https://gw.example.com/v1", "api_key": "gw-key", "weight": 2}]'
+
+    with patch.multiple("src.worker.smart_worker.config", llm_endpoints=endpoints), \
+         patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        worker = SmartWorker(model_name="gpt-4o", api_key="sk-task", base_url="https://proxy.example.com/v1")
+
+    assert "OPENAI_API_KEY" not in os.environ
+    assert "OPENAI_API_BASE" not in os.environ
+    pool = mock_client_cls.call_args.kwargs["pool"]
+    assert pool is worker.pool
+    assert [endpoint.request_kwargs() for endpoint in pool.endpoints] == [
+        {"model": "gpt-4o", "api_key": "sk-task", "api_base": "https://proxy.example.com/v1"},
+        {"model": "openai/gpt-4o", "api_key": "gw-key", "api_base": "https://gw.example.com/v1"},
+    ]
+    assert pool.endpoints[1].weight == 2
+
+    # base_url 只用于 OpenAI 兼容接口
+    with patch("src.worker.smart_worker.LLMClient"):
+        worker = SmartWorker(model_name="gemini-2.0-flash", api_key="g-key", base_url="https://proxy.example.com/v1")
+    assert worker.pool.endpoints[0].request_kwargs() == {"model": "gemini/gemini-2.0-flash", "api_key": "g-key"}
+
+
+def test_smart_worker_shares_endpoint_pool():
+    """
+    Test that tasks with the same endpoints share one pool, so endpoint health outlives a task
+    """
+    from src.worker.smart_worker import config
+
+    with patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        first = SmartWorker(model_name="gpt-4o", api_key="sk-shared", cascade_models=["gpt-4o-mini"])
+        second = SmartWorker(model_name="gpt-4o", api_key="sk-shared", cascade_models=["gpt-4o-mini"])
+        other = SmartWorker(model_name="gpt-4o", api_key="sk-other")
+
+    assert second.pool is first.pool
+    assert other.pool is not first.pool
+    # 级联各级的端点池同样跨任务共享
+    tier_pools = [c.kwargs["pool"] for c in mock_client_cls.call_args_list if c.args[0] == "gpt-4o-mini"]
+    assert len(tier_pools) == 2 and tier_pools[0] is tier_pools[1]
+
+    endpoint = first.pool.endpoints[0]
+    for _ in range(config.endpoint_eject_after):
+        first.pool.report(endpoint, False)
+    assert second.pool.stats()[endpoint.key]["ejected"]
+
+
+
+def test_smart_worker_shares_completion_cache(tmp_path):
+    """
+    Test that tasks share one completion cache, so a process keeps a single SQLite connection per cache file
+    """
+    from src.worker.smart_worker import config
+
+    with patch.object(config, "cache_path", str(tmp_path / "llm.sqlite")), patch("src.worker.smart_worker.LLMClient") as mock_client_cls:
+        SmartWorker(model_name="gpt-4o", cascade_models=["gpt-4o-mini"])
+        SmartWorker(model_name="gpt-4o")
+
+    caches = [c.kwargs["cache"] for c in mock_client_cls.call_args_list]
+    assert len(caches) == 3 and caches[0] is not None
+    assert all(cache is caches[0] for cache in caches)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_convert_one_refresh_cache(mock_llm_client):
+    """
+    Test that regenerating a page asks the client to bypass the cache
+    """
+    worker = SmartWorker(model_name="gpt-4o")
+
+    await worker._convert_one("/tmp/page_0001.jpg", refresh_cache=True)
+
+    assert mock_llm_client.acompletion.call_args.kwargs["refresh_cache"] is True
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_pages_in_flight_are_coroutines(mock_create_worker, mock_llm_client):
+    """
+    Test that many pages can wait on the LLM at once without a thread per page
+    """
+    pages = [f"/tmp/page_{i}.jpg" for i in range(64)]
+    mock_create_worker.return_value.convert_to_images.return_value = pages
+    in_flight = 0
+    peak = 0
+    all_started = asyncio.Event()
+
+    async def _slow_completion(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        if in_flight == len(pages):
+            all_started.set()
+        # 所有页面同时等待，如果每页占用一个线程则会超出默认线程池上限而卡住
+        await asyncio.wait_for(all_started.wait(), timeout=5)
+        in_flight -= 1
+        return CompletionResult(content="ok")
+
+    mock_llm_client.acompletion.side_effect = _slow_completion
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=len(pages))
+    _, total_pages, _, _ = await worker.process_file("/tmp/test.pdf")
+
+    assert total_pages == len(pages)
+    assert peak == len(pages)
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_bounded_render_pipeline(mock_create_worker, mock_llm_client):
+    """
+    Test that pages render off the event loop and only a bounded window ahead of the LLM calls
+    """
+    loop_thread = threading.get_ident()
+    render_threads = set()
+    rendered = 0
+    converted = 0
+    peak_ahead = 0
+
+    def _render(**kwargs):
+        nonlocal rendered
+        for i in range(40):
+            render_threads.add(threading.get_ident())
+            rendered += 1
+            yield f"/tmp/page_{i + 1}.jpg"
+
+    async def _completion(**kwargs):
+        nonlocal converted, peak_ahead
+        peak_ahead = max(peak_ahead, rendered - converted)
+        await asyncio.sleep(0.001)
+        converted += 1
+        return CompletionResult(content="ok")
+
+    mock_create_worker.return_value.convert_to_images.side_effect = _render
+    mock_llm_client.acompletion.side_effect = _completion
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, render_prefetch=2, max_inflight_pages=3)
+    markdown, total_pages, _, _ = await worker.process_file("/tmp/test.pdf")
+
+    assert total_pages == 40
+    assert markdown.count("ok") == 40
+    assert render_threads and loop_thread not in render_threads
+    # 在途 3 页 + 队列中 2 页 + 等待窗口的 1 页 + 渲染线程中阻塞的 1 页
+    assert peak_ahead <= 3 + 2 + 1 + 1
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_render_error_keeps_rendered_pages(mock_create_worker, mock_llm_client):
+    """
+    Test that a rendering failure part way converts the pages rendered before it
+    """
+    def _render(**kwargs):
+        yield "/tmp/page_1.jpg"
+        yield "/tmp/page_2.jpg"
+        raise RuntimeError("corrupt page 3")
+
+    mock_create_worker.return_value.convert_to_images.side_effect = _render
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2)
+    markdown, total_pages, _, _ = await worker.process_file("/tmp/test.pdf")
+
+    assert total_pages == 2
+    assert markdown.count("Mocked Markdown Content") == 2
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_shared_page_scheduler(mock_create_worker, mock_llm_client):
+    """
+    Test that a small task finishes while a large one is still running on a shared page budget
+    """
+    from src.worker.page_scheduler import PageScheduler
+
+    documents = {
+        "/tmp/large.pdf": [f"/tmp/large_{i}.jpg" for i in range(30)],
+        "/tmp/small.pdf": ["/tmp/small_1.jpg", "/tmp/small_2.jpg"],
+    }
+
+    def _create_worker(path):
+        worker_instance = MagicMock()
+        worker_instance.convert_to_images.return_value = documents[path]
+        return worker_instance
+
+    mock_create_worker.side_effect = _create_worker
+    peak = 0
+    in_flight = 0
+
+    async def _completion(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return CompletionResult(content="ok")
+
+    mock_llm_client.acompletion.side_effect = _completion
+    scheduler = PageScheduler(2)
+    large = SmartWorker(model_name="gpt-4o", concurrency=4, scheduler=scheduler)
+    small = SmartWorker(model_name="gpt-4o", concurrency=4, scheduler=scheduler)
+
+    large_task = asyncio.create_task(large.process_file("/tmp/large.pdf", task_id="large"))
+    await asyncio.sleep(0.03)
+    _, small_pages, _, _ = await small.process_file("/tmp/small.pdf", task_id="small")
+
+    # 小任务完成时，大任务仍有大量页面未转换
+    assert small_pages == 2
+    assert not large_task.done()
+    assert scheduler.granted["large"] < 15
+    await large_task
+    assert peak == 2
+    assert scheduler.granted == {"large": 30, "small": 2}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_memory_images", [False, True])
+async def test_smart_worker_resume(mock_llm_client, tmp_path, in_memory_images):
+    """
+    Test that a resumed run converts only unfinished pages and reuses rendered images
+    """
+    import fitz
+    from markpdfdown.core import file_worker
+
+    input_path = str(tmp_path / "test.pdf")
+    document = fitz.open()
+    for i in range(4):
+        document.new_page().insert_text((72, 72), f"Page {i + 1}")
+    document.save(input_path)
+    document.close()
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, in_memory_images=in_memory_images)
+    first, _, first_input, _ = await worker.process_file(input_path)
+    assert mock_llm_client.acompletion.call_count == 4
+
+    # 模拟中断：第 3 页尚未保存，第 4 页的图片也未渲染
+    os.remove(tmp_path / "page_0003.md")
+    os.remove(tmp_path / "page_0004.md")
+    os.remove(tmp_path / "page_0004.jpg")
+    mock_llm_client.acompletion.reset_mock()
+
+    with patch("markpdfdown.core.file_worker._render_page", wraps=file_worker._render_page) as render:
+        markdown, total_pages, input_tokens, _ = await worker.process_file(input_path, resume=True)
+
+    assert mock_llm_client.acompletion.call_count == 2
+    assert [c.args[1] for c in render.call_args_list] == [4]
+    assert (worker.resumed_pages, worker.reused_images) == (2, 1)
+    assert markdown == first
+    assert total_pages == 4
+    # 中断前已完成页面的 token 仍计入任务
+    assert input_tokens == first_input
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_resume_retries_failed_pages(mock_llm_client, tmp_path):
+    """
+    Test that a page whose LLM request failed is not checkpointed and is converted again on resume
+    """
+    import fitz
+
+    input_path = str(tmp_path / "test.pdf")
+    document = fitz.open()
+    for i in range(3):
+        document.new_page().insert_text((72, 72), f"Page {i + 1}")
+    document.save(input_path)
+    document.close()
+
+    async def _flaky(**kwargs):
+        if kwargs["image_paths"][0].endswith("page_0002.jpg"):
+            raise RuntimeError("upstream timeout")
+        return CompletionResult(content="ok", input_tokens=100, output_tokens=50, total_tokens=150)
+
+    mock_llm_client.acompletion.side_effect = _flaky
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, in_memory_images=False)
+    await worker.process_file(input_path)
+    mock_llm_client.acompletion.reset_mock()
+    mock_llm_client.acompletion.side_effect = None
+
+    markdown, _, _, _ = await worker.process_file(input_path, resume=True)
+
+    converted = [c.kwargs["image_paths"][0] for c in mock_llm_client.acompletion.call_args_list]
+    assert [os.path.basename(path) for path in converted] == ["page_0002.jpg"]
+    assert worker.resumed_pages == 2
+    assert "Mocked Markdown Content" in markdown
+
+
+@pytest.mark.asyncio
+async def test_smart_worker_page_states(mock_create_worker, mock_llm_client):
+    """
+    Test that every converted or failed page is reported with its route, tokens and retries
+    """
+    async def _completion(**kwargs):
+        if kwargs["image_paths"] == ["/tmp/page_2.jpg"]:
+            raise RuntimeError("upstream timeout")
+        return CompletionResult(content="ok", input_tokens=100, output_tokens=50, total_tokens=150, retries=1)
+
+    mock_llm_client.acompletion.side_effect = _completion
+    reported = []
+
+    async def _on_state(task_id, state):
+        reported.append((task_id, state.page_num))
+
+    worker = SmartWorker(model_name="gpt-4o", concurrency=2, page_state_callback=_on_state)
+    await worker.process_file("/tmp/test.pdf", task_id="task")
+
+    assert sorted(reported) == [("task", 1), ("task", 2), ("task", 3)]
+    page = worker.page_states[1]
+    assert (page.status, page.route, page.model) == ("completed", "llm", worker.model_name)
+    assert (page.input_tokens, page.output_tokens, page.retries) == (100, 50, 1)
+    assert page.latency >= 0
+    failed = worker.page_states[2]
+    assert (failed.status, failed.error) == ("failed", "upstream timeout")
@@ -41,10 +41,19 @@ interface PageInfo {
   page: number;
   status: string;
   content?: string;
+  partial?: boolean;  // 流式生成中的部分内容
   total_pages?: number;
   message?: string;
 }
 
+// SSE page_content 事件数据（STREAM_OUTPUT 开启时推送）
+interface PageContentEventData {
+  task_id: string;
+  page: number;
+  content: string;
+  done: boolean;
+}
+
 const { Text } = Typography;
 
 /**
@@ -103,6 +112,16 @@ export const Preview: React.FC = () => {
         console.log(`[Preview] Page ${page} result:`, result);
         setPageContent(result);
 
+        // 流式生成中的部分内容：SSE 会推送后续内容，轮询仅作兜底（不计入重试次数）
+        if (result.partial) {
+          setTimeout(() => {
+            if (currentPage === page) {
+              fetchPageContent(page);
+            }
+          }, 3000);
+          return;
+        }
+
         // ✅ 优先检查：如果已经读到 MD 内容，直接停止刷新
         if (result.content && result.content.trim().length > 0) {
           console.log(`[Preview] ✅ Content loaded successfully, stopping refresh`);
@@ -198,6 +217,32 @@ export const Preview: React.FC = () => {
     }
   }, [currentPage, taskId, fetchPageContent]);
 
+  // 处理中的任务：订阅 SSE page_content 事件，实时显示当前页生成中的内容
+  useEffect(() => {
+    if (!taskId || task?.status !== 'processing') return;
+
+    const eventSource = new EventSource(`/api/v1/events?task_id=${taskId}`);
+    eventSource.addEventListener('page_content', (event) => {
+      try {
+        const data: PageContentEventData = JSON.parse((event as MessageEvent).data);
+        if (data.page !== currentPage) return;
+        setPageContent((prev) => ({
+          ...prev,
+          page: data.page,
+          status: 'processing',
+          content: data.content,
+          partial: !data.done,
+        }));
+      } catch (error) {
+        console.error('[Preview] Failed to parse page content event:', error);
+      }
+    });
+
+    return () => {
+      eventSource.close();
+    };
+  }, [taskId, task?.status, currentPage]);
+
   // 下载 Markdown
   const handleDownload = async () => {
     if (!taskId) return;
@@ -350,7 +395,7 @@ export const Preview: React.FC = () => {
               icon={<SyncOutlined spin={regenerating} />}
               onClick={handleRegeneratePage}
               loading={regenerating}
-              disabled={!pageContent?.content}
+              disabled={!pageContent?.content || pageContent.partial}
             >
               {t('preview.regenerate')}
             </Button>
@@ -534,7 +579,7 @@ export const Preview: React.FC = () => {
                   backgroundColor: '#fffbe6',
                 }}
               >
-                {contentLoading ? (
+                {contentLoading && !pageContent?.partial ? (
                   <div
                     style={{
                       display: 'flex',
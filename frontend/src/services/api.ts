@@ -113,6 +113,7 @@ export class ApiClient {
     page: number;
     status: string;
     content?: string;
+    partial?: boolean;
     total_pages?: number;
     message?: string;
   }> {
@@ -0,0 +1,9 @@
+"""
+Throughput benchmark for MarkPDFDown pipelines
+"""
+
+from .corpus import synthetic_pdf
+from .profiler import StageProfiler
+from .runner import compare_reports, run_benchmark
+
+__all__ = ["StageProfiler", "compare_reports", "run_benchmark", "synthetic_pdf"]
@@ -0,0 +1,8 @@
+"""
+Entry point for python -m markpdfdown.benchmark
+"""
+
+from .runner import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Synthetic PDF corpus for benchmarks
+
+Pages mix the content MarkPDFDown has to transcribe: a heading and body text
+on every page, plus a table, a formula block or a raster figure in turn. The
+same seed always produces the same document.
+"""
+
+import random
+
+import fitz
+
+from ..testing.mock_llm import WORDS
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+FORMULAS = (
+    "E = m c^2",
+    "f(x) = sum_{k=0}^{n} a_k x^k",
+    "integral_0^1 x^2 dx = 1/3",
+    "sigma^2 = (1/N) sum_i (x_i - mu)^2",
+)
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+
+def _draw_table(page: "fitz.Page", rng: random.Random, top: float) -> float:
+    """Draw a ruled 4-column table; return the y below it"""
+    columns, rows = 4, rng.randint(4, 7)
+    cell_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+    cell_height = 20
+    for row in range(rows + 1):
+        for column in range(columns):
+            rect = fitz.Rect(
+                MARGIN + column * cell_width,
+                top + row * cell_height,
+                MARGIN + (column + 1) * cell_width,
+                top + (row + 1) * cell_height,
+            )
+            page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+            text = rng.choice(WORDS).title() if row == 0 else str(rng.randint(1, 999))
+            page.insert_text((rect.x0 + 4, rect.y1 - 6), text, fontsize=9)
+    return top + (rows + 1) * cell_height + 20
+
+
+def _draw_formula(page: "fitz.Page", rng: random.Random, top: float) -> float:
+    """Draw a centred display formula; return the y below it"""
+    formula = rng.choice(FORMULAS)
+    page.insert_text(
+        (PAGE_WIDTH / 2 - 3 * len(formula), top + 20), formula, fontsize=13
+    )
+    return top + 44
+
+
+def _draw_figure(page: "fitz.Page", rng: random.Random, top: float) -> float:
+    """Insert a noisy gradient raster as a figure; return the y below it"""
+    width, height = 240, 150
+    noise = rng.randint(0, 63)
+    samples = bytearray()
+    for y in range(height):
+        for x in range(width):
+            shade = (x * 255 // width + y * 255 // height + noise) % 256
+            samples += bytes((shade, (shade * 3) % 256, 255 - shade))
+    pix = fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), False)
+    rect = fitz.Rect(MARGIN, top, MARGIN + width, top + height)
+    page.insert_image(rect, pixmap=pix)
+    page.insert_text((MARGIN, rect.y1 + 14), f"Figure: {_sentence(rng, 5)}", fontsize=9)
+    return rect.y1 + 34
+
+
+def synthetic_pdf(pages: int, seed: int = 0) -> bytes:
+    """
+    Generate a PDF of text, table, formula and figure pages
+
+    Args:
+        pages: Number of pages
+        seed: Random seed; the same seed gives the same document
+
+    Returns:
+        PDF file data
+    """
+    rng = random.Random(seed)
+    extras = (_draw_table, _draw_formula, _draw_figure, None)
+    document = fitz.open()
+    for index in range(pages):
+        page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text(
+            (MARGIN, MARGIN + 14), f"{index + 1}. {_sentence(rng, 4)}", fontsize=16
+        )
+        top = MARGIN + 36
+        extra = extras[index % len(extras)]
+        # Text-only pages get a full page of paragraphs
+        for _ in range(2 if extra else 6):
+            rect = fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, top + 110)
+            page.insert_textbox(rect, _paragraph(rng), fontsize=10)
+            top += 116
+        if extra:
+            top = extra(page, rng, top)
+            rect = fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, top + 110)
+            page.insert_textbox(rect, _paragraph(rng), fontsize=10)
+    # No dates and no random file ID, so that equal seeds give equal bytes
+    document.set_metadata({})
+    data = document.tobytes(garbage=3, deflate=True, no_new_id=True)
+    document.close()
+    return data
@@ -0,0 +1,150 @@
+"""
+Stage timing and memory measurement for benchmark runs
+
+StageProfiler times pipeline stages by temporarily wrapping the methods that
+implement them, so the measured code runs unchanged outside benchmarks.
+"""
+
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any, Optional
+
+from ..core.file_worker import PDFWorker
+from ..core.llm_client import LLMClient
+
+# (owner, attribute, stage) triples timed by default: rendering pages to
+# images, encoding them into requests, waiting for the LLM (rate-limit and
+# concurrency waits included) and merging the page Markdown
+DEFAULT_TARGETS = [
+    (PDFWorker, "convert_to_images", "render"),
+    (LLMClient, "_prepare_request", "encode"),
+    (LLMClient, "_call", "llm"),
+    (LLMClient, "_call_sync", "llm"),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """
+    Context manager summing the time spent in each pipeline stage
+
+    Every call of a wrapped method is one sample of its stage; a method
+    returning an iterator (page rendering) is timed per item as it is
+    consumed. Samples of concurrent calls overlap, so a stage's total can
+    exceed the wall time of the run.
+    """
+
+    def __init__(self, targets: Optional[list[tuple[Any, str, str]]] = None):
+        """
+        Args:
+            targets: (owner, attribute, stage) triples to time; owner is a
+                class or module (defaults to DEFAULT_TARGETS)
+        """
+        self.targets = DEFAULT_TARGETS if targets is None else targets
+        self.samples: dict[str, list[float]] = {
+            stage: [] for _, _, stage in self.targets
+        }
+        self._originals: list[tuple[Any, str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "StageProfiler":
+        for owner, attribute, stage in self.targets:
+            original = owner.__dict__[attribute]
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, self._wrap(original, stage))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one timed sample to a stage"""
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """
+        Per-stage totals
+
+        Returns:
+            Dict of stage -> {"seconds", "calls", "p50_ms", "p90_ms", "p99_ms"}
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "seconds": round(sum(samples), 6),
+                    "calls": len(samples),
+                    "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                    "p90_ms": round(percentile(samples, 90) * 1000, 3),
+                    "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                }
+                for stage, samples in self.samples.items()
+            }
+
+    def _wrap(self, original: Any, stage: str) -> Any:
+        """Timing wrapper with the same calling convention as original"""
+        if inspect.iscoroutinefunction(original):
+
+            @functools.wraps(original)
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+
+            return timed_async
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+            if inspect.isgenerator(result):
+                return self._timed_items(result, stage, elapsed)
+            self.record(stage, elapsed)
+            return result
+
+        return timed
+
+    def _timed_items(self, items: Iterator, stage: str, setup: float) -> Iterator:
+        """Yield from items, timing the production of each one"""
+        elapsed = setup
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            self.record(stage, elapsed)
+            elapsed = 0.0
+            yield item
@@ -0,0 +1,368 @@
+"""
+End-to-end throughput benchmark against the mock LLM server
+
+Converts a synthetic PDF corpus with a pipeline pointed at MockLLMServer and
+reports wall time, pages per second, per-stage times with latency
+percentiles, and peak memory. Reports are JSON so runs on two commits can be
+compared with ``--compare``::
+
+    markpdfdown-bench --pages 40 --runs 3 --output before.json
+    git checkout my-branch
+    markpdfdown-bench --pages 40 --runs 3 --compare before.json
+
+Pipeline settings (RENDER_WORKERS, IMAGE_ENCODING, ...) are read from the
+environment as usual; only the model and the completion cache are overridden.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from .. import __version__
+from .. import main as core_main
+from ..config import config
+from ..testing.mock_llm import MockLLMServer
+from .corpus import synthetic_pdf
+from .profiler import DEFAULT_TARGETS, StageProfiler, peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+MOCK_MODEL = "openai/mock"
+MOCK_API_KEY = "sk-mock"
+
+# Converts PDF data with the LLM at the given base URL
+Convert = Callable[[bytes, str], Any]
+
+
+@contextmanager
+def _overridden(target: Any, **values: Any) -> Iterator[None]:
+    """Temporarily set attributes of target"""
+    saved = {name: getattr(target, name) for name in values}
+    for name, value in values.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+@contextmanager
+def _environ(**values: str) -> Iterator[None]:
+    """Temporarily set environment variables"""
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def convert_core(pdf: bytes, base_url: str) -> None:
+    """Convert with markpdfdown.main.convert_to_markdown"""
+    mock = _environ(OPENAI_API_BASE=base_url, OPENAI_API_KEY=MOCK_API_KEY)
+    with tempfile.TemporaryDirectory() as output_dir, mock:
+        with _overridden(config, model_name=MOCK_MODEL, cache_path=""):
+            core_main.convert_to_markdown(
+                pdf,
+                input_filename="benchmark.pdf",
+                output_dir=output_dir,
+                cleanup=False,
+            )
+
+
+CORE_TARGETS = [*DEFAULT_TARGETS, (core_main, "_merge_pages", "merge")]
+
+
+def _git_commit() -> Optional[str]:
+    """Commit of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(
+    convert: Convert,
+    pdf: bytes,
+    pages: int,
+    server: MockLLMServer,
+    targets: Optional[list] = None,
+) -> dict[str, Any]:
+    """
+    Time one conversion
+
+    Args:
+        convert: Pipeline to run
+        pdf: PDF file data
+        pages: Number of pages in pdf
+        server: Running mock LLM server
+        targets: Profiler targets (defaults to DEFAULT_TARGETS)
+
+    Returns:
+        Run record with wall time, throughput, stage times and peak RSS
+    """
+    before = server.stats()
+    with StageProfiler(targets) as profiler:
+        started = time.perf_counter()
+        convert(pdf, server.base_url)
+        wall = time.perf_counter() - started
+    after = server.stats()
+    return {
+        "wall_seconds": round(wall, 6),
+        "pages": pages,
+        "pages_per_second": round(pages / wall, 3) if wall else 0.0,
+        "stages": profiler.report(),
+        "llm_requests": after["requests"] - before["requests"],
+        "llm_errors": (after["injected_errors"] + after["rate_limited"])
+        - (before["injected_errors"] + before["rate_limited"]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def summarize(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Median wall time, throughput and stage times over runs; peak RSS max"""
+    stages = {}
+    for stage in runs[0]["stages"]:
+        stages[stage] = {
+            key: statistics.median(run["stages"][stage][key] for run in runs)
+            for key in runs[0]["stages"][stage]
+        }
+    rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    return {
+        "wall_seconds": statistics.median(run["wall_seconds"] for run in runs),
+        "pages_per_second": statistics.median(run["pages_per_second"] for run in runs),
+        "stages": stages,
+        "peak_rss_mb": max(rss) if rss else None,
+    }
+
+
+def run_benchmark(
+    convert: Convert = convert_core,
+    pipeline: str = "core",
+    pages: int = 20,
+    runs: int = 3,
+    seed: int = 0,
+    latency: str = "lognormal:0.8,0.3",
+    error_429: float = 0.0,
+    error_500: float = 0.0,
+    targets: Optional[list] = None,
+    warmup: bool = True,
+) -> dict[str, Any]:
+    """
+    Benchmark a pipeline on a synthetic corpus against the mock LLM server
+
+    Args:
+        convert: Pipeline to run (defaults to the core convert_to_markdown)
+        pipeline: Name recorded in the report
+        pages: Pages in the synthetic PDF
+        runs: Measured runs
+        seed: Seed of the corpus and of the mock server
+        latency: Mock LLM latency spec (see parse_latency)
+        error_429: Rate of injected 429 responses
+        error_500: Rate of injected 500 responses
+        targets: Profiler targets (defaults to the core pipeline's stages)
+        warmup: Do one unmeasured run first (imports, connection setup)
+
+    Returns:
+        JSON-serializable report with parameters, environment, every run and
+        the summary
+    """
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+    targets = CORE_TARGETS if targets is None else targets
+    pdf = synthetic_pdf(pages, seed)
+    results = []
+    with MockLLMServer(
+        latency=latency, error_429=error_429, error_500=error_500, seed=seed
+    ) as server:
+        if warmup:
+            convert(synthetic_pdf(1, seed), server.base_url)
+        for run in range(runs):
+            results.append(measure(convert, pdf, pages, server, targets))
+            logger.info(
+                f"Run {run + 1}/{runs}: {results[-1]['pages_per_second']} pages/s"
+            )
+    return {
+        "pipeline": pipeline,
+        "version": __version__,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "pages": pages,
+            "runs": runs,
+            "seed": seed,
+            "latency": latency,
+            "error_429": error_429,
+            "error_500": error_500,
+        },
+        "runs": results,
+        "summary": summarize(results),
+    }
+
+
+def compare_reports(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    tolerance: float = 0.1,
+    min_seconds: float = 0.01,
+) -> list[str]:
+    """
+    Find regressions of current against baseline
+
+    Args:
+        baseline: Earlier report
+        current: New report
+        tolerance: Relative change tolerated (0.1 = 10%)
+        min_seconds: Stage time changes below this are noise
+
+    Returns:
+        One message per regression (empty when none)
+    """
+    old, new = baseline["summary"], current["summary"]
+    regressions = []
+    if new["pages_per_second"] < old["pages_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {old['pages_per_second']} -> {new['pages_per_second']} pages/s"
+        )
+    for stage, stats in new["stages"].items():
+        before = old["stages"].get(stage)
+        if before is None:
+            continue
+        grown = stats["seconds"] - before["seconds"]
+        if grown > min_seconds and grown > before["seconds"] * tolerance:
+            regressions.append(
+                f"{stage} {before['seconds']:.3f}s -> {stats['seconds']:.3f}s"
+            )
+    if old["peak_rss_mb"] and new["peak_rss_mb"]:
+        if new["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"peak RSS {old['peak_rss_mb']:.1f} -> {new['peak_rss_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def format_summary(report: dict[str, Any]) -> str:
+    """Human-readable summary of a report"""
+    summary = report["summary"]
+    lines = [
+        f"{report['pipeline']} pipeline, {report['params']['pages']} pages x "
+        f"{report['params']['runs']} runs (commit {report['commit'] or 'unknown'})",
+        f"  wall {summary['wall_seconds']:.3f}s, "
+        f"{summary['pages_per_second']} pages/s, "
+        f"peak RSS {summary['peak_rss_mb'] or 0:.1f} MB",
+    ]
+    for stage, stats in summary["stages"].items():
+        lines.append(
+            f"  {stage:<7} {stats['seconds']:8.3f}s over {stats['calls']:g} calls "
+            f"(p50 {stats['p50_ms']:.1f} ms, p90 {stats['p90_ms']:.1f} ms, "
+            f"p99 {stats['p99_ms']:.1f} ms)"
+        )
+    return "\n".join(lines)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Create the benchmark's argument parser (pipelines may add options)
+
+    Returns:
+        Configured ArgumentParser instance
+    """
+    parser = argparse.ArgumentParser(
+        prog="markpdfdown-bench",
+        description="Throughput benchmark on a synthetic corpus and a mock LLM",
+    )
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--runs", type=int, default=3, help="Measured runs")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.8,0.3",
+        help="Mock LLM latency spec, e.g. fixed:0.5 or lognormal:MEDIAN,SIGMA",
+    )
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 rate")
+    parser.add_argument("--error-500", type=float, default=0.0, help="500 rate")
+    parser.add_argument("--output", "-o", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative slowdown reported as a regression (default: 0.1)",
+    )
+    return parser
+
+
+def run_cli(
+    args: argparse.Namespace,
+    convert: Convert = convert_core,
+    pipeline: str = "core",
+    targets: Optional[list] = None,
+) -> int:
+    """
+    Run the benchmark for parsed arguments
+
+    Returns:
+        Exit code: 1 if --compare found regressions, else 0
+    """
+    report = run_benchmark(
+        convert,
+        pipeline=pipeline,
+        pages=args.pages,
+        runs=args.runs,
+        seed=args.seed,
+        latency=args.latency,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        targets=targets,
+    )
+    print(format_summary(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Benchmark the core pipeline"""
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    sys.exit(run_cli(create_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,269 @@ class Config(BaseModel):
         default=3, gt=0, description="Number of retries for API calls"
     )
 
+    # Request policy parameters
+    retry_base_delay: float = Field(
+        default=0.5,
+        gt=0.0,
+        description="Backoff cap in seconds of the first retry, doubled per attempt",
+    )
+
+    retry_max_delay: float = Field(
+        default=30.0,
+        gt=0.0,
+        description="Longest wait in seconds between attempts, Retry-After included",
+    )
+
+    request_timeout: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="Seconds a single LLM call may take (0 = no timeout)",
+    )
+
+    hedge_percentile: float = Field(
+        default=0.0,
+        ge=0.0,
+        lt=100.0,
+        description="Send a duplicate call after this latency percentile (0 = off)",
+    )
+
+    hedge_min_samples: int = Field(
+        default=20,
+        gt=0,
+        description="Successful calls needed before hedging starts",
+    )
+
+    # Endpoint pool parameters
+    llm_endpoints: str = Field(
+        default="",
+        description="JSON list of extra endpoints (model, api_key, api_base, weight)",
+    )
+
+    endpoint_eject_after: int = Field(
+        default=3,
+        gt=0,
+        description="Consecutive failures that temporarily eject an endpoint",
+    )
+
+    endpoint_eject_seconds: float = Field(
+        default=30.0,
+        gt=0.0,
+        description="Seconds an ejected endpoint receives no traffic",
+    )
+
+    # Concurrency parameters
+    adaptive_concurrency: bool = Field(
+        default=False,
+        description="Adjust the number of concurrent LLM calls from latency and 429s",
+    )
+
+    max_concurrency: int = Field(
+        default=32,
+        gt=0,
+        description="Upper bound of the adaptive concurrency window",
+    )
+
+    # Rate limiting parameters
+    rpm_limit: int = Field(
+        default=0,
+        ge=0,
+        description="Requests per minute per model or API key (0 = unlimited)",
+    )
+
+    tpm_limit: int = Field(
+        default=0,
+        ge=0,
+        description="Tokens per minute per model or API key (0 = unlimited)",
+    )
+
+    rate_limit_redis_url: str = Field(
+        default="",
+        description="Redis URL holding the rate-limit buckets (empty = in-process)",
+    )
+
+    # Rendering parameters
+    render_workers: int = Field(
+        default=1,
+        gt=0,
+        description="Number of processes used to rasterize PDF pages (1 = serial)",
+    )
+
+    render_prefetch: int = Field(
+        default=4,
+        gt=0,
+        description="Rendered pages buffered ahead of the LLM calls",
+    )
+
+    max_inflight_pages: int = Field(
+        default=0,
+        ge=0,
+        description="Pages dispatched but not finished at once (0 = 2x concurrency)",
+    )
+
+    in_memory_images: bool = Field(
+        default=False,
+        description="Pass rendered pages to the LLM as in-memory buffers instead of files",
+    )
+
+    adaptive_dpi: bool = Field(
+        default=False,
+        description="Choose the render DPI per page from its text density and graphics",
+    )
+
+    image_encoding: bool = Field(
+        default=False,
+        description="Downscale pages to the model's resolution limit and send the smallest format",
+    )
+
+    image_quality: int = Field(
+        default=85,
+        ge=1,
+        le=100,
+        description="JPEG/WebP quality used by image encoding (lower = fewer bytes)",
+    )
+
+    image_max_edge: int = Field(
+        default=0,
+        ge=0,
+        description="Long-edge limit in pixels for image encoding (0 = provider limit)",
+    )
+
+    # Cascade parameters
+    cascade_models: str = Field(
+        default="",
+        description="Comma-separated cheaper models tried before model_name, cheapest first",
+    )
+
+    cascade_min_text_ratio: float = Field(
+        default=0.5,
+        ge=0.0,
+        le=1.0,
+        description="Escalate when the output is shorter than this share of the text layer",
+    )
+
+    # Packing parameters
+    page_packing: bool = Field(
+        default=False,
+        description="Send runs of light pages in one request with page delimiters",
+    )
+
+    pack_token_budget: int = Field(
+        default=2048,
+        gt=0,
+        description="Estimated output tokens allowed per packed request",
+    )
+
+    pack_max_pages: int = Field(
+        default=4,
+        ge=2,
+        description="Maximum number of pages in one packed request",
+    )
+
+    # Tiling parameters
+    tile_pages: bool = Field(
+        default=False,
+        description="Convert tall or dense pages as overlapping horizontal bands",
+    )
+
+    tile_max_aspect: float = Field(
+        default=2.0,
+        gt=0.0,
+        description="Height/width ratio above which a page is split into bands",
+    )
+
+    tile_max_bands: int = Field(
+        default=4,
+        ge=2,
+        description="Maximum number of bands a page is split into",
+    )
+
+    tile_overlap: float = Field(
+        default=0.05,
+        ge=0.0,
+        lt=0.5,
+        description="Fraction of the page height shared by neighbouring bands",
+    )
+
+    # Streaming parameters
+    stream_output: bool = Field(
+        default=False,
+        description="Stream page Markdown to partial files and SSE as tokens arrive",
+    )
+
+    stream_interval: float = Field(
+        default=0.5,
+        ge=0.0,
+        description="Minimum seconds between streamed content updates of a page",
+    )
+
+    # Routing parameters
+    text_fast_path: bool = Field(
+        default=False,
+        description="Convert plain-prose PDF pages from their text layer without the LLM",
+    )
+
+    # Page filtering parameters
+    page_filter: bool = Field(
+        default=False,
+        description="Skip blank pages and reuse Markdown for near-duplicate pages",
+    )
+
+    blank_ink_ratio: float = Field(
+        default=0.001,
+        ge=0.0,
+        le=1.0,
+        description="Pages with a smaller fraction of inked pixels are treated as blank",
+    )
+
+    duplicate_hash_distance: int = Field(
+        default=6,
+        ge=0,
+        le=64,
+        description="Maximum perceptual-hash Hamming distance between duplicate pages",
+    )
+
+    duplicate_mean_diff: float = Field(
+        default=3.0,
+        ge=0.0,
+        description="Maximum mean thumbnail difference (0-255) between duplicate pages",
+    )
+
+    # Cache parameters
+    cache_path: str = Field(
+        default="",
+        description="SQLite file of the persistent completion cache (empty = disabled)",
+    )
+
+    cache_max_mb: int = Field(
+        default=512,
+        gt=0,
+        description="Size bound of the completion cache in MB (LRU eviction)",
+    )
+
+    # Record/replay parameters
+    cassette_path: str = Field(
+        default="",
+        description="Archive of recorded LLM responses (empty = disabled)",
+    )
+
+    cassette_mode: str = Field(
+        default="replay",
+        pattern="^(record|replay)$",
+        description="record every provider response, or replay recorded ones",
+    )
+
+    cassette_on_miss: str = Field(
+        default="fail",
+        pattern="^(fail|passthrough)$",
+        description="Replaying a request that was not recorded: fail or passthrough",
+    )
+
+    cassette_latency_scale: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="Replayed responses take their recorded latency times this",
+    )
+
     @classmethod
     def from_env(cls) -> "Config":
         """Create configuration from environment variables"""
@@ -41,6 +304,50 @@ class Config(BaseModel):
             temperature=float(os.getenv("TEMPERATURE", "0.3")),
             max_tokens=int(os.getenv("MAX_TOKENS", "8192")),
             retry_times=int(os.getenv("RETRY_TIMES", "3")),
+            retry_base_delay=float(os.getenv("RETRY_BASE_DELAY", "0.5")),
+            retry_max_delay=float(os.getenv("RETRY_MAX_DELAY", "30")),
+            request_timeout=float(os.getenv("REQUEST_TIMEOUT", "0")),
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "0")),
+            hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+            llm_endpoints=os.getenv("LLM_ENDPOINTS", ""),
+            endpoint_eject_after=int(os.getenv("ENDPOINT_EJECT_AFTER", "3")),
+            endpoint_eject_seconds=float(os.getenv("ENDPOINT_EJECT_SECONDS", "30")),
+            adaptive_concurrency=os.getenv("ADAPTIVE_CONCURRENCY", "false").lower()
+            == "true",
+            max_concurrency=int(os.getenv("MAX_CONCURRENCY", "32")),
+            rpm_limit=int(os.getenv("RPM_LIMIT", "0")),
+            tpm_limit=int(os.getenv("TPM_LIMIT", "0")),
+            rate_limit_redis_url=os.getenv("RATE_LIMIT_REDIS_URL", ""),
+            render_workers=int(os.getenv("RENDER_WORKERS", "1")),
+            render_prefetch=int(os.getenv("RENDER_PREFETCH", "4")),
+            max_inflight_pages=int(os.getenv("MAX_INFLIGHT_PAGES", "0")),
+            in_memory_images=os.getenv("IN_MEMORY_IMAGES", "false").lower() == "true",
+            adaptive_dpi=os.getenv("ADAPTIVE_DPI", "false").lower() == "true",
+            image_encoding=os.getenv("IMAGE_ENCODING", "false").lower() == "true",
+            image_quality=int(os.getenv("IMAGE_QUALITY", "85")),
+            image_max_edge=int(os.getenv("IMAGE_MAX_EDGE", "0")),
+            cascade_models=os.getenv("CASCADE_MODELS", ""),
+            cascade_min_text_ratio=float(os.getenv("CASCADE_MIN_TEXT_RATIO", "0.5")),
+            page_packing=os.getenv("PAGE_PACKING", "false").lower() == "true",
+            pack_token_budget=int(os.getenv("PACK_TOKEN_BUDGET", "2048")),
+            pack_max_pages=int(os.getenv("PACK_MAX_PAGES", "4")),
+            tile_pages=os.getenv("TILE_PAGES", "false").lower() == "true",
+            tile_max_aspect=float(os.getenv("TILE_MAX_ASPECT", "2.0")),
+            tile_max_bands=int(os.getenv("TILE_MAX_BANDS", "4")),
+            tile_overlap=float(os.getenv("TILE_OVERLAP", "0.05")),
+            stream_output=os.getenv("STREAM_OUTPUT", "false").lower() == "true",
+            stream_interval=float(os.getenv("STREAM_INTERVAL", "0.5")),
+            text_fast_path=os.getenv("TEXT_FAST_PATH", "false").lower() == "true",
+            page_filter=os.getenv("PAGE_FILTER", "false").lower() == "true",
+            blank_ink_ratio=float(os.getenv("BLANK_INK_RATIO", "0.001")),
+            duplicate_hash_distance=int(os.getenv("DUPLICATE_HASH_DISTANCE", "6")),
+            duplicate_mean_diff=float(os.getenv("DUPLICATE_MEAN_DIFF", "3.0")),
+            cache_path=os.getenv("LLM_CACHE_PATH", ""),
+            cache_max_mb=int(os.getenv("LLM_CACHE_MAX_MB", "512")),
+            cassette_path=os.getenv("LLM_CASSETTE_PATH", ""),
+            cassette_mode=os.getenv("LLM_CASSETTE_MODE", "replay"),
+            cassette_on_miss=os.getenv("LLM_CASSETTE_ON_MISS", "fail"),
+            cassette_latency_scale=float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "0")),
         )
 
 
@@ -2,16 +2,43 @@
 Core modules for MarkPDFDown
 """
 
-from .file_worker import FileWorker, ImageWorker, PDFWorker, create_worker
+from .cache import CompletionCache
+from .cassette import Cassette
+from .endpoint_pool import Endpoint, EndpointPool
+from .file_worker import (
+    FileWorker,
+    ImageWorker,
+    PageImage,
+    PDFWorker,
+    create_worker,
+)
+from .image_encoding import ImageEncoder
 from .llm_client import LLMClient
+from .page_filter import PageFilter, PageVerdict
+from .request_policy import RequestPolicy
+from .resolution import PageRenderPlan, ResolutionPlanner
+from .text_layer import PageRoute, PageRouter
 from .utils import detect_file_type, remove_markdown_wrap, validate_page_range
 
 __all__ = [
     "LLMClient",
+    "CompletionCache",
+    "Cassette",
+    "Endpoint",
+    "EndpointPool",
     "FileWorker",
     "PDFWorker",
     "ImageWorker",
+    "PageImage",
     "create_worker",
+    "ImageEncoder",
+    "RequestPolicy",
+    "ResolutionPlanner",
+    "PageRenderPlan",
+    "PageRouter",
+    "PageRoute",
+    "PageFilter",
+    "PageVerdict",
     "remove_markdown_wrap",
     "detect_file_type",
     "validate_page_range",
@@ -0,0 +1,274 @@
+"""
+Persistent content-addressed cache for LLM completions
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .llm_client import CompletionResult
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key layout or stored columns change
+CACHE_VERSION = 1
+
+
+def cache_key(
+    model_name: str,
+    user_message: str,
+    system_prompt: Optional[str],
+    images: list[tuple[str, bytes]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """
+    Hash everything that determines a completion
+
+    Args:
+        model_name: LLM model name
+        user_message: User message content
+        system_prompt: System prompt (optional)
+        images: (mime type, encoded bytes) of each image, in request order
+        temperature: Generation temperature
+        max_tokens: Maximum number of tokens
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    header = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "model": model_name,
+            "system": system_prompt,
+            "user": user_message,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "images": [
+                [mime_type, hashlib.sha256(data).hexdigest()]
+                for mime_type, data in images
+            ],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(header.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    SQLite-backed completion cache with size-bounded LRU eviction
+
+    Entries are keyed by cache_key() and store the completion text with its
+    token counts. Each hit refreshes the entry's access time; once the stored
+    content exceeds max_bytes the least recently used entries are evicted.
+    Safe to share between threads, and between processes through SQLite's
+    own locking.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Open (or create) a cache database
+
+        Args:
+            path: SQLite database file
+            max_bytes: Upper bound on the stored content size
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completions_accessed "
+            "ON completions (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional["CompletionResult"]:
+        """
+        Look up a completion and mark it as recently used
+
+        Args:
+            key: Cache key from cache_key()
+
+        Returns:
+            Stored CompletionResult (with cached=True), or None on a miss
+        """
+        from .llm_client import CompletionResult
+
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT content, input_tokens, output_tokens, total_tokens "
+                    "FROM completions WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE completions SET accessed_at = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                # A broken or locked cache must never fail the conversion
+                logger.warning(f"Completion cache lookup failed: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        content, input_tokens, output_tokens, total_tokens = row
+        return CompletionResult(
+            content=content,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+            cached=True,
+        )
+
+    def put(self, key: str, result: "CompletionResult") -> None:
+        """
+        Store a completion, evicting least recently used entries if needed
+
+        Truncated completions (finish_reason "length") are not stored: the
+        cache does not keep the finish reason, and a hit must not hide the
+        truncation from callers that retile or escalate on it.
+
+        Args:
+            key: Cache key from cache_key()
+            result: Completion to store
+        """
+        if result.finish_reason == "length":
+            return
+        size = len(result.content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO completions "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        result.content,
+                        int(result.input_tokens or 0),
+                        int(result.output_tokens or 0),
+                        int(result.total_tokens or 0),
+                        size,
+                        now,
+                        now,
+                    ),
+                )
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.warning(f"Completion cache store failed: {e}")
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the size bound holds"""
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute(
+            "SELECT key, size FROM completions ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} cached completions")
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this instance and the current store size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+_shared_caches: dict[tuple[str, int], CompletionCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_completion_cache(
+    path: str = "", max_bytes: int = 512 * 1024 * 1024
+) -> Optional[CompletionCache]:
+    """
+    Process-wide completion cache for the given settings
+
+    Every caller asking for the same cache gets the same instance, so a
+    process holds one SQLite connection per cache file however many
+    conversions it runs.
+
+    Args:
+        path: SQLite database file (empty = no cache)
+        max_bytes: Upper bound on the stored content size
+
+    Returns:
+        The shared CompletionCache, or None without a path
+    """
+    if not path:
+        return None
+    settings = (os.path.abspath(path), max_bytes)
+    with _shared_lock:
+        cache = _shared_caches.get(settings)
+        if cache is None:
+            cache = CompletionCache(path, max_bytes)
+            _shared_caches[settings] = cache
+        return cache
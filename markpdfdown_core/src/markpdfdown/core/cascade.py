@@ -0,0 +1,166 @@
+"""
+Cheap output checks deciding when a page escalates to a stronger model
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+_FENCE_PATTERN = re.compile(r"```.*?(```|$)", re.DOTALL)
+_INLINE_CODE_PATTERN = re.compile(r"`[^`\n]*`")
+_SEPARATOR_CELL_PATTERN = re.compile(r"^\s*:?-{3,}:?\s*$")
+# A $ followed by a digit is a currency amount, not a math delimiter
+_DOLLAR_PATTERN = re.compile(r"(?<!\\)\$(?!\d)")
+_ENVIRONMENT_PATTERN = re.compile(r"\\(begin|end)\{([^}]*)\}")
+
+
+def _strip_code(markdown: str) -> str:
+    """Remove fenced and inline code, whose content is not checked"""
+    return _INLINE_CODE_PATTERN.sub("", _FENCE_PATTERN.sub("", markdown))
+
+
+def _cells(row: str) -> list[str]:
+    """Cells of a Markdown table row (escaped pipes stay inside their cell)"""
+    row = row.strip()
+    if row.startswith("|"):
+        row = row[1:]
+    if row.endswith("|") and not row.endswith("\\|"):
+        row = row[:-1]
+    return re.split(r"(?<!\\)\|", row)
+
+
+def table_issues(markdown: str) -> list[str]:
+    """
+    Find malformed Markdown tables
+
+    Args:
+        markdown: Page Markdown
+
+    Returns:
+        One message per malformed table (empty when all tables are well formed)
+    """
+    issues = []
+    table: list[str] = []
+    for line in [*_strip_code(markdown).splitlines(), ""]:
+        if line.strip().startswith("|"):
+            table.append(line)
+            continue
+        if table:
+            issue = _table_issue(table)
+            if issue:
+                issues.append(issue)
+            table = []
+    return issues
+
+
+def _table_issue(rows: list[str]) -> Optional[str]:
+    """What is wrong with one table, or None"""
+    if len(rows) < 2:
+        return "table with a single row"
+    separator = _cells(rows[1])
+    if not all(_SEPARATOR_CELL_PATTERN.match(cell) for cell in separator):
+        return "table without a header separator row"
+    columns = len(_cells(rows[0]))
+    if len(separator) != columns:
+        return "table separator does not match the header columns"
+    ragged = sum(1 for row in rows[2:] if len(_cells(row)) != columns)
+    if ragged:
+        return f"table with {ragged} rows of the wrong column count"
+    return None
+
+
+def latex_issues(markdown: str) -> list[str]:
+    """
+    Find unbalanced LaTeX math delimiters and environments
+
+    Args:
+        markdown: Page Markdown
+
+    Returns:
+        One message per kind of imbalance (empty when balanced)
+    """
+    text = _strip_code(markdown)
+    issues = []
+    if text.count("$$") % 2:
+        issues.append("unbalanced $$ delimiters")
+    if len(_DOLLAR_PATTERN.findall(text.replace("$$", ""))) % 2:
+        issues.append("unbalanced $ delimiters")
+    for opening, closing in (("\\(", "\\)"), ("\\[", "\\]")):
+        if text.count(opening) != text.count(closing):
+            issues.append(f"unbalanced {opening} {closing} delimiters")
+    depth: dict[str, int] = {}
+    for kind, name in _ENVIRONMENT_PATTERN.findall(text):
+        depth[name] = depth.get(name, 0) + (1 if kind == "begin" else -1)
+    issues.extend(
+        f"unbalanced \\begin{{{name}}}" for name, count in depth.items() if count
+    )
+    return issues
+
+
+def check_page(
+    content: str,
+    finish_reason: Optional[str] = None,
+    char_count: int = 0,
+    min_text_ratio: float = 0.5,
+) -> list[str]:
+    """
+    Cheap quality checks on one model answer for a page
+
+    Args:
+        content: Page Markdown returned by the model
+        finish_reason: Finish reason of the request ("length" = truncated)
+        char_count: Characters in the page's text layer (0 = unknown)
+        min_text_ratio: Smallest accepted output length relative to char_count
+
+    Returns:
+        Reasons to escalate the page to a stronger model (empty = accept)
+    """
+    if finish_reason == "length":
+        return ["output truncated at max_tokens"]
+    if not content.strip():
+        return ["empty output"]
+    issues = table_issues(content) + latex_issues(content)
+    if char_count and len(content) < char_count * min_text_ratio:
+        issues.append(
+            f"output of {len(content)} characters for {char_count} in the text layer"
+        )
+    return issues
+
+
+@dataclass
+class TierAttempt:
+    """One model's answer for a page"""
+
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached: bool = False
+    issues: list[str] = field(default_factory=list)  # why it was escalated
+
+
+@dataclass
+class CascadeRecord:
+    """Models a page went through; the last attempt is the accepted one"""
+
+    page_num: int  # 1-based
+    attempts: list[TierAttempt] = field(default_factory=list)
+
+    @property
+    def tier(self) -> int:
+        """0-based index of the model whose answer was kept"""
+        return len(self.attempts) - 1
+
+    @property
+    def model(self) -> str:
+        """Model whose answer was kept"""
+        return self.attempts[-1].model
+
+    @property
+    def input_tokens(self) -> int:
+        """Input tokens spent on the page across all tiers"""
+        return sum(a.input_tokens for a in self.attempts if not a.cached)
+
+    @property
+    def output_tokens(self) -> int:
+        """Output tokens spent on the page across all tiers"""
+        return sum(a.output_tokens for a in self.attempts if not a.cached)
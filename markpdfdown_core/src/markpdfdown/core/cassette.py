@@ -0,0 +1,246 @@
+"""
+Record/replay cassettes of LLM responses
+
+A cassette records the provider responses of a real run, keyed by request
+fingerprint, with their timings. Replaying it serves those responses back
+without the network, optionally with the original latencies, so a full run
+can be reproduced and profiled offline.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_RECORD = "record"
+CASSETTE_REPLAY = "replay"
+MISS_FAIL = "fail"
+MISS_PASSTHROUGH = "passthrough"
+
+# Characters per chunk when a replayed response is streamed
+STREAM_CHUNK_CHARS = 64
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recorded response"""
+
+
+@dataclass
+class CassetteEntry:
+    """One recorded response"""
+
+    key: str  # request fingerprint (cache_key of the request)
+    model: str
+    content: str
+    finish_reason: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    latency: float = 0.0  # seconds from sending the request to the last token
+    first_token: Optional[float] = None  # seconds to the first streamed token
+
+
+class Cassette:
+    """
+    Gzipped JSON-lines archive of LLM responses
+
+    In record mode every response is appended to the archive as soon as it
+    arrives, so a recording cut short by a crash keeps what it had and later
+    runs add to it (delete the file to start over). In
+    replay mode the archive is loaded once; a fingerprint recorded several
+    times (retries, regenerated pages) is served in recorded order, then the
+    last response repeats. Safe to share between threads and clients.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = CASSETTE_REPLAY,
+        on_miss: str = MISS_FAIL,
+        latency_scale: float = 0.0,
+    ):
+        """
+        Open a cassette
+
+        Args:
+            path: Archive file
+            mode: "record" or "replay"
+            on_miss: In replay mode, "fail" raises CassetteMiss for requests
+                that were not recorded, "passthrough" sends them to the provider
+            latency_scale: Replayed responses take their recorded latency times
+                this (0 = immediately, 1 = original timing)
+
+        Raises:
+            ValueError: If mode or on_miss is unknown
+            FileNotFoundError: If a replayed archive does not exist
+        """
+        if mode not in (CASSETTE_RECORD, CASSETTE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        if on_miss not in (MISS_FAIL, MISS_PASSTHROUGH):
+            raise ValueError(f"Unknown cassette miss behaviour: {on_miss!r}")
+        self.path = path
+        self.mode = mode
+        self.on_miss = on_miss
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._entries: dict[str, list[CassetteEntry]] = {}
+        self._served: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if mode == CASSETTE_REPLAY:
+            self._load()
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "ab").close()
+
+    @property
+    def recording(self) -> bool:
+        """Whether responses are being recorded"""
+        return self.mode == CASSETTE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        """Whether responses are served from the archive"""
+        return self.mode == CASSETTE_REPLAY
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = CassetteEntry(**json.loads(line))
+                    self._entries.setdefault(entry.key, []).append(entry)
+        count = sum(len(entries) for entries in self._entries.values())
+        logger.info(f"Cassette {self.path}: {count} responses loaded")
+
+    def record(self, entry: CassetteEntry) -> None:
+        """Append one response to the archive"""
+        line = json.dumps(asdict(entry), ensure_ascii=False) + "\n"
+        with self._lock:
+            # Each append is a gzip member of its own; readers see one stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a response was recorded for a request fingerprint"""
+        with self._lock:
+            return bool(self._entries.get(key))
+
+    def lookup(self, key: str) -> Optional[CassetteEntry]:
+        """
+        Next recorded response for a request fingerprint
+
+        Returns:
+            The entry, or None on a miss when misses pass through
+
+        Raises:
+            CassetteMiss: On a miss when misses fail
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                if self.on_miss == MISS_FAIL:
+                    raise CassetteMiss(f"No recorded response for request {key[:12]}")
+                return None
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            self.replayed += 1
+            return entries[min(served, len(entries) - 1)]
+
+    def play_sync(self, entry: CassetteEntry) -> None:
+        """Block for the scaled latency of a replayed response"""
+        if self.latency_scale > 0:
+            time.sleep(entry.latency * self.latency_scale)
+
+    async def play(
+        self,
+        entry: CassetteEntry,
+        on_chunk: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Wait out the scaled latency of a replayed response
+
+        With on_chunk the content is streamed in chunks: the first after the
+        recorded time to first token, the rest spread over the remaining
+        latency.
+        """
+        scale = self.latency_scale
+        if on_chunk is None:
+            if scale > 0:
+                await asyncio.sleep(entry.latency * scale)
+            return
+
+        first_token = entry.first_token if entry.first_token is not None else 0.0
+        if scale > 0:
+            await asyncio.sleep(first_token * scale)
+        count = max(1, math.ceil(len(entry.content) / STREAM_CHUNK_CHARS))
+        # The last chunk arrives at the recorded latency
+        interval = max(0.0, entry.latency - first_token) * scale / max(1, count - 1)
+        content = ""
+        for index in range(count):
+            if index and interval:
+                await asyncio.sleep(interval)
+            delta = entry.content[
+                index * STREAM_CHUNK_CHARS : (index + 1) * STREAM_CHUNK_CHARS
+            ]
+            content += delta
+            if delta:
+                await on_chunk(delta, content)
+
+    def stats(self) -> dict[str, int]:
+        """Recorded, replayed and missed responses"""
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses,
+            }
+
+
+_shared_cassettes: dict[tuple[str, str, str, float], Cassette] = {}
+_shared_lock = threading.Lock()
+
+
+def get_cassette(
+    path: str = "",
+    mode: str = CASSETTE_REPLAY,
+    on_miss: str = MISS_FAIL,
+    latency_scale: float = 0.0,
+) -> Optional[Cassette]:
+    """
+    Process-wide cassette for the given settings
+
+    Every caller asking for the same cassette gets the same instance, so an
+    archive is loaded once and replay order is kept across LLMClient instances.
+
+    Args:
+        path: Archive file (empty = no cassette)
+        mode: "record" or "replay"
+        on_miss: "fail" or "passthrough" for requests missing when replaying
+        latency_scale: Replayed latency relative to the recorded one
+
+    Returns:
+        The shared Cassette, or None without a path
+    """
+    if not path:
+        return None
+    settings = (os.path.abspath(path), mode, on_miss, latency_scale)
+    with _shared_lock:
+        cassette = _shared_cassettes.get(settings)
+        if cassette is None:
+            cassette = Cassette(path, mode, on_miss, latency_scale)
+            _shared_cassettes[settings] = cassette
+        return cassette
@@ -0,0 +1,172 @@
+"""
+Adaptive (AIMD) concurrency limiter driven by provider feedback
+"""
+
+import asyncio
+import logging
+import math
+from collections import deque
+from time import monotonic
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Share of the gap to the current latency the baseline closes per sample
+BASELINE_DRIFT = 0.01
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency window that converges to what the provider allows
+
+    Works like asyncio.Semaphore whose size is adjusted after every call:
+
+    - Additive increase: each successful call grows the window by 1/window
+      (about one slot per window of successes) while the smoothed latency
+      stays within latency_tolerance of the baseline (the best latency seen,
+      slowly drifting towards the current one), and only when the window is
+      actually in use.
+    - Multiplicative decrease: a rate-limit or timeout error shrinks the
+      window by the backoff factor. Calls started before the last decrease
+      are ignored, so one burst of 429s counts as a single congestion event.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        """
+        Args:
+            initial_limit: Starting window
+            min_limit: Smallest window
+            max_limit: Largest window
+            backoff: Factor applied to the window on rate-limit or timeout errors
+            latency_tolerance: Growth stops when the smoothed latency exceeds this
+                multiple of the baseline latency
+            smoothing: Weight of the newest sample in the latency average
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self.latency: Optional[float] = None  # smoothed latency of successful calls
+        self.baseline: Optional[float] = None  # lowest smoothed latency seen
+        self.increases = 0
+        self.decreases = 0
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: deque = deque()
+
+    @property
+    def window(self) -> int:
+        """Current number of calls allowed in flight"""
+        return int(self.limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently holding a slot"""
+        return self._in_flight
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot in the window
+
+        Returns:
+            Start time to pass back to release()
+        """
+        if not self._waiters and self._in_flight < self.window:
+            self._in_flight += 1
+            return monotonic()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self._in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                # _wake() may already have dropped the cancelled waiter
+                self._waiters.remove(waiter)
+            raise
+        return monotonic()
+
+    def release(
+        self, started: float, success: bool = True, overloaded: bool = False
+    ) -> None:
+        """
+        Return a slot and adjust the window from the call's outcome
+
+        Args:
+            started: Value returned by acquire()
+            success: Whether the call succeeded
+            overloaded: Whether it failed with a rate-limit or timeout error
+        """
+        window_full = self._in_flight >= self.window or bool(self._waiters)
+        self._in_flight -= 1
+
+        if overloaded:
+            if started >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = monotonic()
+                self.decreases += 1
+                logger.info(f"Provider overloaded, concurrency window -> {self.window}")
+        elif success:
+            latency = monotonic() - started
+            self._observe(latency)
+            if window_full and self._latency_stable():
+                grown = min(self.max_limit, self.limit + 1 / self.limit)
+                if math.floor(grown) > self.window:
+                    logger.debug(f"Concurrency window -> {math.floor(grown)}")
+                    self.increases += 1
+                self.limit = grown
+
+        self._wake()
+
+    def _observe(self, latency: float) -> None:
+        """Update the smoothed and baseline latency with one sample"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        if self.baseline is None or self.latency < self.baseline:
+            self.baseline = self.latency
+        else:
+            # Slowly forget an unusually fast start (e.g. a few short pages)
+            self.baseline += BASELINE_DRIFT * (self.latency - self.baseline)
+
+    def _latency_stable(self) -> bool:
+        """Whether latency is close enough to the baseline to keep growing"""
+        return self.latency <= self.baseline * self.latency_tolerance
+
+    def _wake(self) -> None:
+        """Hand free slots to waiting callers in arrival order"""
+        while self._waiters and self._in_flight < self.window:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        """Current window and the feedback it is based on"""
+        return {
+            "window": self.window,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "latency": self.latency,
+            "baseline_latency": self.baseline,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
@@ -0,0 +1,275 @@
+"""
+Pool of LLM endpoints (model, API key, base URL) with health-scored routing
+"""
+
+import hashlib
+import json
+import logging
+import random
+import threading
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Floor of the success factor, so a recovering endpoint still gets probed
+MIN_SUCCESS_FACTOR = 0.05
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """One routing target; credentials travel with each request"""
+
+    model: str
+    api_key: Optional[str] = field(default=None, repr=False)  # kept out of logs
+    api_base: Optional[str] = None
+    weight: float = 1.0
+
+    @property
+    def key(self) -> str:
+        """Stable identifier (model plus key/base fingerprint), safe to log"""
+        secret = f"{self.api_key or ''}|{self.api_base or ''}"
+        if secret == "|":
+            return self.model
+        return f"{self.model}:{hashlib.sha256(secret.encode('utf-8')).hexdigest()[:12]}"
+
+    def request_kwargs(self) -> dict:
+        """litellm arguments selecting this endpoint"""
+        kwargs = {"model": self.model}
+        if self.api_key:
+            kwargs["api_key"] = self.api_key
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        return kwargs
+
+
+class _Health:
+    """Live error rate and latency of one endpoint"""
+
+    def __init__(self):
+        self.error_rate = 0.0
+        self.latency: Optional[float] = None
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+
+def endpoints_from_json(
+    spec: str, default: Optional[Endpoint] = None
+) -> list[Endpoint]:
+    """
+    Parse a JSON list of endpoints
+
+    Args:
+        spec: e.g. '[{"model": "gpt-4o", "api_key": "sk-...", "weight": 2},
+            {"model": "openai/gpt-4o", "api_base": "https://gw/v1"}]'
+        default: Endpoint placed first in the list (optional)
+
+    Raises:
+        ValueError: If the spec is not a list of objects with a model
+    """
+    try:
+        items = json.loads(spec)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid endpoint list: {e}") from e
+    if not isinstance(items, list):
+        raise ValueError("The endpoint list must be a JSON array")
+    endpoints = [default] if default is not None else []
+    for index, item in enumerate(items):
+        # Report the position only: the entry carries an API key
+        if not isinstance(item, dict) or not item.get("model"):
+            raise ValueError(f"Endpoint {index} has no model")
+        endpoints.append(
+            Endpoint(
+                model=item["model"],
+                api_key=item.get("api_key"),
+                api_base=item.get("api_base"),
+                weight=float(item.get("weight", 1.0)),
+            )
+        )
+    return endpoints
+
+
+class EndpointPool:
+    """
+    Weighted routing over several endpoints by live health
+
+    Each endpoint's share of traffic is its weight times its smoothed
+    success rate times how fast it is relative to the fastest endpoint.
+    After eject_after consecutive failures an endpoint is ejected for
+    eject_seconds; once that expires it is probed again and ejected anew by
+    a single further failure.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+        smoothing: float = 0.2,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            endpoints: Routing targets, at least one
+            eject_after: Consecutive failures that eject an endpoint
+            eject_seconds: How long an ejected endpoint receives no traffic
+            smoothing: Weight of the newest sample in error rate and latency
+            rng: Random source for the weighted choice (tests pass a seeded one)
+        """
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        self.endpoints = list(endpoints)
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.smoothing = smoothing
+        self.rng = rng or random.Random()
+        self._health = {endpoint: _Health() for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(
+        cls, spec: str, default: Optional[Endpoint] = None, **kwargs
+    ) -> "EndpointPool":
+        """
+        Build a pool from a JSON list of endpoints
+
+        Args:
+            spec: See endpoints_from_json()
+            default: Endpoint placed first in the pool (optional)
+            **kwargs: Passed to the constructor
+
+        Raises:
+            ValueError: If the spec is not a list of objects with a model
+        """
+        return cls(endpoints_from_json(spec, default), **kwargs)
+
+    def choose(self, avoid: frozenset = frozenset()) -> Endpoint:
+        """
+        Pick an endpoint for the next request
+
+        Args:
+            avoid: Endpoints to skip while others are available, e.g. ones that
+                already failed or are in flight for the same page
+
+        Returns:
+            A healthy endpoint drawn by score, or the one whose ejection ends
+            first when all are ejected
+        """
+        with self._lock:
+            now = monotonic()
+            healthy = [
+                endpoint
+                for endpoint in self.endpoints
+                if self._health[endpoint].ejected_until <= now
+            ]
+            if not healthy:
+                return min(self.endpoints, key=lambda e: self._health[e].ejected_until)
+            candidates = [e for e in healthy if e not in avoid] or healthy
+            if len(candidates) == 1:
+                return candidates[0]
+            scores = self._scores(candidates)
+            return self.rng.choices(candidates, weights=scores)[0]
+
+    def report(self, endpoint: Endpoint, success: bool, latency: float = 0.0) -> None:
+        """
+        Feed the outcome of a request back into the endpoint's health
+
+        Args:
+            endpoint: Endpoint returned by choose()
+            success: Whether the request succeeded
+            latency: Seconds the successful request took
+        """
+        with self._lock:
+            health = self._health.get(endpoint)
+            if health is None:
+                return
+            health.requests += 1
+            health.error_rate += self.smoothing * ((not success) - health.error_rate)
+            if success:
+                health.failures = 0
+                if health.latency is None:
+                    health.latency = latency
+                else:
+                    health.latency += self.smoothing * (latency - health.latency)
+                return
+
+            health.errors += 1
+            health.failures += 1
+            if health.failures >= self.eject_after:
+                health.ejected_until = monotonic() + self.eject_seconds
+                # Probe after the ejection: one more failure ejects it again
+                health.failures = self.eject_after - 1
+                logger.warning(
+                    f"Endpoint {endpoint.key} ejected for {self.eject_seconds:.0f}s "
+                    f"after repeated failures"
+                )
+
+    def _scores(self, endpoints: list[Endpoint]) -> list[float]:
+        """Routing weight of each endpoint from its weight, errors and latency"""
+        latencies = [
+            self._health[e].latency for e in endpoints if self._health[e].latency
+        ]
+        fastest = min(latencies) if latencies else None
+        scores = []
+        for endpoint in endpoints:
+            health = self._health[endpoint]
+            success = max(MIN_SUCCESS_FACTOR, 1 - health.error_rate)
+            speed = fastest / health.latency if fastest and health.latency else 1.0
+            scores.append(endpoint.weight * success * speed)
+        return scores
+
+    def stats(self) -> dict:
+        """Health of every endpoint, keyed by Endpoint.key"""
+        now = monotonic()
+        with self._lock:
+            return {
+                endpoint.key: {
+                    "requests": health.requests,
+                    "errors": health.errors,
+                    "error_rate": health.error_rate,
+                    "latency": health.latency,
+                    "ejected": health.ejected_until > now,
+                }
+                for endpoint, health in self._health.items()
+            }
+
+
+_shared_pools: dict[tuple, EndpointPool] = {}
+_shared_health: dict[Endpoint, _Health] = {}
+_shared_lock = threading.Lock()
+
+
+def get_endpoint_pool(
+    endpoints: list[Endpoint], eject_after: int = 3, eject_seconds: float = 30.0
+) -> EndpointPool:
+    """
+    Process-wide pool for the given endpoints and ejection settings
+
+    Every caller asking for the same endpoints gets the same instance, and
+    an endpoint's health is shared by every pool that contains it, so error
+    rates, latencies and ejections outlive the task that observed them.
+
+    Args:
+        endpoints: Routing targets, at least one
+        eject_after: Consecutive failures that eject an endpoint
+        eject_seconds: How long an ejected endpoint receives no traffic
+
+    Returns:
+        The shared EndpointPool
+    """
+    key = (tuple(endpoints), eject_after, eject_seconds)
+    with _shared_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = EndpointPool(endpoints, eject_after, eject_seconds)
+            # Pools overlapping on an endpoint update the same health record
+            pool._health = {
+                endpoint: _shared_health.setdefault(endpoint, _Health())
+                for endpoint in pool.endpoints
+            }
+            pool._lock = _shared_lock
+            _shared_pools[key] = pool
+        return pool
@@ -3,13 +3,172 @@ Base file worker and factory for different file types
 """
 
 import logging
+import multiprocessing
 import os
 from abc import ABC, abstractmethod
-
+from collections import deque
+from collections.abc import Collection
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from .page_filter import PageFilter, PageFingerprint, PageVerdict, fingerprint_pixmap
+from .resolution import PageRenderPlan, ResolutionPlanner
+from .text_layer import PageRoute, PageRouter
 from .utils import validate_page_range
 
 logger = logging.getLogger(__name__)
 
+# Pages rendered per process-pool job when rendering in parallel
+RENDER_SHARD_SIZE = 4
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method of the rendering processes
+
+    Never fork(): the backend renders from a thread of a multi-threaded
+    process, and a forked child can inherit a lock some other thread held.
+    The shard workers reopen the document by path, so they need nothing the
+    parent process had. forkserver imports this module once and forks each
+    worker from that single-threaded process; spawn is the portable fallback.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+IMAGE_MIME_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+@dataclass
+class PageImage:
+    """In-memory encoded page image"""
+
+    page_num: int  # 1-based
+    data: bytes = field(repr=False)
+    mime_type: str = "image/jpeg"
+
+    @property
+    def file_name(self) -> str:
+        """File name used when the image is persisted next to the input"""
+        ext = "png" if self.mime_type == "image/png" else "jpg"
+        return f"page_{self.page_num:04d}.{ext}"
+
+
+def _render_page(
+    page,
+    page_num: int,
+    output_dir: str,
+    dpi: int,
+    fmt: str,
+    in_memory: bool,
+    planner: Optional[ResolutionPlanner] = None,
+    router: Optional[PageRouter] = None,
+    fingerprint: bool = False,
+) -> tuple[
+    Union[str, PageImage],
+    Optional[PageRenderPlan],
+    Optional[PageRoute],
+    Optional[PageFingerprint],
+]:
+    """
+    Render one fitz page either to disk or to an in-memory buffer
+
+    Args:
+        page: fitz page object
+        page_num: 1-based page number
+        output_dir: Directory for generated images
+        dpi: Output image resolution (ignored when a planner is given)
+        fmt: Image format (jpg/png)
+        in_memory: Return a PageImage instead of writing a file
+        planner: Resolution planner choosing the DPI for this page (optional)
+        router: Text-layer router deciding whether the page needs the LLM (optional)
+        fingerprint: Compute the page's blank/duplicate fingerprint
+
+    Returns:
+        Tuple of (image path or PageImage, render plan or None, route or None,
+        fingerprint or None)
+    """
+    route = router.route(page, page_num) if router else None
+    render_plan = planner.plan(page, page_num) if planner else None
+    if render_plan:
+        dpi = render_plan.dpi
+
+    pix = page.get_pixmap(dpi=dpi)
+    page_fingerprint = fingerprint_pixmap(pix, page_num) if fingerprint else None
+    if in_memory:
+        image = PageImage(
+            page_num=page_num,
+            data=pix.tobytes(output=fmt),
+            mime_type=IMAGE_MIME_TYPES.get(fmt, "image/jpeg"),
+        )
+        return image, render_plan, route, page_fingerprint
+
+    output_path = os.path.join(output_dir, f"page_{page_num:04d}.{fmt}")
+    pix.save(output_path)
+    return output_path, render_plan, route, page_fingerprint
+
+
+def _render_page_shard(
+    input_path: str,
+    page_indices: list[int],
+    output_dir: str,
+    dpi: int,
+    fmt: str,
+    in_memory: bool = False,
+    planner: Optional[ResolutionPlanner] = None,
+    router: Optional[PageRouter] = None,
+    fingerprint: bool = False,
+) -> list[tuple]:
+    """
+    Render a shard of PDF pages in a worker process
+
+    Each call opens its own fitz document, since fitz documents cannot be
+    shared across processes.
+
+    Args:
+        input_path: Path to PDF file
+        page_indices: 0-based page indices to render
+        output_dir: Directory for generated images
+        dpi: Output image resolution
+        fmt: Image format (jpg/png)
+        in_memory: Return PageImage buffers instead of writing files
+        planner: Resolution planner choosing the DPI per page (optional)
+        router: Text-layer router deciding which pages need the LLM (optional)
+        fingerprint: Compute blank/duplicate fingerprints
+
+    Returns:
+        (image path or PageImage, render plan, route, fingerprint) tuples in
+        page order
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(input_path)
+    try:
+        return [
+            _render_page(
+                doc.load_page(page_num),
+                page_num + 1,
+                output_dir,
+                dpi,
+                fmt,
+                in_memory,
+                planner,
+                router,
+                fingerprint,
+            )
+            for page_num in page_indices
+        ]
+    finally:
+        doc.close()
+
 
 class FileWorker(ABC):
     """
@@ -45,11 +204,20 @@ class PDFWorker(FileWorker):
     def __init__(self, input_path: str, start_page: int = 1, end_page: int = 0):
         super().__init__(input_path)
 
+        # Render decisions per page number, filled when adaptive DPI is used
+        self.render_plans: dict[int, PageRenderPlan] = {}
+        # Text-layer routes per page number, filled when route_text is used
+        self.page_routes: dict[int, PageRoute] = {}
+        # Blank/duplicate verdicts per page number, filled when a page filter is used
+        self.page_verdicts: dict[int, PageVerdict] = {}
+        self._page_filter: Optional[PageFilter] = None
+
         try:
-            import PyPDF2
+            import fitz  # PyMuPDF
 
-            self.reader = PyPDF2.PdfReader(input_path)
-            self.total_pages = len(self.reader.pages)
+            # fitz only reads the xref here; pages are parsed lazily on load_page
+            with fitz.open(input_path, filetype="pdf") as doc:
+                self.total_pages = doc.page_count
         except Exception as e:
             logger.error(f"Failed to read PDF file: {e}")
             raise ValueError(f"Invalid PDF file: {input_path}") from e
@@ -63,74 +231,87 @@ class PDFWorker(FileWorker):
             f"Processing PDF from page {self.start_page} to page {self.end_page}"
         )
 
-        # Extract pages if needed
-        if self.start_page != 1 or self.end_page != self.total_pages:
-            extracted_path = self._extract_pages()
-            if extracted_path:
-                self.input_path = extracted_path
-                logger.info("Page extraction completed")
-            else:
-                logger.warning("Page extraction failed, using original file")
-
-    def _extract_pages(self) -> str:
-        """
-        Extract specified page range from PDF
-
-        Returns:
-            Path to extracted PDF file, empty string on failure
-        """
-        try:
-            import PyPDF2
-
-            writer = PyPDF2.PdfWriter()
-
-            # Add pages (convert to 0-based index)
-            for page_num in range(self.start_page - 1, self.end_page):
-                writer.add_page(self.reader.pages[page_num])
-
-            # Generate output filename
-            base_name = os.path.basename(self.input_path).rsplit(".", 1)[0]
-            output_name = f"{base_name}_pages_{self.start_page}-{self.end_page}.pdf"
-            output_path = os.path.join(self.output_dir, output_name)
-
-            # Write extracted PDF
-            os.makedirs(self.output_dir, exist_ok=True)
-            with open(output_path, "wb") as out_file:
-                writer.write(out_file)
-
-            return output_path
-
-        except Exception as e:
-            logger.error(f"Page extraction failed: {e}")
-            return ""
-
-    def convert_to_images(self, dpi: int = 150, fmt: str = "jpg") -> list[str]:
+    @property
+    def page_indices(self) -> range:
+        """0-based indices of the pages in the requested range"""
+        return range(self.start_page - 1, self.end_page)
+
+    def convert_to_images(
+        self,
+        dpi: int = 150,
+        fmt: str = "jpg",
+        workers: int = 1,
+        in_memory: bool = False,
+        adaptive_dpi: bool = False,
+        route_text: bool = False,
+        page_filter: Optional[PageFilter] = None,
+        skip_pages: Optional[Collection[int]] = None,
+    ) -> list[Union[str, PageImage]]:
         """
         Convert PDF pages to images using PyMuPDF (Streaming Generator)
 
+        Only pages start_page..end_page are loaded and rendered, straight from
+        the original document; output files keep their original page numbers.
+
         Args:
             dpi: Output image resolution (Lowered to 150 for peak performance, matching desktop feel)
             fmt: Image format (jpg/png)
+            workers: Number of rendering processes (1 renders serially in-process)
+            in_memory: Yield encoded PageImage buffers instead of writing files
+            adaptive_dpi: Pick the DPI per page around `dpi` from its content;
+                decisions are recorded in self.render_plans
+            route_text: Inspect each page's text layer; pages that are plain
+                prose get local Markdown in self.page_routes and need no LLM call
+            page_filter: Classify each rendered page as blank, a near-duplicate
+                of an earlier page, or to keep; verdicts go to self.page_verdicts
+            skip_pages: 1-based page numbers that are neither loaded nor
+                rendered (e.g. pages already converted by an interrupted run)
 
         Yields:
-            Generated image paths one by one
+            Generated image paths (or PageImages) one by one, in page order
         """
         try:
             import fitz  # PyMuPDF
 
             os.makedirs(self.output_dir, exist_ok=True)
+            planner = ResolutionPlanner(base_dpi=dpi) if adaptive_dpi else None
+            router = PageRouter() if route_text else None
+            self._page_filter = page_filter
+            fingerprint = page_filter is not None
+            skip = set(skip_pages or ())
+            page_indices = [i for i in self.page_indices if i + 1 not in skip]
+
+            if workers > 1:
+                yield from self._convert_to_images_parallel(
+                    dpi,
+                    fmt,
+                    workers,
+                    in_memory,
+                    planner,
+                    router,
+                    fingerprint,
+                    page_indices,
+                )
+                return
 
             doc = fitz.open(self.input_path)
-            for page_num in range(len(doc)):
+            for page_num in page_indices:
                 page = doc.load_page(page_num)
-                # Use a slightly lower scale matrix if needed, 
+                # Use a slightly lower scale matrix if needed,
                 # but DPI 150 is usually sufficient for AI
-                pix = page.get_pixmap(dpi=dpi)
-                output_path = os.path.join(
-                    self.output_dir, f"page_{page_num + 1:04d}.{fmt}"
+                output, render_plan, route, page_fingerprint = _render_page(
+                    page,
+                    page_num + 1,
+                    self.output_dir,
+                    dpi,
+                    fmt,
+                    in_memory,
+                    planner,
+                    router,
+                    fingerprint,
                 )
-                pix.save(output_path)
-                yield output_path
+                self._record(render_plan, route, page_fingerprint)
+                yield output
 
             doc.close()
 
@@ -138,6 +319,97 @@ class PDFWorker(FileWorker):
             logger.error(f"PDF to image conversion failed: {e}")
             return
 
+    def _convert_to_images_parallel(
+        self,
+        dpi: int,
+        fmt: str,
+        workers: int,
+        in_memory: bool = False,
+        planner: Optional[ResolutionPlanner] = None,
+        router: Optional[PageRouter] = None,
+        fingerprint: bool = False,
+        page_indices: Optional[list[int]] = None,
+    ):
+        """
+        Render pages across a process pool, yielding paths in page order
+
+        Pages are split into shards of RENDER_SHARD_SIZE; at most two shards per
+        worker are in flight, so rendering never runs far ahead of the consumer.
+
+        Args:
+            dpi: Output image resolution
+            fmt: Image format (jpg/png)
+            workers: Number of rendering processes
+            in_memory: Yield PageImage buffers instead of writing files
+            planner: Resolution planner choosing the DPI per page (optional)
+            router: Text-layer router deciding which pages need the LLM (optional)
+            fingerprint: Compute blank/duplicate fingerprints
+            page_indices: 0-based pages to render (default: the whole range)
+
+        Yields:
+            Generated image paths one by one, in page order
+        """
+        if page_indices is None:
+            page_indices = list(self.page_indices)
+        shards = (
+            list(page_indices[start : start + RENDER_SHARD_SIZE])
+            for start in range(0, len(page_indices), RENDER_SHARD_SIZE)
+        )
+        max_in_flight = workers * 2
+
+        logger.info(f"Rendering {len(page_indices)} pages with {workers} processes")
+
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_process_context())
+        try:
+            pending = deque()
+
+            def _submit_next() -> None:
+                shard = next(shards, None)
+                if shard:
+                    pending.append(
+                        pool.submit(
+                            _render_page_shard,
+                            self.input_path,
+                            shard,
+                            self.output_dir,
+                            dpi,
+                            fmt,
+                            in_memory,
+                            planner,
+                            router,
+                            fingerprint,
+                        )
+                    )
+
+            for _ in range(max_in_flight):
+                _submit_next()
+
+            while pending:
+                rendered = pending.popleft().result()
+                _submit_next()
+                for output, render_plan, route, page_fingerprint in rendered:
+                    self._record(render_plan, route, page_fingerprint)
+                    yield output
+        finally:
+            # Drop queued shards if the consumer stops early
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _record(
+        self,
+        render_plan: Optional[PageRenderPlan],
+        route: Optional[PageRoute],
+        page_fingerprint: Optional[PageFingerprint] = None,
+    ) -> None:
+        """Keep per-page render, routing and filtering decisions"""
+        if render_plan:
+            self.render_plans[render_plan.page_num] = render_plan
+        if route:
+            self.page_routes[route.page_num] = route
+        if page_fingerprint and self._page_filter is not None:
+            # Pages arrive in document order, so duplicates point backwards
+            verdict = self._page_filter.check(page_fingerprint)
+            self.page_verdicts[verdict.page_num] = verdict
+
 
 class ImageWorker(FileWorker):
     """
@@ -148,9 +420,9 @@ class ImageWorker(FileWorker):
         super().__init__(input_path)
         logger.info(f"Processing image file: {input_path}")
 
-    def convert_to_images(self) -> list[str]:
+    def convert_to_images(self, **kwargs) -> list[str]:
         """
-        For image files, just return the original path
+        For image files, just return the original path (rendering options are ignored)
 
         Returns:
             List containing the original image path
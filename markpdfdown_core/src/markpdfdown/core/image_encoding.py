@@ -0,0 +1,264 @@
+"""
+Per-model image encoding: downscale, then pick the smallest format
+"""
+
+import io
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed for WebP candidates
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Whether the missing-Pillow fallback was logged (once per process)
+_webp_fallback_logged = False
+
+MIME_JPEG = "image/jpeg"
+MIME_PNG = "image/png"
+MIME_WEBP = "image/webp"
+MIME_GIF = "image/gif"
+MIME_BMP = "image/bmp"
+
+# Formats every supported provider accepts as-is
+SENDABLE_MIME_TYPES = (MIME_JPEG, MIME_PNG, MIME_WEBP, MIME_GIF)
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """
+    Detect the MIME type of encoded image bytes from their magic number
+
+    Args:
+        data: Encoded image
+
+    Returns:
+        MIME type, or None if not recognized
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return MIME_JPEG
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return MIME_PNG
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return MIME_WEBP
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return MIME_GIF
+    if data.startswith(b"BM"):
+        return MIME_BMP
+    return None
+
+
+@dataclass(frozen=True)
+class ResolutionLimit:
+    """Largest image a provider uses before downscaling it server-side"""
+
+    max_long_edge: Optional[int] = None
+    max_short_edge: Optional[int] = None  # applied after max_long_edge
+    max_pixels: Optional[int] = None
+
+    def scale(self, width: int, height: int) -> float:
+        """
+        Factor (<= 1.0) that brings an image within this limit
+
+        Args:
+            width: Image width in pixels
+            height: Image height in pixels
+
+        Returns:
+            Scale factor, 1.0 when the image already fits
+        """
+        scale = 1.0
+        if self.max_long_edge:
+            scale = min(scale, self.max_long_edge / max(width, height))
+        if self.max_short_edge:
+            scale = min(scale, self.max_short_edge / min(width, height))
+        if self.max_pixels:
+            scale = min(scale, (self.max_pixels / (width * height)) ** 0.5)
+        return scale
+
+
+# Model name prefixes (after any provider/ routing prefix) and their limits
+PROVIDER_LIMITS: list[tuple[tuple[str, ...], ResolutionLimit]] = [
+    # OpenAI high detail: fit in 2048x2048, then the short side to 768
+    (
+        ("gpt-4o", "gpt-4.1", "gpt-5", "chatgpt-4o", "o1", "o3", "o4"),
+        ResolutionLimit(max_long_edge=2048, max_short_edge=768),
+    ),
+    # Anthropic: long edge 1568 and about 1.15 megapixels
+    (("claude",), ResolutionLimit(max_long_edge=1568, max_pixels=1_150_000)),
+    # Gemini: larger images are scaled down to fit 3072x3072
+    (("gemini",), ResolutionLimit(max_long_edge=3072)),
+]
+
+
+def resolution_limit(model_name: str) -> ResolutionLimit:
+    """
+    Look up the effective maximum resolution of a model
+
+    Args:
+        model_name: LiteLLM model name, e.g. "openrouter/anthropic/claude-3.5-sonnet"
+
+    Returns:
+        ResolutionLimit of the provider, unbounded for unknown models
+    """
+    name = model_name.lower().rsplit("/", 1)[-1]
+    for prefixes, limit in PROVIDER_LIMITS:
+        if name.startswith(prefixes):
+            return limit
+    return ResolutionLimit()
+
+
+@dataclass
+class EncodedImage:
+    """Image bytes ready to send, with the size before encoding"""
+
+    data: bytes = field(repr=False)
+    mime_type: str
+    width: int = 0
+    height: int = 0
+    bytes_before: int = 0
+
+    @property
+    def bytes_after(self) -> int:
+        """Size of the encoded payload"""
+        return len(self.data)
+
+
+class ImageEncoder:
+    """
+    Re-encode page images for one target model
+
+    Each image is downscaled to the model's resolution limit, reduced to a
+    single channel when it has no colour, and encoded as lossless PNG and as
+    JPEG (plus WebP when Pillow is installed) at the configured quality. The
+    smallest candidate is sent; the original bytes are kept when nothing
+    beats them.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[ResolutionLimit] = None,
+        quality: int = 85,
+        webp: Optional[bool] = None,
+    ):
+        """
+        Args:
+            limit: Resolution limit of the target model (optional)
+            quality: JPEG/WebP quality (1-100); lower trades fidelity for bytes
+            webp: Consider WebP (default: when Pillow is installed)
+
+        Raises:
+            ImportError: If webp is requested but Pillow is not installed
+        """
+        if webp and Image is None:
+            raise ImportError(
+                "WebP encoding requires Pillow; install it with "
+                '`pip install "markpdfdown[webp]"`'
+            )
+        self.limit = limit or ResolutionLimit()
+        self.quality = quality
+        self.webp = Image is not None if webp is None else webp
+
+    @classmethod
+    def for_model(
+        cls, model_name: str, quality: int = 85, max_long_edge: int = 0
+    ) -> "ImageEncoder":
+        """
+        Create an encoder for a model's resolution limit
+
+        Args:
+            model_name: LiteLLM model name
+            quality: JPEG/WebP quality (1-100)
+            max_long_edge: Override of the long-edge limit in pixels (0 = provider)
+
+        Returns:
+            ImageEncoder for the model; without Pillow it picks between JPEG
+            and PNG only
+        """
+        global _webp_fallback_logged
+        limit = resolution_limit(model_name)
+        if max_long_edge:
+            limit = ResolutionLimit(
+                max_long_edge, limit.max_short_edge, limit.max_pixels
+            )
+        if Image is None and not _webp_fallback_logged:
+            _webp_fallback_logged = True
+            logger.warning(
+                "Pillow is not installed: page images are sent as JPEG or PNG, "
+                'without WebP (install it with `pip install "markpdfdown[webp]"`)'
+            )
+        return cls(limit, quality, webp=Image is not None)
+
+    def encode(self, data: bytes, mime_type: Optional[str] = None) -> EncodedImage:
+        """
+        Encode one image for the target model
+
+        Args:
+            data: Encoded source image
+            mime_type: MIME type of data (sniffed when omitted)
+
+        Returns:
+            EncodedImage with the smallest payload
+        """
+        mime_type = mime_type or sniff_mime_type(data) or MIME_JPEG
+        try:
+            pix = fitz.Pixmap(data)
+        except Exception as e:
+            logger.debug(f"Cannot decode image, sending it unchanged: {e}")
+            return EncodedImage(data, mime_type, bytes_before=len(data))
+
+        original = EncodedImage(data, mime_type, pix.width, pix.height, len(data))
+        pix = self._prepare(pix)
+        candidates = [
+            EncodedImage(pix.tobytes("png"), MIME_PNG),
+            EncodedImage(pix.tobytes("jpg", jpg_quality=self.quality), MIME_JPEG),
+        ]
+        if self.webp:
+            candidates.append(EncodedImage(self._to_webp(pix), MIME_WEBP))
+
+        best = min(candidates, key=lambda candidate: candidate.bytes_after)
+        resized = (pix.width, pix.height) != (original.width, original.height)
+        if not resized and mime_type in SENDABLE_MIME_TYPES:
+            if original.bytes_after <= best.bytes_after:
+                return original
+
+        best.width, best.height = pix.width, pix.height
+        best.bytes_before = len(data)
+        return best
+
+    def _prepare(self, pix: "fitz.Pixmap") -> "fitz.Pixmap":
+        """Drop alpha, convert to RGB or gray and downscale to the limit"""
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+
+        scale = self.limit.scale(pix.width, pix.height)
+        if scale < 1.0:
+            width = max(1, int(pix.width * scale))
+            height = max(1, int(pix.height * scale))
+            pix = fitz.Pixmap(pix, width, height, None)
+
+        if pix.n == 3 and self._is_gray(pix):
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        return pix
+
+    @staticmethod
+    def _is_gray(pix: "fitz.Pixmap") -> bool:
+        """Whether every pixel of an RGB pixmap has equal channels"""
+        samples = pix.samples
+        return samples[0::3] == samples[1::3] == samples[2::3]
+
+    def _to_webp(self, pix: "fitz.Pixmap") -> bytes:
+        """Encode a pixmap as WebP through Pillow"""
+        mode = "L" if pix.n == 1 else "RGB"
+        image = Image.frombytes(
+            mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride
+        )
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=self.quality, method=4)
+        return buffer.getvalue()
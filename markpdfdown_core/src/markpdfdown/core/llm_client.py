@@ -2,25 +2,93 @@
 LLM client using LiteLLM for unified API access
 """
 
+import asyncio
 import base64
+import contextlib
 import logging
+import mimetypes
 import time
+from collections.abc import Awaitable, Callable
 from typing import Optional
 from dataclasses import dataclass
 
 import litellm
-from litellm import completion
+from litellm import acompletion, completion
+
+from .cache import CompletionCache, cache_key
+from .cassette import Cassette, CassetteEntry, CassetteMiss
+from .concurrency import AdaptiveLimiter
+from .endpoint_pool import Endpoint, EndpointPool
+from .file_worker import PageImage
+from .image_encoding import ImageEncoder, sniff_mime_type
+from .rate_limit import RateLimiter, estimate_request_tokens
+from .request_policy import RequestPolicy
 
 logger = logging.getLogger(__name__)
 
+# HTTP statuses meaning the provider is shedding load
+OVERLOAD_STATUS_CODES = (429, 503, 529)
+
+# Called with (new text, text streamed so far in this attempt) as tokens arrive
+ChunkCallback = Callable[[str, str], Awaitable[None]]
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    Whether an API error means the provider is rate limiting or overloaded
+
+    Args:
+        error: Exception raised by litellm
+
+    Returns:
+        True for rate-limit, overload and timeout errors
+    """
+    timeouts = (litellm.Timeout, TimeoutError, asyncio.TimeoutError)
+    if isinstance(error, (litellm.RateLimitError, *timeouts)):
+        return True
+    return getattr(error, "status_code", None) in OVERLOAD_STATUS_CODES
+
 
 @dataclass
 class CompletionResult:
     """LLM completion 结果"""
+
     content: str
     input_tokens: int = 0
     output_tokens: int = 0
     total_tokens: int = 0
+    cached: bool = False  # 命中转换缓存，未发起网络请求
+    image_bytes_before: int = 0  # 编码前的图片总字节数
+    image_bytes_after: int = 0  # 实际发送的图片总字节数
+    finish_reason: Optional[str] = None  # "length" 表示输出被 max_tokens 截断
+    retries: int = 0  # 成功前失败并重试的次数
+    error: Optional[str] = None  # 调用方以空结果代替失败的请求时记录错误信息
+
+
+@dataclass
+class _Message:
+    content: str
+
+
+@dataclass
+class _Choice:
+    message: _Message
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class _Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+
+@dataclass
+class _Response:
+    """Non-streaming response shape rebuilt from streamed chunks"""
+
+    choices: list
+    usage: Optional[object] = None
 
 
 class LLMClient:
@@ -29,18 +97,49 @@ class LLMClient:
     Supports OpenAI and OpenRouter automatically
     """
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        cache: Optional[CompletionCache] = None,
+        encoder: Optional[ImageEncoder] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        rate_limit_key: Optional[str] = None,
+        policy: Optional[RequestPolicy] = None,
+        pool: Optional[EndpointPool] = None,
+        cassette: Optional[Cassette] = None,
+    ):
         """
         Initialize LLM client
 
         Args:
             model_name: Model name (e.g., "gpt-4o", "openrouter/anthropic/claude-3.5-sonnet")
+            cache: Persistent completion cache (optional); hits skip the API call
+            encoder: Re-encodes images for the model before sending (optional)
+            limiter: Adaptive concurrency window for acompletion() calls (optional)
+            rate_limiter: Shared RPM/TPM buckets every attempt waits on (optional)
+            rate_limit_key: Bucket key, e.g. per API key (defaults to model_name)
+            policy: Backoff, timeout and hedging of API calls (optional; defaults
+                to jittered exponential backoff without timeout or hedging)
+            pool: Endpoints (model, API key, base URL) each call is routed to by
+                health (optional); credentials are passed per request and each
+                endpoint has its own rate-limit bucket
+            cassette: Records every provider response, or serves recorded
+                responses instead of calling the provider (optional)
         """
         self.model_name = model_name
+        self.cache = cache
+        self.encoder = encoder
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.rate_limit_key = rate_limit_key or model_name
+        self.policy = policy or RequestPolicy()
+        self.pool = pool
+        self.cassette = cassette
 
         # Configure LiteLLM logging
         # litellm.set_verbose = True  # Deprecated and noisy, removing by default
-        
+
         # import logging
         # logging.getLogger("litellm").setLevel(logging.INFO) # Set to INFO or WARNING to reduce noise
 
@@ -52,6 +151,8 @@ class LLMClient:
         temperature: float = 0.3,
         max_tokens: int = 8192,
         retry_times: int = 3,
+        images: Optional[list[PageImage]] = None,
+        refresh_cache: bool = False,
     ) -> CompletionResult:
         """
         Create chat completion with multimodal support
@@ -63,71 +164,518 @@ class LLMClient:
             temperature: Generation temperature
             max_tokens: Maximum number of tokens
             retry_times: Number of retries
+            images: List of in-memory page images (optional), sent after image_paths
+            refresh_cache: Skip the cache lookup but store the fresh result
 
         Returns:
             CompletionResult with content and token usage
         """
-        # Build user content with text and images
-        user_content = [{"type": "text", "text": user_message}]
-
-        if image_paths:
-            for img_path in image_paths:
-                base64_image = self._encode_image(img_path)
-                user_content.append(
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                    }
-                )
-
-        # Build messages
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": user_content})
+        keys, cached, request, image_bytes = self._prepare_request(
+            user_message,
+            system_prompt,
+            image_paths,
+            images,
+            temperature,
+            max_tokens,
+            refresh_cache,
+        )
+        if cached is not None:
+            return cached
 
+        tokens = self._estimate_tokens(
+            user_message, system_prompt, image_paths, images, max_tokens
+        )
+        used = set()  # endpoints tried for this request, avoided on retry
         # Retry mechanism
         for attempt in range(retry_times):
             try:
-                response = completion(
-                    model=self.model_name,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    # Add custom headers for tracking
-                    extra_headers={
-                        "X-Title": "MarkPDFdown",
-                        "HTTP-Referer": "https://github.com/MarkPDFdown/markpdfdown.git",
-                    },
+                response, rate_key, key = self._call_sync(request, tokens, used, keys)
+                result = self._handle_response(
+                    response, key, image_bytes, tokens, rate_key
+                )
+                result.retries = attempt
+                return result
+
+            except CassetteMiss:
+                # Replaying again cannot find it either
+                raise
+            except Exception as e:
+                logger.error(
+                    f"API request failed (attempt {attempt + 1}/{retry_times}): {str(e)}"
                 )
+                if attempt < retry_times - 1:
+                    # Wait before retry, as long as the provider asks if it does
+                    time.sleep(self.policy.backoff(attempt, e))
+                else:
+                    raise e
+
+        return ""
+
+    async def acompletion(
+        self,
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        image_paths: Optional[list[str]] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 8192,
+        retry_times: int = 3,
+        images: Optional[list[PageImage]] = None,
+        refresh_cache: bool = False,
+        on_chunk: Optional[ChunkCallback] = None,
+    ) -> CompletionResult:
+        """
+        Async counterpart of completion() built on litellm.acompletion
 
-                if not response.choices:
-                    raise Exception("No response from API")
+        Waiting for the API and backing off between retries never block the
+        event loop, so many pages can be in flight without a thread each.
+        With a limiter, every attempt holds a slot of its window and reports
+        its latency or overload error back to it. The policy decides the
+        backoff between attempts, bounds each call and may hedge a slow call
+        with a duplicate (never for streamed calls).
 
-                # 提取 token 使用情况
-                usage = response.usage
-                input_tokens = usage.prompt_tokens if usage else 0
-                output_tokens = usage.completion_tokens if usage else 0
-                total_tokens = usage.total_tokens if usage else (input_tokens + output_tokens)
+        With on_chunk, the response is streamed and the callback is awaited
+        for every content delta. A retried attempt starts over, which the
+        callback sees as text streamed so far equal to the new text.
 
-                return CompletionResult(
-                    content=response.choices[0].message.content,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    total_tokens=total_tokens
+        Args:
+            user_message: User message content
+            system_prompt: System prompt (optional)
+            image_paths: List of image paths (optional)
+            temperature: Generation temperature
+            max_tokens: Maximum number of tokens
+            retry_times: Number of retries
+            images: List of in-memory page images (optional), sent after image_paths
+            refresh_cache: Skip the cache lookup but store the fresh result
+            on_chunk: Coroutine awaited with (delta, content so far) while
+                streaming (optional); cache hits return without calling it
+
+        Returns:
+            CompletionResult with content and token usage
+        """
+        # Reading and re-encoding images is CPU/disk work: keep it off the loop
+        keys, cached, request, image_bytes = await asyncio.to_thread(
+            self._prepare_request,
+            user_message,
+            system_prompt,
+            image_paths,
+            images,
+            temperature,
+            max_tokens,
+            refresh_cache,
+        )
+        if cached is not None:
+            return cached
+
+        tokens = self._estimate_tokens(
+            user_message, system_prompt, image_paths, images, max_tokens
+        )
+        # Endpoints tried for this request: retries and hedges go elsewhere
+        used = set()
+        for attempt in range(retry_times):
+            try:
+                response, rate_key, key = await self.policy.call(
+                    lambda sent: self._call(
+                        request, tokens, on_chunk, used, keys, sent
+                    ),
+                    hedge=on_chunk is None,
+                )
+                result = self._handle_response(
+                    response, key, image_bytes, tokens, rate_key, store=False
                 )
+                # SQLite write and eviction: keep them off the event loop
+                await asyncio.to_thread(self._store, key, result)
+                result.retries = attempt
+                return result
 
+            except CassetteMiss:
+                # Replaying again cannot find it either
+                raise
             except Exception as e:
                 logger.error(
                     f"API request failed (attempt {attempt + 1}/{retry_times}): {str(e)}"
                 )
                 if attempt < retry_times - 1:
-                    # Wait before retry
-                    time.sleep(0.5 * (attempt + 1))
+                    await asyncio.sleep(self.policy.backoff(attempt, e))
                 else:
                     raise e
 
-        return ""
+        return CompletionResult(content="")
+
+    def _call_sync(
+        self, request: dict, tokens: int, used: set, keys: Optional[dict] = None
+    ) -> tuple:
+        """
+        One blocking API call, refunding its estimated tokens if it fails
+
+        Returns:
+            Tuple of (litellm response, rate-limit key it was charged to,
+            cache key of the request as routed)
+        """
+        endpoint, request, rate_key = self._route(request, used)
+        key = self._key(keys, request["model"])
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire_sync(rate_key, tokens)
+        started = time.monotonic()
+        try:
+            response = self._send_sync(request, key)
+        except Exception:
+            self._reconcile(tokens, 0, rate_key)
+            self._report(endpoint, False)
+            raise
+        self._report(endpoint, True, time.monotonic() - started)
+        return response, rate_key, key
+
+    async def _call(
+        self,
+        request: dict,
+        tokens: int,
+        on_chunk: Optional[ChunkCallback],
+        used: set,
+        keys: Optional[dict] = None,
+        sent: Optional[asyncio.Future] = None,
+    ) -> tuple:
+        """
+        One API call, also used for hedges
+
+        Waits for the RPM/TPM budget before taking a concurrency slot. Only
+        the provider call runs under the policy timeout, and only then does
+        the hedge clock run (sent is resolved by the policy), so a timeout
+        counts as overload for the limiter and a call queued locally is never
+        hedged. The estimated tokens are refunded if the call fails or is
+        cancelled (e.g. a losing hedge).
+
+        Returns:
+            Tuple of (litellm response, rate-limit key it was charged to,
+            cache key of the request as routed)
+        """
+        endpoint, request, rate_key = self._route(request, used)
+        key = self._key(keys, request["model"])
+        succeeded = False
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(rate_key, tokens)
+            async with self._limited():
+                started = time.monotonic()
+                response = await self.policy.send(
+                    self._send(request, key, on_chunk), rate_key, sent
+                )
+                latency = time.monotonic() - started
+            succeeded = True
+        except Exception:
+            self._report(endpoint, False)
+            raise
+        finally:
+            if not succeeded:
+                self._reconcile(tokens, 0, rate_key)
+        self._report(endpoint, True, latency)
+        return response, rate_key, key
+
+    def _send_sync(self, request: dict, key: Optional[str]):
+        """Blocking provider call, or its recorded response when replaying"""
+        cassette = self.cassette if key is not None else None
+        if cassette is not None and cassette.replaying:
+            entry = cassette.lookup(key)
+            if entry is not None:
+                cassette.play_sync(entry)
+                return _replayed_response(entry)
+
+        started = time.monotonic()
+        response = completion(**request)
+        if cassette is not None and cassette.recording:
+            latency = time.monotonic() - started
+            _record(cassette, key, request["model"], response, latency)
+        return response
+
+    async def _send(
+        self, request: dict, key: Optional[str], on_chunk: Optional[ChunkCallback]
+    ):
+        """Provider call, or its recorded response when replaying"""
+        cassette = self.cassette if key is not None else None
+        if cassette is not None and cassette.replaying:
+            entry = cassette.lookup(key)
+            if entry is not None:
+                await cassette.play(entry, on_chunk)
+                return _replayed_response(entry)
+
+        started = time.monotonic()
+        if on_chunk is None:
+            response = await acompletion(**request)
+            first_token = None
+        else:
+            first_chunk = []
+
+            async def timed_chunk(delta: str, content: str) -> None:
+                if not first_chunk:
+                    first_chunk.append(time.monotonic() - started)
+                await on_chunk(delta, content)
+
+            # The slot is held until the last chunk has arrived
+            stream = await acompletion(
+                **request,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            response = await self._collect_stream(stream, timed_chunk)
+            first_token = first_chunk[0] if first_chunk else None
+        if cassette is not None and cassette.recording:
+            latency = time.monotonic() - started
+            _record(cassette, key, request["model"], response, latency, first_token)
+        return response
+
+    def _route(self, request: dict, used: set) -> tuple[Optional[Endpoint], dict, str]:
+        """
+        Pick the endpoint for one call
+
+        Returns:
+            Tuple of (endpoint or None without a pool, request with its model
+            and credentials, rate-limit key)
+        """
+        if self.pool is None:
+            return None, request, self.rate_limit_key
+        endpoint = self.pool.choose(avoid=frozenset(used))
+        used.add(endpoint)
+        return endpoint, {**request, **endpoint.request_kwargs()}, endpoint.key
+
+    def _key(self, keys: Optional[dict], model: str) -> Optional[str]:
+        """
+        Cache key of a request routed to the given model
+
+        When replaying, a model the recording has a response for is used if
+        the routed one has none: routing may differ from the recorded run.
+        """
+        if keys is None:
+            return None
+        key = keys.get(model)
+        cassette = self.cassette
+        if cassette is not None and cassette.replaying and key not in cassette:
+            return next((other for other in keys.values() if other in cassette), key)
+        return key
+
+    def _models(self) -> list[str]:
+        """Models this client's requests may be routed to"""
+        if self.pool is None:
+            return [self.model_name]
+        return list(dict.fromkeys(endpoint.model for endpoint in self.pool.endpoints))
+
+    def _report(
+        self, endpoint: Optional[Endpoint], success: bool, latency: float = 0.0
+    ) -> None:
+        """Feed a call's outcome into the pool's health scores"""
+        if endpoint is not None:
+            self.pool.report(endpoint, success, latency)
+
+    async def _collect_stream(self, stream, on_chunk: ChunkCallback) -> "_Response":
+        """
+        Consume a litellm stream, forwarding content deltas as they arrive
+
+        Returns:
+            The assembled response, with the usage reported by the final chunk
+        """
+        content = ""
+        finish_reason = None
+        usage = None
+        async for chunk in stream:
+            # With include_usage the last chunk carries the usage of the call
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = getattr(choice, "finish_reason", None) or finish_reason
+            delta = getattr(choice.delta, "content", None)
+            if delta:
+                content += delta
+                await on_chunk(delta, content)
+
+        if not content and finish_reason is None:
+            return _Response(choices=[], usage=usage)
+        return _Response(
+            choices=[_Choice(_Message(content), finish_reason)],
+            usage=usage,
+        )
+
+    def _estimate_tokens(
+        self,
+        user_message: str,
+        system_prompt: Optional[str],
+        image_paths: Optional[list[str]],
+        images: Optional[list[PageImage]],
+        max_tokens: int,
+    ) -> int:
+        """Tokens debited from the TPM bucket until the actual usage is known"""
+        image_count = len(image_paths or []) + len(images or [])
+        return estimate_request_tokens(
+            (system_prompt or "") + user_message, image_count, max_tokens
+        )
+
+    def _reconcile(
+        self, estimated: int, actual: int, rate_key: Optional[str] = None
+    ) -> None:
+        """Correct the TPM bucket with the actual usage of an attempt"""
+        if self.rate_limiter is not None:
+            key = rate_key or self.rate_limit_key
+            self.rate_limiter.reconcile(key, estimated, actual)
+
+    @contextlib.asynccontextmanager
+    async def _limited(self):
+        """Hold a limiter slot for one API attempt and report its outcome"""
+        if self.limiter is None:
+            yield
+            return
+
+        started = await self.limiter.acquire()
+        success, overloaded = False, False
+        try:
+            yield
+            success = True
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            self.limiter.release(started, success=success, overloaded=overloaded)
+
+    def _prepare_request(
+        self,
+        user_message: str,
+        system_prompt: Optional[str],
+        image_paths: Optional[list[str]],
+        images: Optional[list[PageImage]],
+        temperature: float,
+        max_tokens: int,
+        refresh_cache: bool,
+    ) -> tuple[Optional[dict], Optional[CompletionResult], dict, tuple[int, int]]:
+        """
+        Encode the images, look up the cache and build the litellm request
+
+        Returns:
+            Tuple of ({model: cache key} or None, cached result or None, request
+            kwargs, (image bytes before encoding, image bytes sent))
+        """
+        # Collect image bytes first: they are both the cache key and the payload
+        encoded_images = []
+        for img_path in image_paths or []:
+            with open(img_path, "rb") as image_file:
+                data = image_file.read()
+            mime_type = sniff_mime_type(data) or mimetypes.guess_type(img_path)[0]
+            encoded_images.append((mime_type or "image/jpeg", data))
+        for image in images or []:
+            encoded_images.append((image.mime_type, image.data))
+
+        bytes_before = sum(len(data) for _, data in encoded_images)
+        if self.encoder is not None:
+            encoded = [self.encoder.encode(data, mime) for mime, data in encoded_images]
+            encoded_images = [(image.mime_type, image.data) for image in encoded]
+        bytes_after = sum(len(data) for _, data in encoded_images)
+        if bytes_after != bytes_before:
+            logger.debug(f"Images encoded: {bytes_before} -> {bytes_after} bytes")
+
+        keys = None
+        if self.cache is not None or self.cassette is not None:
+            # The cache key doubles as the cassette's request fingerprint. It
+            # names the model that answers: each model of the pool has its own
+            keys = {
+                model: cache_key(
+                    model,
+                    user_message,
+                    system_prompt,
+                    encoded_images,
+                    temperature,
+                    max_tokens,
+                )
+                for model in self._models()
+            }
+        if self.cache is not None and not refresh_cache:
+            for key in keys.values():
+                cached = self.cache.get(key)
+                if cached is not None:
+                    logger.debug(f"Completion cache hit: {key[:12]}")
+                    cached.image_bytes_before = bytes_before
+                    cached.image_bytes_after = bytes_after
+                    return keys, cached, {}, (bytes_before, bytes_after)
+
+        # Build user content with text and images
+        user_content = [{"type": "text", "text": user_message}]
+
+        for mime_type, data in encoded_images:
+            base64_image = base64.b64encode(data).decode("utf-8")
+            user_content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+                }
+            )
+
+        # Build messages
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": user_content})
+
+        request = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            # Add custom headers for tracking
+            "extra_headers": {
+                "X-Title": "MarkPDFdown",
+                "HTTP-Referer": "https://github.com/MarkPDFdown/markpdfdown.git",
+            },
+        }
+        if self.policy.timeout:
+            request["timeout"] = self.policy.timeout
+        return keys, None, request, (bytes_before, bytes_after)
+
+    def _handle_response(
+        self,
+        response,
+        key: Optional[str],
+        image_bytes: tuple[int, int] = (0, 0),
+        estimated_tokens: int = 0,
+        rate_key: Optional[str] = None,
+        store: bool = True,
+    ) -> CompletionResult:
+        """
+        Turn a litellm response into a CompletionResult and cache it
+
+        Args:
+            store: Write the result to the cache here; async callers pass
+                False and call _store() in a worker thread
+
+        Raises:
+            Exception: If the response has no choices
+        """
+        if not response.choices:
+            self._reconcile(estimated_tokens, 0, rate_key)
+            raise Exception("No response from API")
+
+        # 提取 token 使用情况
+        usage = response.usage
+        input_tokens = usage.prompt_tokens if usage else 0
+        output_tokens = usage.completion_tokens if usage else 0
+        total_tokens = usage.total_tokens if usage else (input_tokens + output_tokens)
+        # 没有 usage 时保留预估值
+        actual_tokens = total_tokens if usage else estimated_tokens
+        self._reconcile(estimated_tokens, actual_tokens, rate_key)
+
+        result = CompletionResult(
+            content=response.choices[0].message.content,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+            image_bytes_before=image_bytes[0],
+            image_bytes_after=image_bytes[1],
+            finish_reason=getattr(response.choices[0], "finish_reason", None),
+        )
+        if store:
+            self._store(key, result)
+        return result
+
+    def _store(self, key: Optional[str], result: CompletionResult) -> None:
+        """Cache a fresh result"""
+        # 只缓存非空结果，失败或空页面下次仍会重新请求
+        if self.cache is not None and key is not None and result.content:
+            self.cache.put(key, result)
 
     def _encode_image(self, image_path: str) -> str:
         """
@@ -141,3 +689,39 @@ class LLMClient:
         """
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode("utf-8")
+
+
+def _replayed_response(entry: CassetteEntry) -> _Response:
+    """Response shape of a recorded response"""
+    return _Response(
+        choices=[_Choice(_Message(entry.content), entry.finish_reason)],
+        usage=_Usage(entry.prompt_tokens, entry.completion_tokens, entry.total_tokens),
+    )
+
+
+def _record(
+    cassette: Cassette,
+    key: str,
+    model: str,
+    response,
+    latency: float,
+    first_token: Optional[float] = None,
+) -> None:
+    """Add a provider response to a recording cassette (empty ones are skipped)"""
+    if not response.choices:
+        return
+    choice = response.choices[0]
+    usage = response.usage
+    cassette.record(
+        CassetteEntry(
+            key=key,
+            model=model,
+            content=choice.message.content or "",
+            finish_reason=getattr(choice, "finish_reason", None),
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            total_tokens=usage.total_tokens if usage else 0,
+            latency=round(latency, 4),
+            first_token=None if first_token is None else round(first_token, 4),
+        )
+    )
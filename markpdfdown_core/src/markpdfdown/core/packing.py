@@ -0,0 +1,168 @@
+"""
+Pack consecutive light pages into one LLM request and split the response
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import fitz  # PyMuPDF
+
+from .file_worker import PageImage
+
+# Output tokens per unit of mean page darkness, calibrated on 10 pt body text
+# (a full page of prose is ~9% dark and transcribes to ~1200 tokens)
+TOKENS_PER_DARKNESS = 14000
+# Text-layer characters per output token
+CHARS_PER_TOKEN = 4
+# Width the page is reduced to before measuring darkness
+ESTIMATE_WIDTH = 256
+
+PAGE_MARKER = "<!-- PAGE {page_num} -->"
+_MARKER_PATTERN = re.compile(r"^[ \t]*<!--\s*PAGE\s+(\d+)\s*-->[ \t]*$", re.MULTILINE)
+_FENCE_PATTERN = re.compile(r"^\s*```(?:markdown)?\s*\n(.*?)\n?```\s*$", re.DOTALL)
+
+
+def estimate_page_tokens(image: Union[str, PageImage], char_count: int = 0) -> int:
+    """
+    Estimate the number of output tokens a page transcribes to
+
+    Uses the text-layer character count when known, otherwise the mean
+    darkness of a downscaled grayscale copy of the page image.
+
+    Args:
+        image: Page image path or in-memory PageImage
+        char_count: Characters in the page's text layer (0 = unknown)
+
+    Returns:
+        Estimated output tokens
+    """
+    if char_count:
+        return math.ceil(char_count / CHARS_PER_TOKEN)
+
+    if isinstance(image, PageImage):
+        pix = fitz.Pixmap(image.data)
+    else:
+        pix = fitz.Pixmap(image)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.width > ESTIMATE_WIDTH:
+        height = max(1, pix.height * ESTIMATE_WIDTH // pix.width)
+        pix = fitz.Pixmap(pix, ESTIMATE_WIDTH, height, None)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+
+    samples = pix.samples
+    if not samples:
+        return 0
+    darkness = 1 - sum(samples) / (255 * len(samples))
+    return math.ceil(darkness * TOKENS_PER_DARKNESS)
+
+
+@dataclass
+class PagePacker:
+    """
+    Group consecutive light pages under an estimated output-token budget
+
+    Pages are added in document order. A page is light when its estimate
+    leaves room for at least one more page in the budget. Adding a page
+    that would overflow the budget (or max_pages) closes the current group.
+    """
+
+    token_budget: int = 2048
+    max_pages: int = 4
+    _group: list[Any] = field(default_factory=list, repr=False)
+    _tokens: int = field(default=0, repr=False)
+
+    def is_light(self, estimate: int) -> bool:
+        """Whether a page with this estimate may be packed"""
+        return estimate * 2 <= self.token_budget
+
+    def add(self, item: Any, estimate: int) -> Optional[list[Any]]:
+        """
+        Add a light page to the current group
+
+        Args:
+            item: Page to pack (returned unchanged in its group)
+            estimate: Estimated output tokens of the page
+
+        Returns:
+            The previous group when this page started a new one, else None
+        """
+        closed = None
+        if self._group and (
+            self._tokens + estimate > self.token_budget
+            or len(self._group) >= self.max_pages
+        ):
+            closed = self.flush()
+        self._group.append(item)
+        self._tokens += estimate
+        return closed
+
+    def flush(self) -> Optional[list[Any]]:
+        """
+        Close the current group
+
+        Returns:
+            The pending group, or None if it is empty
+        """
+        group, self._group, self._tokens = self._group, [], 0
+        return group or None
+
+
+def packed_prompt(page_nums: list[int]) -> str:
+    """
+    Instructions that make the model delimit each page's Markdown
+
+    Args:
+        page_nums: Page numbers of the images, in request order
+
+    Returns:
+        Prompt paragraph to append to the per-page instructions
+    """
+    pages = ", ".join(str(page_num) for page_num in page_nums)
+    first = PAGE_MARKER.format(page_num=page_nums[0])
+    return (
+        f"The {len(page_nums)} images are consecutive pages {pages} of the same "
+        f"document, in this order. Transcribe every page separately. Start each "
+        f"page's Markdown with a line containing only its marker, e.g. `{first}` "
+        f"for page {page_nums[0]}, and do not merge content across pages."
+    )
+
+
+def split_packed_response(content: str, page_nums: list[int]) -> Optional[list[str]]:
+    """
+    Split a packed completion back into per-page Markdown
+
+    The split is valid only if every page marker appears exactly once, in
+    request order, with nothing but whitespace before the first one, and
+    every page has content.
+
+    Args:
+        content: Completion text
+        page_nums: Page numbers of the packed images, in request order
+
+    Returns:
+        Markdown of each page in page_nums order, or None if validation fails
+    """
+    if not content:
+        return None
+    fenced = _FENCE_PATTERN.match(content)
+    if fenced:
+        content = fenced.group(1)
+
+    markers = list(_MARKER_PATTERN.finditer(content))
+    if [int(m.group(1)) for m in markers] != page_nums:
+        return None
+    if content[: markers[0].start()].strip():
+        return None
+
+    parts = []
+    for marker, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following else len(content)
+        part = content[marker.end() : end].strip()
+        if not part:
+            return None
+        parts.append(part)
+    return parts
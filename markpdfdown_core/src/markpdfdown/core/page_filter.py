@@ -0,0 +1,195 @@
+"""
+Blank and duplicate page detection on rendered page images
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed when page filtering is enabled
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_KEEP = "keep"
+PAGE_BLANK = "blank"
+PAGE_DUPLICATE = "duplicate"
+
+# Gray levels below this count as ink
+INK_LEVEL = 160
+# Page margins ignored when measuring ink (scanner edges, punch holes)
+MARGIN_RATIO = 0.04
+# Side of the square thumbnails used for hashing and comparison
+HASH_SIZE = 32
+THUMB_SIZE = 64
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "Page filtering requires numpy; install it with "
+            '`pip install "markpdfdown[filter]"`'
+        )
+
+
+@dataclass
+class PageFingerprint:
+    """Perceptual hash and ink coverage of one rendered page"""
+
+    page_num: int  # 1-based
+    phash: int  # 64-bit DCT hash
+    ink_coverage: float  # fraction of inked pixels inside the margins
+    thumbnail: "np.ndarray" = field(repr=False)  # THUMB_SIZE² grayscale
+
+
+@dataclass
+class PageVerdict:
+    """Filtering decision for one page"""
+
+    page_num: int  # 1-based
+    action: str  # PAGE_KEEP, PAGE_BLANK or PAGE_DUPLICATE
+    ink_coverage: float = 0.0
+    duplicate_of: Optional[int] = None  # page whose Markdown is reused
+
+    @property
+    def needs_llm(self) -> bool:
+        """Whether the page still has to be converted"""
+        return self.action == PAGE_KEEP
+
+
+def _area_resize(pixels: "np.ndarray", size: int) -> "np.ndarray":
+    """Downscale a 2-D array to size x size by averaging the covered areas"""
+    rows = np.linspace(0, pixels.shape[0], size + 1).astype(int)[:-1]
+    cols = np.linspace(0, pixels.shape[1], size + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(pixels, rows, axis=0), cols, axis=1)
+    counts = np.outer(
+        np.diff(np.append(rows, pixels.shape[0])),
+        np.diff(np.append(cols, pixels.shape[1])),
+    )
+    return sums / np.maximum(counts, 1)
+
+
+def _dct_matrix(size: int) -> "np.ndarray":
+    """Orthonormal DCT-II basis"""
+    k = np.arange(size)
+    basis = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * size))
+    basis[0] *= 1 / np.sqrt(2)
+    return basis * np.sqrt(2 / size)
+
+
+def fingerprint_pixmap(pix, page_num: int) -> PageFingerprint:
+    """
+    Compute the fingerprint of a rendered page
+
+    Args:
+        pix: fitz Pixmap of the page
+        page_num: 1-based page number
+
+    Returns:
+        PageFingerprint of the page
+    """
+    _require_numpy()
+    import fitz  # PyMuPDF
+
+    if pix.n - pix.alpha != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    samples = np.frombuffer(pix.samples, dtype=np.uint8)
+    pixels = samples.reshape(pix.height, pix.stride)[:, : pix.width]
+
+    margin = int(min(pix.width, pix.height) * MARGIN_RATIO)
+    body = pixels[margin : pix.height - margin, margin : pix.width - margin]
+    ink_coverage = float((body < INK_LEVEL).mean()) if body.size else 0.0
+
+    gray = pixels.astype(np.float32)
+    small = _area_resize(gray, HASH_SIZE)
+    dct = _dct_matrix(HASH_SIZE)
+    low = (dct @ small @ dct.T)[:8, :8].ravel()
+    # Skip the DC term, which only reflects overall brightness
+    bits = low > np.median(low[1:])
+    phash = int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    thumbnail = _area_resize(gray, THUMB_SIZE).astype(np.uint8)
+    return PageFingerprint(page_num, phash, round(ink_coverage, 6), thumbnail)
+
+
+@dataclass
+class PageFilter:
+    """
+    Skip blank pages and reuse Markdown for near-duplicate pages
+
+    Pages are checked in document order. A page is blank when almost no ink
+    falls inside its margins. A page is a duplicate of an earlier kept page
+    when their perceptual hashes are close and their thumbnails confirm it,
+    so that dense pages with similar layouts are not merged by the hash alone.
+    """
+
+    blank_ink_ratio: float = 0.001
+    max_hash_distance: int = 6
+    max_mean_diff: float = 3.0  # mean absolute thumbnail difference (0-255)
+    max_pixel_diff: float = 32.0  # largest single thumbnail pixel difference
+    verdicts: dict[int, PageVerdict] = field(default_factory=dict, repr=False)
+    _kept: list[PageFingerprint] = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        _require_numpy()
+
+    def check(self, fingerprint: PageFingerprint) -> PageVerdict:
+        """
+        Classify one page against the pages seen so far
+
+        Args:
+            fingerprint: Fingerprint of the page
+
+        Returns:
+            PageVerdict for the page
+        """
+        page_num = fingerprint.page_num
+        if fingerprint.ink_coverage < self.blank_ink_ratio:
+            verdict = PageVerdict(page_num, PAGE_BLANK, fingerprint.ink_coverage)
+        else:
+            original = self._find_duplicate(fingerprint)
+            if original is not None:
+                verdict = PageVerdict(
+                    page_num, PAGE_DUPLICATE, fingerprint.ink_coverage, original
+                )
+            else:
+                self._kept.append(fingerprint)
+                verdict = PageVerdict(page_num, PAGE_KEEP, fingerprint.ink_coverage)
+
+        if not verdict.needs_llm:
+            logger.debug(
+                f"Page {page_num} filtered: {verdict.action}"
+                + (f" of page {verdict.duplicate_of}" if verdict.duplicate_of else "")
+            )
+        self.verdicts[page_num] = verdict
+        return verdict
+
+    def _find_duplicate(self, fingerprint: PageFingerprint) -> Optional[int]:
+        """Page number of the first kept page matching this one, if any"""
+        for kept in self._kept:
+            if bin(kept.phash ^ fingerprint.phash).count("1") > self.max_hash_distance:
+                continue
+            diff = kept.thumbnail.astype(np.float32) - fingerprint.thumbnail
+            # Ignore a uniform brightness shift between two scans of a page
+            diff = np.abs(diff - diff.mean())
+            if diff.mean() <= self.max_mean_diff and diff.max() <= self.max_pixel_diff:
+                return kept.page_num
+        return None
+
+    @property
+    def blank_pages(self) -> list[int]:
+        """Pages skipped as blank"""
+        return [p for p, v in self.verdicts.items() if v.action == PAGE_BLANK]
+
+    @property
+    def duplicate_pages(self) -> dict[int, int]:
+        """Duplicate page number -> page whose Markdown it reuses"""
+        return {
+            p: v.duplicate_of
+            for p, v in self.verdicts.items()
+            if v.action == PAGE_DUPLICATE
+        }
@@ -0,0 +1,224 @@
+"""
+Process-wide token-bucket rate limiting for requests and tokens per minute
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+try:
+    import redis
+except ImportError:  # redis is only needed for a shared, cross-process budget
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Rough prompt cost of one page image and of the expected answer, used until
+# the response reports the actual usage
+ESTIMATED_IMAGE_TOKENS = 1000
+ESTIMATED_OUTPUT_TOKENS = 1000
+CHARS_PER_TOKEN = 4
+
+# Redis: refill, debit (or refund) and return the wait in seconds atomically
+_RESERVE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local level = tonumber(redis.call('HGET', KEYS[1], 'level') or capacity)
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or now)
+level = math.min(capacity, level + math.max(0, now - updated) * rate)
+level = math.min(capacity, level - amount)
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+if level >= 0 then
+    return '0'
+end
+return tostring(-level / rate)
+"""
+
+
+def estimate_request_tokens(
+    text: str, image_count: int, max_tokens: int = ESTIMATED_OUTPUT_TOKENS
+) -> int:
+    """
+    Estimate the tokens a request will consume before its usage is known
+
+    Args:
+        text: System and user prompt text
+        image_count: Number of images in the request
+        max_tokens: Output token limit of the request
+
+    Returns:
+        Estimated prompt plus output tokens
+    """
+    prompt = math.ceil(len(text) / CHARS_PER_TOKEN)
+    prompt += image_count * ESTIMATED_IMAGE_TOKENS
+    return prompt + min(max_tokens, ESTIMATED_OUTPUT_TOKENS)
+
+
+class MemoryBucketStore:
+    """Token buckets kept in this process, safe to share between threads"""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (level, time)
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, capacity: float, rate: float, amount: float) -> float:
+        """
+        Debit a bucket, allowing it to go into debt
+
+        Args:
+            key: Bucket name
+            capacity: Bucket size (the per-minute limit)
+            rate: Refill per second
+            amount: Units to debit; negative amounts are refunded
+
+        Returns:
+            Seconds until the debt is repaid (0 when the bucket covered it)
+        """
+        with self._lock:
+            now = time.monotonic()
+            level, updated = self._buckets.get(key, (capacity, now))
+            level = min(capacity, level + (now - updated) * rate)
+            level = min(capacity, level - amount)
+            self._buckets[key] = (level, now)
+        return max(0.0, -level / rate)
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by the API and Celery processes"""
+
+    def __init__(self, url: str, prefix: str = "markpdfdown:ratelimit:"):
+        """
+        Args:
+            url: Redis URL, e.g. redis://localhost:6379/0
+            prefix: Namespace of the bucket keys
+        """
+        if redis is None:
+            raise ImportError(
+                "A Redis rate-limit store requires redis; "
+                "install it with `pip install redis`"
+            )
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self, key: str, capacity: float, rate: float, amount: float) -> float:
+        """Same contract as MemoryBucketStore.reserve, atomic across processes"""
+        wait = self._script(keys=[self.prefix + key], args=[capacity, rate, amount])
+        return float(wait)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets per model or API key
+
+    Callers reserve one request and an estimated token count before each
+    API call and sleep until both buckets can cover it, so calls queue
+    instead of failing. Once the response reports its usage, the token
+    bucket is reconciled with the difference to the estimate.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        store: Optional[MemoryBucketStore] = None,
+    ):
+        """
+        Args:
+            rpm: Requests per minute per key (0 = unlimited)
+            tpm: Tokens per minute per key (0 = unlimited)
+            store: Bucket storage (in-process by default)
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.store = store or MemoryBucketStore()
+        self.waited = 0.0  # total seconds callers were held back
+
+    def reserve(self, key: str, tokens: int) -> float:
+        """
+        Debit one request and the estimated tokens
+
+        Args:
+            key: Model name or API key identifier
+            tokens: Estimated tokens of the request
+
+        Returns:
+            Seconds to wait before sending the request
+        """
+        wait = 0.0
+        if self.rpm:
+            wait = self.store.reserve(f"{key}:rpm", self.rpm, self.rpm / 60, 1)
+        if self.tpm:
+            # A request larger than the whole bucket still gets through
+            tokens = min(tokens, self.tpm)
+            wait = max(
+                wait, self.store.reserve(f"{key}:tpm", self.tpm, self.tpm / 60, tokens)
+            )
+        if wait:
+            self.waited += wait
+            logger.debug(f"Rate limit for {key}: waiting {wait:.2f}s")
+        return wait
+
+    async def acquire(self, key: str, tokens: int) -> None:
+        """Reserve and wait without blocking the event loop"""
+        wait = self.reserve(key, tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, key: str, tokens: int) -> None:
+        """Reserve and wait, blocking the calling thread"""
+        wait = self.reserve(key, tokens)
+        if wait:
+            time.sleep(wait)
+
+    def reconcile(self, key: str, estimated: int, actual: int) -> None:
+        """
+        Correct the token bucket once the actual usage is known
+
+        Args:
+            key: Key passed to reserve()
+            estimated: Tokens debited by reserve()
+            actual: Tokens reported by the response (0 for failed calls)
+        """
+        delta = actual - min(estimated, self.tpm)
+        if self.tpm and delta:
+            self.store.reserve(f"{key}:tpm", self.tpm, self.tpm / 60, delta)
+
+
+_shared_limiters: dict[tuple[int, int, str], RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    rpm: int = 0, tpm: int = 0, redis_url: str = ""
+) -> Optional[RateLimiter]:
+    """
+    Process-wide rate limiter for the given limits
+
+    Every caller asking for the same limits gets the same instance, so all
+    LLMClient instances in a process draw from one budget.
+
+    Args:
+        rpm: Requests per minute per key (0 = unlimited)
+        tpm: Tokens per minute per key (0 = unlimited)
+        redis_url: Keep the buckets in Redis to share them across processes
+
+    Returns:
+        The shared RateLimiter, or None when no limit is set
+    """
+    if not (rpm or tpm):
+        return None
+    with _shared_lock:
+        limiter = _shared_limiters.get((rpm, tpm, redis_url))
+        if limiter is None:
+            store = RedisBucketStore(redis_url) if redis_url else None
+            limiter = RateLimiter(rpm, tpm, store)
+            _shared_limiters[(rpm, tpm, redis_url)] = limiter
+        return limiter
@@ -0,0 +1,310 @@
+"""
+Retry, timeout and hedging policy for LLM requests
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _header(headers, name: str) -> Optional[str]:
+    """Case-insensitive header lookup on a dict or httpx.Headers"""
+    if not headers or not hasattr(headers, "items"):
+        return None
+    value = headers.get(name)
+    if value is None and isinstance(headers, dict):
+        lowered = {key.lower(): value for key, value in headers.items()}
+        value = lowered.get(name)
+    return value if isinstance(value, str) else None
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Retry delay requested by the provider in the error's response headers
+
+    Understands retry-after-ms, and retry-after as seconds or an HTTP date.
+
+    Args:
+        error: Exception raised by litellm
+
+    Returns:
+        Seconds to wait, or None when the provider gave no hint
+    """
+    response = getattr(error, "response", None)
+    candidates = (
+        getattr(error, "litellm_response_headers", None),
+        getattr(error, "headers", None),
+        getattr(response, "headers", None),
+    )
+    for headers in candidates:
+        value = _header(headers, "retry-after-ms")
+        if value is not None:
+            try:
+                return max(0.0, float(value) / 1000)
+            except ValueError:
+                pass
+        value = _header(headers, "retry-after")
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            continue
+        return max(0.0, date.timestamp() - time.time())
+    return None
+
+
+class RequestPolicy:
+    """
+    How LLM calls are retried, timed out and hedged
+
+    - Retries back off exponentially with full jitter, unless the provider
+      sent a Retry-After hint, which is honored (up to max_delay).
+    - Each provider call can be bounded by a timeout (see send()); time spent
+      waiting for local rate-limit or concurrency slots does not count.
+    - With hedging, a duplicate call is started once the original's provider
+      request has run longer than the given percentile of recent successful
+      latencies of the same endpoint. The first response wins and the other
+      call is cancelled.
+
+    One policy can be shared by several clients (see get_request_policy());
+    latencies are kept per endpoint and hedge counters are pooled.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        timeout: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        window: int = 200,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            base_delay: Backoff cap of the first retry in seconds, doubled per attempt
+            max_delay: Longest wait between attempts, Retry-After included
+            timeout: Seconds a single call may take (None = no limit)
+            hedge_percentile: Latency percentile (0-100) after which a duplicate
+                call is started (None = no hedging)
+            hedge_min_samples: Successful calls to an endpoint needed before
+                its calls are hedged
+            window: Number of recent latencies per endpoint the percentile is
+                computed over
+            rng: Random source for the jitter (tests pass a seeded one)
+        """
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be between 0 and 100")
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.rng = rng or random.Random()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.window = window
+        self._latencies: dict[Optional[str], deque] = {}
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Seconds to wait before the next attempt
+
+        Args:
+            attempt: Index of the attempt that just failed (0-based)
+            error: The error it failed with, checked for a Retry-After hint
+
+        Returns:
+            The provider's hint, or a jittered exponential delay
+        """
+        hint = retry_after(error) if error is not None else None
+        if hint is not None:
+            return min(hint, self.max_delay)
+        cap = min(self.max_delay, self.base_delay * 2**attempt)
+        return self.rng.uniform(0, cap)
+
+    def observe(self, latency: float, key: Optional[str] = None) -> None:
+        """
+        Record the latency of a successful call
+
+        Args:
+            latency: Seconds the provider took
+            key: Endpoint the call went to (e.g. Endpoint.key)
+        """
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = deque(maxlen=self.window)
+        latencies.append(latency)
+
+    def hedge_delay(self, key: Optional[str] = None) -> Optional[float]:
+        """
+        Seconds after which a call to the endpoint is hedged
+
+        Returns:
+            The configured latency percentile of the endpoint, or None while
+            hedging is off or too few of its latencies have been seen
+        """
+        if self.hedge_percentile is None:
+            return None
+        latencies = self._latencies.get(key, ())
+        if len(latencies) < max(1, self.hedge_min_samples):
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    async def call(
+        self,
+        make_call: Callable[[Optional[asyncio.Future]], Awaitable[T]],
+        hedge: bool = True,
+    ) -> T:
+        """
+        Run one attempt, hedging it when its provider request runs long
+
+        The hedge clock starts when the call hands its provider request to
+        send(): a call still waiting for a local rate-limit or concurrency
+        slot is queued, not slow, and duplicating it would only add load.
+
+        Args:
+            make_call: Returns a fresh awaitable for the call, given the future
+                the call passes on to send(); invoked a second time with None
+                for the hedge
+            hedge: Allow hedging for this call (e.g. off for streamed output)
+
+        Returns:
+            The result of whichever call finished first
+
+        Raises:
+            Exception: The error of the last call to fail when none succeeded
+        """
+        sent = None
+        if hedge and self.hedge_percentile is not None:
+            sent = asyncio.get_running_loop().create_future()
+        calls = [asyncio.ensure_future(make_call(sent))]
+        try:
+            delay = None
+            if sent is not None:
+                await asyncio.wait(
+                    [calls[0], sent], return_when=asyncio.FIRST_COMPLETED
+                )
+                if not calls[0].done():
+                    delay = self.hedge_delay(sent.result())
+            done, _ = await asyncio.wait(calls, timeout=delay)
+            if done:
+                return calls[0].result()
+
+            self.hedges_fired += 1
+            logger.debug(f"Call still running after {delay:.2f}s, sending a hedge")
+            calls.append(asyncio.ensure_future(make_call(None)))
+            pending = set(calls)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is calls[1]:
+                            self.hedges_won += 1
+                        return task.result()
+                if not pending:
+                    # Both calls failed: surface the error of the last one
+                    return done.pop().result()
+        finally:
+            if sent is not None and not sent.done():
+                sent.cancel()
+            # The loser (or both calls, if we were cancelled) is not needed
+            for task in calls:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark a losing error as retrieved
+
+    async def send(
+        self,
+        provider_call: Awaitable[T],
+        key: Optional[str] = None,
+        sent: Optional[asyncio.Future] = None,
+    ) -> T:
+        """
+        Await the provider call under the timeout and learn its latency
+
+        Only the provider call itself is timed: a call waiting for a local
+        slot is not a slow provider.
+
+        Args:
+            provider_call: The request to the provider
+            key: Endpoint the request goes to; latencies are kept per endpoint
+            sent: Future given to call()'s make_call, resolved now to start
+                the hedge clock
+
+        Raises:
+            asyncio.TimeoutError: The call took longer than the timeout
+        """
+        if sent is not None and not sent.done():
+            sent.set_result(key)
+        started = time.monotonic()
+        if self.timeout:
+            result = await asyncio.wait_for(provider_call, self.timeout)
+        else:
+            result = await provider_call
+        self.observe(time.monotonic() - started, key)
+        return result
+
+    def stats(self) -> dict:
+        """Hedge counters and the current hedge threshold of each endpoint"""
+        return {
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedge_delay": {key: self.hedge_delay(key) for key in self._latencies},
+            "samples": {
+                key: len(latencies) for key, latencies in self._latencies.items()
+            },
+        }
+
+
+_shared_policies: dict[tuple, RequestPolicy] = {}
+_shared_lock = threading.Lock()
+
+
+def get_request_policy(
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    timeout: Optional[float] = None,
+    hedge_percentile: Optional[float] = None,
+    hedge_min_samples: int = 20,
+) -> RequestPolicy:
+    """
+    Process-wide request policy for the given settings
+
+    Every caller asking for the same settings gets the same instance, so
+    endpoint latencies learned by one task set the hedge threshold for the
+    next instead of starting over with every task.
+
+    Args:
+        See RequestPolicy
+
+    Returns:
+        The shared RequestPolicy
+    """
+    key = (base_delay, max_delay, timeout, hedge_percentile, hedge_min_samples)
+    with _shared_lock:
+        policy = _shared_policies.get(key)
+        if policy is None:
+            policy = RequestPolicy(*key)
+            _shared_policies[key] = policy
+        return policy
@@ -0,0 +1,281 @@
+"""
+Native text-layer routing: convert born-digital prose pages without the LLM
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ROUTE_TEXT = "text"
+ROUTE_LLM = "llm"
+
+# Span flags set by PyMuPDF
+FLAG_ITALIC = 2
+FLAG_BOLD = 16
+
+BULLET_RE = re.compile(r"^[•◦▪▫●○■□‣⁃·*–-]\s*")
+NUMBERED_RE = re.compile(r"^\(?(\d{1,3}|[a-z])[.)]\s+")
+MATH_FONT_RE = re.compile(r"CMMI|CMSY|CMEX|MSBM|Math|Symbol|STIX", re.IGNORECASE)
+MATH_CHARS = set("∑∫∮∏√∂∇≈≠≡≤≥±∓∞∈∉⊂⊆⊃⊇∪∩⇒⇔∀∃⊗⊕")
+
+
+@dataclass
+class PageRoute:
+    """Routing decision for one page"""
+
+    page_num: int  # 1-based
+    route: str  # ROUTE_TEXT or ROUTE_LLM
+    reason: str
+    char_count: int = 0
+    markdown: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def is_local(self) -> bool:
+        """Whether the page was converted from its text layer"""
+        return self.route == ROUTE_TEXT and self.markdown is not None
+
+
+@dataclass
+class PageRouter:
+    """
+    Decide per page whether the text layer is good enough to skip the LLM
+
+    Only plain prose qualifies: pages with images, vector drawings, formulas,
+    tabular line layouts, multiple columns or too little text are sent to the
+    LLM. Qualifying pages are rendered to Markdown locally, inferring headings
+    from font sizes and keeping lists and paragraphs.
+    """
+
+    min_chars: int = 200
+    max_drawings: int = 2
+    max_tabular_lines: int = 2
+    max_math_chars: int = 2
+    max_replacement_ratio: float = 0.01
+    heading_ratio: float = 1.15
+    max_heading_chars: int = 200
+    margin_ratio: float = 0.06
+
+    def route(self, page, page_num: int) -> PageRoute:
+        """
+        Route one page
+
+        Args:
+            page: fitz page object
+            page_num: 1-based page number
+
+        Returns:
+            PageRoute; markdown is set when the page is converted locally
+        """
+        text_dict = page.get_text("dict", sort=True)
+        if page.get_images() or any(b.get("type") == 1 for b in text_dict["blocks"]):
+            return PageRoute(page_num, ROUTE_LLM, "images")
+
+        if len(page.get_drawings()) > self.max_drawings:
+            return PageRoute(page_num, ROUTE_LLM, "drawings")
+
+        height = text_dict["height"]
+        top, bottom = height * self.margin_ratio, height * (1 - self.margin_ratio)
+        # Drop running headers and footers (page numbers, titles) in the margins
+        blocks = [
+            b
+            for b in text_dict["blocks"]
+            if b.get("type") == 0 and b["bbox"][3] > top and b["bbox"][1] < bottom
+        ]
+        spans = [span for b in blocks for line in b["lines"] for span in line["spans"]]
+        text = "".join(span["text"] for span in spans)
+        char_count = len(text.strip())
+
+        if char_count < self.min_chars:
+            return PageRoute(page_num, ROUTE_LLM, "too little text", char_count)
+        if text.count("�") > char_count * self.max_replacement_ratio:
+            return PageRoute(page_num, ROUTE_LLM, "unreliable text layer", char_count)
+        if (
+            any(MATH_FONT_RE.search(span["font"]) for span in spans)
+            or sum(ch in MATH_CHARS for ch in text) > self.max_math_chars
+        ):
+            return PageRoute(page_num, ROUTE_LLM, "formula", char_count)
+        if self._has_columns(blocks):
+            return PageRoute(page_num, ROUTE_LLM, "multi-column layout", char_count)
+        if self._count_tabular_lines(blocks) > self.max_tabular_lines:
+            return PageRoute(page_num, ROUTE_LLM, "table", char_count)
+
+        markdown = self._to_markdown(blocks)
+        return PageRoute(page_num, ROUTE_TEXT, "prose", char_count, markdown)
+
+    @staticmethod
+    def _count_tabular_lines(blocks: list[dict]) -> int:
+        """Count visual rows whose spans are separated by column-like gaps"""
+        # Table cells often come back as separate lines on a shared baseline
+        rows: dict[int, list[dict]] = {}
+        for block in blocks:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    if span["text"].strip():
+                        rows.setdefault(round(span["bbox"][3]), []).append(span)
+
+        count = 0
+        for spans in rows.values():
+            spans.sort(key=lambda s: s["bbox"][0])
+            if any(
+                cur["bbox"][0] - prev["bbox"][2] > 2 * prev["size"]
+                for prev, cur in zip(spans, spans[1:])
+            ):
+                count += 1
+        return count
+
+    @staticmethod
+    def _has_columns(blocks: list[dict]) -> bool:
+        """Check for text blocks sitting side by side"""
+        for i, a in enumerate(blocks):
+            for b in blocks[i + 1 :]:
+                side_by_side = (
+                    a["bbox"][2] <= b["bbox"][0] or b["bbox"][2] <= a["bbox"][0]
+                )
+                overlap = min(a["bbox"][3], b["bbox"][3]) - max(
+                    a["bbox"][1], b["bbox"][1]
+                )
+                if side_by_side and overlap > 0:
+                    return True
+        return False
+
+    def _to_markdown(self, blocks: list[dict]) -> str:
+        """Render prose blocks to Markdown"""
+        size_chars = Counter()
+        for block in blocks:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    size_chars[round(span["size"] * 2) / 2] += len(span["text"].strip())
+        body_size = size_chars.most_common(1)[0][0]
+
+        block_sizes = [self._block_size(block) for block in blocks]
+        heading_sizes = sorted(
+            {
+                size
+                for block, size in zip(blocks, block_sizes)
+                if size >= body_size * self.heading_ratio
+                and len(self._plain_text(block)) <= self.max_heading_chars
+            },
+            reverse=True,
+        )
+
+        parts = []
+        for block, size in zip(blocks, block_sizes):
+            plain = self._plain_text(block)
+            if not plain:
+                continue
+
+            if size in heading_sizes and len(plain) <= self.max_heading_chars:
+                level = min(heading_sizes.index(size) + 1, 6)
+                parts.append(f"{'#' * level} {plain}")
+            elif self._is_bold_line(block):
+                level = min(len(heading_sizes) + 1, 6)
+                parts.append(f"{'#' * level} {plain}")
+            elif BULLET_RE.match(plain) or NUMBERED_RE.match(plain):
+                parts.append(self._list_markdown(block))
+            else:
+                paragraph = self._join_lines(
+                    [self._styled_line(line) for line in block["lines"]]
+                )
+                if paragraph.startswith("#"):
+                    paragraph = "\\" + paragraph
+                parts.append(paragraph)
+
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def _block_size(block: dict) -> float:
+        """Dominant font size of a block, weighted by characters"""
+        sizes = Counter()
+        for line in block["lines"]:
+            for span in line["spans"]:
+                sizes[round(span["size"] * 2) / 2] += len(span["text"].strip())
+        return sizes.most_common(1)[0][0] if sizes else 0.0
+
+    def _plain_text(self, block: dict) -> str:
+        """Block text with lines joined and no styling"""
+        return self._join_lines(
+            ["".join(s["text"] for s in line["spans"]) for line in block["lines"]]
+        )
+
+    @staticmethod
+    def _is_bold_line(block: dict) -> bool:
+        """Single short line set entirely in bold (a run-in heading)"""
+        spans = [
+            s for line in block["lines"] for s in line["spans"] if s["text"].strip()
+        ]
+        return (
+            len(block["lines"]) == 1
+            and bool(spans)
+            and all(s["flags"] & FLAG_BOLD for s in spans)
+            and len("".join(s["text"] for s in spans).strip()) < 100
+        )
+
+    @staticmethod
+    def _styled_line(line: dict) -> str:
+        """Line text with bold/italic spans wrapped in Markdown emphasis"""
+        runs = []  # [marker, text]
+        for span in line["spans"]:
+            marker = ""
+            if span["flags"] & FLAG_BOLD:
+                marker += "**"
+            if span["flags"] & FLAG_ITALIC:
+                marker += "*"
+            if runs and runs[-1][0] == marker:
+                runs[-1][1] += span["text"]
+            else:
+                runs.append([marker, span["text"]])
+
+        pieces = []
+        for marker, text in runs:
+            stripped = text.strip()
+            if not marker or not stripped:
+                pieces.append(text)
+                continue
+            leading = text[: len(text) - len(text.lstrip())]
+            trailing = text[len(text.rstrip()) :]
+            pieces.append(f"{leading}{marker}{stripped}{marker[::-1]}{trailing}")
+        return "".join(pieces)
+
+    @staticmethod
+    def _join_lines(lines: list[str]) -> str:
+        """Join wrapped lines into one paragraph, undoing end-of-line hyphens"""
+        text = ""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if text.endswith("-") and line[:1].islower():
+                text = text[:-1] + line
+            elif text:
+                text += " " + line
+            else:
+                text = line
+        return text
+
+    def _list_markdown(self, block: dict) -> str:
+        """Render a block of list items, one item per marker line"""
+        items: list[list[str]] = []
+        for line in block["lines"]:
+            text = self._styled_line(line).strip()
+            plain = "".join(s["text"] for s in line["spans"]).strip()
+            if BULLET_RE.match(plain) or NUMBERED_RE.match(plain) or not items:
+                items.append([text])
+            else:
+                items[-1].append(text)
+
+        rendered = []
+        for lines in items:
+            item = self._join_lines(lines)
+            numbered = NUMBERED_RE.match(item)
+            bullet = BULLET_RE.match(item)
+            if numbered and numbered.group(1).isdigit():
+                rendered.append(f"{numbered.group(1)}. {item[numbered.end() :]}")
+            elif bullet:
+                rendered.append(f"- {item[bullet.end() :]}")
+            else:
+                rendered.append(f"- {item}")
+        return "\n".join(rendered)
@@ -0,0 +1,279 @@
+"""
+Split oversized pages into overlapping horizontal bands and stitch the results
+"""
+
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Union
+
+import fitz  # PyMuPDF
+
+from .file_worker import IMAGE_MIME_TYPES, PageImage
+
+logger = logging.getLogger(__name__)
+
+# Overlaps matching fewer characters than this are treated as coincidence
+MIN_OVERLAP_CHARS = 6
+# Similarity above which a line is taken as a cut-off copy of another
+CUT_LINE_SIMILARITY = 0.8
+
+_SEPARATOR_PATTERN = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@dataclass
+class PageTiler:
+    """
+    Decide when a page is converted as several bands, and cut the bands
+
+    A page is split when it is much taller than wide (long receipts,
+    drawings), when it has more pixels than a provider keeps legible
+    (A3 sheets), or when its estimated output would not fit comfortably in
+    max_tokens (dense spreadsheets). Neighbouring bands overlap by a
+    fraction of the page height so no line is lost at a cut.
+    """
+
+    max_aspect: float = 2.0
+    max_bands: int = 4
+    overlap: float = 0.05
+    max_pixels: int = 2048 * 2048
+    output_share: float = 0.6  # share of max_tokens one band should fill at most
+
+    def band_count(
+        self,
+        width: int,
+        height: int,
+        estimated_tokens: int = 0,
+        max_tokens: int = 0,
+    ) -> int:
+        """
+        Number of bands a page of this size and estimated output needs
+
+        Args:
+            width: Page image width in pixels
+            height: Page image height in pixels
+            estimated_tokens: Estimated output tokens of the page (0 = unknown)
+            max_tokens: Output token limit of one request (0 = unknown)
+
+        Returns:
+            Band count between 1 (no tiling) and max_bands
+        """
+        if width <= 0 or height <= 0:
+            return 1
+        bands = math.ceil(height / width / self.max_aspect)
+        if self.max_pixels:
+            bands = max(bands, math.ceil(width * height / self.max_pixels))
+        if estimated_tokens and max_tokens:
+            budget = max(1, int(max_tokens * self.output_share))
+            bands = max(bands, math.ceil(estimated_tokens / budget))
+        return max(1, min(bands, self.max_bands))
+
+    def plan(
+        self,
+        image: Union[str, PageImage],
+        estimated_tokens: int = 0,
+        max_tokens: int = 0,
+    ) -> int:
+        """
+        Band count for a rendered page image
+
+        Args:
+            image: Page image path or in-memory PageImage
+            estimated_tokens: Estimated output tokens of the page (0 = unknown)
+            max_tokens: Output token limit of one request (0 = unknown)
+
+        Returns:
+            Band count between 1 (no tiling) and max_bands
+        """
+        pix = _load_pixmap(image)
+        return self.band_count(pix.width, pix.height, estimated_tokens, max_tokens)
+
+    def split(self, image: Union[str, PageImage], bands: int) -> list[PageImage]:
+        """
+        Cut a page image into overlapping horizontal bands
+
+        Args:
+            image: Page image path or in-memory PageImage
+            bands: Number of bands
+
+        Returns:
+            Band images from top to bottom, encoded like the source image
+            (PNG for formats other than JPEG)
+        """
+        pix = _load_pixmap(image)
+        if isinstance(image, PageImage):
+            page_num, mime_type = image.page_num, image.mime_type
+        else:
+            page_num = 0
+            ext = os.path.splitext(image)[1].lower().lstrip(".")
+            mime_type = IMAGE_MIME_TYPES.get(ext, "image/png")
+        fmt = "png" if mime_type == "image/png" else "jpg"
+        if pix.alpha and fmt == "jpg":
+            pix = fitz.Pixmap(pix, 0)
+
+        step = pix.height / bands
+        margin = int(pix.height * self.overlap / 2)
+        result = []
+        for band in range(bands):
+            top = max(0, int(band * step) - margin)
+            bottom = min(pix.height, int((band + 1) * step) + margin)
+            rect = fitz.IRect(0, top, pix.width, bottom)
+            band_pix = fitz.Pixmap(pix.colorspace, rect, pix.alpha)
+            band_pix.copy(pix, rect)
+            result.append(
+                PageImage(
+                    page_num=page_num, data=band_pix.tobytes(fmt), mime_type=mime_type
+                )
+            )
+        return result
+
+
+def _load_pixmap(image: Union[str, PageImage]) -> "fitz.Pixmap":
+    """Decode a page image path or PageImage"""
+    if isinstance(image, PageImage):
+        return fitz.Pixmap(image.data)
+    return fitz.Pixmap(image)
+
+
+def _normalize(line: str) -> str:
+    """Comparison key of a line: whitespace and case do not count"""
+    return _WHITESPACE_PATTERN.sub("", line).lower()
+
+
+def _is_table_row(line: str) -> bool:
+    return line.strip().startswith("|")
+
+
+def _overlap(prev: list[str], nxt: list[str], max_lines: int) -> tuple[int, int, int]:
+    """
+    Find the lines the end of one band repeats at the start of the next
+
+    Either band may additionally have one line cut in half at the band edge,
+    which the other band has in full; the cut copy is skipped when it is
+    similar enough to the full one.
+
+    Returns:
+        (lines to drop from the end of prev, lines to drop from the start of
+        nxt, matched lines); all zero when no overlap was found
+    """
+    a = [_normalize(line) for line in prev]
+    b = [_normalize(line) for line in nxt]
+    best = (0, 0, 0)
+    for skip_a in range(2):
+        end = len(a) - skip_a
+        for skip_b in range(2):
+            longest = min(end, len(b) - skip_b, max_lines)
+            for k in range(longest, best[2], -1):
+                if a[end - k : end] != b[skip_b : skip_b + k]:
+                    continue
+                if sum(len(key) for key in a[end - k : end]) < MIN_OVERLAP_CHARS:
+                    break
+                if skip_a and not (
+                    skip_b + k < len(b) and _is_cut_copy(a[end], b[skip_b + k])
+                ):
+                    break
+                if skip_b and not (end - k > 0 and _is_cut_copy(b[0], a[end - k - 1])):
+                    break
+                best = (skip_a, skip_b + k, k)
+                break
+    return best
+
+
+def _is_cut_copy(cut: str, full: str) -> bool:
+    """Whether a line read across a band edge is a partial copy of another"""
+    if cut in full or full in cut:
+        return True
+    return SequenceMatcher(None, cut, full).ratio() >= CUT_LINE_SIMILARITY
+
+
+def _table_header(lines: list[str]) -> list[str]:
+    """Header and separator rows of the table the lines end in (if any)"""
+    if not lines or not _is_table_row(lines[-1]):
+        return []
+    start = len(lines)
+    while start > 0 and _is_table_row(lines[start - 1]):
+        start -= 1
+    table = lines[start:]
+    if len(table) >= 2 and _SEPARATOR_PATTERN.match(table[1].strip()):
+        return table[:2]
+    return []
+
+
+def stitch_bands(parts: list[str], max_overlap_lines: int = 20) -> str:
+    """
+    Join the Markdown of consecutive bands of one page
+
+    Lines (and table rows) repeated in the overlap of two bands are kept once,
+    a table header the model repeated at the top of a band that continues a
+    table is dropped, and table rows split across bands are joined into one
+    table.
+
+    Args:
+        parts: Markdown of each band, top to bottom
+        max_overlap_lines: Longest run of repeated lines looked for
+
+    Returns:
+        Markdown of the whole page
+    """
+    lines: list[str] = []
+    for part in parts:
+        nxt = [line.rstrip() for line in part.strip().splitlines()]
+        if not nxt:
+            continue
+        if not lines:
+            lines = nxt
+            continue
+
+        # Compare content lines only; blank lines keep the paragraphs apart
+        prev_content = [i for i, line in enumerate(lines) if line]
+        next_content = [i for i, line in enumerate(nxt) if line]
+        drop_tail, drop_head, matched = _overlap(
+            [lines[i] for i in prev_content],
+            [nxt[i] for i in next_content],
+            max_overlap_lines,
+        )
+        paragraph_break = None
+        if matched:
+            logger.debug(f"Band overlap: {matched} repeated lines removed")
+            if drop_tail:
+                lines = _strip_blank(lines[: prev_content[-drop_tail]])
+            # The rest follows the repeated lines directly, so the next band
+            # tells whether a blank line separates them
+            rest = nxt[next_content[drop_head - 1] + 1 :]
+            paragraph_break = bool(rest) and not rest[0]
+            nxt = _strip_blank(rest)
+
+        header = _table_header(lines)
+        if header and [_normalize(line) for line in nxt[:2]] == [
+            _normalize(line) for line in header
+        ]:
+            nxt = _strip_blank(nxt[2:])
+            paragraph_break = False
+        if not nxt:
+            continue
+        if not lines:
+            lines = nxt
+            continue
+
+        if paragraph_break is None:
+            # No overlap found: blank line between blocks, none between the
+            # rows of a table that carries on
+            paragraph_break = not (_is_table_row(lines[-1]) and _is_table_row(nxt[0]))
+        if paragraph_break:
+            lines.append("")
+        lines.extend(nxt)
+    return "\n".join(lines)
+
+
+def _strip_blank(lines: list[str]) -> list[str]:
+    """Drop leading and trailing blank lines"""
+    start, end = 0, len(lines)
+    while start < end and not lines[start]:
+        start += 1
+    while end > start and not lines[end - 1]:
+        end -= 1
+    return lines[start:end]
@@ -10,8 +10,15 @@ import time
 from typing import Optional
 
 from .config import config
-from .core.file_worker import create_worker
+from .core.cache import CompletionCache
+from .core.cassette import get_cassette
+from .core.endpoint_pool import Endpoint, EndpointPool
+from .core.file_worker import PDFWorker, create_worker
+from .core.image_encoding import ImageEncoder
 from .core.llm_client import LLMClient
+from .core.page_filter import PAGE_BLANK, PAGE_DUPLICATE, PageFilter
+from .core.rate_limit import get_rate_limiter
+from .core.request_policy import RequestPolicy
 from .core.utils import detect_file_type, remove_markdown_wrap
 
 logger = logging.getLogger(__name__)
@@ -54,15 +61,30 @@ Output Example:
             retry_times=config.retry_times,
         )
 
+        # LLMClient returns a CompletionResult; plain strings are accepted too
+        content = response.content if hasattr(response, "content") else response
+
         # Remove markdown wrapper if present
-        response = remove_markdown_wrap(response, "markdown")
-        return response
+        return remove_markdown_wrap(content, "markdown")
 
     except Exception as e:
         logger.error(f"Failed to convert image {image_path}: {e}")
         return ""
 
 
+def _merge_pages(markdown_parts: list[str]) -> str:
+    """
+    Combine the Markdown of all pages into one document
+
+    Args:
+        markdown_parts: Page Markdown in page order
+
+    Returns:
+        Document Markdown
+    """
+    return "\n\n".join(markdown_parts)
+
+
 def convert_to_markdown(
     input_data: bytes,
     start_page: int = 1,
@@ -125,20 +147,102 @@ def convert_to_markdown(
         worker = create_worker(input_path, start_page, end_page)
 
         # Convert to images
-        img_paths = worker.convert_to_images()
+        page_filter = None
+        if config.page_filter and isinstance(worker, PDFWorker):
+            page_filter = PageFilter(
+                blank_ink_ratio=config.blank_ink_ratio,
+                max_hash_distance=config.duplicate_hash_distance,
+                max_mean_diff=config.duplicate_mean_diff,
+            )
+        img_paths = list(
+            worker.convert_to_images(
+                workers=config.render_workers,
+                adaptive_dpi=config.adaptive_dpi,
+                route_text=config.text_fast_path,
+                page_filter=page_filter,
+            )
+        )
         if not img_paths:
             raise ValueError("Failed to convert file to images")
 
         logger.info(f"Generated {len(img_paths)} images")
 
+        # Page numbers by image path (PDF pages are yielded in page order)
+        page_nums = {}
+        if isinstance(worker, PDFWorker):
+            page_nums = {
+                img_path: index + 1
+                for index, img_path in zip(worker.page_indices, img_paths)
+            }
+
         # Initialize LLM client
-        llm_client = LLMClient(config.model_name)
+        cache = None
+        if config.cache_path:
+            cache = CompletionCache(config.cache_path, config.cache_max_mb * 1024**2)
+        encoder = None
+        if config.image_encoding:
+            encoder = ImageEncoder.for_model(
+                config.model_name, config.image_quality, config.image_max_edge
+            )
+        rate_limiter = get_rate_limiter(
+            config.rpm_limit, config.tpm_limit, config.rate_limit_redis_url
+        )
+        policy = RequestPolicy(
+            base_delay=config.retry_base_delay,
+            max_delay=config.retry_max_delay,
+            timeout=config.request_timeout or None,
+        )
+        pool = None
+        if config.llm_endpoints:
+            pool = EndpointPool.from_json(
+                config.llm_endpoints,
+                default=Endpoint(config.model_name),
+                eject_after=config.endpoint_eject_after,
+                eject_seconds=config.endpoint_eject_seconds,
+            )
+        cassette = get_cassette(
+            config.cassette_path,
+            config.cassette_mode,
+            config.cassette_on_miss,
+            config.cassette_latency_scale,
+        )
+        llm_client = LLMClient(
+            config.model_name,
+            cache=cache,
+            encoder=encoder,
+            rate_limiter=rate_limiter,
+            policy=policy,
+            pool=pool,
+            cassette=cassette,
+        )
 
         # Convert images to markdown
         markdown_parts = []
+        page_contents = {}
+        local_pages = 0
         for img_path in sorted(img_paths):
-            logger.info(f"Converting image: {os.path.basename(img_path)}")
-            content = convert_image_to_markdown(img_path, llm_client)
+            page_num = page_nums.get(img_path)
+            route = worker.page_routes.get(page_num) if page_num else None
+            verdict = worker.page_verdicts.get(page_num) if page_num else None
+            if verdict and verdict.action == PAGE_BLANK:
+                logger.info(f"Skipping blank page: {os.path.basename(img_path)}")
+                continue
+            if verdict and verdict.action == PAGE_DUPLICATE:
+                logger.info(
+                    f"Reusing page {verdict.duplicate_of} for duplicate page: "
+                    f"{os.path.basename(img_path)}"
+                )
+                content = page_contents.get(verdict.duplicate_of, "")
+            elif route and route.is_local:
+                logger.info(
+                    f"Converting page from text layer: {os.path.basename(img_path)}"
+                )
+                content = route.markdown
+                local_pages += 1
+            else:
+                logger.info(f"Converting image: {os.path.basename(img_path)}")
+                content = convert_image_to_markdown(img_path, llm_client)
+            page_contents[page_num] = content
             if content:
                 # Save individual page markdown (optional)
                 page_md_path = os.path.join(
@@ -149,8 +253,27 @@ def convert_to_markdown(
 
                 markdown_parts.append(content)
 
-        # Combine all markdown content
-        final_markdown = "\n\n".join(markdown_parts)
+        if config.text_fast_path and page_nums:
+            logger.info(
+                f"Text fast path: {local_pages} of {len(img_paths)} pages converted "
+                f"locally, {local_pages} LLM calls saved"
+            )
+        if page_filter:
+            logger.info(
+                f"Page filter: {len(page_filter.blank_pages)} blank pages skipped, "
+                f"{len(page_filter.duplicate_pages)} duplicate pages reused"
+            )
+
+        if cache:
+            stats = cache.stats()
+            logger.info(
+                f"Completion cache: {stats['hits']} hits, {stats['misses']} misses"
+            )
+            cache.close()
+        if cassette:
+            logger.info(f"Cassette {cassette.mode}: {cassette.stats()}")
+
+        final_markdown = _merge_pages(markdown_parts)
 
         logger.info("Conversion completed successfully")
         return final_markdown
@@ -0,0 +1,7 @@
+"""
+Test and benchmark helpers for MarkPDFDown
+"""
+
+from .mock_llm import MockLLMServer, page_markdown, parse_latency
+
+__all__ = ["MockLLMServer", "page_markdown", "parse_latency"]
@@ -0,0 +1,490 @@
+"""
+Local OpenAI-compatible chat-completions server for offline load testing
+
+The server answers multimodal chat-completion requests with deterministic
+Markdown (the same request always gets the same page), realistic token usage,
+a configurable latency distribution, optional streaming, injected 429/500
+errors and RPM/TPM rate limits. Point LLMClient at it with an
+``openai/<name>`` model and ``LLM_BASE_URL``/``api_base`` set to
+``MockLLMServer.base_url``.
+
+Run it standalone with ``python -m markpdfdown.testing.mock_llm --port 8089``.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Input tokens billed per image (a 1024x1024 image at high detail)
+IMAGE_TOKENS = 765
+# Characters per text token
+CHARS_PER_TOKEN = 4
+# Characters per streamed chunk
+STREAM_CHUNK_CHARS = 24
+
+WORDS = (
+    "analysis data model result method system value process table section "
+    "figure sample measure report design network signal energy flow rate "
+    "structure function control review summary context report input output"
+).split()
+
+_PAGES_PATTERN = re.compile(r"consecutive pages ([\d, ]+) of")
+
+LatencyModel = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> LatencyModel:
+    """
+    Build a latency model from a short spec
+
+    Args:
+        spec: One of ``fixed:S``, ``uniform:LOW,HIGH``, ``lognormal:MEDIAN,SIGMA``
+            or ``exponential:MEAN`` (seconds); a bare number means fixed
+
+    Returns:
+        Function drawing one latency in seconds from a random source
+
+    Raises:
+        ValueError: If the spec is not understood
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    try:
+        values = [float(value) for value in args.split(",")]
+    except ValueError as e:
+        raise ValueError(f"Invalid latency spec: {spec!r}") from e
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        if median <= 0:
+            return lambda rng: 0.0
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def page_markdown(seed: bytes, chars: int = 2400) -> str:
+    """
+    Deterministic Markdown page with headings, prose, a table and a formula
+
+    Args:
+        seed: Bytes the content is derived from (same seed, same page)
+        chars: Approximate length of the page in characters
+
+    Returns:
+        Markdown text
+    """
+    rng = random.Random(hashlib.sha256(seed).digest())
+
+    def sentence() -> str:
+        words = rng.choices(WORDS, k=rng.randint(8, 16))
+        return " ".join(words).capitalize() + "."
+
+    parts = [f"# {' '.join(rng.choices(WORDS, k=3)).title()}"]
+    table = ["| Item | Value | Rate |", "|---|---|---|"]
+    table += [
+        f"| {rng.choice(WORDS)} | {rng.randint(1, 999)} | {rng.random():.2f} |"
+        for _ in range(rng.randint(3, 6))
+    ]
+    formula = f"$$\nE_{{{rng.randint(1, 9)}}} = \\sum_{{i=1}}^{{n}} x_i^2\n$$"
+    size = sum(len(part) for part in parts)
+    paragraphs = 0
+    while size < chars:
+        paragraph = " ".join(sentence() for _ in range(rng.randint(3, 5)))
+        parts.append(paragraph)
+        size += len(paragraph)
+        paragraphs += 1
+        if paragraphs == 2:
+            parts.append("\n".join(table))
+        elif paragraphs == 4:
+            parts.append(f"## {' '.join(rng.choices(WORDS, k=2)).title()}")
+            parts.append(formula)
+    return "\n\n".join(parts)
+
+
+class _Limits:
+    """Sliding one-minute request and token windows"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests: deque = deque()
+        self._tokens: deque = deque()  # (time, tokens)
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int) -> Optional[float]:
+        """Record a request, or return seconds until it would fit"""
+        with self._lock:
+            now = time.monotonic()
+            while self._requests and self._requests[0] <= now - 60:
+                self._requests.popleft()
+            while self._tokens and self._tokens[0][0] <= now - 60:
+                self._tokens.popleft()
+            if self.rpm and len(self._requests) >= self.rpm:
+                return self._requests[0] + 60 - now
+            used = sum(count for _, count in self._tokens)
+            if self.tpm and self._tokens and used + tokens > self.tpm:
+                return self._tokens[0][0] + 60 - now
+            self._requests.append(now)
+            self._tokens.append((now, tokens))
+            return None
+
+
+class MockLLMServer:
+    """
+    OpenAI-compatible chat-completions server running in a background thread
+
+    Usable as a context manager::
+
+        with MockLLMServer(latency="lognormal:0.8,0.4", error_429=0.05) as server:
+            client = LLMClient(
+                "openai/mock",
+                pool=EndpointPool([Endpoint("openai/mock", "sk-mock", server.base_url)]),
+            )
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed:0",
+        error_429: float = 0.0,
+        error_500: float = 0.0,
+        rpm: int = 0,
+        tpm: int = 0,
+        page_chars: int = 2400,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            host: Interface to listen on
+            port: TCP port (0 = pick a free one)
+            latency: Latency distribution of a response, see parse_latency
+            error_429: Probability of answering a request with 429
+            error_500: Probability of answering a request with 500
+            rpm: Requests per minute before answering 429 (0 = unlimited)
+            tpm: Tokens per minute before answering 429 (0 = unlimited)
+            page_chars: Approximate length of a generated page
+            seed: Seed of the latency and error draws
+        """
+        self.latency = parse_latency(latency)
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.page_chars = page_chars
+        self.rng = random.Random(seed)
+        self.limits = _Limits(rpm, tpm)
+        self.requests = 0
+        self.injected_errors = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure as api_base / LLM_BASE_URL"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """Serve requests in a daemon thread"""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-llm", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Mock LLM server listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        """Request and error counters"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "injected_errors": self.injected_errors,
+                "rate_limited": self.rate_limited,
+            }
+
+    def _draw(self) -> tuple[float, float]:
+        """Latency and error draw of one request (thread-safe)"""
+        with self._lock:
+            self.requests += 1
+            return max(0.0, self.latency(self.rng)), self.rng.random()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def respond(self, body: dict) -> tuple[int, dict, object]:
+        """
+        Answer one chat-completions request
+
+        Args:
+            body: Decoded JSON request body
+
+        Returns:
+            (HTTP status, extra headers, JSON body or list of stream chunks)
+        """
+        latency, draw = self._draw()
+        messages = body.get("messages") or []
+        text, images = _request_content(messages)
+        prompt_tokens = len(text) // CHARS_PER_TOKEN + len(images) * IMAGE_TOKENS
+
+        if draw < self.error_429:
+            self._count("injected_errors")
+            return _error(429, "Rate limit reached (injected)", retry_after=1)
+        if draw < self.error_429 + self.error_500:
+            self._count("injected_errors")
+            return _error(500, "Internal server error (injected)")
+        wait = self.limits.admit(prompt_tokens)
+        if wait is not None:
+            self._count("rate_limited")
+            return _error(429, "Rate limit reached", retry_after=max(1, round(wait)))
+
+        content = self._content(text, images)
+        finish_reason = "stop"
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+            content = content[: max_tokens * CHARS_PER_TOKEN]
+            finish_reason = "length"
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": -(-len(content) // CHARS_PER_TOKEN),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        response = {
+            "id": f"chatcmpl-mock-{hashlib.sha256(content.encode()).hexdigest()[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+        }
+
+        if not body.get("stream"):
+            time.sleep(latency)
+            return (
+                200,
+                {},
+                {
+                    **response,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+
+        # Streamed: a fifth of the latency before the first token, the rest
+        # spread over the chunks
+        pieces = [
+            content[start : start + STREAM_CHUNK_CHARS]
+            for start in range(0, len(content), STREAM_CHUNK_CHARS)
+        ]
+        delay = latency * 0.8 / max(1, len(pieces))
+        chunk = {**response, "object": "chat.completion.chunk"}
+        chunks = [(latency * 0.2, _delta(chunk, {"role": "assistant"}))]
+        chunks += [(delay, _delta(chunk, {"content": piece})) for piece in pieces]
+        chunks.append((0.0, _delta(chunk, {}, finish_reason)))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunks.append((0.0, {**chunk, "choices": [], "usage": usage}))
+        return 200, {}, chunks
+
+    def _content(self, text: str, images: list[str]) -> str:
+        """Markdown for the request; packed requests get one page per image"""
+        seed = (text + "".join(images)).encode("utf-8")
+        if len(images) < 2:
+            return page_markdown(seed, self.page_chars)
+        match = _PAGES_PATTERN.search(text)
+        page_nums = (
+            [int(n) for n in re.findall(r"\d+", match.group(1))] if match else []
+        )
+        if len(page_nums) != len(images):
+            page_nums = list(range(1, len(images) + 1))
+        return "\n\n".join(
+            f"<!-- PAGE {page_num} -->\n\n"
+            + page_markdown(image.encode("utf-8"), self.page_chars)
+            for page_num, image in zip(page_nums, images)
+        )
+
+
+def _request_content(messages: list) -> tuple[str, list[str]]:
+    """Concatenated text and image URLs of the request messages"""
+    text, images = [], []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            text.append(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                text.append(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                url = part.get("image_url")
+                images.append(url.get("url", "") if isinstance(url, dict) else url)
+    return "\n".join(text), images
+
+
+def _delta(chunk: dict, delta: dict, finish_reason: Optional[str] = None) -> dict:
+    return {
+        **chunk,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _error(
+    status: int, message: str, retry_after: Optional[int] = None
+) -> tuple[int, dict, dict]:
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    kind = "rate_limit_error" if status == 429 else "server_error"
+    return status, headers, {"error": {"message": message, "type": kind}}
+
+
+def _handler_for(server: MockLLMServer) -> type:
+    """Request handler class bound to one MockLLMServer"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002
+            logger.debug("%s - " + format, self.address_string(), *args)
+
+        def do_GET(self):  # noqa: N802
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {}, {"object": "list", "data": [{"id": "mock"}]})
+            elif self.path.rstrip("/").endswith("/health"):
+                self._send_json(200, {}, {"status": "ok", **server.stats()})
+            else:
+                self._send_json(404, {}, {"error": {"message": "Not found"}})
+
+        def do_POST(self):  # noqa: N802
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {}, {"error": {"message": "Invalid JSON"}})
+                return
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {}, {"error": {"message": "Not found"}})
+                return
+
+            status, headers, payload = server.respond(body)
+            if isinstance(payload, list):
+                self._send_stream(payload)
+            else:
+                self._send_json(status, headers, payload)
+
+        def _send_json(self, status: int, headers: dict, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, chunks: list) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for delay, chunk in chunks:
+                    if delay:
+                        time.sleep(delay)
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away (e.g. a cancelled hedge)
+                self.close_connection = True
+
+        def _write_chunk(self, text: str) -> None:
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the mock server in the foreground"""
+    parser = argparse.ArgumentParser(
+        prog="markpdfdown-mock-llm",
+        description="Local OpenAI-compatible mock LLM server for load testing",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8089, help="TCP port")
+    parser.add_argument(
+        "--latency",
+        default="lognormal:1.0,0.4",
+        help="fixed:S | uniform:LOW,HIGH | lognormal:MEDIAN,SIGMA | exponential:MEAN",
+    )
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 rate")
+    parser.add_argument("--error-500", type=float, default=0.0, help="500 rate")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens per minute")
+    parser.add_argument(
+        "--page-chars", type=int, default=2400, help="Length of a generated page"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        page_chars=args.page_chars,
+        seed=args.seed,
+    ).start()
+    print(f"Mock LLM server: LLM_BASE_URL={server.base_url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from markpdfdown.testing import MockLLMServer
+
 
 @pytest.fixture
 def fixtures_dir():
@@ -61,6 +63,13 @@ def mock_litellm_completion(mock_llm_response):
         yield mock_completion
 
 
+@pytest.fixture
+def mock_llm_server():
+    """Start a local OpenAI-compatible mock LLM server for one test"""
+    with MockLLMServer() as server:
+        yield server
+
+
 @pytest.fixture
 def sample_png_bytes():
     """Return sample PNG file bytes (magic number)"""
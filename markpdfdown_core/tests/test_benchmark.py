@@ -0,0 +1,152 @@
+"""
+Tests for markpdfdown.benchmark package
+"""
+
+import asyncio
+import json
+
+import fitz
+
+from markpdfdown.benchmark import (
+    StageProfiler,
+    compare_reports,
+    run_benchmark,
+    synthetic_pdf,
+)
+from markpdfdown.benchmark.profiler import percentile
+
+
+class Pipeline:
+    """Stand-in with one method of each calling convention"""
+
+    def render(self):
+        yield from range(3)
+
+    def encode(self, value):
+        return value * 2
+
+    async def call(self, value):
+        await asyncio.sleep(0)
+        return value + 1
+
+
+def report(pages_per_second=10.0, llm=1.0, rss=100.0):
+    """Minimal report with the given summary"""
+    return {
+        "summary": {
+            "pages_per_second": pages_per_second,
+            "stages": {"llm": {"seconds": llm}},
+            "peak_rss_mb": rss,
+        }
+    }
+
+
+class TestSyntheticPdf:
+    """Tests for synthetic_pdf"""
+
+    def test_pages_and_content(self):
+        """Test the document has the pages, text and figures asked for"""
+        document = fitz.open(stream=synthetic_pdf(8), filetype="pdf")
+
+        assert document.page_count == 8
+        assert document[0].get_text().startswith("1. ")
+        # Every fourth page starting with the third carries a figure
+        assert [bool(page.get_images()) for page in document] == [
+            False,
+            False,
+            True,
+            False,
+        ] * 2
+
+    def test_deterministic(self):
+        """Test the same seed gives the same document"""
+        assert synthetic_pdf(2, seed=1) == synthetic_pdf(2, seed=1)
+        assert synthetic_pdf(2, seed=1) != synthetic_pdf(2, seed=2)
+
+
+class TestStageProfiler:
+    """Tests for StageProfiler"""
+
+    def test_times_every_calling_convention(self):
+        """Test plain, async and generator methods are timed per call or item"""
+        targets = [
+            (Pipeline, "render", "render"),
+            (Pipeline, "encode", "encode"),
+            (Pipeline, "call", "llm"),
+        ]
+        pipeline = Pipeline()
+
+        with StageProfiler(targets) as profiler:
+            assert list(pipeline.render()) == [0, 1, 2]
+            assert pipeline.encode(2) == 4
+            assert asyncio.run(pipeline.call(1)) == 2
+
+        stages = profiler.report()
+        assert {stage: stats["calls"] for stage, stats in stages.items()} == {
+            "render": 3,
+            "encode": 1,
+            "llm": 1,
+        }
+        assert stages["llm"]["seconds"] >= 0
+
+    def test_restores_methods(self):
+        """Test the wrapped methods are put back on exit"""
+        original = Pipeline.__dict__["encode"]
+
+        with StageProfiler([(Pipeline, "encode", "encode")]):
+            assert Pipeline.__dict__["encode"] is not original
+
+        assert Pipeline.__dict__["encode"] is original
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+
+class TestCompareReports:
+    """Tests for compare_reports"""
+
+    def test_no_regression_within_tolerance(self):
+        """Test small changes are not regressions"""
+        assert compare_reports(report(), report(9.5, 1.05, 105.0)) == []
+
+    def test_regressions(self):
+        """Test slower throughput, slower stages and more memory are reported"""
+        regressions = compare_reports(report(), report(8.0, 1.5, 130.0))
+
+        assert regressions == [
+            "throughput 10.0 -> 8.0 pages/s",
+            "llm 1.000s -> 1.500s",
+            "peak RSS 100.0 -> 130.0 MB",
+        ]
+
+    def test_stage_noise_ignored(self):
+        """Test growth below min_seconds is ignored however large relatively"""
+        assert compare_reports(report(llm=0.001), report(llm=0.005)) == []
+
+
+class TestRunBenchmark:
+    """Tests for run_benchmark"""
+
+    def test_core_pipeline_report(self):
+        """Test a short run of the core pipeline produces a full JSON report"""
+        result = run_benchmark(pages=2, runs=2, latency="fixed:0", warmup=False)
+
+        run = result["runs"][0]
+        assert run["pages"] == 2
+        assert run["llm_requests"] == 2
+        assert run["pages_per_second"] > 0
+        assert {stage: stats["calls"] for stage, stats in run["stages"].items()} == {
+            "render": 2,
+            "encode": 2,
+            "llm": 2,
+            "merge": 1,
+        }
+        assert result["params"]["pages"] == 2
+        assert len(result["runs"]) == 2
+        assert result["summary"]["wall_seconds"] > 0
+        json.dumps(result)
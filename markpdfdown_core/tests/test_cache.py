@@ -0,0 +1,148 @@
+"""
+Tests for markpdfdown.core.cache module
+"""
+
+import pytest
+
+from markpdfdown.core.cache import CompletionCache, cache_key, get_completion_cache
+from markpdfdown.core.llm_client import CompletionResult
+
+IMAGE = [("image/jpeg", b"\xff\xd8\xff page one")]
+
+
+def make_key(**overrides):
+    """Build a cache key from default request parameters"""
+    params = {
+        "model_name": "gpt-4o",
+        "user_message": "Convert",
+        "system_prompt": "You convert pages",
+        "images": IMAGE,
+        "temperature": 0.3,
+        "max_tokens": 8192,
+    }
+    params.update(overrides)
+    return cache_key(**params)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Return a cache stored in a temporary directory"""
+    completion_cache = CompletionCache(str(tmp_path / "cache" / "llm.sqlite"))
+    yield completion_cache
+    completion_cache.close()
+
+
+class TestCacheKey:
+    """Tests for cache_key"""
+
+    def test_same_request_same_key(self):
+        """Test the key is stable for identical requests"""
+        assert make_key() == make_key()
+
+    @pytest.mark.parametrize(
+        "override",
+        [
+            {"model_name": "gpt-4o-mini"},
+            {"user_message": "Transcribe"},
+            {"system_prompt": None},
+            {"images": [("image/jpeg", b"\xff\xd8\xff page two")]},
+            {"images": [("image/png", b"\xff\xd8\xff page one")]},
+            {"images": IMAGE * 2},
+            {"temperature": 0.0},
+            {"max_tokens": 4096},
+        ],
+    )
+    def test_any_parameter_changes_key(self, override):
+        """Test every request parameter is part of the key"""
+        assert make_key(**override) != make_key()
+
+
+class TestCompletionCache:
+    """Tests for CompletionCache"""
+
+    def test_miss_then_hit(self, cache):
+        """Test a stored result is returned with its token counts"""
+        key = make_key()
+        assert cache.get(key) is None
+
+        cache.put(key, CompletionResult("# Page", 100, 20, 120))
+        result = cache.get(key)
+
+        assert result == CompletionResult("# Page", 100, 20, 120, cached=True)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+        assert cache.stats()["entries"] == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test entries survive reopening the database"""
+        path = str(tmp_path / "llm.sqlite")
+        first = CompletionCache(path)
+        first.put("k", CompletionResult("kept", 1, 2, 3))
+        first.close()
+
+        second = CompletionCache(path)
+        assert second.get("k").content == "kept"
+        second.close()
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test entries are evicted by last access once max_bytes is exceeded"""
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"), max_bytes=25)
+        cache.put("a", CompletionResult("a" * 10))
+        cache.put("b", CompletionResult("b" * 10))
+        cache.get("a")  # "b" is now the least recently used
+        cache.put("c", CompletionResult("c" * 10))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["size_bytes"] == 20
+        cache.close()
+
+    def test_oversized_result_is_not_stored(self, tmp_path):
+        """Test a result larger than the whole cache is skipped"""
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"), max_bytes=5)
+        cache.put("big", CompletionResult("x" * 10))
+
+        assert cache.stats()["entries"] == 0
+        cache.close()
+
+    def test_truncated_result_is_not_stored(self, cache):
+        """Test a completion cut off at max_tokens is not cached"""
+        cache.put("k", CompletionResult("partial", finish_reason="length"))
+
+        assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_put_replaces_entry(self, cache):
+        """Test storing the same key again overwrites the entry"""
+        cache.put("k", CompletionResult("old"))
+        cache.put("k", CompletionResult("new"))
+
+        assert cache.get("k").content == "new"
+        assert cache.stats()["entries"] == 1
+
+    def test_clear(self, cache):
+        """Test clear removes all entries"""
+        cache.put("k", CompletionResult("x"))
+        cache.clear()
+
+        assert cache.get("k") is None
+
+    def test_errors_are_treated_as_misses(self, cache):
+        """Test a broken database never raises from get or put"""
+        cache._conn.execute("DROP TABLE completions")
+
+        cache.put("k", CompletionResult("x"))
+        assert cache.get("k") is None
+        assert cache.misses == 1
+
+    def test_get_completion_cache_is_shared(self, tmp_path):
+        """Test equal settings share one instance and no path means none"""
+        path = str(tmp_path / "llm.sqlite")
+
+        shared = get_completion_cache(path)
+
+        assert get_completion_cache(path) is shared
+        assert get_completion_cache(path, max_bytes=25) is not shared
+        assert get_completion_cache("") is None
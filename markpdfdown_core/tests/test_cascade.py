@@ -0,0 +1,112 @@
+"""
+Tests for markpdfdown.core.cascade module
+"""
+
+from markpdfdown.core.cascade import (
+    CascadeRecord,
+    TierAttempt,
+    check_page,
+    latex_issues,
+    table_issues,
+)
+
+
+class TestTableIssues:
+    """Tests for table_issues"""
+
+    def test_well_formed_table(self):
+        """Test a table with a separator and even rows passes"""
+        table = "| A | B |\n|:---|---:|\n| 1 | 2 |\n| 3 | a \\| b |"
+
+        assert table_issues(f"Intro\n\n{table}\n\nOutro") == []
+
+    def test_missing_separator(self):
+        """Test a table without a separator row is reported"""
+        assert table_issues("| A | B |\n| 1 | 2 |") == [
+            "table without a header separator row"
+        ]
+
+    def test_ragged_rows(self):
+        """Test rows with a different column count are reported"""
+        table = "| A | B |\n|---|---|\n| 1 | 2 | 3 |\n| 4 |\n| 5 | 6 |"
+
+        assert table_issues(table) == ["table with 2 rows of the wrong column count"]
+
+    def test_each_table_checked(self):
+        """Test every table on the page is checked separately"""
+        markdown = "| A |\n|---|\n| 1 |\n\ntext\n\n| B |"
+
+        assert table_issues(markdown) == ["table with a single row"]
+
+    def test_code_is_ignored(self):
+        """Test pipes inside code blocks are not taken for tables"""
+        assert table_issues("```\n| not | a table\n```") == []
+
+
+class TestLatexIssues:
+    """Tests for latex_issues"""
+
+    def test_balanced(self):
+        """Test balanced inline, display and environment math passes"""
+        markdown = (
+            "Let $x$ be \\(y\\).\n\n$$\na^2\n$$\n\n"
+            "\\begin{align}\nb\n\\end{align}\n\nPrice: $5"
+        )
+
+        assert latex_issues(markdown) == []
+
+    def test_unbalanced_delimiters(self):
+        """Test unclosed $, $$ and \\[ are reported"""
+        assert latex_issues("Let $x be") == ["unbalanced $ delimiters"]
+        assert latex_issues("$$ a^2") == ["unbalanced $$ delimiters"]
+        assert latex_issues("\\[ a") == ["unbalanced \\[ \\] delimiters"]
+
+    def test_unclosed_environment(self):
+        """Test a \\begin without \\end is reported"""
+        assert latex_issues("\\begin{matrix} 1 & 2") == ["unbalanced \\begin{matrix}"]
+
+
+class TestCheckPage:
+    """Tests for check_page"""
+
+    def test_good_page(self):
+        """Test a plausible answer is accepted"""
+        assert check_page("# Title\n\nSome text.", "stop", char_count=20) == []
+
+    def test_truncated(self):
+        """Test a truncated answer always escalates"""
+        assert check_page("# Title", "length") == ["output truncated at max_tokens"]
+
+    def test_empty(self):
+        """Test an empty answer escalates"""
+        assert check_page("  \n") == ["empty output"]
+
+    def test_too_short_for_text_layer(self):
+        """Test an answer much shorter than the text layer escalates"""
+        issues = check_page("Short", char_count=1000, min_text_ratio=0.5)
+
+        assert issues == ["output of 5 characters for 1000 in the text layer"]
+        assert check_page("Short", char_count=0) == []
+
+
+class TestCascadeRecord:
+    """Tests for CascadeRecord"""
+
+    def test_tier_and_tokens(self):
+        """Test the last attempt is the chosen tier and tokens add up"""
+        record = CascadeRecord(
+            page_num=1,
+            attempts=[
+                TierAttempt("gpt-4o-mini", 100, 20, issues=["empty output"]),
+                TierAttempt("gpt-4o", 300, 40),
+            ],
+        )
+
+        assert (record.tier, record.model) == (1, "gpt-4o")
+        assert (record.input_tokens, record.output_tokens) == (400, 60)
+
+    def test_cached_attempts_cost_nothing(self):
+        """Test attempts answered from the cache add no tokens"""
+        record = CascadeRecord(1, [TierAttempt("gpt-4o-mini", 100, 20, cached=True)])
+
+        assert (record.input_tokens, record.output_tokens) == (0, 0)
@@ -0,0 +1,189 @@
+"""
+Tests for markpdfdown.core.cassette module
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from markpdfdown.core.cassette import (
+    Cassette,
+    CassetteEntry,
+    CassetteMiss,
+    get_cassette,
+)
+from markpdfdown.core.endpoint_pool import Endpoint, EndpointPool
+from markpdfdown.core.file_worker import PageImage
+from markpdfdown.core.llm_client import LLMClient
+
+IMAGE = PageImage(page_num=1, data=b"\x89PNG page one", mime_type="image/png")
+
+
+def entry(key="k1", content="# Page", **kwargs):
+    """A recorded response"""
+    return CassetteEntry(key=key, model="gpt-4o", content=content, **kwargs)
+
+
+def mock_client(server, cassette):
+    """LLMClient pointed at the mock server, with a cassette"""
+    endpoint = Endpoint("openai/mock", api_key="sk-mock", api_base=server.base_url)
+    pool = EndpointPool([endpoint])
+    return LLMClient("openai/mock", pool=pool, cassette=cassette)
+
+
+class TestCassette:
+    """Tests for Cassette"""
+
+    def test_record_then_replay(self, tmp_path):
+        """Test recorded entries come back in order, the last one repeating"""
+        path = str(tmp_path / "run.jsonl.gz")
+        recorder = Cassette(path, mode="record")
+        recorder.record(entry(content="first", latency=1.5))
+        recorder.record(entry(content="second", finish_reason="length"))
+        recorder.record(entry("k2", content="other", prompt_tokens=800))
+
+        player = Cassette(path)
+
+        assert player.lookup("k1").content == "first"
+        assert player.lookup("k1").finish_reason == "length"
+        assert player.lookup("k1").content == "second"
+        assert player.lookup("k2").prompt_tokens == 800
+        assert player.stats() == {"recorded": 0, "replayed": 4, "misses": 0}
+
+    def test_recording_appends(self, tmp_path):
+        """Test a second recording adds to the archive"""
+        path = str(tmp_path / "run.jsonl.gz")
+        Cassette(path, mode="record").record(entry(content="first"))
+        Cassette(path, mode="record").record(entry("k2"))
+
+        player = Cassette(path)
+
+        assert player.lookup("k1").content == "first"
+        assert player.lookup("k2").key == "k2"
+
+    def test_miss(self, tmp_path):
+        """Test a miss fails or passes through as configured"""
+        path = str(tmp_path / "run.jsonl.gz")
+        Cassette(path, mode="record").record(entry())
+
+        with pytest.raises(CassetteMiss):
+            Cassette(path).lookup("unknown")
+        assert Cassette(path, on_miss="passthrough").lookup("unknown") is None
+
+    def test_invalid_settings(self, tmp_path):
+        """Test unknown modes and miss behaviours are rejected"""
+        path = str(tmp_path / "run.jsonl.gz")
+        with pytest.raises(ValueError):
+            Cassette(path, mode="rewind")
+        with pytest.raises(ValueError):
+            Cassette(path, mode="record", on_miss="ignore")
+
+    def test_play_streams_with_scaled_latency(self, tmp_path):
+        """Test replayed streams arrive in chunks over the scaled latency"""
+        cassette = Cassette(str(tmp_path / "c.gz"), "record", latency_scale=0.5)
+        recorded = entry(content="x" * 200, latency=0.4, first_token=0.1)
+        chunks = []
+
+        async def on_chunk(delta, content):
+            chunks.append((delta, content))
+
+        started = time.monotonic()
+        asyncio.run(cassette.play(recorded, on_chunk))
+
+        assert time.monotonic() - started >= 0.2
+        assert [len(delta) for delta, _ in chunks] == [64, 64, 64, 8]
+        assert chunks[-1][1] == recorded.content
+
+    def test_get_cassette_is_shared(self, tmp_path):
+        """Test equal settings share one instance and no path means none"""
+        path = str(tmp_path / "run.jsonl.gz")
+
+        assert get_cassette(path, "record") is get_cassette(path, "record")
+        assert get_cassette("") is None
+
+
+class TestLLMClientCassette:
+    """LLMClient recording from and replaying without the mock server"""
+
+    def test_replay_without_provider(self, tmp_path, mock_llm_server):
+        """Test replayed results equal the recorded ones and skip the provider"""
+        path = str(tmp_path / "run.jsonl.gz")
+        recorder = mock_client(mock_llm_server, Cassette(path, mode="record"))
+        recorded = recorder.completion("Transcribe", images=[IMAGE])
+        requests = mock_llm_server.stats()["requests"]
+
+        player = mock_client(mock_llm_server, Cassette(path))
+        replayed = player.completion("Transcribe", images=[IMAGE])
+
+        assert replayed == recorded
+        assert mock_llm_server.stats()["requests"] == requests
+        assert player.cassette.stats()["replayed"] == 1
+
+    def test_streamed_record_and_replay(self, tmp_path, mock_llm_server):
+        """Test streamed calls record their timing and replay as streams"""
+        path = str(tmp_path / "run.jsonl.gz")
+        chunks = []
+
+        async def on_chunk(delta, content):
+            chunks.append(delta)
+
+        async def convert(client):
+            return await client.acompletion(
+                "Transcribe", images=[IMAGE], on_chunk=on_chunk
+            )
+
+        recorded = asyncio.run(
+            convert(mock_client(mock_llm_server, Cassette(path, mode="record")))
+        )
+        chunks.clear()
+        cassette = Cassette(path)
+        replayed = asyncio.run(convert(mock_client(mock_llm_server, cassette)))
+
+        assert replayed.content == recorded.content == "".join(chunks)
+        assert replayed.input_tokens == recorded.input_tokens
+        assert cassette.lookup(next(iter(cassette._entries))).first_token is not None
+
+    def test_miss_fails_without_retries(self, tmp_path, mock_llm_server):
+        """Test a fail-on-miss replay raises at once and never calls out"""
+        path = str(tmp_path / "run.jsonl.gz")
+        Cassette(path, mode="record")
+        requests = mock_llm_server.stats()["requests"]
+        client = mock_client(mock_llm_server, Cassette(path, on_miss="fail"))
+
+        with pytest.raises(CassetteMiss):
+            client.completion("Transcribe", images=[IMAGE], retry_times=3)
+
+        assert mock_llm_server.stats()["requests"] == requests
+        assert client.cassette.stats()["misses"] == 1
+
+    def test_miss_passes_through(self, tmp_path, mock_llm_server):
+        """Test a passthrough replay sends unrecorded requests to the provider"""
+        path = str(tmp_path / "run.jsonl.gz")
+        Cassette(path, mode="record")
+        client = mock_client(mock_llm_server, Cassette(path, on_miss="passthrough"))
+
+        result = client.completion("Transcribe", images=[IMAGE])
+
+        assert result.content.startswith("# ")
+        assert mock_llm_server.stats()["requests"] == 1
+
+    def test_replay_follows_recorded_model(
+        self, tmp_path, mock_llm_server, monkeypatch
+    ):
+        """Test a replay routed to another model of the pool finds the recording"""
+        path = str(tmp_path / "run.jsonl.gz")
+        recorded = mock_client(mock_llm_server, Cassette(path, mode="record"))
+        recorded.completion("Transcribe", images=[IMAGE])
+        requests = mock_llm_server.stats()["requests"]
+
+        other = Endpoint("openai/other", api_key="sk-mock", api_base="http://unused")
+        mock = Endpoint("openai/mock", api_key="sk-mock", api_base="http://unused")
+        player = LLMClient(
+            "openai/other", pool=EndpointPool([other, mock]), cassette=Cassette(path)
+        )
+        monkeypatch.setattr(player.pool, "choose", lambda avoid: other)
+        result = player.completion("Transcribe", images=[IMAGE])
+
+        assert result.content.startswith("# ")
+        assert mock_llm_server.stats()["requests"] == requests
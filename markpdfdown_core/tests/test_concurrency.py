@@ -0,0 +1,196 @@
+"""
+Tests for markpdfdown.core.concurrency module
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from markpdfdown.core.concurrency import AdaptiveLimiter
+
+
+def run(coro):
+    """Run a coroutine to completion"""
+    return asyncio.run(coro)
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Patch the limiter's clock"""
+    fake = FakeClock()
+    with patch("markpdfdown.core.concurrency.monotonic", fake):
+        yield fake
+
+
+async def call(limiter, clock, latency=1.0, **outcome):
+    """Acquire a slot, advance the clock by latency and release it"""
+    started = await limiter.acquire()
+    await asyncio.sleep(0)  # let other callers queue up meanwhile
+    clock.now += latency
+    limiter.release(started, **outcome)
+
+
+class TestAdaptiveLimiter:
+    """Tests for AdaptiveLimiter"""
+
+    def test_invalid_limits(self):
+        """Test min_limit must not exceed max_limit"""
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(min_limit=4, max_limit=2)
+
+    def test_initial_window_is_clamped(self):
+        """Test the initial window is kept within the bounds"""
+        assert AdaptiveLimiter(initial_limit=50, max_limit=8).window == 8
+        assert AdaptiveLimiter(initial_limit=0).window == 1
+
+    def test_window_blocks_extra_callers(self):
+        """Test callers beyond the window wait until a slot is released"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=2)
+            first = await limiter.acquire()
+            await limiter.acquire()
+            third = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            assert not third.done()
+            assert limiter.stats()["waiting"] == 1
+
+            limiter.release(first, success=False)
+            await asyncio.sleep(0)
+            assert third.done()
+            assert limiter.in_flight == 2
+
+        run(scenario())
+
+    def test_additive_increase_with_stable_latency(self, clock):
+        """Test a saturated window grows by about one slot per window"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+            await asyncio.gather(*(call(limiter, clock) for _ in range(5)))
+            assert limiter.window == 3
+            await asyncio.gather(*(call(limiter, clock) for _ in range(20)))
+            return limiter
+
+        limiter = run(scenario())
+
+        assert limiter.window == 4
+        assert limiter.increases == 2
+
+    def test_no_increase_when_window_is_not_used(self, clock):
+        """Test sequential calls never grow the window"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=2)
+            for _ in range(20):
+                await call(limiter, clock)
+            return limiter
+
+        assert run(scenario()).window == 2
+
+    def test_no_increase_when_latency_rises(self, clock):
+        """Test growth stops once latency exceeds the tolerance"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=1, smoothing=1.0)
+            await call(limiter, clock, latency=1.0)
+            await call(limiter, clock, latency=5.0)
+            return limiter
+
+        limiter = run(scenario())
+
+        assert limiter.window == 2  # grown by the first call only
+        assert limiter.latency == 5.0
+
+    def test_multiplicative_decrease_on_overload(self, clock):
+        """Test rate-limit errors halve the window once per congestion event"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=8)
+            started = [await limiter.acquire() for _ in range(8)]
+            clock.now += 1.0
+            for start in started:
+                limiter.release(start, success=False, overloaded=True)
+            assert limiter.window == 4
+            assert limiter.decreases == 1
+
+            await call(limiter, clock, success=False, overloaded=True)
+            return limiter
+
+        limiter = run(scenario())
+
+        assert limiter.window == 2
+        assert limiter.decreases == 2
+
+    def test_decrease_respects_min_limit(self, clock):
+        """Test the window never drops below min_limit"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=2, min_limit=2)
+            await call(limiter, clock, success=False, overloaded=True)
+            return limiter
+
+        assert run(scenario()).window == 2
+
+    def test_other_failures_leave_window(self, clock):
+        """Test non-overload failures neither grow nor shrink the window"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=1)
+            await call(limiter, clock, success=False)
+            return limiter
+
+        limiter = run(scenario())
+
+        assert limiter.window == 1
+        assert limiter.latency is None
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        """Test a cancelled waiter neither leaks a slot nor blocks others"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=1)
+            first = await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+
+            limiter.release(first, success=False)
+            assert limiter.in_flight == 0
+            await limiter.acquire()
+            assert limiter.in_flight == 1
+
+        run(scenario())
+
+    def test_waiter_cancelled_before_release(self):
+        """Test a waiter cancelled just before a release still raises CancelledError"""
+
+        async def scenario():
+            limiter = AdaptiveLimiter(initial_limit=1)
+            first = await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            # The release drops the cancelled waiter before it runs its handler
+            limiter.release(first, success=False)
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+            assert limiter.stats()["waiting"] == 0
+            assert limiter.in_flight == 0
+            await limiter.acquire()
+            assert limiter.in_flight == 1
+
+        run(scenario())
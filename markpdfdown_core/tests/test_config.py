@@ -66,6 +66,146 @@ class TestConfig:
         with pytest.raises(ValidationError):
             Config(retry_times=-1)
 
+    def test_render_workers_validation(self):
+        """Test render_workers must be positive"""
+        assert Config().render_workers == 1
+
+        with pytest.raises(ValidationError):
+            Config(render_workers=0)
+
+    def test_page_filter_validation(self):
+        """Test page filter thresholds are range-checked"""
+        config = Config()
+        assert config.page_filter is False
+        assert config.blank_ink_ratio == 0.001
+        assert config.duplicate_hash_distance == 6
+
+        with pytest.raises(ValidationError):
+            Config(blank_ink_ratio=1.5)
+
+        with pytest.raises(ValidationError):
+            Config(duplicate_hash_distance=65)
+
+    def test_cache_defaults(self):
+        """Test the completion cache is disabled by default"""
+        config = Config()
+        assert config.cache_path == ""
+        assert config.cache_max_mb == 512
+
+        with pytest.raises(ValidationError):
+            Config(cache_max_mb=0)
+
+    def test_image_encoding_validation(self):
+        """Test image encoding is off by default and quality is bounded"""
+        config = Config()
+        assert config.image_encoding is False
+        assert config.image_quality == 85
+        assert config.image_max_edge == 0
+
+        with pytest.raises(ValidationError):
+            Config(image_quality=0)
+        with pytest.raises(ValidationError):
+            Config(image_quality=101)
+
+    def test_page_packing_validation(self):
+        """Test packing is off by default and groups hold at least two pages"""
+        config = Config()
+        assert config.page_packing is False
+        assert config.pack_token_budget == 2048
+        assert config.pack_max_pages == 4
+
+        with pytest.raises(ValidationError):
+            Config(pack_max_pages=1)
+
+    def test_adaptive_concurrency_defaults(self):
+        """Test adaptive concurrency is off by default with a window cap of 32"""
+        config = Config()
+        assert config.adaptive_concurrency is False
+        assert config.max_concurrency == 32
+
+        with pytest.raises(ValidationError):
+            Config(max_concurrency=0)
+
+    def test_rate_limit_defaults(self):
+        """Test rate limits are off by default and cannot be negative"""
+        config = Config()
+        assert (config.rpm_limit, config.tpm_limit) == (0, 0)
+        assert config.rate_limit_redis_url == ""
+
+        with pytest.raises(ValidationError):
+            Config(tpm_limit=-1)
+
+    def test_endpoint_pool_defaults(self):
+        """Test no extra endpoints by default and ejection after 3 failures"""
+        config = Config()
+        assert config.llm_endpoints == ""
+        assert (config.endpoint_eject_after, config.endpoint_eject_seconds) == (3, 30)
+
+        with pytest.raises(ValidationError):
+            Config(endpoint_eject_after=0)
+
+    def test_request_policy_defaults(self):
+        """Test retries back off from 0.5s and timeouts and hedging are off"""
+        config = Config()
+        assert (config.retry_base_delay, config.retry_max_delay) == (0.5, 30.0)
+        assert config.request_timeout == 0
+        assert config.hedge_percentile == 0
+        assert config.hedge_min_samples == 20
+
+        with pytest.raises(ValidationError):
+            Config(hedge_percentile=100)
+
+    def test_cascade_defaults(self):
+        """Test no cascade by default and escalation below half the text layer"""
+        config = Config()
+        assert config.cascade_models == ""
+        assert config.cascade_min_text_ratio == 0.5
+
+        with pytest.raises(ValidationError):
+            Config(cascade_min_text_ratio=1.5)
+
+    def test_tiling_defaults(self):
+        """Test tiling is off by default and bands overlap by 5%"""
+        config = Config()
+        assert config.tile_pages is False
+        assert (config.tile_max_aspect, config.tile_max_bands) == (2.0, 4)
+        assert config.tile_overlap == 0.05
+
+        with pytest.raises(ValidationError):
+            Config(tile_max_bands=1)
+        with pytest.raises(ValidationError):
+            Config(tile_overlap=0.5)
+
+    def test_stream_output_defaults(self):
+        """Test streaming is off by default and the interval cannot be negative"""
+        config = Config()
+        assert config.stream_output is False
+        assert config.stream_interval == 0.5
+
+        with pytest.raises(ValidationError):
+            Config(stream_interval=-1)
+
+    def test_pipeline_window_defaults(self):
+        """Test the render prefetch is at least one page and the window derived"""
+        config = Config()
+        assert config.render_prefetch == 4
+        assert config.max_inflight_pages == 0
+
+        with pytest.raises(ValidationError):
+            Config(render_prefetch=0)
+
+    def test_cassette_validation(self):
+        """Test the cassette is off by default and its modes are checked"""
+        config = Config()
+        assert config.cassette_path == ""
+        assert (config.cassette_mode, config.cassette_on_miss) == ("replay", "fail")
+
+        with pytest.raises(ValidationError):
+            Config(cassette_mode="rewind")
+
+        with pytest.raises(ValidationError):
+            Config(cassette_on_miss="ignore")
+
 
 class TestConfigFromEnv:
     """Tests for Config.from_env class method"""
@@ -88,12 +228,14 @@ class TestConfigFromEnv:
         monkeypatch.setenv("TEMPERATURE", "0.5")
         monkeypatch.setenv("MAX_TOKENS", "16384")
         monkeypatch.setenv("RETRY_TIMES", "5")
+        monkeypatch.setenv("RENDER_WORKERS", "4")
 
         config = Config.from_env()
         assert config.model_name == "gpt-4-turbo"
         assert config.temperature == 0.5
         assert config.max_tokens == 16384
         assert config.retry_times == 5
+        assert config.render_workers == 4
 
     def test_from_env_partial_override(self, monkeypatch):
         """Test from_env with partial environment variables"""
@@ -0,0 +1,177 @@
+"""
+Tests for markpdfdown.core.endpoint_pool module
+"""
+
+import random
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+from markpdfdown.core.endpoint_pool import Endpoint, EndpointPool, get_endpoint_pool
+
+PRIMARY = Endpoint("gpt-4o", api_key="sk-one")
+SECONDARY = Endpoint("gpt-4o", api_key="sk-two")
+
+
+@pytest.fixture
+def clock():
+    """Freeze the pool clock at a value the test can advance"""
+    now = [1000.0]
+    with patch("markpdfdown.core.endpoint_pool.monotonic", lambda: now[0]):
+        yield now
+
+
+def picks(pool, count=2000):
+    """Count how often each endpoint is chosen"""
+    return Counter(pool.choose() for _ in range(count))
+
+
+class TestEndpoint:
+    """Tests for Endpoint"""
+
+    def test_request_kwargs(self):
+        """Test only the set credentials are passed to litellm"""
+        endpoint = Endpoint("openai/gpt-4o", api_key="k", api_base="https://gw/v1")
+
+        assert endpoint.request_kwargs() == {
+            "model": "openai/gpt-4o",
+            "api_key": "k",
+            "api_base": "https://gw/v1",
+        }
+        assert Endpoint("gpt-4o").request_kwargs() == {"model": "gpt-4o"}
+
+    def test_key_hides_secret(self):
+        """Test the key tells endpoints apart without exposing the API key"""
+        assert PRIMARY.key.startswith("gpt-4o:")
+        assert "sk-one" not in PRIMARY.key
+        assert PRIMARY.key != SECONDARY.key
+        assert Endpoint("gpt-4o").key == "gpt-4o"
+
+
+class TestEndpointPool:
+    """Tests for EndpointPool"""
+
+    def test_requires_endpoints(self):
+        """Test an empty pool is rejected"""
+        with pytest.raises(ValueError):
+            EndpointPool([])
+
+    def test_from_json(self):
+        """Test endpoints are parsed after the default endpoint"""
+        pool = EndpointPool.from_json(
+            '[{"model": "openai/gpt-4o", "api_base": "https://gw/v1", "weight": 2}]',
+            default=PRIMARY,
+        )
+
+        assert pool.endpoints == [
+            PRIMARY,
+            Endpoint("openai/gpt-4o", api_base="https://gw/v1", weight=2.0),
+        ]
+
+    @pytest.mark.parametrize(
+        "spec", ["not json", '{"model": "x"}', '[{"api_key": "k"}]']
+    )
+    def test_from_json_invalid(self, spec):
+        """Test malformed endpoint lists raise ValueError"""
+        with pytest.raises(ValueError):
+            EndpointPool.from_json(spec)
+
+    def test_errors_do_not_leak_api_keys(self):
+        """Test invalid entries and endpoint reprs never show the key"""
+        with pytest.raises(ValueError) as error:
+            EndpointPool.from_json('[{"model": "gpt-4o"}, {"api_key": "sk-secret"}]')
+
+        assert "Endpoint 1" in str(error.value)
+        assert "sk-secret" not in str(error.value)
+        assert "sk-one" not in repr(PRIMARY)
+
+    def test_weights_split_traffic(self):
+        """Test fresh endpoints receive traffic in proportion to their weight"""
+        heavy = Endpoint("gpt-4o", api_key="sk-two", weight=3.0)
+        pool = EndpointPool([PRIMARY, heavy], rng=random.Random(1))
+
+        counts = picks(pool)
+
+        assert counts[heavy] / counts[PRIMARY] == pytest.approx(3, rel=0.2)
+
+    def test_errors_and_latency_shift_traffic(self):
+        """Test failing or slow endpoints get a smaller share"""
+        pool = EndpointPool([PRIMARY, SECONDARY], eject_after=100, rng=random.Random(2))
+        for _ in range(10):
+            pool.report(PRIMARY, True, 1.0)
+            pool.report(SECONDARY, False)
+
+        assert picks(pool)[PRIMARY] > 1800
+
+        slow = EndpointPool([PRIMARY, SECONDARY], rng=random.Random(3))
+        slow.report(PRIMARY, True, 1.0)
+        slow.report(SECONDARY, True, 4.0)
+        counts = picks(slow)
+        assert counts[PRIMARY] / counts[SECONDARY] == pytest.approx(4, rel=0.2)
+
+    def test_ejection_and_probe(self, clock):
+        """Test repeated failures eject an endpoint until the cooldown ends"""
+        pool = EndpointPool([PRIMARY, SECONDARY], eject_after=2, eject_seconds=30)
+        pool.report(PRIMARY, False)
+        assert PRIMARY in picks(pool, 200)
+
+        pool.report(PRIMARY, False)
+        assert set(picks(pool, 200)) == {SECONDARY}
+        assert pool.stats()[PRIMARY.key]["ejected"]
+
+        clock[0] += 31
+        assert PRIMARY in picks(pool, 200)
+        # Half-open: one more failure ejects it again
+        pool.report(PRIMARY, False)
+        assert set(picks(pool, 200)) == {SECONDARY}
+
+    def test_success_resets_failures(self, clock):
+        """Test only consecutive failures count towards ejection"""
+        pool = EndpointPool([PRIMARY, SECONDARY], eject_after=2)
+        pool.report(PRIMARY, False)
+        pool.report(PRIMARY, True, 1.0)
+        pool.report(PRIMARY, False)
+
+        assert not pool.stats()[PRIMARY.key]["ejected"]
+
+    def test_avoid_fails_over(self):
+        """Test avoided endpoints are skipped while another is healthy"""
+        pool = EndpointPool([PRIMARY, SECONDARY])
+
+        assert all(pool.choose(frozenset({PRIMARY})) == SECONDARY for _ in range(50))
+        assert pool.choose(frozenset({PRIMARY, SECONDARY})) in (PRIMARY, SECONDARY)
+
+    def test_all_ejected(self, clock):
+        """Test the endpoint recovering first is used when all are ejected"""
+        pool = EndpointPool([PRIMARY, SECONDARY], eject_after=1, eject_seconds=30)
+        pool.report(SECONDARY, False)
+        clock[0] += 10
+        pool.report(PRIMARY, False)
+
+        assert pool.choose() == SECONDARY
+
+
+class TestGetEndpointPool:
+    """Tests for get_endpoint_pool"""
+
+    def test_shared_per_endpoints(self):
+        """Test every caller with the same endpoints shares one instance"""
+        first = get_endpoint_pool([Endpoint("shared", api_key="a")])
+
+        assert get_endpoint_pool([Endpoint("shared", api_key="a")]) is first
+        assert get_endpoint_pool([Endpoint("shared", api_key="b")]) is not first
+        assert get_endpoint_pool([Endpoint("shared", api_key="a")], 5) is not first
+
+    def test_health_shared_across_pools(self, clock):
+        """Test an ejection seen by one pool holds for every pool with that endpoint"""
+        dead = Endpoint("shared", api_key="dead")
+        gateway = Endpoint("shared", api_key="gateway")
+        task = get_endpoint_pool([Endpoint("shared", api_key="task"), dead])
+        task.report(dead, False)
+        task.report(dead, False)
+        task.report(dead, False)
+
+        other = get_endpoint_pool([gateway, dead])
+        assert other.stats()[dead.key]["ejected"]
+        assert set(picks(other, 200)) == {gateway}
@@ -10,6 +10,7 @@ import pytest
 from markpdfdown.core.file_worker import (
     FileWorker,
     ImageWorker,
+    PageImage,
     PDFWorker,
     create_worker,
 )
@@ -70,7 +71,7 @@ class TestPDFWorker:
         worker.output_dir = str(tmp_path)
         worker.input_path = sample_pdf_path
 
-        images = worker.convert_to_images(dpi=72, fmt="png")
+        images = list(worker.convert_to_images(dpi=72, fmt="png"))
         assert len(images) > 0
         for img_path in images:
             assert os.path.exists(img_path)
@@ -155,52 +156,79 @@ class TestCreateWorker:
         assert isinstance(worker, ImageWorker)
 
 
-class TestPDFWorkerExtractPages:
-    """Tests for PDFWorker _extract_pages method"""
+class TestPDFWorkerPageRange:
+    """Tests for PDFWorker page range rendering"""
 
-    def test_extract_pages_creates_new_pdf(self, sample_pdf_path, tmp_path):
-        """Test _extract_pages creates new PDF file"""
-        worker = PDFWorker(sample_pdf_path, start_page=1, end_page=1)
-        worker.output_dir = str(tmp_path)
+    @pytest.fixture
+    def five_page_pdf(self, tmp_path):
+        """Return path to a 5-page PDF"""
+        import fitz
 
-        # Check that extracted file was created
-        assert os.path.exists(worker.input_path)
+        pdf_path = tmp_path / "five.pdf"
+        doc = fitz.open()
+        for i in range(5):
+            doc.new_page().insert_text((72, 72), f"Page {i + 1}")
+        doc.save(str(pdf_path))
+        doc.close()
+        return str(pdf_path)
 
-    def test_extract_pages_with_exception(self, sample_pdf_path, tmp_path, monkeypatch):
-        """Test _extract_pages handles exception gracefully"""
-        # Create worker first
-        worker = PDFWorker(sample_pdf_path)
-        worker.output_dir = str(tmp_path)
+    def test_page_range_keeps_original_file(self, five_page_pdf, tmp_path):
+        """Test a partial range renders from the original PDF without rewriting it"""
+        worker = PDFWorker(five_page_pdf, start_page=2, end_page=4)
 
-        # Mock PyPDF2.PdfWriter to raise exception
-        def mock_writer_init(*args, **kwargs):
-            raise Exception("Write error")
+        assert worker.input_path == five_page_pdf
+        assert worker.total_pages == 5
+        assert list(worker.page_indices) == [1, 2, 3]
+        assert sorted(os.listdir(tmp_path)) == ["five.pdf"]
 
-        import PyPDF2
+    def test_page_range_renders_requested_pages(self, five_page_pdf):
+        """Test only the requested pages are rendered, with original numbering"""
+        worker = PDFWorker(five_page_pdf, start_page=2, end_page=4)
 
-        monkeypatch.setattr(PyPDF2, "PdfWriter", mock_writer_init)
+        images = list(worker.convert_to_images(dpi=36, fmt="png"))
 
-        # Call _extract_pages which should return empty string on error
-        result = worker._extract_pages()
-        assert result == ""
+        assert [os.path.basename(p) for p in images] == [
+            "page_0002.png",
+            "page_0003.png",
+            "page_0004.png",
+        ]
 
-    def test_extract_pages_failure_uses_original_file(
-        self, sample_pdf_path, monkeypatch
-    ):
-        """Test when extraction fails, original file is used"""
-        original_path = sample_pdf_path
+    def test_page_range_parallel(self, five_page_pdf):
+        """Test parallel rendering honours the page range"""
+        worker = PDFWorker(five_page_pdf, start_page=3, end_page=0)
 
-        # Mock _extract_pages to return empty string (failure)
-        def mock_extract_pages(self):
-            return ""
+        images = list(worker.convert_to_images(dpi=36, in_memory=True, workers=2))
 
-        monkeypatch.setattr(PDFWorker, "_extract_pages", mock_extract_pages)
+        assert [image.page_num for image in images] == [3, 4, 5]
 
-        # Create worker with page range that would trigger extraction
-        worker = PDFWorker(sample_pdf_path, start_page=1, end_page=1)
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_skip_pages(self, five_page_pdf, workers):
+        """Test skipped pages are not rendered, serially or in parallel"""
+        worker = PDFWorker(five_page_pdf)
+
+        images = worker.convert_to_images(
+            dpi=36, in_memory=True, workers=workers, skip_pages={1, 4}
+        )
+
+        assert [image.page_num for image in images] == [2, 3, 5]
+
+    def test_parallel_rendering_does_not_fork(self, five_page_pdf):
+        """Test render processes start without fork() from a threaded parent"""
+        from concurrent.futures import ProcessPoolExecutor
+        from unittest.mock import patch
+
+        contexts = []
 
-        # Should still have the original path since extraction "failed"
-        assert worker.input_path == original_path
+        def pool(max_workers, mp_context):
+            contexts.append(mp_context)
+            return ProcessPoolExecutor(max_workers, mp_context=mp_context)
+
+        worker = PDFWorker(five_page_pdf)
+        with patch("markpdfdown.core.file_worker.ProcessPoolExecutor", pool):
+            images = list(worker.convert_to_images(dpi=36, in_memory=True, workers=2))
+
+        assert len(images) == 5
+        assert contexts[0].get_start_method() != "fork"
 
 
 class TestPDFWorkerConvertToImages:
@@ -221,5 +249,132 @@ class TestPDFWorkerConvertToImages:
 
         monkeypatch.setattr(fitz, "open", mock_fitz_open)
 
-        result = worker.convert_to_images()
+        result = list(worker.convert_to_images())
         assert result == []
+
+    def test_convert_to_images_parallel_preserves_order(self, tmp_path):
+        """Test parallel rendering yields every page in page order"""
+        import fitz
+
+        pdf_path = tmp_path / "multi.pdf"
+        doc = fitz.open()
+        for i in range(10):
+            doc.new_page().insert_text((72, 72), f"Page {i + 1}")
+        doc.save(str(pdf_path))
+        doc.close()
+
+        worker = PDFWorker(str(pdf_path))
+        serial = list(worker.convert_to_images(dpi=36, fmt="png"))
+        parallel = list(worker.convert_to_images(dpi=36, fmt="png", workers=3))
+
+        assert parallel == serial
+        assert len(parallel) == 10
+        assert os.path.basename(parallel[-1]) == "page_0010.png"
+        for img_path in parallel:
+            assert os.path.exists(img_path)
+
+    def test_convert_to_images_in_memory(self, sample_pdf_path, tmp_path):
+        """Test in-memory mode yields encoded buffers without writing files"""
+        worker = PDFWorker(sample_pdf_path)
+        worker.output_dir = str(tmp_path)
+
+        images = list(worker.convert_to_images(dpi=72, in_memory=True))
+
+        assert len(images) == 1
+        assert isinstance(images[0], PageImage)
+        assert images[0].page_num == 1
+        assert images[0].mime_type == "image/jpeg"
+        assert images[0].data[:3] == b"\xff\xd8\xff"
+        assert images[0].file_name == "page_0001.jpg"
+        assert os.listdir(tmp_path) == []
+
+    def test_convert_to_images_in_memory_png(self, sample_pdf_path, tmp_path):
+        """Test in-memory mode honours the requested format"""
+        worker = PDFWorker(sample_pdf_path)
+        worker.output_dir = str(tmp_path)
+
+        image = next(worker.convert_to_images(dpi=72, fmt="png", in_memory=True))
+
+        assert image.mime_type == "image/png"
+        assert image.data[:4] == b"\x89PNG"
+
+    def test_convert_to_images_adaptive_dpi(self, tmp_path):
+        """Test adaptive DPI records a plan per page and renders at its DPI"""
+        pdf_path = tmp_path / "mixed.pdf"
+        import fitz
+
+        doc = fitz.open()
+        doc.new_page()
+        doc.new_page().insert_text((72, 300), "Title", fontsize=28)
+        doc.save(str(pdf_path))
+        doc.close()
+
+        worker = PDFWorker(str(pdf_path))
+        images = list(
+            worker.convert_to_images(fmt="png", in_memory=True, adaptive_dpi=True)
+        )
+
+        assert sorted(worker.render_plans) == [1, 2]
+        assert worker.render_plans[1].dpi == 72
+        assert worker.render_plans[2].dpi == 100
+
+        pix = fitz.Pixmap(images[0].data)
+        assert pix.width == round(worker.render_plans[1].width_pt)
+
+    def test_convert_to_images_route_text(self, tmp_path):
+        """Test text routing records a route per page and still renders all pages"""
+        pdf_path = tmp_path / "mixed.pdf"
+        import fitz
+
+        doc = fitz.open()
+        doc.new_page().insert_textbox(
+            fitz.Rect(72, 72, 520, 400), "Plain prose sentence. " * 30, fontsize=11
+        )
+        doc.new_page()
+        doc.save(str(pdf_path))
+        doc.close()
+
+        worker = PDFWorker(str(pdf_path))
+        images = list(worker.convert_to_images(in_memory=True, route_text=True))
+
+        assert len(images) == 2
+        assert worker.page_routes[1].is_local
+        assert worker.page_routes[1].markdown.startswith("Plain prose sentence.")
+        assert not worker.page_routes[2].is_local
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_convert_to_images_page_filter(self, tmp_path, workers):
+        """Test a page filter records blank and duplicate verdicts in page order"""
+        from markpdfdown.core.page_filter import PageFilter
+
+        pdf_path = tmp_path / "scanned.pdf"
+        import fitz
+
+        doc = fitz.open()
+        for text in [
+            "Terms and conditions. " * 20,
+            None,
+            "Terms and conditions. " * 20,
+        ]:
+            page = doc.new_page()
+            if text:
+                page.insert_textbox(fitz.Rect(72, 72, 520, 400), text, fontsize=11)
+        doc.save(str(pdf_path))
+        doc.close()
+
+        page_filter = PageFilter()
+        worker = PDFWorker(str(pdf_path))
+        images = list(
+            worker.convert_to_images(
+                in_memory=True, workers=workers, page_filter=page_filter
+            )
+        )
+
+        assert len(images) == 3
+        assert [v.action for v in worker.page_verdicts.values()] == [
+            "keep",
+            "blank",
+            "duplicate",
+        ]
+        assert worker.page_verdicts[3].duplicate_of == 1
+        assert page_filter.blank_pages == [2]
@@ -0,0 +1,186 @@
+"""
+Tests for markpdfdown.core.image_encoding module
+"""
+
+import fitz
+import pytest
+
+from markpdfdown.core.image_encoding import (
+    MIME_BMP,
+    MIME_GIF,
+    MIME_JPEG,
+    MIME_PNG,
+    MIME_WEBP,
+    ImageEncoder,
+    ResolutionLimit,
+    resolution_limit,
+    sniff_mime_type,
+)
+
+BODY = "The committee reviewed the quarterly report and drafted recommendations. "
+
+
+@pytest.fixture
+def text_page():
+    """Return a page of black text"""
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 520, 700), BODY * 30, fontsize=10)
+    yield page
+    document.close()
+
+
+def decode(data):
+    """Decode image bytes to a pixmap"""
+    return fitz.Pixmap(data)
+
+
+class TestSniffMimeType:
+    """Tests for sniff_mime_type"""
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            (b"\xff\xd8\xff\xee rest", MIME_JPEG),
+            (b"\x89PNG\r\n\x1a\n rest", MIME_PNG),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", MIME_WEBP),
+            (b"GIF89a rest", MIME_GIF),
+            (b"BM rest", MIME_BMP),
+            (b"%PDF-1.7", None),
+        ],
+    )
+    def test_magic_numbers(self, data, expected):
+        """Test formats are recognized from their leading bytes"""
+        assert sniff_mime_type(data) == expected
+
+
+class TestResolutionLimit:
+    """Tests for ResolutionLimit and resolution_limit"""
+
+    @pytest.mark.parametrize(
+        "model_name, expected",
+        [
+            ("gpt-4o", ResolutionLimit(max_long_edge=2048, max_short_edge=768)),
+            ("openai/gpt-4.1-mini", ResolutionLimit(2048, 768)),
+            (
+                "openrouter/anthropic/claude-3.5-sonnet",
+                ResolutionLimit(1568, None, 1_150_000),
+            ),
+            ("gemini/gemini-2.0-flash", ResolutionLimit(max_long_edge=3072)),
+            ("openai/doubao-1-5-vision-pro-32k-250115", ResolutionLimit()),
+        ],
+    )
+    def test_provider_lookup(self, model_name, expected):
+        """Test limits are matched on the model name after routing prefixes"""
+        assert resolution_limit(model_name) == expected
+
+    def test_openai_fits_short_side(self):
+        """Test a letter page at 200 DPI is scaled to a 768 px short side"""
+        scale = ResolutionLimit(2048, 768).scale(1700, 2200)
+
+        assert round(1700 * scale) == 768
+
+    def test_claude_pixel_budget(self):
+        """Test the pixel budget applies when the long edge already fits"""
+        scale = ResolutionLimit(1568, None, 1_150_000).scale(1200, 1500)
+
+        assert 1200 * 1500 * scale**2 == pytest.approx(1_150_000)
+
+    def test_small_image_is_not_upscaled(self):
+        """Test images within the limit keep their size"""
+        assert ResolutionLimit(2048, 768).scale(600, 700) == 1.0
+        assert ResolutionLimit().scale(5000, 7000) == 1.0
+
+
+class TestImageEncoder:
+    """Tests for ImageEncoder.encode"""
+
+    def test_downscales_to_model_limit(self, text_page):
+        """Test pages larger than the provider limit are downscaled"""
+        data = text_page.get_pixmap(dpi=200).tobytes("jpg")
+
+        encoded = ImageEncoder.for_model("gpt-4o").encode(data)
+
+        assert min(encoded.width, encoded.height) == 768
+        pix = decode(encoded.data)
+        assert (pix.width, pix.height) == (encoded.width, encoded.height)
+        assert encoded.bytes_before == len(data)
+        assert encoded.bytes_after < encoded.bytes_before
+
+    def test_mime_type_matches_payload(self, text_page):
+        """Test the reported MIME type is the format actually produced"""
+        data = text_page.get_pixmap(dpi=200).tobytes("jpg")
+
+        encoded = ImageEncoder.for_model("claude-sonnet-4").encode(data)
+
+        assert sniff_mime_type(encoded.data) == encoded.mime_type
+
+    def test_black_and_white_page_is_sent_as_gray(self, text_page):
+        """Test colourless pages are reduced to a single channel"""
+        data = text_page.get_pixmap(dpi=100).tobytes("png")
+
+        encoded = ImageEncoder(ResolutionLimit(max_long_edge=600)).encode(data)
+
+        assert decode(encoded.data).n == 1
+
+    def test_color_is_preserved(self, text_page):
+        """Test pages with colour keep three channels"""
+        text_page.draw_rect(fitz.Rect(100, 720, 300, 800), fill=(1, 0, 0))
+        data = text_page.get_pixmap(dpi=100).tobytes("png")
+
+        encoded = ImageEncoder(ResolutionLimit(max_long_edge=600)).encode(data)
+
+        assert decode(encoded.data).n == 3
+
+    def test_smaller_original_is_kept(self, text_page):
+        """Test an already-compact image within the limit is sent unchanged"""
+        data = text_page.get_pixmap(dpi=50, colorspace="gray").tobytes("png")
+
+        encoded = ImageEncoder(quality=100).encode(data)
+
+        assert encoded.data == data
+        assert encoded.mime_type == MIME_PNG
+        assert encoded.bytes_after == encoded.bytes_before
+
+    def test_quality_controls_lossy_size(self, text_page):
+        """Test lower quality never produces a larger payload"""
+        data = text_page.get_pixmap(dpi=150).tobytes("jpg")
+
+        low = ImageEncoder(quality=30).encode(data)
+        high = ImageEncoder(quality=95).encode(data)
+
+        assert low.bytes_after <= high.bytes_after
+
+    def test_bmp_is_converted(self, text_page):
+        """Test formats providers do not accept are always re-encoded"""
+        data = text_page.get_pixmap(dpi=40).tobytes("png")
+
+        encoded = ImageEncoder().encode(data, MIME_BMP)
+
+        assert encoded.mime_type in (MIME_PNG, MIME_JPEG, MIME_WEBP)
+
+    def test_without_pillow_falls_back_to_jpeg(self, text_page, monkeypatch, caplog):
+        """Test a missing Pillow is logged once and WebP is never produced"""
+        from markpdfdown.core import image_encoding
+
+        monkeypatch.setattr(image_encoding, "Image", None)
+        monkeypatch.setattr(image_encoding, "_webp_fallback_logged", False)
+        data = text_page.get_pixmap(dpi=150).tobytes("jpg")
+
+        with caplog.at_level("WARNING"):
+            encoder = ImageEncoder.for_model("gpt-4o")
+            ImageEncoder.for_model("claude-sonnet-4")
+        encoded = encoder.encode(data)
+
+        assert not encoder.webp
+        assert encoded.mime_type in (MIME_JPEG, MIME_PNG)
+        assert caplog.text.count("Pillow is not installed") == 1
+        with pytest.raises(ImportError, match="markpdfdown\\[webp\\]"):
+            ImageEncoder(webp=True)
+
+    def test_undecodable_data_is_sent_unchanged(self):
+        """Test bytes fitz cannot decode pass through"""
+        encoded = ImageEncoder().encode(b"not an image", MIME_JPEG)
+
+        assert encoded.data == b"not an image"
+        assert encoded.mime_type == MIME_JPEG
@@ -2,13 +2,21 @@
 Tests for markpdfdown.core.llm_client module
 """
 
+import asyncio
 import base64
 import os
-from unittest.mock import MagicMock, patch
+import random
+from unittest.mock import DEFAULT, AsyncMock, MagicMock, call, patch
 
+import litellm
 import pytest
 
-from markpdfdown.core.llm_client import LLMClient
+from markpdfdown.core.cache import CompletionCache
+from markpdfdown.core.endpoint_pool import Endpoint, EndpointPool
+from markpdfdown.core.file_worker import PageImage
+from markpdfdown.core.image_encoding import EncodedImage
+from markpdfdown.core.llm_client import LLMClient, is_overload_error
+from markpdfdown.core.request_policy import RequestPolicy
 
 
 class TestLLMClientInit:
@@ -33,7 +41,7 @@ class TestLLMClientCompletion:
         client = LLMClient("gpt-4o")
         result = client.completion("Hello, world!")
 
-        assert result == mock_llm_response
+        assert result.content == mock_llm_response
         mock_litellm_completion.assert_called_once()
 
     def test_completion_with_system_prompt(self, mock_litellm_completion):
@@ -64,6 +72,38 @@ class TestLLMClientCompletion:
         assert user_content[1]["type"] == "image_url"
         assert "base64" in user_content[1]["image_url"]["url"]
 
+    def test_image_path_mime_type_is_detected(
+        self, mock_litellm_completion, sample_image_path
+    ):
+        """Test image files are labelled with their actual format"""
+        client = LLMClient("gpt-4o")
+        result = client.completion("Describe", image_paths=[sample_image_path])
+
+        user_content = mock_litellm_completion.call_args.kwargs["messages"][0][
+            "content"
+        ]
+        assert user_content[1]["image_url"]["url"].startswith("data:image/png;")
+        size = os.path.getsize(sample_image_path)
+        assert result.image_bytes_before == result.image_bytes_after == size
+
+    def test_encoder_rewrites_payload(self, mock_litellm_completion, sample_image_path):
+        """Test the encoder's output is sent and its byte counts reported"""
+        encoder = MagicMock()
+        encoder.encode.return_value = EncodedImage(b"\xff\xd8\xffsmall", "image/jpeg")
+
+        client = LLMClient("gpt-4o", encoder=encoder)
+        result = client.completion("Describe", image_paths=[sample_image_path])
+
+        encoder.encode.assert_called_once()
+        url = mock_litellm_completion.call_args.kwargs["messages"][0]["content"][1][
+            "image_url"
+        ]["url"]
+        assert url == "data:image/jpeg;base64," + base64.b64encode(
+            b"\xff\xd8\xffsmall"
+        ).decode("utf-8")
+        assert result.image_bytes_before == os.path.getsize(sample_image_path)
+        assert result.image_bytes_after == 8
+
     def test_completion_with_multiple_images(self, mock_litellm_completion, images_dir):
         """Test completion with multiple images"""
         image_paths = [
@@ -84,6 +124,21 @@ class TestLLMClientCompletion:
         assert user_content[1]["type"] == "image_url"
         assert user_content[2]["type"] == "image_url"
 
+    def test_completion_with_in_memory_images(self, mock_litellm_completion):
+        """Test completion with in-memory page buffers"""
+        image = PageImage(page_num=1, data=b"\x89PNG\r\n", mime_type="image/png")
+
+        client = LLMClient("gpt-4o")
+        client.completion("Describe this image", images=[image])
+
+        call_args = mock_litellm_completion.call_args
+        user_content = call_args.kwargs["messages"][0]["content"]
+
+        assert len(user_content) == 2
+        url = user_content[1]["image_url"]["url"]
+        assert url.startswith("data:image/png;base64,")
+        assert base64.b64decode(url.split(",", 1)[1]) == image.data
+
     def test_completion_with_custom_params(self, mock_litellm_completion):
         """Test completion with custom parameters"""
         client = LLMClient("gpt-4o")
@@ -115,7 +170,8 @@ class TestLLMClientCompletion:
             with patch("markpdfdown.core.llm_client.time.sleep"):
                 result = client.completion("Hello", retry_times=3)
 
-            assert result == "Success"
+            assert result.content == "Success"
+            assert result.retries == 2
             assert mock_completion.call_count == 3
 
     def test_completion_raises_after_max_retries(self):
@@ -143,6 +199,600 @@ class TestLLMClientCompletion:
                     client.completion("Hello", retry_times=1)
 
 
+class TestLLMClientAcompletion:
+    """Tests for LLMClient.acompletion method"""
+
+    @pytest.fixture
+    def mock_acompletion(self, mock_llm_response):
+        """Mock litellm.acompletion for testing LLMClient"""
+        with patch("markpdfdown.core.llm_client.acompletion") as mock:
+            response = MagicMock()
+            response.choices = [MagicMock()]
+            response.choices[0].message.content = mock_llm_response
+            response.usage.prompt_tokens = 10
+            response.usage.completion_tokens = 5
+            response.usage.total_tokens = 15
+            mock.return_value = response
+            yield mock
+
+    def test_acompletion_basic(self, mock_acompletion, mock_llm_response):
+        """Test acompletion builds the same request as completion"""
+        image = PageImage(page_num=1, data=b"\x89PNG\r\n", mime_type="image/png")
+
+        client = LLMClient("gpt-4o")
+        result = asyncio.run(
+            client.acompletion("Describe", system_prompt="Sys", images=[image])
+        )
+
+        assert result.content == mock_llm_response
+        assert result.total_tokens == 15
+        kwargs = mock_acompletion.call_args.kwargs
+        assert kwargs["model"] == "gpt-4o"
+        assert kwargs["messages"][0] == {"role": "system", "content": "Sys"}
+        url = kwargs["messages"][1]["content"][1]["image_url"]["url"]
+        assert url.startswith("data:image/png;base64,")
+
+    def test_acompletion_retry_uses_async_sleep(self, mock_acompletion):
+        """Test retries back off with asyncio.sleep instead of time.sleep"""
+        response = mock_acompletion.return_value
+        mock_acompletion.side_effect = [Exception("API Error"), response]
+
+        client = LLMClient("gpt-4o")
+        with patch("markpdfdown.core.llm_client.asyncio.sleep") as mock_sleep:
+            with patch("markpdfdown.core.llm_client.time.sleep") as mock_time_sleep:
+                result = asyncio.run(client.acompletion("Hello", retry_times=3))
+
+        assert result.content == response.choices[0].message.content
+        assert result.retries == 1
+        mock_sleep.assert_awaited_once()
+        assert 0 <= mock_sleep.await_args.args[0] <= 0.5  # jittered first backoff
+        mock_time_sleep.assert_not_called()
+
+    def test_acompletion_honors_retry_after(self, mock_acompletion):
+        """Test a Retry-After header replaces the computed backoff"""
+        error = litellm.RateLimitError(
+            "Too many requests", "openai", "gpt-4o", headers={"retry-after": "7"}
+        )
+        mock_acompletion.side_effect = [error, mock_acompletion.return_value]
+
+        client = LLMClient("gpt-4o")
+        with patch("markpdfdown.core.llm_client.asyncio.sleep") as mock_sleep:
+            asyncio.run(client.acompletion("Hello", retry_times=2))
+
+        mock_sleep.assert_awaited_once_with(7.0)
+
+    def test_acompletion_timeout(self, mock_acompletion):
+        """Test a call exceeding the policy timeout fails the attempt"""
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        mock_acompletion.side_effect = hang
+        client = LLMClient("gpt-4o", policy=RequestPolicy(timeout=0.01))
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(client.acompletion("Hello", retry_times=1))
+        assert mock_acompletion.call_args.kwargs["timeout"] == 0.01
+
+    def test_acompletion_hedges_slow_call(self, mock_acompletion):
+        """Test a slow call is hedged and the hedge's response is used"""
+        response = mock_acompletion.return_value
+        cancelled = []
+
+        calls = iter(["slow", "fast"])
+
+        async def slow_then_fast(**kwargs):
+            if next(calls) == "fast":
+                return response
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        mock_acompletion.side_effect = slow_then_fast
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01, "gpt-4o")
+        limiter = MagicMock()
+        limiter.acquire = AsyncMock(return_value=1.0)
+
+        client = LLMClient("gpt-4o", limiter=limiter, policy=policy)
+        result = asyncio.run(client.acompletion("Hello"))
+
+        assert result.content == response.choices[0].message.content
+        assert (policy.hedges_fired, policy.hedges_won) == (1, 1)
+        assert cancelled == [True]
+        # Both calls held a limiter slot and both were released
+        assert limiter.acquire.await_count == 2
+        assert limiter.release.call_count == 2
+
+    def test_acompletion_raises_after_max_retries(self, mock_acompletion):
+        """Test acompletion raises after the last retry"""
+        mock_acompletion.side_effect = Exception("API Error")
+
+        client = LLMClient("gpt-4o")
+        with patch("markpdfdown.core.llm_client.asyncio.sleep"):
+            with pytest.raises(Exception, match="API Error"):
+                asyncio.run(client.acompletion("Hello", retry_times=2))
+
+        assert mock_acompletion.call_count == 2
+
+    def test_acompletion_uses_cache(self, mock_acompletion, tmp_path):
+        """Test acompletion shares the completion cache"""
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        client = LLMClient("gpt-4o", cache=cache)
+
+        asyncio.run(client.acompletion("Hello"))
+        result = asyncio.run(client.acompletion("Hello"))
+
+        assert result.cached
+        assert mock_acompletion.call_count == 1
+        cache.close()
+
+    def test_acompletion_does_not_cache_truncated_output(
+        self, mock_acompletion, tmp_path
+    ):
+        """Test a truncated completion is requested again instead of cached"""
+        mock_acompletion.return_value.choices[0].finish_reason = "length"
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        client = LLMClient("gpt-4o", cache=cache)
+
+        asyncio.run(client.acompletion("Hello"))
+        result = asyncio.run(client.acompletion("Hello"))
+
+        assert result.finish_reason == "length"
+        assert not result.cached
+        assert mock_acompletion.call_count == 2
+        cache.close()
+
+    def test_acompletion_stores_cache_off_loop(self, mock_acompletion, tmp_path):
+        """Test the cache write does not run on the event loop thread"""
+        import threading
+
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        threads = []
+        put = cache.put
+
+        def record_thread(key, result):
+            threads.append(threading.get_ident())
+            put(key, result)
+
+        cache.put = record_thread
+        client = LLMClient("gpt-4o", cache=cache)
+        asyncio.run(client.acompletion("Hello"))
+
+        assert threads and threads[0] != threading.get_ident()
+        cache.close()
+
+    def test_acompletion_reports_to_limiter(self, mock_acompletion):
+        """Test every attempt holds a limiter slot and reports its outcome"""
+        response = mock_acompletion.return_value
+        mock_acompletion.side_effect = [
+            litellm.RateLimitError("Too many requests", "openai", "gpt-4o"),
+            Exception("Bad request"),
+            response,
+        ]
+        limiter = MagicMock()
+        limiter.acquire = AsyncMock(return_value=1.0)
+
+        client = LLMClient("gpt-4o", limiter=limiter)
+        with patch("markpdfdown.core.llm_client.asyncio.sleep"):
+            asyncio.run(client.acompletion("Hello", retry_times=3))
+
+        assert limiter.acquire.await_count == 3
+        assert limiter.release.call_args_list == [
+            call(1.0, success=False, overloaded=True),
+            call(1.0, success=False, overloaded=False),
+            call(1.0, success=True, overloaded=False),
+        ]
+
+    def test_acompletion_waits_for_rate_limit(self, mock_acompletion):
+        """Test each attempt reserves budget and the usage is reconciled"""
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+        image = PageImage(page_num=1, data=b"\x89PNG\r\n", mime_type="image/png")
+
+        client = LLMClient("gpt-4o", rate_limiter=rate_limiter, rate_limit_key="key")
+        asyncio.run(client.acompletion("x" * 40, images=[image], max_tokens=500))
+
+        rate_limiter.acquire.assert_awaited_once_with("key", 10 + 1000 + 500)
+        rate_limiter.reconcile.assert_called_once_with("key", 1510, 15)
+
+    def test_failed_attempt_refunds_estimate(self, mock_acompletion):
+        """Test a failed attempt gives its estimated tokens back"""
+        mock_acompletion.side_effect = [Exception("API Error"), DEFAULT]
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+
+        client = LLMClient("gpt-4o", rate_limiter=rate_limiter)
+        with patch("markpdfdown.core.llm_client.asyncio.sleep"):
+            asyncio.run(client.acompletion("Hello", max_tokens=100))
+
+        assert rate_limiter.acquire.await_count == 2
+        assert rate_limiter.reconcile.call_args_list == [
+            call("gpt-4o", 102, 0),
+            call("gpt-4o", 102, 15),
+        ]
+
+    def test_timeout_excludes_local_queueing(self, mock_acompletion):
+        """Test pages waiting for a limiter slot are not timed out"""
+        from markpdfdown.core.concurrency import AdaptiveLimiter
+
+        response = mock_acompletion.return_value
+
+        async def provider(**kwargs):
+            await asyncio.sleep(0.3)
+            return response
+
+        mock_acompletion.side_effect = provider
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        client = LLMClient("gpt-4o", limiter=limiter, policy=RequestPolicy(timeout=0.5))
+
+        async def pages():
+            return await asyncio.gather(
+                *(client.acompletion(f"Page {i}", retry_times=1) for i in range(4))
+            )
+
+        results = asyncio.run(pages())
+
+        assert [r.content for r in results] == [response.choices[0].message.content] * 4
+        assert limiter.decreases == 0
+
+    def test_timeout_counts_as_overload(self, mock_acompletion):
+        """Test a provider timeout is reported to the limiter as overload"""
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        mock_acompletion.side_effect = hang
+        limiter = MagicMock()
+        limiter.acquire = AsyncMock(return_value=1.0)
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+        client = LLMClient(
+            "gpt-4o",
+            limiter=limiter,
+            rate_limiter=rate_limiter,
+            policy=RequestPolicy(timeout=0.01),
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(client.acompletion("Hello", retry_times=1, max_tokens=100))
+
+        limiter.release.assert_called_once_with(1.0, success=False, overloaded=True)
+        rate_limiter.reconcile.assert_called_once_with("gpt-4o", 102, 0)
+
+    def test_rate_limit_wait_is_not_hedged(self, mock_acompletion):
+        """Test a call waiting for rate-limit tokens is not hedged"""
+
+        async def wait_for_tokens(key, tokens):
+            await asyncio.sleep(0.05)
+
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01, "gpt-4o")
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock(side_effect=wait_for_tokens)
+
+        client = LLMClient("gpt-4o", rate_limiter=rate_limiter, policy=policy)
+        asyncio.run(client.acompletion("Hello"))
+
+        assert policy.hedges_fired == 0
+        assert mock_acompletion.call_count == 1
+
+    def test_cancelled_hedge_refunds_estimate(self, mock_acompletion):
+        """Test the losing hedge gives its estimated tokens back"""
+        response = mock_acompletion.return_value
+        calls = iter(["slow", "fast"])
+
+        async def slow_then_fast(**kwargs):
+            if next(calls) == "fast":
+                return response
+            await asyncio.sleep(10)
+
+        mock_acompletion.side_effect = slow_then_fast
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01, "gpt-4o")
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+
+        client = LLMClient("gpt-4o", rate_limiter=rate_limiter, policy=policy)
+        asyncio.run(client.acompletion("Hello", max_tokens=100))
+
+        assert sorted(rate_limiter.reconcile.call_args_list) == [
+            call("gpt-4o", 102, 0),
+            call("gpt-4o", 102, 15),
+        ]
+
+
+def stream_chunk(content=None, finish_reason=None, usage=None):
+    """Build one litellm streaming chunk"""
+    chunk = MagicMock()
+    chunk.usage = usage
+    if content is None and finish_reason is None:
+        chunk.choices = []
+    else:
+        chunk.choices = [MagicMock(finish_reason=finish_reason)]
+        chunk.choices[0].delta.content = content
+    return chunk
+
+
+def async_stream(*chunks):
+    """Async iterator over chunks, like the stream litellm.acompletion returns"""
+
+    async def iterate():
+        for chunk in chunks:
+            yield chunk
+
+    return iterate()
+
+
+class TestLLMClientStreaming:
+    """Tests for LLMClient.acompletion with on_chunk"""
+
+    @pytest.fixture
+    def usage(self):
+        """Usage reported by the final chunk"""
+        return MagicMock(prompt_tokens=100, completion_tokens=7, total_tokens=107)
+
+    def test_chunks_are_forwarded(self, usage):
+        """Test deltas reach the callback in order with the text so far"""
+        chunks = [
+            stream_chunk("# Ti"),
+            stream_chunk("tle"),
+            stream_chunk("\n", finish_reason="stop"),
+            stream_chunk(usage=usage),
+        ]
+        received = []
+
+        async def on_chunk(delta, content):
+            received.append((delta, content))
+
+        with patch(
+            "markpdfdown.core.llm_client.acompletion",
+            AsyncMock(return_value=async_stream(*chunks)),
+        ) as mock:
+            client = LLMClient("gpt-4o")
+            result = asyncio.run(client.acompletion("Hello", on_chunk=on_chunk))
+
+        assert received == [("# Ti", "# Ti"), ("tle", "# Title"), ("\n", "# Title\n")]
+        assert result.content == "# Title\n"
+        assert result.finish_reason == "stop"
+        assert (result.input_tokens, result.output_tokens) == (100, 7)
+        assert result.total_tokens == 107
+        assert mock.call_args.kwargs["stream"] is True
+        assert mock.call_args.kwargs["stream_options"] == {"include_usage": True}
+
+    def test_usage_reconciles_rate_limit(self, usage):
+        """Test the final chunk's usage corrects the TPM estimate"""
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+        chunks = [stream_chunk("A", finish_reason="stop"), stream_chunk(usage=usage)]
+
+        with patch(
+            "markpdfdown.core.llm_client.acompletion",
+            AsyncMock(return_value=async_stream(*chunks)),
+        ):
+            client = LLMClient("gpt-4o", rate_limiter=rate_limiter)
+            asyncio.run(
+                client.acompletion("Hello", max_tokens=100, on_chunk=AsyncMock())
+            )
+
+        rate_limiter.reconcile.assert_called_once_with("gpt-4o", 102, 107)
+
+    def test_empty_stream_is_retried(self, usage):
+        """Test a stream without content fails the attempt like an empty response"""
+        streams = [
+            async_stream(stream_chunk(usage=usage)),
+            async_stream(stream_chunk("A", finish_reason="stop")),
+        ]
+        on_chunk = AsyncMock()
+
+        with patch(
+            "markpdfdown.core.llm_client.acompletion", AsyncMock(side_effect=streams)
+        ):
+            client = LLMClient("gpt-4o")
+            with patch("markpdfdown.core.llm_client.asyncio.sleep"):
+                result = asyncio.run(client.acompletion("Hello", on_chunk=on_chunk))
+
+        assert result.content == "A"
+        assert result.total_tokens == 0  # no usage reported by the second stream
+        on_chunk.assert_awaited_once_with("A", "A")
+
+    def test_cache_hit_skips_stream(self, tmp_path):
+        """Test cached results are returned without streaming"""
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        on_chunk = AsyncMock()
+
+        with patch(
+            "markpdfdown.core.llm_client.acompletion",
+            AsyncMock(return_value=async_stream(stream_chunk("A", "stop"))),
+        ) as mock:
+            client = LLMClient("gpt-4o", cache=cache)
+            asyncio.run(client.acompletion("Hello", on_chunk=on_chunk))
+            result = asyncio.run(client.acompletion("Hello", on_chunk=on_chunk))
+
+        assert result.cached
+        assert result.content == "A"
+        assert mock.await_count == 1
+        on_chunk.assert_awaited_once()
+        cache.close()
+
+
+class TestLLMClientPool:
+    """Tests for LLMClient with an EndpointPool"""
+
+    def test_failover_to_next_endpoint(self, mock_llm_response):
+        """Test a failed call is retried on another endpoint with its credentials"""
+        first = Endpoint("gpt-4o", api_key="sk-one")
+        second = Endpoint("openai/gpt-4o", api_key="gw-key", api_base="https://gw/v1")
+        pool = EndpointPool([first, second], rng=random.Random(0))
+        response = MagicMock()
+        response.choices[0].message.content = mock_llm_response
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+
+        with patch("markpdfdown.core.llm_client.acompletion") as mock:
+            mock.side_effect = [Exception("API Error"), response]
+            client = LLMClient("gpt-4o", pool=pool, rate_limiter=rate_limiter)
+            with patch.object(pool, "choose", wraps=pool.choose) as choose:
+                with patch("markpdfdown.core.llm_client.asyncio.sleep"):
+                    result = asyncio.run(client.acompletion("Hello", retry_times=2))
+
+        assert result.content == mock_llm_response
+        used = [c.kwargs for c in mock.call_args_list]
+        assert {(k["model"], k["api_key"]) for k in used} == {
+            ("gpt-4o", "sk-one"),
+            ("openai/gpt-4o", "gw-key"),
+        }
+        # The retry avoided the endpoint that had just failed
+        failed = first if used[0]["api_key"] == "sk-one" else second
+        assert choose.call_args_list[1].kwargs["avoid"] == frozenset({failed})
+        stats = pool.stats()
+        assert sum(s["errors"] for s in stats.values()) == 1
+        # Each endpoint draws from its own rate-limit bucket
+        keys = {c.args[0] for c in rate_limiter.acquire.await_args_list}
+        assert keys == {first.key, second.key}
+
+    def test_sync_completion_uses_pool(self, mock_llm_response):
+        """Test the blocking client routes through the pool as well"""
+        endpoint = Endpoint("gpt-4o", api_key="sk-one")
+        pool = EndpointPool([endpoint])
+
+        with patch("markpdfdown.core.llm_client.completion") as mock:
+            mock.return_value.choices[0].message.content = mock_llm_response
+            LLMClient("gpt-4o", pool=pool).completion("Hello")
+
+        assert mock.call_args.kwargs["api_key"] == "sk-one"
+        assert pool.stats()[endpoint.key]["requests"] == 1
+
+    def test_cache_key_names_routed_model(self, mock_llm_response, tmp_path):
+        """Test a result is cached under the model that produced it"""
+        cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        gateway = Endpoint("openai/gpt-4o-mini", api_base="https://gw/v1")
+
+        with patch("markpdfdown.core.llm_client.completion") as mock:
+            mock.return_value.choices[0].message.content = mock_llm_response
+            LLMClient("gpt-4o", cache=cache, pool=EndpointPool([gateway])).completion(
+                "Hello"
+            )
+            # The nominal model never answered this page: no shared entry
+            result = LLMClient("gpt-4o", cache=cache).completion("Hello")
+            assert not result.cached
+            # A pool routing to the same model reuses the entry
+            result = LLMClient(
+                "other", cache=cache, pool=EndpointPool([gateway])
+            ).completion("Hello")
+
+        assert result.cached
+        assert mock.call_count == 2
+        cache.close()
+
+
+class TestIsOverloadError:
+    """Tests for is_overload_error"""
+
+    def test_rate_limit_and_timeout(self):
+        """Test rate-limit and timeout errors count as overload"""
+        assert is_overload_error(
+            litellm.RateLimitError("Too many requests", "openai", "gpt-4o")
+        )
+        assert is_overload_error(litellm.Timeout("Timed out", "gpt-4o", "openai"))
+
+    def test_status_codes(self):
+        """Test overload status codes on other errors are recognized"""
+        error = Exception("Overloaded")
+        error.status_code = 529
+
+        assert is_overload_error(error)
+        assert not is_overload_error(Exception("Bad request"))
+
+
+class TestLLMClientCache:
+    """Tests for the completion cache in LLMClient.completion"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Return a cache stored in a temporary directory"""
+        completion_cache = CompletionCache(str(tmp_path / "llm.sqlite"))
+        yield completion_cache
+        completion_cache.close()
+
+    @pytest.fixture
+    def mock_completion(self):
+        """Mock litellm.completion with token usage"""
+        with patch("markpdfdown.core.llm_client.completion") as mock:
+            response = MagicMock()
+            response.choices = [MagicMock()]
+            response.choices[0].message.content = "# Page"
+            response.usage.prompt_tokens = 100
+            response.usage.completion_tokens = 20
+            response.usage.total_tokens = 120
+            mock.return_value = response
+            yield mock
+
+    def test_hit_skips_api_call(self, cache, mock_completion):
+        """Test a repeated request is answered from the cache with its tokens"""
+        image = PageImage(page_num=1, data=b"\xff\xd8\xff")
+        client = LLMClient("gpt-4o", cache=cache)
+
+        first = client.completion("Convert", images=[image])
+        second = LLMClient("gpt-4o", cache=cache).completion(
+            "Convert", images=[PageImage(page_num=7, data=image.data)]
+        )
+
+        assert mock_completion.call_count == 1
+        assert not first.cached
+        assert second.cached
+        assert (second.content, second.input_tokens, second.total_tokens) == (
+            "# Page",
+            100,
+            120,
+        )
+
+    def test_image_path_and_buffer_share_key(
+        self, cache, mock_completion, sample_image_path
+    ):
+        """Test the key depends on image bytes, not on how they are passed"""
+        with open(sample_image_path, "rb") as f:
+            image = PageImage(page_num=1, data=f.read(), mime_type="image/png")
+        client = LLMClient("gpt-4o", cache=cache)
+
+        client.completion("Convert", image_paths=[sample_image_path])
+        result = client.completion("Convert", images=[image])
+
+        assert result.cached
+        assert mock_completion.call_count == 1
+
+    def test_different_model_misses(self, cache, mock_completion):
+        """Test another model does not reuse the cached completion"""
+        LLMClient("gpt-4o", cache=cache).completion("Convert")
+        LLMClient("gpt-4o-mini", cache=cache).completion("Convert")
+
+        assert mock_completion.call_count == 2
+
+    def test_refresh_cache_bypasses_lookup(self, cache, mock_completion):
+        """Test refresh_cache calls the API and overwrites the entry"""
+        client = LLMClient("gpt-4o", cache=cache)
+        client.completion("Convert")
+        mock_completion.return_value.choices[0].message.content = "# Better"
+
+        refreshed = client.completion("Convert", refresh_cache=True)
+
+        assert not refreshed.cached
+        assert client.completion("Convert").content == "# Better"
+        assert mock_completion.call_count == 2
+
+    def test_empty_result_is_not_cached(self, cache, mock_completion):
+        """Test empty completions are retried next time"""
+        mock_completion.return_value.choices[0].message.content = ""
+        client = LLMClient("gpt-4o", cache=cache)
+
+        client.completion("Convert")
+        client.completion("Convert")
+
+        assert mock_completion.call_count == 2
+
+
 class TestLLMClientEncodeImage:
     """Tests for LLMClient._encode_image method"""
 
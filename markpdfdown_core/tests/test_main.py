@@ -226,6 +226,62 @@ class TestConvertToMarkdown:
         )
         assert "# Content" in result
 
+    @patch("markpdfdown.main.LLMClient")
+    def test_text_fast_path_skips_llm(self, mock_llm_class, tmp_path):
+        """Test prose pages are taken from the text layer without an LLM call"""
+        import fitz
+
+        doc = fitz.open()
+        doc.new_page().insert_textbox(
+            fitz.Rect(72, 72, 520, 400), "Plain prose sentence. " * 30, fontsize=11
+        )
+        doc.new_page().insert_text((72, 300), "Figure 1", fontsize=11)
+        pdf_data = doc.tobytes()
+        doc.close()
+
+        mock_llm = MagicMock()
+        mock_llm.completion.return_value = "# Figure"
+        mock_llm_class.return_value = mock_llm
+
+        with patch("markpdfdown.main.config.text_fast_path", True):
+            result = convert_to_markdown(
+                pdf_data, output_dir=str(tmp_path), cleanup=False
+            )
+
+        assert result.startswith("Plain prose sentence.")
+        assert result.endswith("# Figure")
+        assert mock_llm.completion.call_count == 1
+
+    @patch("markpdfdown.main.LLMClient")
+    def test_page_filter_skips_blank_and_duplicate_pages(
+        self, mock_llm_class, tmp_path
+    ):
+        """Test blank pages are dropped and duplicates reuse earlier Markdown"""
+        import fitz
+
+        doc = fitz.open()
+        for title in ["Notice", None, "Notice"]:
+            page = doc.new_page()
+            if title:
+                page.insert_text((72, 72), title, fontsize=14)
+                page.insert_textbox(
+                    fitz.Rect(72, 90, 520, 400), "Read carefully. " * 30, fontsize=11
+                )
+        pdf_data = doc.tobytes()
+        doc.close()
+
+        mock_llm = MagicMock()
+        mock_llm.completion.return_value = "# Notice"
+        mock_llm_class.return_value = mock_llm
+
+        with patch("markpdfdown.main.config.page_filter", True):
+            result = convert_to_markdown(
+                pdf_data, output_dir=str(tmp_path), cleanup=False
+            )
+
+        assert result == "# Notice\n\n# Notice"
+        assert mock_llm.completion.call_count == 1
+
 
 class TestConvertFromFile:
     """Tests for convert_from_file function"""
@@ -0,0 +1,196 @@
+"""
+Tests for markpdfdown.testing.mock_llm module
+"""
+
+import asyncio
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from markpdfdown.core.endpoint_pool import Endpoint, EndpointPool
+from markpdfdown.core.file_worker import PageImage
+from markpdfdown.core.llm_client import LLMClient
+from markpdfdown.testing import MockLLMServer, page_markdown, parse_latency
+
+IMAGE = PageImage(page_num=1, data=b"\x89PNG page one", mime_type="image/png")
+
+
+def post(server, body):
+    """Send a chat-completions request; return (status, headers, body text)"""
+    request = urllib.request.Request(
+        f"{server.base_url}/chat/completions",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read().decode()
+
+
+def chat(text="Transcribe", images=1, **kwargs):
+    """Chat-completions body with a text part and some image parts"""
+    content = [{"type": "text", "text": text}] + [
+        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,aW1n{i}"}}
+        for i in range(images)
+    ]
+    return {
+        "model": "mock",
+        "messages": [{"role": "user", "content": content}],
+        **kwargs,
+    }
+
+
+def mock_client(server):
+    """LLMClient pointed at the mock server"""
+    endpoint = Endpoint("openai/mock", api_key="sk-mock", api_base=server.base_url)
+    return LLMClient("openai/mock", pool=EndpointPool([endpoint]))
+
+
+class TestParseLatency:
+    """Tests for parse_latency"""
+
+    def test_distributions(self):
+        """Test every supported distribution draws plausible values"""
+        rng = random.Random(0)
+
+        assert parse_latency("0.25")(rng) == 0.25
+        assert parse_latency("fixed:1")(rng) == 1.0
+        assert 0.2 <= parse_latency("uniform:0.2,0.4")(rng) <= 0.4
+        assert parse_latency("lognormal:1.0,0.3")(rng) > 0
+        assert parse_latency("exponential:0.5")(rng) >= 0
+
+    def test_invalid(self):
+        """Test unknown kinds and malformed numbers are rejected"""
+        with pytest.raises(ValueError):
+            parse_latency("gamma:1,2")
+        with pytest.raises(ValueError):
+            parse_latency("uniform:a,b")
+
+
+class TestPageMarkdown:
+    """Tests for page_markdown"""
+
+    def test_deterministic(self):
+        """Test the same seed always gives the same page"""
+        assert page_markdown(b"a") == page_markdown(b"a") != page_markdown(b"b")
+
+    def test_realistic_content(self):
+        """Test pages have a heading, a table and a formula at about the length"""
+        page = page_markdown(b"seed", chars=2400)
+
+        assert page.startswith("# ")
+        assert "|---|---|---|" in page
+        assert "$$" in page
+        assert 2000 < len(page) < 3500
+
+
+class TestMockLLMServer:
+    """Tests for MockLLMServer"""
+
+    def test_completion_with_usage(self, mock_llm_server):
+        """Test a multimodal request gets Markdown and image-aware usage"""
+        status, _, text = post(mock_llm_server, chat(images=2))
+        response = json.loads(text)
+
+        assert status == 200
+        assert response["choices"][0]["finish_reason"] == "stop"
+        assert response["usage"]["prompt_tokens"] == 2 + 2 * 765
+        content = response["choices"][0]["message"]["content"]
+        assert response["usage"]["completion_tokens"] == -(-len(content) // 4)
+        # Two images without page numbers in the prompt: pages 1 and 2
+        assert "<!-- PAGE 1 -->" in content and "<!-- PAGE 2 -->" in content
+
+    def test_packed_page_numbers(self, mock_llm_server):
+        """Test packed requests are answered with their page markers"""
+        body = chat("The 2 images are consecutive pages 7, 8 of the document", 2)
+
+        content = json.loads(post(mock_llm_server, body)[2])["choices"][0]["message"]
+
+        assert "<!-- PAGE 7 -->" in content["content"]
+        assert "<!-- PAGE 8 -->" in content["content"]
+
+    def test_max_tokens_truncates(self, mock_llm_server):
+        """Test answers longer than max_tokens are cut with finish_reason length"""
+        response = json.loads(post(mock_llm_server, chat(max_tokens=10))[2])
+
+        assert response["choices"][0]["finish_reason"] == "length"
+        assert len(response["choices"][0]["message"]["content"]) == 40
+
+    def test_stream(self, mock_llm_server):
+        """Test streamed answers end with usage and [DONE]"""
+        body = chat(stream=True, stream_options={"include_usage": True})
+
+        status, headers, text = post(mock_llm_server, body)
+
+        events = [line[6:] for line in text.splitlines() if line.startswith("data: ")]
+        chunks = [json.loads(event) for event in events[:-1]]
+        assert status == 200
+        assert headers["Content-Type"] == "text/event-stream"
+        assert events[-1] == "[DONE]"
+        assert chunks[-1]["usage"]["prompt_tokens"] == 2 + 765
+        content = "".join(
+            chunk["choices"][0]["delta"].get("content", "")
+            for chunk in chunks
+            if chunk["choices"]
+        )
+        unstreamed = json.loads(post(mock_llm_server, chat())[2])
+        assert content == unstreamed["choices"][0]["message"]["content"]
+
+    def test_injected_errors(self):
+        """Test injected 429s carry Retry-After and 500s are server errors"""
+        with MockLLMServer(error_429=1.0) as server:
+            status, headers, _ = post(server, chat())
+            assert (status, headers["retry-after"]) == (429, "1")
+        with MockLLMServer(error_500=1.0) as server:
+            assert post(server, chat())[0] == 500
+            assert server.stats()["injected_errors"] == 1
+
+    def test_rate_limit(self):
+        """Test requests beyond the RPM limit are refused until the window frees"""
+        with MockLLMServer(rpm=2) as server:
+            statuses = [post(server, chat())[0] for _ in range(3)]
+
+            assert statuses == [200, 200, 429]
+            assert server.stats()["rate_limited"] == 1
+
+    def test_latency(self):
+        """Test responses wait for the configured latency"""
+        with MockLLMServer(latency="fixed:0.2") as server:
+            started = time.monotonic()
+            post(server, chat())
+
+            assert time.monotonic() - started >= 0.2
+
+
+class TestLLMClientAgainstMockServer:
+    """LLMClient talking to the mock server through litellm"""
+
+    def test_completion(self, mock_llm_server):
+        """Test the sync path returns the page and its usage"""
+        result = mock_client(mock_llm_server).completion("Transcribe", images=[IMAGE])
+
+        assert result.content.startswith("# ")
+        assert result.input_tokens > 765
+        assert result.finish_reason == "stop"
+
+    def test_streamed_acompletion(self, mock_llm_server):
+        """Test streamed output arrives in chunks and matches the full answer"""
+        client = mock_client(mock_llm_server)
+        chunks = []
+
+        async def on_chunk(delta, content):
+            chunks.append(delta)
+
+        streamed = asyncio.run(
+            client.acompletion("Transcribe", images=[IMAGE], on_chunk=on_chunk)
+        )
+
+        assert len(chunks) > 10
+        assert streamed.content == "".join(chunks)
+        assert streamed.output_tokens == -(-len(streamed.content) // 4)
@@ -0,0 +1,128 @@
+"""
+Tests for markpdfdown.core.packing module
+"""
+
+import fitz
+import pytest
+
+from markpdfdown.core.file_worker import PageImage
+from markpdfdown.core.packing import (
+    PagePacker,
+    estimate_page_tokens,
+    packed_prompt,
+    split_packed_response,
+)
+
+WORDS = "Hello world lorem ipsum "
+
+
+def page_image(words, dpi=100):
+    """Render a page with the given number of words as a PageImage"""
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 790), WORDS * words, fontsize=10)
+    data = page.get_pixmap(dpi=dpi).tobytes("jpg")
+    document.close()
+    return PageImage(page_num=1, data=data)
+
+
+class TestEstimatePageTokens:
+    """Tests for estimate_page_tokens"""
+
+    def test_scales_with_text_amount(self):
+        """Test a denser page is estimated at proportionally more tokens"""
+        sparse = estimate_page_tokens(page_image(50))
+        dense = estimate_page_tokens(page_image(200))
+
+        assert 200 < sparse < 400  # 1200 characters
+        assert dense == pytest.approx(4 * sparse, rel=0.1)
+
+    def test_independent_of_resolution(self):
+        """Test the estimate does not depend on the render DPI"""
+        low = estimate_page_tokens(page_image(100, dpi=72))
+        high = estimate_page_tokens(page_image(100, dpi=200))
+
+        assert low == pytest.approx(high, rel=0.1)
+
+    def test_blank_page(self):
+        """Test an empty page is estimated at zero tokens"""
+        assert estimate_page_tokens(page_image(0)) == 0
+
+    def test_image_path(self, tmp_path):
+        """Test images on disk are estimated like in-memory images"""
+        image = page_image(50)
+        path = tmp_path / "page_0001.jpg"
+        path.write_bytes(image.data)
+
+        assert estimate_page_tokens(str(path)) == estimate_page_tokens(image)
+
+    def test_text_layer_count_wins(self):
+        """Test a known text-layer character count is used directly"""
+        assert estimate_page_tokens(page_image(200), char_count=400) == 100
+
+
+class TestPagePacker:
+    """Tests for PagePacker"""
+
+    def test_light_pages(self):
+        """Test pages up to half the budget are light"""
+        packer = PagePacker(token_budget=1000)
+
+        assert packer.is_light(500)
+        assert not packer.is_light(501)
+
+    def test_groups_within_budget(self):
+        """Test a group closes when the next page would overflow the budget"""
+        packer = PagePacker(token_budget=1000)
+
+        assert packer.add(1, 400) is None
+        assert packer.add(2, 400) is None
+        assert packer.add(3, 400) == [1, 2]
+        assert packer.flush() == [3]
+        assert packer.flush() is None
+
+    def test_max_pages(self):
+        """Test a group never exceeds max_pages"""
+        packer = PagePacker(token_budget=1000, max_pages=2)
+        closed = [packer.add(page, 10) for page in range(1, 6)]
+
+        assert [group for group in closed if group] == [[1, 2], [3, 4]]
+        assert packer.flush() == [5]
+
+
+class TestSplitPackedResponse:
+    """Tests for split_packed_response"""
+
+    def test_splits_on_markers(self):
+        """Test each page gets the Markdown following its marker"""
+        content = "<!-- PAGE 3 -->\n# Title\n\nText\n\n<!-- PAGE 4 -->\n- item\n"
+
+        assert split_packed_response(content, [3, 4]) == ["# Title\n\nText", "- item"]
+
+    def test_markdown_fence_is_removed(self):
+        """Test a fenced response is unwrapped before splitting"""
+        content = "```markdown\n<!-- PAGE 1 -->\nA\n<!--PAGE 2-->\nB\n```"
+
+        assert split_packed_response(content, [1, 2]) == ["A", "B"]
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            "<!-- PAGE 1 -->\nA\n",  # missing page
+            "<!-- PAGE 2 -->\nB\n<!-- PAGE 1 -->\nA\n",  # wrong order
+            "<!-- PAGE 1 -->\nA\n<!-- PAGE 1 -->\nA\n<!-- PAGE 2 -->\nB",  # repeated
+            "Here are the pages:\n<!-- PAGE 1 -->\nA\n<!-- PAGE 2 -->\nB",  # preamble
+            "<!-- PAGE 1 -->\n\n<!-- PAGE 2 -->\nB",  # empty page
+            "",
+        ],
+    )
+    def test_invalid_split_is_rejected(self, content):
+        """Test responses that cannot be attributed to pages are rejected"""
+        assert split_packed_response(content, [1, 2]) is None
+
+    def test_prompt_names_pages_and_marker(self):
+        """Test the prompt lists the pages and shows the marker format"""
+        prompt = packed_prompt([5, 6, 7])
+
+        assert "pages 5, 6, 7" in prompt
+        assert "<!-- PAGE 5 -->" in prompt
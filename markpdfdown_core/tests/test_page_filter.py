@@ -0,0 +1,185 @@
+"""
+Tests for markpdfdown.core.page_filter module
+"""
+
+import fitz
+import numpy as np
+import pytest
+
+from markpdfdown.core.page_filter import (
+    PAGE_BLANK,
+    PAGE_DUPLICATE,
+    PAGE_KEEP,
+    PageFilter,
+    PageVerdict,
+    fingerprint_pixmap,
+)
+
+DISCLAIMER = "This document is provided as is, without any warranty. " * 8
+
+
+@pytest.fixture
+def doc():
+    """Return an empty in-memory PDF document"""
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+def add_text_page(doc, text, title="DISCLAIMER"):
+    """Add a page with a title line and a block of text"""
+    page = doc.new_page()
+    page.insert_text((72, 72), title, fontsize=14)
+    page.insert_textbox(fitz.Rect(72, 90, 520, 400), text, fontsize=11)
+    return page
+
+
+def fingerprint(page, page_num, dpi=100):
+    """Render a page and fingerprint it"""
+    return fingerprint_pixmap(page.get_pixmap(dpi=dpi), page_num)
+
+
+def rescan(pix):
+    """Simulate a second scan: shifted by two rows, darker and noisy"""
+    rng = np.random.default_rng(0)
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+        pix.height, pix.width, pix.n
+    )
+    pixels = np.roll(pixels.astype(int), 2, axis=0) - 10
+    pixels += rng.integers(-15, 15, pixels.shape)
+    samples = np.clip(pixels, 0, 255).astype(np.uint8).tobytes()
+    return fitz.Pixmap(fitz.csRGB, pix.width, pix.height, samples, 0)
+
+
+class TestFingerprintPixmap:
+    """Tests for fingerprint_pixmap"""
+
+    def test_blank_page_has_no_ink(self, doc):
+        """Test an empty page has zero ink coverage"""
+        result = fingerprint(doc.new_page(), 1)
+
+        assert result.page_num == 1
+        assert result.ink_coverage == 0.0
+        assert result.thumbnail.shape == (64, 64)
+
+    def test_text_page_has_ink(self, doc):
+        """Test a page of text has measurable ink coverage"""
+        result = fingerprint(add_text_page(doc, DISCLAIMER), 2)
+
+        assert result.ink_coverage > 0.005
+        assert 0 < result.phash < 2**64
+
+    def test_margins_are_ignored(self, doc):
+        """Test marks in the page margins do not count as ink"""
+        page = doc.new_page()
+        page.draw_rect(fitz.Rect(0, 0, 595, 10), color=(0, 0, 0), fill=(0, 0, 0))
+
+        assert fingerprint(page, 1).ink_coverage == 0.0
+
+    def test_same_page_same_hash(self, doc):
+        """Test identical pages produce identical fingerprints"""
+        first = fingerprint(add_text_page(doc, DISCLAIMER), 1)
+        second = fingerprint(add_text_page(doc, DISCLAIMER), 2)
+
+        assert first.phash == second.phash
+        assert np.array_equal(first.thumbnail, second.thumbnail)
+
+    def test_grayscale_pixmap(self, doc):
+        """Test grayscale and RGB renders of a page agree"""
+        page = add_text_page(doc, DISCLAIMER)
+        gray = fingerprint_pixmap(page.get_pixmap(dpi=100, colorspace="gray"), 1)
+
+        assert gray.phash == fingerprint(page, 1).phash
+
+
+class TestPageFilter:
+    """Tests for PageFilter.check"""
+
+    def test_blank_page_is_skipped(self, doc):
+        """Test pages below blank_ink_ratio are classified as blank"""
+        page_filter = PageFilter()
+        page = doc.new_page()
+        page.insert_text((290, 820), "7", fontsize=9)
+
+        verdict = page_filter.check(fingerprint(page, 1))
+
+        assert verdict.action == PAGE_BLANK
+        assert not verdict.needs_llm
+        assert page_filter.blank_pages == [1]
+
+    def test_blank_ink_ratio_is_configurable(self, doc):
+        """Test a near-empty page is kept when blank_ink_ratio is lowered"""
+        page = doc.new_page()
+        page.insert_text((72, 300), "Intentionally left blank", fontsize=11)
+        page_fingerprint = fingerprint(page, 1)
+
+        assert PageFilter().check(page_fingerprint).action == PAGE_BLANK
+        assert (
+            PageFilter(blank_ink_ratio=0.0001).check(page_fingerprint).action
+            == PAGE_KEEP
+        )
+
+    def test_duplicate_points_to_first_occurrence(self, doc):
+        """Test repeated pages reuse the first kept page"""
+        page_filter = PageFilter()
+        texts = [
+            (DISCLAIMER, "DISCLAIMER"),
+            ("Quarterly results were above plan. " * 12, "Results"),
+            (DISCLAIMER, "DISCLAIMER"),
+            (DISCLAIMER, "DISCLAIMER"),
+        ]
+
+        verdicts = [
+            page_filter.check(fingerprint(add_text_page(doc, text, title), i + 1))
+            for i, (text, title) in enumerate(texts)
+        ]
+
+        assert [v.action for v in verdicts] == [
+            PAGE_KEEP,
+            PAGE_KEEP,
+            PAGE_DUPLICATE,
+            PAGE_DUPLICATE,
+        ]
+        assert page_filter.duplicate_pages == {3: 1, 4: 1}
+
+    def test_rescanned_page_is_duplicate(self, doc):
+        """Test a shifted, darker, noisy copy is still a near-duplicate"""
+        page_filter = PageFilter()
+        pix = add_text_page(doc, DISCLAIMER).get_pixmap(dpi=100)
+
+        page_filter.check(fingerprint_pixmap(pix, 1))
+        verdict = page_filter.check(fingerprint_pixmap(rescan(pix), 2))
+
+        assert verdict == PageVerdict(2, PAGE_DUPLICATE, verdict.ink_coverage, 1)
+
+    def test_changed_title_is_not_duplicate(self, doc):
+        """Test a page differing only in its title is kept"""
+        page_filter = PageFilter()
+
+        page_filter.check(fingerprint(add_text_page(doc, DISCLAIMER), 1))
+        verdict = page_filter.check(
+            fingerprint(add_text_page(doc, DISCLAIMER, title="NOTICE"), 2)
+        )
+
+        assert verdict.action == PAGE_KEEP
+
+    def test_dense_pages_with_same_layout_are_kept(self, doc):
+        """Test different pages of body text are not merged"""
+        page_filter = PageFilter()
+        first = add_text_page(doc, "Alpha beta gamma delta. " * 40, "Chapter")
+        page_filter.check(fingerprint(first, 1))
+        second = add_text_page(doc, "Omega sigma tau kappa rho. " * 35, "Chapter")
+
+        assert page_filter.check(fingerprint(second, 2)).action == PAGE_KEEP
+
+    def test_hash_distance_is_configurable(self, doc):
+        """Test max_hash_distance=0 with max_mean_diff=0 only matches exact copies"""
+        page_filter = PageFilter(max_hash_distance=0, max_mean_diff=0.0)
+        pix = add_text_page(doc, DISCLAIMER).get_pixmap(dpi=100)
+
+        page_filter.check(fingerprint_pixmap(pix, 1))
+
+        assert page_filter.check(fingerprint_pixmap(pix, 2)).action == PAGE_DUPLICATE
+        assert page_filter.check(fingerprint_pixmap(rescan(pix), 3)).action == (
+            PAGE_KEEP
+        )
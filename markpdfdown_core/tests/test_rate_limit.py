@@ -0,0 +1,179 @@
+"""
+Tests for markpdfdown.core.rate_limit module
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from markpdfdown.core import rate_limit
+from markpdfdown.core.rate_limit import (
+    MemoryBucketStore,
+    RateLimiter,
+    RedisBucketStore,
+    estimate_request_tokens,
+    get_rate_limiter,
+)
+
+
+@pytest.fixture
+def clock():
+    """Freeze the bucket clock at a value the test can advance"""
+    now = [1000.0]
+    with patch("markpdfdown.core.rate_limit.time.monotonic", lambda: now[0]):
+        yield now
+
+
+class TestEstimateRequestTokens:
+    """Tests for estimate_request_tokens"""
+
+    def test_prompt_images_and_output(self):
+        """Test text, images and expected output are all counted"""
+        assert estimate_request_tokens("x" * 400, 2, 8192) == 100 + 2000 + 1000
+
+    def test_output_capped_by_max_tokens(self):
+        """Test a small max_tokens bounds the output estimate"""
+        assert estimate_request_tokens("", 0, 200) == 200
+
+
+class TestMemoryBucketStore:
+    """Tests for MemoryBucketStore"""
+
+    def test_full_bucket_covers_burst(self, clock):
+        """Test a fresh bucket serves up to its capacity without waiting"""
+        store = MemoryBucketStore()
+
+        waits = [store.reserve("k", 3, 1.0, 1) for _ in range(3)]
+
+        assert waits == [0.0, 0.0, 0.0]
+        assert store.reserve("k", 3, 1.0, 1) == pytest.approx(1.0)
+        assert store.reserve("k", 3, 1.0, 1) == pytest.approx(2.0)
+
+    def test_refill_over_time(self, clock):
+        """Test the bucket refills at its rate, up to capacity"""
+        store = MemoryBucketStore()
+        store.reserve("k", 2, 0.5, 2)
+
+        clock[0] += 2.0
+        assert store.reserve("k", 2, 0.5, 1) == 0.0
+        clock[0] += 100.0
+        assert store.reserve("k", 2, 0.5, 3) == pytest.approx(2.0)
+
+    def test_refund(self, clock):
+        """Test negative amounts are credited back, never beyond capacity"""
+        store = MemoryBucketStore()
+        store.reserve("k", 10, 1.0, 10)
+
+        store.reserve("k", 10, 1.0, -4)
+        assert store.reserve("k", 10, 1.0, 4) == 0.0
+        store.reserve("k", 10, 1.0, -50)
+        assert store.reserve("k", 10, 1.0, 11) == pytest.approx(1.0)
+
+    def test_keys_are_independent(self, clock):
+        """Test each key has its own bucket"""
+        store = MemoryBucketStore()
+        store.reserve("a", 1, 1.0, 1)
+
+        assert store.reserve("b", 1, 1.0, 1) == 0.0
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter"""
+
+    def test_requests_per_minute(self, clock):
+        """Test calls beyond the RPM budget are told to wait"""
+        limiter = RateLimiter(rpm=60)
+
+        waits = [limiter.reserve("gpt-4o", 0) for _ in range(61)]
+
+        assert waits[:60] == [0.0] * 60
+        assert waits[60] == pytest.approx(1.0)
+        assert limiter.waited == pytest.approx(1.0)
+
+    def test_tokens_per_minute(self, clock):
+        """Test the TPM bucket is debited by the estimate"""
+        limiter = RateLimiter(tpm=6000)
+
+        assert limiter.reserve("gpt-4o", 6000) == 0.0
+        assert limiter.reserve("gpt-4o", 100) == pytest.approx(1.0)
+
+    def test_oversized_request_is_capped(self, clock):
+        """Test a request larger than the TPM bucket is not blocked forever"""
+        limiter = RateLimiter(tpm=1000)
+
+        assert limiter.reserve("gpt-4o", 50000) == 0.0
+
+    def test_reconcile_refunds_overestimate(self, clock):
+        """Test unused estimated tokens are returned to the bucket"""
+        limiter = RateLimiter(tpm=6000)
+        limiter.reserve("gpt-4o", 6000)
+
+        limiter.reconcile("gpt-4o", 6000, 1000)
+
+        assert limiter.reserve("gpt-4o", 5000) == 0.0
+
+    def test_reconcile_charges_underestimate(self, clock):
+        """Test usage above the estimate is debited"""
+        limiter = RateLimiter(tpm=6000)
+        limiter.reserve("gpt-4o", 1000)
+
+        limiter.reconcile("gpt-4o", 1000, 6000)
+
+        assert limiter.reserve("gpt-4o", 100) == pytest.approx(1.0)
+
+    def test_acquire_sleeps_instead_of_failing(self, clock):
+        """Test acquire waits asynchronously for the budget"""
+        limiter = RateLimiter(rpm=1)
+        limiter.reserve("gpt-4o", 0)
+
+        with patch("markpdfdown.core.rate_limit.asyncio.sleep") as mock_sleep:
+            asyncio.run(limiter.acquire("gpt-4o", 0))
+
+        mock_sleep.assert_awaited_once_with(pytest.approx(60.0))
+
+    def test_unlimited(self, clock):
+        """Test no limit never waits"""
+        limiter = RateLimiter()
+
+        assert all(limiter.reserve("k", 10**6) == 0.0 for _ in range(100))
+
+
+class TestRedisBucketStore:
+    """Tests for RedisBucketStore"""
+
+    @pytest.mark.skipif(rate_limit.redis is None, reason="redis is not installed")
+    def test_reserve_runs_atomic_script(self):
+        """Test reservations go through one Lua script per call"""
+        client = MagicMock()
+        client.register_script.return_value.return_value = b"1.5"
+
+        with patch.object(rate_limit.redis.Redis, "from_url", return_value=client):
+            store = RedisBucketStore("redis://localhost:6379/0")
+            wait = store.reserve("gpt-4o:rpm", 60, 1.0, 1)
+
+        assert wait == 1.5
+        client.register_script.return_value.assert_called_once_with(
+            keys=["markpdfdown:ratelimit:gpt-4o:rpm"], args=[60, 1.0, 1]
+        )
+
+    def test_requires_redis(self):
+        """Test a helpful error is raised without the redis package"""
+        with patch.object(rate_limit, "redis", None):
+            with pytest.raises(ImportError, match="redis"):
+                RedisBucketStore("redis://localhost:6379/0")
+
+
+class TestGetRateLimiter:
+    """Tests for get_rate_limiter"""
+
+    def test_no_limits(self):
+        """Test no limiter is created when both limits are 0"""
+        assert get_rate_limiter(0, 0) is None
+
+    def test_shared_per_settings(self):
+        """Test every caller with the same limits shares one instance"""
+        first = get_rate_limiter(rpm=123)
+
+        assert get_rate_limiter(rpm=123) is first
+        assert get_rate_limiter(rpm=124) is not first
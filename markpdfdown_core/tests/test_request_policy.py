@@ -0,0 +1,220 @@
+"""
+Tests for markpdfdown.core.request_policy module
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import litellm
+import pytest
+
+from markpdfdown.core.request_policy import (
+    RequestPolicy,
+    get_request_policy,
+    retry_after,
+)
+
+
+def run(coro):
+    """Run a coroutine to completion"""
+    return asyncio.run(coro)
+
+
+class TestRetryAfter:
+    """Tests for retry_after"""
+
+    def test_seconds_header(self):
+        """Test a numeric Retry-After is read from the error headers"""
+        error = litellm.RateLimitError(
+            "limited", "openai", "gpt-4o", headers={"Retry-After": "12"}
+        )
+
+        assert retry_after(error) == 12.0
+
+    def test_milliseconds_header(self):
+        """Test retry-after-ms takes precedence and is converted to seconds"""
+        error = Exception("limited")
+        error.litellm_response_headers = {"retry-after-ms": "1500", "retry-after": "9"}
+
+        assert retry_after(error) == 1.5
+
+    def test_http_date_on_response(self):
+        """Test an HTTP-date Retry-After on the raw response is honored"""
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        response = httpx.Response(429, headers={"retry-after": date})
+        error = Exception("limited")
+        error.response = response
+
+        assert 28 <= retry_after(error) <= 30
+
+    def test_no_hint(self):
+        """Test errors without usable headers give no hint"""
+        assert retry_after(Exception("boom")) is None
+        assert retry_after(MagicMock()) is None
+
+
+class TestBackoff:
+    """Tests for RequestPolicy.backoff"""
+
+    def test_exponential_with_jitter(self):
+        """Test the delay is drawn below a cap that doubles per attempt"""
+        policy = RequestPolicy(base_delay=1.0, max_delay=5.0, rng=random.Random(0))
+
+        for attempt, cap in enumerate([1.0, 2.0, 4.0, 5.0, 5.0]):
+            delays = [policy.backoff(attempt) for _ in range(50)]
+            assert all(0 <= delay <= cap for delay in delays)
+            assert max(delays) > cap / 2
+
+    def test_retry_after_wins(self):
+        """Test a provider hint replaces the jittered delay, within max_delay"""
+        policy = RequestPolicy(max_delay=10.0)
+        error = Exception("limited")
+        error.headers = {"retry-after": "3"}
+
+        assert policy.backoff(0, error) == 3.0
+        error.headers = {"retry-after": "120"}
+        assert policy.backoff(0, error) == 10.0
+
+
+class TestHedging:
+    """Tests for RequestPolicy.call"""
+
+    def test_invalid_percentile(self):
+        """Test the hedge percentile must lie strictly between 0 and 100"""
+        with pytest.raises(ValueError):
+            RequestPolicy(hedge_percentile=100)
+
+    def test_hedge_delay_needs_samples(self):
+        """Test hedging waits for enough latencies and then uses the percentile"""
+        policy = RequestPolicy(hedge_percentile=90, hedge_min_samples=10)
+        for latency in range(1, 10):
+            policy.observe(float(latency))
+        assert policy.hedge_delay() is None
+
+        policy.observe(10.0)
+        assert policy.hedge_delay() == 10.0
+        assert RequestPolicy().hedge_delay() is None
+
+    def test_fast_call_is_not_hedged(self):
+        """Test a call finishing before the threshold runs once"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(1.0)
+        calls = []
+
+        async def make_call(sent):
+            calls.append(1)
+            return await policy.send(asyncio.sleep(0, "ok"), sent=sent)
+
+        assert run(policy.call(make_call)) == "ok"
+        assert calls == [1]
+        assert policy.hedges_fired == 0
+
+    def test_original_can_still_win(self):
+        """Test the original response is used when it beats the hedge"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01)
+        delays = iter([0.05, 1.0])
+
+        async def make_call(sent):
+            delay = next(delays)
+            return await policy.send(asyncio.sleep(delay, delay), sent=sent)
+
+        assert run(policy.call(make_call)) == 0.05
+        assert (policy.hedges_fired, policy.hedges_won) == (1, 0)
+
+    def test_failed_original_waits_for_hedge(self):
+        """Test an error of one call does not abort the other"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01)
+        outcomes = iter(["fail", "ok"])
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        async def make_call(sent):
+            outcome = next(outcomes)
+            if outcome == "fail":
+                return await policy.send(fail(), sent=sent)
+            return await policy.send(asyncio.sleep(0.1, outcome), sent=sent)
+
+        assert run(policy.call(make_call)) == "ok"
+        assert policy.hedges_won == 1
+
+    def test_both_failures_raise(self):
+        """Test the error surfaces when both calls fail"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01)
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        async def make_call(sent):
+            return await policy.send(fail(), sent=sent)
+
+        with pytest.raises(RuntimeError, match="boom"):
+            run(policy.call(make_call))
+        assert policy.hedges_fired == 1
+
+    def test_hedging_disabled_per_call(self):
+        """Test hedge=False never duplicates the call"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.001)
+        calls = []
+
+        async def make_call(sent):
+            assert sent is None
+            calls.append(1)
+            return await policy.send(asyncio.sleep(0.02, "ok"), sent=sent)
+
+        run(policy.call(make_call, hedge=False))
+        assert calls == [1]
+
+    def test_local_wait_is_not_hedged(self):
+        """Test the hedge clock starts only once the provider request is sent"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.observe(0.01)
+        calls = []
+
+        async def make_call(sent):
+            calls.append(1)
+            # Waiting for a local rate-limit or concurrency slot
+            await asyncio.sleep(0.05)
+            return await policy.send(asyncio.sleep(0.005, "ok"), sent=sent)
+
+        assert run(policy.call(make_call)) == "ok"
+        assert calls == [1]
+        assert policy.hedges_fired == 0
+
+    def test_latencies_per_endpoint(self):
+        """Test each endpoint is hedged against its own latencies"""
+        policy = RequestPolicy(hedge_percentile=50, hedge_min_samples=2)
+        for latency in (1.0, 2.0):
+            policy.observe(latency, "fast")
+            policy.observe(latency * 10, "slow")
+
+        assert policy.hedge_delay("fast") == 2.0
+        assert policy.hedge_delay("slow") == 20.0
+        assert policy.hedge_delay("new") is None
+
+        async def make_call(sent):
+            return await policy.send(asyncio.sleep(0.01, "ok"), "slow", sent)
+
+        assert run(policy.call(make_call)) == "ok"
+        assert policy.stats()["samples"]["slow"] == 3
+
+
+class TestGetRequestPolicy:
+    """Tests for get_request_policy"""
+
+    def test_shared_per_settings(self):
+        """Test every caller with the same settings shares one instance"""
+        first = get_request_policy(timeout=12.5, hedge_percentile=95)
+
+        assert get_request_policy(timeout=12.5, hedge_percentile=95) is first
+        assert get_request_policy(timeout=12.5) is not first
@@ -0,0 +1,96 @@
+"""
+Tests for markpdfdown.core.resolution module
+"""
+
+import fitz
+import pytest
+
+from markpdfdown.core.resolution import PageRenderPlan, ResolutionPlanner
+
+
+@pytest.fixture
+def doc():
+    """Return an empty in-memory PDF document"""
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+class TestResolutionPlanner:
+    """Tests for ResolutionPlanner.plan"""
+
+    def test_blank_page_uses_min_dpi(self, doc):
+        """Test a page without text or graphics is rendered at min_dpi"""
+        page = doc.new_page()
+
+        plan = ResolutionPlanner().plan(page, 1)
+
+        assert plan.dpi == 72
+        assert plan.reason == "blank"
+        assert plan.text_spans == 0
+
+    def test_sparse_title_page_uses_sparse_dpi(self, doc):
+        """Test a page with a few large spans is rendered below base_dpi"""
+        page = doc.new_page()
+        page.insert_text((72, 300), "Annual Report", fontsize=28)
+
+        plan = ResolutionPlanner().plan(page, 1)
+
+        assert plan.dpi == 100
+        assert plan.reason == "sparse"
+        assert plan.text_spans == 1
+        assert plan.median_font_size == pytest.approx(28)
+
+    def test_small_font_page_uses_dense_dpi(self, doc):
+        """Test a page of small print is rendered above base_dpi"""
+        page = doc.new_page()
+        for i in range(60):
+            page.insert_text((36, 40 + i * 12), f"cell {i} | value {i}", fontsize=7)
+
+        plan = ResolutionPlanner().plan(page, 3)
+
+        assert plan.page_num == 3
+        assert plan.dpi == 200
+        assert plan.reason == "dense"
+
+    def test_ruled_page_uses_dense_dpi(self, doc):
+        """Test many vector drawings (e.g. table rules) count as dense"""
+        page = doc.new_page()
+        page.insert_text((72, 72), "Quarterly figures", fontsize=11)
+        for i in range(12):
+            page.draw_line((72, 100 + i * 20), (500, 100 + i * 20))
+
+        plan = ResolutionPlanner().plan(page, 1)
+
+        assert plan.dpi == 200
+        assert plan.drawing_count >= 10
+
+    def test_regular_prose_uses_base_dpi(self, doc):
+        """Test ordinary body text keeps base_dpi"""
+        page = doc.new_page()
+        for i in range(30):
+            page.insert_text((72, 72 + i * 20), f"Body text line {i}", fontsize=11)
+
+        plan = ResolutionPlanner(base_dpi=150).plan(page, 1)
+
+        assert plan.dpi == 150
+        assert plan.reason == "default"
+
+    def test_large_page_is_capped(self, doc):
+        """Test the DPI is lowered so the image stays within max_pixels"""
+        page = doc.new_page(width=2384, height=3370)  # A0
+        page.insert_text((72, 72), "tiny", fontsize=6)
+
+        planner = ResolutionPlanner()
+        plan = planner.plan(page, 1)
+
+        assert plan.reason == "dense, capped"
+        assert plan.dpi < 72
+        assert plan.estimated_pixels <= planner.max_pixels
+
+    def test_estimated_pixels(self):
+        """Test estimated_pixels follows the planned DPI"""
+        plan = PageRenderPlan(
+            page_num=1, dpi=144, max_pixels=0, reason="", width_pt=72, height_pt=36
+        )
+        assert plan.estimated_pixels == 144 * 72
@@ -0,0 +1,192 @@
+"""
+Tests for markpdfdown.core.text_layer module
+"""
+
+import fitz
+import pytest
+
+from markpdfdown.core.text_layer import ROUTE_LLM, ROUTE_TEXT, PageRoute, PageRouter
+
+BODY = (
+    "The committee reviewed the quarterly report and drafted recommendations "
+    "for the coming year, focusing on staffing, training and maintenance."
+)
+
+
+@pytest.fixture
+def doc():
+    """Return an empty in-memory PDF document"""
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+def add_prose_page(doc):
+    """Add a born-digital prose page with a heading, a list and paragraphs"""
+    page = doc.new_page()
+    page.insert_text((72, 90), "Introduction", fontsize=20)
+    page.insert_textbox(fitz.Rect(72, 110, 520, 200), f"{BODY} {BODY}", fontsize=11)
+    page.insert_textbox(
+        fitz.Rect(72, 210, 520, 260),
+        "- First point about the plan\n- Second point about the budget",
+        fontsize=11,
+    )
+    page.insert_textbox(fitz.Rect(72, 270, 520, 360), BODY, fontsize=11)
+    return page
+
+
+class TestPageRouterRoute:
+    """Tests for PageRouter.route decisions"""
+
+    def test_prose_page_is_converted_locally(self, doc):
+        """Test plain prose is routed to the text fast path"""
+        route = PageRouter().route(add_prose_page(doc), 1)
+
+        assert route.route == ROUTE_TEXT
+        assert route.is_local
+        assert route.reason == "prose"
+        assert route.char_count > 200
+
+    def test_page_with_image_goes_to_llm(self, doc):
+        """Test pages with images are routed to the LLM"""
+        page = add_prose_page(doc)
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+        page.insert_image(fitz.Rect(72, 400, 200, 500), pixmap=pix)
+
+        route = PageRouter().route(page, 1)
+
+        assert route.route == ROUTE_LLM
+        assert route.reason == "images"
+        assert route.markdown is None
+        assert not route.is_local
+
+    def test_page_with_drawings_goes_to_llm(self, doc):
+        """Test pages with vector drawings (table rules, figures) go to the LLM"""
+        page = add_prose_page(doc)
+        for i in range(4):
+            page.draw_line((72, 400 + i * 20), (500, 400 + i * 20))
+
+        assert PageRouter().route(page, 1).reason == "drawings"
+
+    def test_short_page_goes_to_llm(self, doc):
+        """Test pages with too little text go to the LLM"""
+        page = doc.new_page()
+        page.insert_text((72, 300), "Figure 3", fontsize=11)
+
+        assert PageRouter().route(page, 1).reason == "too little text"
+
+    def test_formula_goes_to_llm(self, doc):
+        """Test spans set in a math font route the page to the LLM"""
+        page = add_prose_page(doc)
+        page.insert_text((72, 420), "a + b = c", fontsize=11, fontname="symb")
+
+        assert PageRouter().route(page, 1).reason == "formula"
+
+    def test_tabular_lines_go_to_llm(self, doc):
+        """Test lines split by column gaps are treated as a table"""
+        page = add_prose_page(doc)
+        for i in range(4):
+            y = 420 + i * 14
+            page.insert_text((72, y), f"Item {i}", fontsize=10)
+            page.insert_text((300, y), f"{i * 10}", fontsize=10)
+            page.insert_text((450, y), f"{i * 20}", fontsize=10)
+
+        assert PageRouter().route(page, 1).reason == "table"
+
+    def test_multi_column_goes_to_llm(self, doc):
+        """Test side-by-side text columns go to the LLM"""
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 72, 280, 400), BODY * 2, fontsize=10)
+        page.insert_textbox(fitz.Rect(310, 72, 550, 400), BODY * 2, fontsize=10)
+
+        assert PageRouter().route(page, 1).reason == "multi-column layout"
+
+    def test_headers_and_footers_are_ignored(self, doc):
+        """Test text in the top and bottom margins is dropped"""
+        page = add_prose_page(doc)
+        page.insert_text((290, 830), "Page 7", fontsize=9)
+
+        route = PageRouter().route(page, 1)
+
+        assert route.is_local
+        assert "Page 7" not in route.markdown
+
+
+class TestPageRouterMarkdown:
+    """Tests for local Markdown generation"""
+
+    def test_headings_lists_and_paragraphs(self, doc):
+        """Test headings come from font size, lists and paragraphs are kept"""
+        markdown = PageRouter().route(add_prose_page(doc), 1).markdown
+
+        assert markdown.startswith("# Introduction\n\n")
+        assert "- First point about the plan\n- Second point about the budget" in (
+            markdown
+        )
+        assert f"{BODY} {BODY}" in markdown
+        assert markdown.endswith(BODY)
+
+    def test_heading_levels_follow_size_order(self, doc):
+        """Test larger fonts map to higher heading levels"""
+        page = add_prose_page(doc)
+        page.insert_text((72, 400), "Background", fontsize=15)
+
+        markdown = PageRouter().route(page, 1).markdown
+
+        assert "# Introduction" in markdown
+        assert "## Background" in markdown
+
+    def test_numbered_list(self, doc):
+        """Test numbered items become an ordered list with wrapped lines joined"""
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(72, 72, 520, 300),
+            "1. Alpha step is long enough to wrap onto a second line of this box\n"
+            "2. Beta",
+            fontsize=11,
+        )
+        blocks = page.get_text("dict", sort=True)["blocks"]
+
+        markdown = PageRouter()._to_markdown(blocks)
+
+        assert markdown == (
+            "1. Alpha step is long enough to wrap onto a second line of this box\n"
+            "2. Beta"
+        )
+
+    def test_bold_line_becomes_heading(self, doc):
+        """Test a short all-bold line is treated as a run-in heading"""
+        page = doc.new_page()
+        page.insert_text((72, 72), "Scope", fontsize=11, fontname="hebo")
+        page.insert_textbox(fitz.Rect(72, 90, 520, 300), BODY, fontsize=11)
+        blocks = page.get_text("dict", sort=True)["blocks"]
+
+        assert PageRouter()._to_markdown(blocks) == f"# Scope\n\n{BODY}"
+
+    def test_styled_line(self):
+        """Test bold and italic spans are wrapped in emphasis markers"""
+        line = {
+            "spans": [
+                {"text": "Plain ", "flags": 0},
+                {"text": "bold ", "flags": 16},
+                {"text": "italic", "flags": 2},
+            ]
+        }
+
+        assert PageRouter._styled_line(line) == "Plain **bold** *italic*"
+
+    def test_join_lines_removes_hyphenation(self):
+        """Test end-of-line hyphens are removed when the word continues"""
+        assert PageRouter._join_lines(["A para-", "graph of text"]) == (
+            "A paragraph of text"
+        )
+        assert PageRouter._join_lines(["Well-", "Known"]) == "Well- Known"
+
+
+class TestPageRoute:
+    """Tests for PageRoute"""
+
+    def test_is_local_requires_markdown(self):
+        """Test a text route without markdown is not local"""
+        assert not PageRoute(1, ROUTE_TEXT, "prose").is_local
+        assert PageRoute(1, ROUTE_TEXT, "prose", markdown="x").is_local
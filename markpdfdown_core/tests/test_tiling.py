@@ -0,0 +1,141 @@
+"""
+Tests for markpdfdown.core.tiling module
+"""
+
+import fitz
+
+from markpdfdown.core.file_worker import PageImage
+from markpdfdown.core.tiling import PageTiler, stitch_bands
+
+
+def page_image(width=100, height=400, fmt="png"):
+    """A blank page image of the given pixel size"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    mime_type = "image/png" if fmt == "png" else "image/jpeg"
+    return PageImage(page_num=3, data=pix.tobytes(fmt), mime_type=mime_type)
+
+
+class TestPageTiler:
+    """Tests for PageTiler"""
+
+    def test_regular_page_is_not_tiled(self):
+        """Test an A4 page with a modest estimate stays one request"""
+        assert PageTiler().band_count(1240, 1754, 1500, 8192) == 1
+
+    def test_tall_page(self):
+        """Test pages taller than max_aspect are split by their aspect ratio"""
+        tiler = PageTiler(max_aspect=2.0)
+
+        assert tiler.band_count(500, 1500) == 2
+        assert tiler.band_count(500, 3500) == 4
+
+    def test_oversized_page(self):
+        """Test pages with more than max_pixels are split"""
+        assert PageTiler(max_pixels=1000 * 1000).band_count(1200, 1700) == 3
+
+    def test_dense_page(self):
+        """Test a page whose estimate exceeds its share of max_tokens is split"""
+        tiler = PageTiler(output_share=0.5)
+
+        assert tiler.band_count(1240, 1754, 9000, 8192) == 3
+
+    def test_capped_by_max_bands(self):
+        """Test no page is split into more than max_bands"""
+        assert PageTiler(max_bands=3).band_count(100, 5000, 10**6, 1000) == 3
+
+    def test_plan_reads_image_size(self, tmp_path):
+        """Test plan measures paths and in-memory images alike"""
+        image = page_image(100, 450)
+        path = tmp_path / "page_0001.png"
+        path.write_bytes(image.data)
+        tiler = PageTiler()
+
+        assert tiler.plan(image) == tiler.plan(str(path)) == 3
+
+    def test_split_overlapping_bands(self):
+        """Test bands cover the page top to bottom and overlap their neighbours"""
+        bands = PageTiler(overlap=0.1).split(page_image(100, 400), 2)
+
+        heights = [fitz.Pixmap(band.data).height for band in bands]
+        assert heights == [220, 220]
+        assert [(band.page_num, band.mime_type) for band in bands] == [
+            (3, "image/png"),
+            (3, "image/png"),
+        ]
+
+    def test_split_image_path_keeps_format(self, tmp_path):
+        """Test bands of a JPEG file are JPEG PageImages"""
+        path = tmp_path / "page_0001.jpg"
+        path.write_bytes(page_image(fmt="jpg").data)
+
+        bands = PageTiler(overlap=0).split(str(path), 4)
+
+        assert len(bands) == 4
+        assert {band.mime_type for band in bands} == {"image/jpeg"}
+        assert sum(fitz.Pixmap(band.data).height for band in bands) == 400
+
+
+class TestStitchBands:
+    """Tests for stitch_bands"""
+
+    def test_repeated_lines_kept_once(self):
+        """Test lines in the overlap of two bands appear once"""
+        parts = [
+            "# Title\n\nFirst paragraph.\n\nSecond paragraph starts\nand goes on",
+            "and goes on\nto its end.\n\nThird paragraph.",
+        ]
+
+        assert stitch_bands(parts) == (
+            "# Title\n\nFirst paragraph.\n\n"
+            "Second paragraph starts\nand goes on\nto its end.\n\n"
+            "Third paragraph."
+        )
+
+    def test_table_rows_deduplicated(self):
+        """Test repeated rows are dropped and the table continues"""
+        parts = [
+            "| Item | Qty |\n|---|---|\n| Apples | 3 |\n| Pears | 5 |",
+            "| Pears  | 5 |\n| Plums | 7 |\n\nTotal: 15",
+        ]
+
+        assert stitch_bands(parts) == (
+            "| Item | Qty |\n|---|---|\n| Apples | 3 |\n| Pears | 5 |\n"
+            "| Plums | 7 |\n\nTotal: 15"
+        )
+
+    def test_line_cut_at_band_edge(self):
+        """Test a line cut off at the bottom of a band yields to its full copy"""
+        parts = [
+            "| Item | Qty |\n|---|---|\n| Apples | 3 |\n| Pears | 5 |\n| Plu",
+            "| Pears | 5 |\n| Plums | 7 |",
+        ]
+
+        assert stitch_bands(parts).splitlines()[-2:] == [
+            "| Pears | 5 |",
+            "| Plums | 7 |",
+        ]
+
+    def test_repeated_table_header_dropped(self):
+        """Test a header the model repeated for a continued table is dropped"""
+        parts = [
+            "| Item | Qty |\n|---|---|\n| Apples | 3 |",
+            "| Item | Qty |\n| --- | --- |\n| Plums | 7 |",
+        ]
+
+        assert stitch_bands(parts) == (
+            "| Item | Qty |\n|---|---|\n| Apples | 3 |\n| Plums | 7 |"
+        )
+
+    def test_similar_rows_are_not_merged(self):
+        """Test rows that only look alike are both kept"""
+        parts = ["| A | B |\n|---|---|\n| 1 | x |", "| A | B |\n|---|---|\n| 2 | y |"]
+
+        assert stitch_bands(parts).count("| 1 | x |") == 1
+        assert "| 2 | y |" in stitch_bands(parts)
+
+    def test_no_overlap(self):
+        """Test bands without common lines are joined as separate blocks"""
+        assert stitch_bands(["Top text.", "", "Bottom text."]) == (
+            "Top text.\n\nBottom text."
+        )